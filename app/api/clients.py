@@ -1,6 +1,7 @@
 # File: /app/api/clients.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import logging
 
@@ -11,6 +12,7 @@ from app.schemas.schemas import (
     ClientCredentials, ClientWithCredentials
 )
 from app.core.security import encrypt_data, decrypt_data
+from app.core.responses import conditional_json_response
 
 logger = logging.getLogger(__name__)
 
@@ -89,23 +91,23 @@ def check_credential_existence(client: ClientModel) -> dict:
         )
     }
 
-def validate_client_code_unique(db: Session, client_code: str, exclude_id: Optional[int] = None) -> bool:
+async def validate_client_code_unique(db: AsyncSession, client_code: str, exclude_id: Optional[int] = None) -> bool:
     """
     Validate that client code is unique
     
     Args:
-        db (Session): Database session
+        db (AsyncSession): Database session
         client_code (str): Client code to validate
         exclude_id (Optional[int]): Client ID to exclude from check (for updates)
         
     Returns:
         bool: True if unique, False if duplicate exists
     """
-    query = db.query(ClientModel).filter(ClientModel.client_code == client_code)
+    query = select(ClientModel.id).where(ClientModel.client_code == client_code)
     if exclude_id:
-        query = query.filter(ClientModel.id != exclude_id)
+        query = query.where(ClientModel.id != exclude_id)
     
-    existing_client = query.first()
+    existing_client = await db.scalar(query.limit(1))
     return existing_client is None
 
 # =============================================================================
@@ -116,7 +118,7 @@ def validate_client_code_unique(db: Session, client_code: str, exclude_id: Optio
 async def create_client(
     client_data: ClientCreate,
     credentials: Optional[dict] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new client
@@ -124,7 +126,7 @@ async def create_client(
     Args:
         client_data (ClientCreate): Client creation data
         credentials (Optional[dict]): Optional broker credentials
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         ClientResponse: Created client data
@@ -136,14 +138,14 @@ async def create_client(
     
     try:
         # Validate client code uniqueness
-        if not validate_client_code_unique(db, client_data.client_code):
+        if not await validate_client_code_unique(db, client_data.client_code):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Client code '{client_data.client_code}' already exists"
             )
         
         # Validate email uniqueness
-        existing_email = db.query(ClientModel).filter(ClientModel.email == client_data.email).first()
+        existing_email = await db.scalar(select(ClientModel.id).where(ClientModel.email == client_data.email).limit(1))
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -161,8 +163,8 @@ async def create_client(
         # Create database record
         db_client = ClientModel(**client_dict)
         db.add(db_client)
-        db.commit()
-        db.refresh(db_client)
+        await db.commit()
+        await db.refresh(db_client)
         
         logger.info(f"Client created successfully: {db_client.client_code} (ID: {db_client.id})")
         
@@ -176,10 +178,10 @@ async def create_client(
         
     except HTTPException:
         # Re-raise HTTP exceptions
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error creating client {client_data.client_code}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -188,23 +190,25 @@ async def create_client(
 
 @router.get("/", response_model=ClientListResponse)
 async def list_clients(
+    request: Request,
     skip: int = Query(0, ge=0, description="Number of clients to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of clients to return"),
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     risk_profile: Optional[str] = Query(None, description="Filter by risk profile"),
     search: Optional[str] = Query(None, description="Search by client code or name"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     List all clients with optional filtering and pagination
     
     Args:
+        request (Request): Incoming request (for If-None-Match)
         skip (int): Number of records to skip
         limit (int): Number of records to return
         is_active (Optional[bool]): Filter by active status
         risk_profile (Optional[str]): Filter by risk profile
         search (Optional[str]): Search term
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         ClientListResponse: List of clients with pagination info
@@ -213,28 +217,28 @@ async def list_clients(
     
     try:
         # Build query
-        query = db.query(ClientModel)
+        query = select(ClientModel)
         
         # Apply filters
         if is_active is not None:
-            query = query.filter(ClientModel.is_active == is_active)
+            query = query.where(ClientModel.is_active == is_active)
         
         if risk_profile:
-            query = query.filter(ClientModel.risk_profile == risk_profile)
+            query = query.where(ClientModel.risk_profile == risk_profile)
         
         if search:
             search_filter = f"%{search}%"
-            query = query.filter(
+            query = query.where(
                 (ClientModel.client_code.ilike(search_filter)) |
                 (ClientModel.name.ilike(search_filter)) |
                 (ClientModel.email.ilike(search_filter))
             )
         
         # Get total count
-        total = query.count()
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
         
         # Apply pagination and get results
-        clients = query.offset(skip).limit(limit).all()
+        clients = (await db.scalars(query.offset(skip).limit(limit))).all()
         
         # Convert to response format (excluding encrypted fields)
         client_list = []
@@ -244,14 +248,14 @@ async def list_clients(
         
         logger.info(f"Retrieved {len(client_list)} clients (total: {total})")
         
-        return ClientListResponse(
+        return conditional_json_response(request, ClientListResponse(
             success=True,
             message=f"Retrieved {len(client_list)} clients",
             data=client_list,
             total=total,
             page=skip // limit + 1,
             per_page=limit
-        )
+        ))
         
     except Exception as e:
         logger.error(f"Error listing clients: {e}")
@@ -264,7 +268,7 @@ async def list_clients(
 async def get_client(
     client_id: int,
     include_credentials: bool = Query(False, description="Include credential status"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific client by ID
@@ -272,7 +276,7 @@ async def get_client(
     Args:
         client_id (int): Client ID
         include_credentials (bool): Whether to include credential status
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         ClientResponse: Client data
@@ -284,7 +288,7 @@ async def get_client(
     
     try:
         # Get client from database
-        client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+        client = await db.get(ClientModel, client_id)
         
         if not client:
             raise HTTPException(
@@ -324,7 +328,7 @@ async def get_client(
 async def update_client(
     client_id: int,
     client_update: ClientUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a client
@@ -332,7 +336,7 @@ async def update_client(
     Args:
         client_id (int): Client ID
         client_update (ClientUpdate): Client update data
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         ClientResponse: Updated client data
@@ -344,7 +348,7 @@ async def update_client(
     
     try:
         # Get existing client
-        client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+        client = await db.get(ClientModel, client_id)
         
         if not client:
             raise HTTPException(
@@ -354,10 +358,10 @@ async def update_client(
         
         # Validate email uniqueness if email is being updated
         if client_update.email and client_update.email != client.email:
-            existing_email = db.query(ClientModel).filter(
+            existing_email = await db.scalar(select(ClientModel.id).where(
                 ClientModel.email == client_update.email,
                 ClientModel.id != client_id
-            ).first()
+            ).limit(1))
             if existing_email:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -370,8 +374,8 @@ async def update_client(
             setattr(client, field, value)
         
         # Commit changes
-        db.commit()
-        db.refresh(client)
+        await db.commit()
+        await db.refresh(client)
         
         logger.info(f"Client updated successfully: {client.client_code}")
         
@@ -385,10 +389,10 @@ async def update_client(
         
     except HTTPException:
         # Re-raise HTTP exceptions
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error updating client {client_id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -398,14 +402,14 @@ async def update_client(
 @router.delete("/{client_id}")
 async def delete_client(
     client_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a client (soft delete - mark as inactive)
     
     Args:
         client_id (int): Client ID
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         dict: Success message
@@ -417,7 +421,7 @@ async def delete_client(
     
     try:
         # Get existing client
-        client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+        client = await db.get(ClientModel, client_id)
         
         if not client:
             raise HTTPException(
@@ -427,7 +431,7 @@ async def delete_client(
         
         # Soft delete - mark as inactive
         client.is_active = False
-        db.commit()
+        await db.commit()
         
         logger.info(f"Client soft deleted: {client.client_code}")
         
@@ -438,10 +442,10 @@ async def delete_client(
         
     except HTTPException:
         # Re-raise HTTP exceptions
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error deleting client {client_id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -456,7 +460,7 @@ async def delete_client(
 async def update_client_credentials(
     client_id: int,
     credentials: ClientCredentials,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update client broker credentials
@@ -464,7 +468,7 @@ async def update_client_credentials(
     Args:
         client_id (int): Client ID
         credentials (ClientCredentials): New credentials
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         ClientResponse: Updated client data
@@ -476,7 +480,7 @@ async def update_client_credentials(
     
     try:
         # Get existing client
-        client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+        client = await db.get(ClientModel, client_id)
         
         if not client:
             raise HTTPException(
@@ -504,8 +508,8 @@ async def update_client_credentials(
             )
         
         # Commit changes
-        db.commit()
-        db.refresh(client)
+        await db.commit()
+        await db.refresh(client)
         
         logger.info(f"Credentials updated for client {client.client_code} - {broker_name}")
         
@@ -519,10 +523,10 @@ async def update_client_credentials(
         
     except HTTPException:
         # Re-raise HTTP exceptions
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error updating credentials for client {client_id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -532,14 +536,14 @@ async def update_client_credentials(
 @router.get("/{client_id}/credentials/status")
 async def get_credential_status(
     client_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get credential status for a client (which brokers have credentials configured)
     
     Args:
         client_id (int): Client ID
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         dict: Credential status information
@@ -551,7 +555,7 @@ async def get_credential_status(
     
     try:
         # Get existing client
-        client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+        client = await db.get(ClientModel, client_id)
         
         if not client:
             raise HTTPException(
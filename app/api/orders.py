@@ -1,17 +1,45 @@
 # File: /app/api/orders.py
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status, BackgroundTasks
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any, Tuple, Callable, Awaitable
 from pydantic import BaseModel, Field, validator
 import logging
 import asyncio
-from datetime import datetime, timezone
+import time
+import httpx
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from functools import partial
 
-from app.db.database import get_db
-from app.models.models import Client as ClientModel, Order as OrderModel, Token as TokenModel
+from app.config import settings
+from app.db.database import AsyncSessionLocal, get_db, release_connection, session_scope
+from app.models.models import (
+    Client as ClientModel,
+    Order as OrderModel,
+    OrderBatch as OrderBatchModel,
+    OrderBatchItem as OrderBatchItemModel,
+    ConditionalOrder as ConditionalOrderModel,
+    Token as TokenModel
+)
 from app.schemas.schemas import OrderCreate, Order, OrderResponse, ResponseBase
-from app.core.mofsl_api_wrapper import mofsl_wrapper
+from app.core.mofsl_api_wrapper import OrderRejectedError, mofsl_wrapper
+from app.core.order_journal import order_journal
+from app.core.dispatch import DispatchPriority, TradingHaltedError, order_dispatcher
+from app.core.idempotency import IdempotencyUnavailableError, OrderInProgressError, order_idempotency
+from app.core.order_reconciler import order_reconciler
+from app.core.order_book_cache import is_terminal_order, order_book_cache
+from app.core.order_slicer import OrderSlicer
+from app.core.allocation import ALLOCATION_RULES, allocate_lots, load_allocation_weights
+from app.core.execution_algos import AlgoExecution, AlgoSlice, execution_scheduler, plan_slices
+from app.core.risk import RiskLimitError, instrument_key, risk_ledger
+from app.core.margin_cache import MarginCheck, margin_cache
+from app.core.trigger_engine import TRIGGER_TYPES, trigger_engine
+from app.core.square_off import segment_for_exchange, square_off_scheduler
+from app.core.coordination import shared_state
+from app.core.batch_jobs import BatchProgress, batch_job_runner
+from app.core.responses import conditional_json_response
+from app.core.streaming import streaming_records_response, STREAM_FORMAT_PATTERN
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +54,16 @@ router = APIRouter(
 # REQUEST/RESPONSE SCHEMAS
 # =============================================================================
 
+# Most client orders executed synchronously by /orders/execute-all
+MAX_BATCH_ORDERS = 100
+
+# Most orders changed by one /orders/cancel:batch or /orders/modify:batch call
+MAX_BULK_ORDERS = 1000
+
+# Database token ID recorded for exits of instruments missing from the master
+# (the risk ledger does not track these - it keys instruments by token ID)
+UNMAPPED_TOKEN_ID = 1
+
 class ClientOrder(BaseModel):
     """Individual client order within batch execution"""
     client_id: int = Field(..., gt=0, description="Client ID")
@@ -33,6 +71,42 @@ class ClientOrder(BaseModel):
     price: Optional[Decimal] = Field(None, gt=0, description="Limit price (optional for market orders)")
     remarks: Optional[str] = Field(None, max_length=100, description="Order remarks")
 
+class AllocationRequest(BaseModel):
+    """Total quantity or notional to split across clients"""
+    rule: str = Field(default="equal", description="Allocation rule: equal, margin, portfolio_value or risk_profile")
+    total_quantity: Optional[int] = Field(None, gt=0, description="Total quantity to allocate")
+    notional: Optional[Decimal] = Field(None, gt=0, description="Total order value to allocate")
+    reference_price: Optional[Decimal] = Field(None, gt=0, description="Price converting the notional to a quantity (default - default_price)")
+    client_ids: Optional[List[int]] = Field(None, min_items=1, description="Clients to allocate across (optional - default all active clients)")
+    
+    @validator('rule')
+    def validate_rule(cls, v):
+        if v not in ALLOCATION_RULES:
+            raise ValueError(f"Allocation rule must be one of: {', '.join(ALLOCATION_RULES)}")
+        return v
+    
+    @validator('notional', always=True)
+    def validate_total(cls, v, values):
+        if (v is None) == (values.get('total_quantity') is None):
+            raise ValueError('Exactly one of total_quantity or notional is required')
+        return v
+
+class ExecutionAlgoRequest(BaseModel):
+    """Spread a batch over a time window instead of placing it at once"""
+    algo: str = Field(..., pattern=r'^(TWAP|VWAP)$', description="Execution algo")
+    duration_minutes: int = Field(..., ge=1, le=375, description="Execution window in minutes")
+    slices: int = Field(default=10, ge=2, le=200, description="Number of child batches over the window")
+    volume_profile: Optional[List[float]] = Field(None, min_items=1, description="Relative volumes over the window (VWAP only - default intraday volume curve)")
+    
+    @validator('volume_profile')
+    def validate_volume_profile(cls, v, values):
+        if v is not None:
+            if values.get('algo') != 'VWAP':
+                raise ValueError('volume_profile only applies to VWAP')
+            if any(volume < 0 for volume in v) or not sum(v):
+                raise ValueError('volume_profile must be non-negative with a positive total')
+        return v
+
 class BatchOrderRequest(BaseModel):
     """Batch order execution request"""
     # Trade parameters
@@ -51,12 +125,31 @@ class BatchOrderRequest(BaseModel):
     segment: str = Field(default="interactive", pattern=r'^(interactive|commodity)$', description="Credential segment")
     validity: str = Field(default="DAY", pattern=r'^(DAY|IOC|GTD)$', description="Order validity")
     
-    # Client orders
-    client_orders: List[ClientOrder] = Field(..., min_items=1, max_items=100, description="List of client orders")
+    # Client orders (or an allocation that generates them)
+    client_orders: Optional[List[ClientOrder]] = Field(None, min_items=1, max_items=MAX_BATCH_ORDERS, description="List of client orders")
+    allocation: Optional[AllocationRequest] = Field(None, description="Split a total quantity across clients instead of listing client orders")
     
     # Execution options
     dry_run: bool = Field(default=False, description="Dry run mode (validate without executing)")
-    max_concurrent: int = Field(default=5, ge=1, le=20, description="Maximum concurrent order executions")
+    max_concurrent: int = Field(default=5, ge=1, le=20, description="Maximum concurrent order executions for this batch")
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=100, description="Retries with the same key return the original orders")
+    execution_algo: Optional[ExecutionAlgoRequest] = Field(None, description="Schedule the orders over a window (TWAP/VWAP) instead of placing them at once")
+    margin_check: Optional[str] = Field(None, pattern=r'^(off|reject|resize)$', description="Unaffordable orders: off, reject or resize (default - ORDER_MARGIN_CHECK_MODE)")
+    
+    @validator('allocation', always=True)
+    def validate_orders_or_allocation(cls, v, values):
+        if (v is None) == (values.get('client_orders') is None):
+            raise ValueError('Exactly one of client_orders or allocation is required')
+        return v
+
+class BatchJobRequest(BatchOrderRequest):
+    """Batch order job request - executed in the background, so far larger batches are allowed"""
+    client_orders: Optional[List[ClientOrder]] = Field(
+        None,
+        min_items=1,
+        max_items=settings.ORDER_BATCH_MAX_ORDERS,
+        description="List of client orders"
+    )
 
 class OrderExecutionResult(BaseModel):
     """Result of individual order execution"""
@@ -68,6 +161,8 @@ class OrderExecutionResult(BaseModel):
     order_id: Optional[str] = None
     error_message: Optional[str] = None
     execution_time_ms: Optional[int] = None
+    replayed: bool = False  # Order was placed by an earlier request with the same idempotency key
+    child_orders: Optional[List[Dict[str, Any]]] = None  # Set when the quantity was split into several orders
 
 class BatchOrderResponse(BaseModel):
     """Batch order execution response"""
@@ -86,20 +181,170 @@ class ExitOrderRequest(BaseModel):
     segment: str = Field(default="interactive", description="Credential segment")
     client_filter: Optional[List[int]] = Field(None, description="Specific client IDs to exit (optional)")
     min_quantity: int = Field(default=1, ge=1, description="Minimum position quantity to exit")
+    max_concurrent_discovery: int = Field(default=50, ge=1, le=200, description="Maximum concurrent position fetches")
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=100, description="Retries with the same key return the original exit orders")
     dry_run: bool = Field(default=False, description="Dry run mode")
 
+class KillSwitchRequest(BaseModel):
+    """Firm-wide kill switch request"""
+    confirm: bool = Field(..., description="Must be true to engage the kill switch")
+    segment: str = Field(default="interactive", pattern=r'^(interactive|commodity)$', description="Credential segment")
+    client_filter: Optional[List[int]] = Field(None, description="Specific client IDs (optional - default all clients)")
+    cancel_open_orders: bool = Field(default=True, description="Cancel every open order")
+    square_off: bool = Field(default=False, description="Square off positions after cancelling")
+    square_off_product_types: List[str] = Field(default=["MIS"], description="Product types to square off (intraday by default)")
+    default_exchange: str = Field(default="NSE", pattern=r'^(NSE|BSE|MCX|NCDEX)$', description="Exchange for positions that do not report one")
+    halt_entries: bool = Field(default=True, description="Reject new entry orders until the kill switch is released")
+    max_concurrent_discovery: int = Field(default=100, ge=1, le=500, description="Maximum concurrent order book/position fetches")
+    dry_run: bool = Field(default=False, description="Dry run mode (report without cancelling or placing)")
+    
+    @validator('confirm')
+    def validate_confirm(cls, v):
+        """Require explicit confirmation"""
+        if not v:
+            raise ValueError('confirm must be true to engage the kill switch')
+        return v
+
+class SquareOffRequest(BaseModel):
+    """Intraday square-off run (scheduled runs use the defaults)"""
+    exchanges: Optional[List[str]] = Field(None, min_items=1, description="Exchanges to square off (optional - every exchange with a configured cut-off)")
+    product_types: List[str] = Field(default_factory=lambda: list(settings.SQUARE_OFF_PRODUCT_TYPES), min_items=1, description="Product types to square off")
+    client_filter: Optional[List[int]] = Field(None, description="Specific client IDs (optional - default all clients)")
+    cancel_open_orders: bool = Field(default=True, description="Cancel open orders of the squared-off products first so they cannot reopen positions")
+    max_attempts: int = Field(default=settings.SQUARE_OFF_MAX_ATTEMPTS, ge=1, le=10, description="Exit rounds before positions still open are escalated")
+    max_concurrent_discovery: int = Field(default=settings.SQUARE_OFF_MAX_CONCURRENT_DISCOVERY, ge=1, le=500, description="Maximum concurrent position fetches")
+    dry_run: bool = Field(default=False, description="Dry run mode (report open positions without exiting)")
+    
+    @validator('exchanges', each_item=True)
+    def validate_exchanges(cls, v):
+        if v not in ('NSE', 'BSE', 'MCX', 'NCDEX'):
+            raise ValueError('Exchange must be one of: NSE, BSE, MCX, NCDEX')
+        return v
+    
+    @validator('product_types', each_item=True)
+    def validate_product_types(cls, v):
+        if v not in ('MIS', 'CNC', 'NRML'):
+            raise ValueError('Product type must be one of: MIS, CNC, NRML')
+        return v
+
+class ConditionalOrderRequest(BaseModel):
+    """Conditional (GTT) order held server-side and placed when its trigger is hit"""
+    client_id: int = Field(..., gt=0, description="Client ID")
+    token_id: str = Field(..., description="MOFSL token/symbol ID")
+    symbol: str = Field(..., min_length=1, max_length=20, description="Trading symbol")
+    exchange: str = Field(..., pattern=r'^(NSE|BSE|MCX|NCDEX)$', description="Exchange")
+    trigger_type: str = Field(..., description="STOP_LOSS, TARGET or TRAILING_STOP")
+    transaction_type: str = Field(..., pattern=r'^(BUY|SELL)$', description="Transaction type of the triggered order")
+    product_type: str = Field(default="MIS", pattern=r'^(MIS|CNC|NRML)$', description="Product type")
+    order_type: str = Field(default="MKT", pattern=r'^(MKT|LMT)$', description="Order type placed when triggered")
+    quantity: int = Field(..., gt=0, description="Quantity to trade")
+    price: Optional[Decimal] = Field(None, gt=0, description="Limit price (LMT only)")
+    trigger_price: Optional[Decimal] = Field(None, gt=0, description="Trigger level (STOP_LOSS and TARGET)")
+    trail_amount: Optional[Decimal] = Field(None, gt=0, description="Distance the stop trails the best price (TRAILING_STOP)")
+    reference_price: Optional[Decimal] = Field(None, gt=0, description="Best price the trail starts from (TRAILING_STOP - default last traded price)")
+    segment: str = Field(default="interactive", pattern=r'^(interactive|commodity)$', description="Credential segment")
+    entry: bool = Field(default=False, description="Opens a position - risk checked and halted by the kill switch (exits by default)")
+    expires_at: Optional[datetime] = Field(None, description="Trigger validity (optional - good till cancelled)")
+    
+    @validator('trigger_type')
+    def validate_trigger_type(cls, v):
+        if v not in TRIGGER_TYPES:
+            raise ValueError(f"Trigger type must be one of: {', '.join(TRIGGER_TYPES)}")
+        return v
+    
+    @validator('price', always=True)
+    def validate_price(cls, v, values):
+        if (values.get('order_type') == 'LMT') != (v is not None):
+            raise ValueError('price is required for LMT orders and not allowed for MKT orders')
+        return v
+    
+    @validator('trail_amount', always=True)
+    def validate_trigger(cls, v, values):
+        trailing = values.get('trigger_type') == 'TRAILING_STOP'
+        if trailing and v is None:
+            raise ValueError('trail_amount is required for trailing stops')
+        if not trailing and (v is not None or values.get('trigger_price') is None):
+            raise ValueError('trigger_price (and no trail_amount) is required for stop loss and target orders')
+        return v
+
+class Tick(BaseModel):
+    """Last traded price of an instrument"""
+    token_id: str = Field(..., description="MOFSL token/symbol ID")
+    exchange: str = Field(..., pattern=r'^(NSE|BSE|MCX|NCDEX)$', description="Exchange")
+    price: float = Field(..., gt=0, description="Last traded price")
+
+class TickBatchRequest(BaseModel):
+    """Market data ticks, in arrival order"""
+    ticks: List[Tick] = Field(..., min_items=1, max_items=settings.TICK_MAX_BATCH_SIZE, description="Ticks to apply")
+
+class OrderRef(BaseModel):
+    """Broker order of a client"""
+    client_id: int = Field(..., gt=0, description="Client ID")
+    order_id: str = Field(..., min_length=1, description="Broker order ID")
+
+class BulkOrderRequest(BaseModel):
+    """Open orders selected by filters or listed explicitly"""
+    segment: str = Field(default="interactive", pattern=r'^(interactive|commodity)$', description="Credential segment")
+    client_ids: Optional[List[int]] = Field(None, min_items=1, description="Only orders of these clients (optional - default all clients)")
+    token_id: Optional[str] = Field(None, description="Only orders for this MOFSL token ID")
+    exchange: Optional[str] = Field(None, pattern=r'^(NSE|BSE|MCX|NCDEX)$', description="Only orders on this exchange")
+    transaction_type: Optional[str] = Field(None, pattern=r'^(BUY|SELL)$', description="Only orders on this side")
+    product_type: Optional[str] = Field(None, pattern=r'^(MIS|CNC|NRML)$', description="Only orders of this product type")
+    statuses: Optional[List[str]] = Field(None, min_items=1, description="Only orders in these broker statuses (e.g. Confirm, Trigger Pending)")
+    max_concurrent_discovery: int = Field(default=50, ge=1, le=500, description="Maximum concurrent order book fetches")
+    dry_run: bool = Field(default=False, description="Dry run mode (report the selected orders without changing them)")
+    order_ids: Optional[List[OrderRef]] = Field(None, min_items=1, max_items=MAX_BULK_ORDERS, description="Explicit orders (instead of filters)")
+    
+    @validator('order_ids', always=True)
+    def validate_selection(cls, v, values):
+        """Require either explicit orders or at least one filter"""
+        filters = [values.get(name) for name in ('client_ids', 'token_id', 'exchange', 'transaction_type', 'product_type', 'statuses')]
+        if v is not None and any(value is not None for value in filters):
+            raise ValueError('order_ids cannot be combined with filters')
+        if v is None and all(value is None for value in filters):
+            raise ValueError('Select orders with order_ids or at least one filter')
+        return v
+
+class BulkModifyRequest(BulkOrderRequest):
+    """Modification applied to every selected open order"""
+    order_type: Optional[str] = Field(None, pattern=r'^(MKT|LMT|SL|SLM)$', description="New order type")
+    quantity: Optional[int] = Field(None, gt=0, description="New total quantity")
+    price: Optional[Decimal] = Field(None, gt=0, description="New limit price")
+    trigger_price: Optional[Decimal] = Field(None, gt=0, description="New trigger price")
+    validity: Optional[str] = Field(None, pattern=r'^(DAY|IOC)$', description="New validity")
+    
+    @validator('validity', always=True)
+    def validate_modification(cls, v, values):
+        """Require at least one field to change"""
+        if v is None and all(values.get(name) is None for name in ('order_type', 'quantity', 'price', 'trigger_price')):
+            raise ValueError('At least one of order_type, quantity, price, trigger_price or validity is required')
+        return v
+    
+    def modifications(self) -> Dict[str, Any]:
+        """Fields to change, in modify_order form"""
+        return self.dict(include={'order_type', 'quantity', 'price', 'trigger_price', 'validity'}, exclude_none=True)
+
+class BulkOrderResult(BaseModel):
+    """Outcome of a bulk cancel or modify for one order"""
+    client_id: int
+    client_code: Optional[str] = None
+    order_id: str
+    success: bool
+    skipped: bool = False
+    error_message: Optional[str] = None
+
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
-async def get_client_with_validation(client_id: int, segment: str, db: Session) -> ClientModel:
+async def get_client_with_validation(client_id: int, segment: str, db: AsyncSession) -> ClientModel:
     """
     Get client and validate credentials for trading
     
     Args:
         client_id (int): Client ID
         segment (str): Credential segment
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         ClientModel: Validated client
@@ -107,8 +352,38 @@ async def get_client_with_validation(client_id: int, segment: str, db: Session)
     Raises:
         ValueError: If client not found or invalid
     """
-    client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+    client = await db.get(ClientModel, client_id)
+    return validate_client_for_trading(client, client_id, segment)
+
+async def load_clients_for_batch(client_ids: List[int], db: AsyncSession) -> Dict[int, ClientModel]:
+    """
+    Load all clients of a batch with a single IN query
+    
+    Args:
+        client_ids (List[int]): Client IDs referenced by the batch
+        db (AsyncSession): Database session
+        
+    Returns:
+        Dict[int, ClientModel]: Clients keyed by ID (missing IDs are absent)
+    """
+    clients = (await db.scalars(select(ClientModel).where(ClientModel.id.in_(set(client_ids))))).all()
+    return {client.id: client for client in clients}
+
+def validate_client_for_trading(client: Optional[ClientModel], client_id: int, segment: str) -> ClientModel:
+    """
+    Validate that a loaded client can trade on a segment
     
+    Args:
+        client (Optional[ClientModel]): Loaded client, or None if not found
+        client_id (int): Requested client ID
+        segment (str): Credential segment
+        
+    Returns:
+        ClientModel: Validated client
+        
+    Raises:
+        ValueError: If client not found or invalid
+    """
     if not client:
         raise ValueError(f"Client with ID {client_id} not found")
     
@@ -135,6 +410,436 @@ async def get_client_with_validation(client_id: int, segment: str, db: Session)
     
     return client
 
+# Broker order book statuses of orders that can still be cancelled
+OPEN_ORDER_STATUSES = {"sent", "confirm", "open", "pending", "partial", "trigger pending", "modified"}
+
+def is_open_order(order: Dict[str, Any]) -> bool:
+    """
+    Check whether an order book entry is still open
+    
+    Args:
+        order (Dict[str, Any]): Broker order book entry
+        
+    Returns:
+        bool: True if the order can still be cancelled
+    """
+    return str(order.get("orderstatus", "")).strip().lower() in OPEN_ORDER_STATUSES
+
+def batch_order_keys(batch_request: BatchOrderRequest, client_orders: List[ClientOrder]) -> List[Optional[str]]:
+    """
+    Idempotency keys for the orders of a batch
+    
+    Keys are per (batch, client); a client's second and later orders in the
+    same batch are numbered so each still gets its own key.
+    
+    Args:
+        batch_request (BatchOrderRequest): Batch order parameters
+        client_orders (List[ClientOrder]): Orders to key, in request order
+        
+    Returns:
+        List[Optional[str]]: One key per order (all None if the request has no idempotency key)
+    """
+    if not batch_request.idempotency_key:
+        return [None] * len(client_orders)
+    
+    seen: Dict[int, int] = {}
+    keys = []
+    for client_order in client_orders:
+        occurrence = seen.get(client_order.client_id, 0)
+        seen[client_order.client_id] = occurrence + 1
+        key = f"{batch_request.idempotency_key}:{client_order.client_id}"
+        keys.append(f"{key}:{occurrence}" if occurrence else key)
+    return keys
+
+async def find_order_by_tag(client: ClientModel, segment: str, tag: str) -> Optional[str]:
+    """
+    Look up an order in the client's broker order book by its tag
+    
+    Args:
+        client (ClientModel): Client
+        segment (str): Credential segment
+        tag (str): Order tag
+        
+    Returns:
+        Optional[str]: Broker order ID, or None if no order carries the tag
+    """
+    auth_token = await mofsl_wrapper.authenticate_client(client, segment)
+    order_book = await mofsl_wrapper.get_order_book(auth_token.token, client.client_code)
+    for order in order_book:
+        if order.get("tag") == tag:
+            return str(order.get("uniqueorderid") or order.get("order_id"))
+    return None
+
+def record_placed_order(client: ClientModel, segment: str, order_create: OrderCreate, order_id: str) -> None:
+    """
+    Add an order we just placed to the client's cached order book
+    
+    Args:
+        client (ClientModel): Client
+        segment (str): Credential segment
+        order_create (OrderCreate): Placed order
+        order_id (str): Broker order ID
+    """
+    order_book_cache.record_order(client.id, segment, {
+        "uniqueorderid": order_id,
+        "orderstatus": "Sent",
+        "symboltoken": str(order_create.token_id),
+        "transactiontype": order_create.transaction_type,
+        "ordertype": order_create.order_type,
+        "producttype": order_create.product_type,
+        "quantity": order_create.quantity,
+        "price": float(order_create.price) if order_create.price is not None else None,
+        "exchange": order_create.exchange,
+        "tag": order_create.tag
+    })
+
+async def place_order_once(
+    client: ClientModel,
+    order_create: OrderCreate,
+    auth_token: str,
+    priority: DispatchPriority,
+    exchange: Optional[str],
+    segment: str,
+    order_key: Optional[str] = None,
+    track_risk: bool = True
+) -> Tuple[str, bool]:
+    """
+    Place an order through the dispatcher, at most once per idempotency key
+    
+    Keyed orders carry a broker tag derived from the key. A retry returns
+    the order ID recorded in Redis, or finds the order in the broker order
+    book if the earlier attempt ended without a known outcome. The key is
+    released straight away only for definite rejections (validation, a
+    parsed broker rejection, risk limits, the entry halt); after any other
+    error the order book is checked for the tag first. Network errors are
+    retried (ORDER_PLACE_TRANSPORT_RETRIES) only after the order book shows
+    the order did not reach the broker.
+    
+    Args:
+        client (ClientModel): Client
+        order_create (OrderCreate): Order to place
+        auth_token (str): Authentication token
+        priority (DispatchPriority): Dispatch priority
+        exchange (Optional[str]): Dispatcher exchange pool
+        segment (str): Credential segment (for order book lookups)
+        order_key (Optional[str]): Idempotency key (None - no deduplication)
+        track_risk (bool): Track the order in the risk ledger (False only for
+            exits of instruments missing from the master)
+        
+    Returns:
+        Tuple[str, bool]: Broker order ID and whether an earlier request placed it
+        
+    Raises:
+        OrderInProgressError: If an earlier attempt with the key has no known outcome yet
+        IdempotencyUnavailableError: If the key cannot be checked
+        RiskLimitError: If an entry order would breach the client's risk limits
+    """
+    async def place() -> str:
+        if not track_risk:
+            return await order_dispatcher.submit(
+                partial(mofsl_wrapper.place_order, auth_token, order_create, client.client_code),
+                priority,
+                client.id,
+                exchange
+            )
+        
+        # Entries are checked against the client's risk limits; every placed order is tracked
+        reservation = risk_ledger.reserve(client, order_create, enforce=priority == DispatchPriority.ENTRY)
+        try:
+            order_id = await order_dispatcher.submit(
+                partial(mofsl_wrapper.place_order, auth_token, order_create, client.client_code),
+                priority,
+                client.id,
+                exchange
+            )
+        except BaseException:
+            risk_ledger.release(reservation)
+            raise
+        risk_ledger.confirm(reservation, order_id)
+        return order_id
+    
+    if order_key is None:
+        order_id = await place()
+        record_placed_order(client, segment, order_create, order_id)
+        return order_id, False
+    
+    order_create.tag = order_idempotency.order_tag(order_key)
+    record = await order_idempotency.claim(order_key)
+    if record is not None:
+        if record.get("order_id"):
+            return record["order_id"], True
+        
+        # Earlier attempt is still in flight or died mid-placement
+        order_id = await find_order_by_tag(client, segment, order_create.tag)
+        if order_id is None:
+            raise OrderInProgressError(f"Order with idempotency key {order_key} is still in progress")
+        await order_idempotency.complete(order_key, order_id)
+        return order_id, True
+    
+    attempt = 0
+    while True:
+        try:
+            order_id = await place()
+            break
+        except (OrderRejectedError, RiskLimitError, TradingHaltedError):
+            # Rejected - nothing was placed, so a retry may place it
+            await order_idempotency.release(order_key)
+            raise
+        except Exception as e:
+            # Outcome unknown (network error, 5xx, unreadable response) - the
+            # order may have reached the broker
+            order_id = await find_order_by_tag(client, segment, order_create.tag)
+            if order_id is not None:
+                if track_risk:
+                    risk_ledger.confirm(risk_ledger.reserve(client, order_create, enforce=False), order_id)
+                break
+            if not isinstance(e, httpx.TransportError) or attempt >= settings.ORDER_PLACE_TRANSPORT_RETRIES:
+                # The book shows it was not placed, so a retry with the key may place it
+                await order_idempotency.release(order_key)
+                raise
+            attempt += 1
+            logger.warning(f"Retrying order {order_key} after network error (attempt {attempt})")
+    
+    await order_idempotency.complete(order_key, order_id)
+    record_placed_order(client, segment, order_create, order_id)
+    return order_id, False
+
+async def load_instrument(batch_request: BatchOrderRequest, db: AsyncSession) -> Tuple[Optional[TokenModel], OrderSlicer]:
+    """
+    Look up the instrument of a batch and build its order slicer
+    
+    Args:
+        batch_request (BatchOrderRequest): Batch order parameters
+        db (AsyncSession): Database session
+        
+    Returns:
+        Tuple[Optional[TokenModel], OrderSlicer]: Token (None if the instrument is not in the master) and slicer
+    """
+    token = await db.scalar(select(TokenModel).where(TokenModel.token == batch_request.token_id).limit(1))
+    if token is None:
+        logger.warning(f"Token {batch_request.token_id} not in instrument master - no lot size or freeze limits applied")
+    return token, OrderSlicer.for_instrument(token, batch_request.symbol)
+
+def require_instrument(batch_request: BatchOrderRequest, token: Optional[TokenModel]) -> int:
+    """
+    Database token ID of a batch's instrument
+    
+    Entries are risk checked per instrument, so instruments missing from
+    the master are rejected rather than tracked under a placeholder ID.
+    
+    Args:
+        batch_request (BatchOrderRequest): Batch order parameters
+        token (Optional[TokenModel]): Instrument from load_instrument
+        
+    Returns:
+        int: Token ID
+        
+    Raises:
+        HTTPException: If the instrument is not in the master
+    """
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Token {batch_request.token_id} not in instrument master"
+        )
+    return token.id
+
+async def allocate_batch_orders(
+    batch_request: BatchOrderRequest,
+    token: Optional[TokenModel],
+    slicer: OrderSlicer,
+    db: AsyncSession,
+    max_orders: Optional[int]
+) -> Dict[str, Any]:
+    """
+    Fill in the client orders of a batch from its allocation
+    
+    The total quantity (or notional at the reference price) is split across
+    the eligible clients by the allocation rule in whole lots. Clients
+    allocated less than one lot get no order.
+    
+    Args:
+        batch_request (BatchOrderRequest): Batch with an allocation; client_orders is replaced
+        token (Optional[TokenModel]): Instrument (segment picks the margin for the margin rule)
+        slicer (OrderSlicer): Instrument slicer (lot size)
+        db (AsyncSession): Database session
+        max_orders (Optional[int]): Most client orders the endpoint accepts (None - unlimited)
+        
+    Returns:
+        Dict[str, Any]: Allocation summary for the response metadata
+        
+    Raises:
+        HTTPException: If the allocation has no price, clients or orders, or too many orders
+    """
+    allocation = batch_request.allocation
+    started = time.perf_counter()
+    
+    if allocation.notional is not None:
+        price = allocation.reference_price or batch_request.default_price
+        if not price:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="reference_price or default_price is required to allocate a notional"
+            )
+        total_quantity = int(allocation.notional / price)
+    else:
+        total_quantity = allocation.total_quantity
+    
+    query = select(ClientModel).where(ClientModel.is_active == True).order_by(ClientModel.id)
+    if allocation.client_ids:
+        query = query.where(ClientModel.id.in_(allocation.client_ids))
+    clients = []
+    for client in (await db.scalars(query)).all():
+        try:
+            clients.append(validate_client_for_trading(client, client.id, batch_request.segment))
+        except ValueError:
+            continue
+    
+    if not clients:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active clients with credentials to allocate across"
+        )
+    
+    margin_segment = token.segment if token is not None and token.segment in ("EQ", "FO", "CD") else "EQ"
+    weights = await load_allocation_weights(allocation.rule, clients, db, margin_segment)
+    allocated = allocate_lots(weights, total_quantity, slicer.lot_size)
+    
+    if not allocated:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Allocation of quantity {total_quantity} by {allocation.rule} gives no client a full lot of {slicer.lot_size}"
+        )
+    if max_orders is not None and len(allocated) > max_orders:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Allocation gives {len(allocated)} client orders (limit {max_orders})"
+        )
+    
+    batch_request.client_orders = [
+        ClientOrder(client_id=client_id, quantity=quantity)
+        for client_id, quantity in allocated
+    ]
+    
+    allocated_quantity = sum(quantity for _, quantity in allocated)
+    return {
+        "rule": allocation.rule,
+        "requested_quantity": total_quantity,
+        "allocated_quantity": allocated_quantity,
+        "unallocated_quantity": total_quantity - allocated_quantity,
+        "lot_size": slicer.lot_size,
+        "eligible_clients": len(clients),
+        "allocated_clients": len(allocated),
+        "compute_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+async def check_batch_margins(
+    batch_request: BatchOrderRequest,
+    client_orders: List[ClientOrder],
+    clients_by_id: Dict[int, ClientModel],
+    token_id: int,
+    slicer: OrderSlicer
+) -> Tuple[List[Optional[MarginCheck]], Optional[Dict[str, Any]]]:
+    """
+    Check a batch's orders against the clients' margins before dispatch
+    
+    Margins of all the batch's clients are fetched (or taken from the cache)
+    concurrently, then every order is checked in one pass; approved orders
+    reserve their estimated requirement. Orders of clients whose margin
+    could not be fetched, and market orders with no known price, are not
+    checked.
+    
+    Args:
+        batch_request (BatchOrderRequest): Batch parameters (margin_check mode)
+        client_orders (List[ClientOrder]): Orders to check, in execution order
+        clients_by_id (Dict[int, ClientModel]): Prefetched clients
+        token_id (int): Database token ID (last traded price for market orders)
+        slicer (OrderSlicer): Lot size for resized orders
+        
+    Returns:
+        Tuple[List[Optional[MarginCheck]], Optional[Dict[str, Any]]]: Check per order (None when off) and a summary
+    """
+    mode = batch_request.margin_check or settings.ORDER_MARGIN_CHECK_MODE
+    if mode == "off":
+        return [None] * len(client_orders), None
+    
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(settings.MARGIN_FETCH_CONCURRENCY)
+    
+    async def fetch_margin(client: ClientModel):
+        async with semaphore:
+            return await margin_cache.get(client, batch_request.segment)
+    
+    order_client_ids = {co.client_id for co in client_orders}
+    clients = [client for client in clients_by_id.values() if client.is_active and client.id in order_client_ids]
+    fetched = await asyncio.gather(*(fetch_margin(client) for client in clients), return_exceptions=True)
+    fetch_failures = 0
+    for client, outcome in zip(clients, fetched):
+        if isinstance(outcome, Exception):
+            fetch_failures += 1
+            logger.warning(f"Margin fetch failed for client {client.client_code} - orders not margin checked: {outcome}")
+    
+    last_price = risk_ledger.last_price(instrument_key(batch_request.exchange, token_id))
+    checks = margin_cache.check_orders(
+        batch_request.segment,
+        [
+            (
+                co.client_id,
+                co.quantity,
+                float(co.price or batch_request.default_price or batch_request.trigger_price or 0) or last_price,
+                batch_request.transaction_type,
+                batch_request.product_type
+            )
+            for co in client_orders
+        ],
+        slicer.lot_size,
+        resize=mode == "resize"
+    )
+    
+    return checks, {
+        "mode": mode,
+        "rejected_orders": sum(1 for check in checks if check.error),
+        "resized_orders": sum(1 for check, co in zip(checks, client_orders) if not check.error and check.quantity != co.quantity),
+        "reserved_margin": round(sum(check.requirement for check in checks if check.reservation), 2),
+        "fetch_failures": fetch_failures,
+        "compute_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+def validate_batch_parameters(batch_request: BatchOrderRequest) -> List[ClientOrder]:
+    """
+    Validate batch order parameters
+    
+    Args:
+        batch_request (BatchOrderRequest): Batch order parameters
+        
+    Returns:
+        List[ClientOrder]: Client orders with quantity > 0
+        
+    Raises:
+        HTTPException: If prices are missing or no order has a quantity
+    """
+    if batch_request.order_type in ["LMT", "SL"] and not batch_request.default_price and not any(co.price for co in batch_request.client_orders):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Price is required for limit orders"
+        )
+    
+    if batch_request.order_type in ["SLM", "SL"] and not batch_request.trigger_price:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Trigger price is required for stop-loss orders"
+        )
+    
+    valid_orders = [co for co in batch_request.client_orders if co.quantity > 0]
+    
+    if not valid_orders:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No valid orders with quantity > 0"
+        )
+    
+    return valid_orders
+
 def create_order_from_request(
     batch_request: BatchOrderRequest, 
     client_order: ClientOrder, 
@@ -170,29 +875,57 @@ def create_order_from_request(
 
 async def execute_single_order(
     client_id: int,
+    client: Optional[ClientModel],
     client_order: ClientOrder,
     batch_request: BatchOrderRequest,
     token_id: int,
-    db: Session
+    journal_writes: List[asyncio.Future],
+    order_key: Optional[str] = None,
+    slicer: Optional[OrderSlicer] = None,
+    margin: Optional[MarginCheck] = None
 ) -> OrderExecutionResult:
     """
     Execute order for a single client
     
+    The client is prefetched by the caller and the placed orders are queued
+    on the order journal, so the task makes no database round trips. The
+    quantity is rounded to whole lots and split into child orders within
+    the freeze quantity; the children are placed concurrently and reported
+    as one result.
+    
     Args:
         client_id (int): Client ID
+        client (Optional[ClientModel]): Prefetched client, or None if not found
         client_order (ClientOrder): Client order details
         batch_request (BatchOrderRequest): Batch request parameters
         token_id (int): Database token ID
-        db (Session): Database session
+        journal_writes (List[asyncio.Future]): Collects the pending journal writes to wait on
+        order_key (Optional[str]): Idempotency key for this order
+        slicer (Optional[OrderSlicer]): Lot size and freeze quantity rules (None - single order as requested)
+        margin (Optional[MarginCheck]): Batch margin check of this order (its reservation is released unless an order is placed)
         
     Returns:
         OrderExecutionResult: Execution result
     """
     start_time = datetime.now()
+    quantity = client_order.quantity
+    placed = []
     
     try:
-        # Get and validate client
-        client = await get_client_with_validation(client_id, batch_request.segment, db)
+        # Validate prefetched client
+        client = validate_client_for_trading(client, client_id, batch_request.segment)
+        
+        if margin is not None:
+            if margin.error:
+                raise ValueError(margin.error)
+            if margin.quantity != client_order.quantity:
+                logger.info(f"Resized order for client {client_id} from {client_order.quantity} to {margin.quantity} to fit margin")
+                client_order = client_order.model_copy(update={"quantity": margin.quantity})
+        
+        # Split into lot-aligned child orders within the freeze quantity
+        child_quantities = slicer.slice(client_order.quantity) if slicer else [client_order.quantity]
+        quantity = sum(child_quantities)
+        sliced = len(child_quantities) > 1
         
         # Create order object
         order_create = create_order_from_request(batch_request, client_order, token_id)
@@ -202,50 +935,87 @@ async def execute_single_order(
             return OrderExecutionResult(
                 client_id=client_id,
                 client_code=client.client_code,
-                quantity=client_order.quantity,
+                quantity=quantity,
                 price=client_order.price or batch_request.default_price,
                 success=True,
                 order_id="DRY_RUN",
-                execution_time_ms=int((datetime.now() - start_time).total_seconds() * 1000)
+                execution_time_ms=int((datetime.now() - start_time).total_seconds() * 1000),
+                child_orders=[
+                    {"order_id": "DRY_RUN", "quantity": child_quantity, "success": True}
+                    for child_quantity in child_quantities
+                ] if sliced else None
             )
         
-        # Execute real order
-        order_id = await mofsl_wrapper.place_order(
-            auth_token="",  # Will be handled by authenticate_client
-            order_details=order_create,
-            client_code=client.client_code
-        )
+        async def place_child(index: int, child_quantity: int) -> Tuple[str, bool]:
+            child_order = order_create.model_copy(update={"quantity": child_quantity}) if sliced else order_create
+            
+            # Execute real order (queued behind cancels and exits)
+            order_id, replayed = await place_order_once(
+                client,
+                child_order,
+                "",  # Will be handled by authenticate_client
+                DispatchPriority.ENTRY,
+                batch_request.exchange,
+                batch_request.segment,
+                f"{order_key}:{index}" if order_key and sliced else order_key
+            )
+            
+            if not replayed:
+                # Queue order for the next bulk insert (replays were journaled by the request that placed them)
+                journal_writes.append(order_journal.submit({
+                    "order_id": order_id,
+                    "client_id": client_id,
+                    "token_id": token_id,
+                    "order_type": batch_request.order_type,
+                    "transaction_type": batch_request.transaction_type,
+                    "product_type": batch_request.product_type,
+                    "quantity": child_quantity,
+                    "price": client_order.price or batch_request.default_price,
+                    "trigger_price": batch_request.trigger_price,
+                    "exchange": batch_request.exchange,
+                    "validity": batch_request.validity,
+                    "status": "PENDING",
+                    "remarks": client_order.remarks or f"Batch order - {batch_request.symbol}"
+                }))
+            return order_id, replayed
         
-        # Save order to database
-        db_order = OrderModel(
-            order_id=order_id,
-            client_id=client_id,
-            token_id=token_id,
-            order_type=batch_request.order_type,
-            transaction_type=batch_request.transaction_type,
-            product_type=batch_request.product_type,
-            quantity=client_order.quantity,
-            price=client_order.price or batch_request.default_price,
-            trigger_price=batch_request.trigger_price,
-            exchange=batch_request.exchange,
-            validity=batch_request.validity,
-            status="PENDING",
-            remarks=client_order.remarks or f"Batch order - {batch_request.symbol}"
+        outcomes = await asyncio.gather(
+            *(place_child(index, child_quantity) for index, child_quantity in enumerate(child_quantities)),
+            return_exceptions=True
         )
         
-        db.add(db_order)
-        db.commit()
+        if not sliced and isinstance(outcomes[0], Exception):
+            raise outcomes[0]
+        
+        # Aggregate the children into the parent result
+        child_orders = [
+            {"order_id": None, "quantity": child_quantity, "success": False, "error_message": str(outcome)}
+            if isinstance(outcome, Exception)
+            else {"order_id": outcome[0], "quantity": child_quantity, "success": True}
+            for child_quantity, outcome in zip(child_quantities, outcomes)
+        ]
+        placed = [child for child in child_orders if child["success"]]
+        failed = [child for child in child_orders if not child["success"]]
+        
+        if failed:
+            logger.error(f"Order execution failed for client {client_id}: {len(failed)}/{len(child_orders)} child orders failed")
         
         execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
         
         return OrderExecutionResult(
             client_id=client_id,
             client_code=client.client_code,
-            quantity=client_order.quantity,
+            quantity=quantity,
             price=client_order.price or batch_request.default_price,
-            success=True,
-            order_id=order_id,
-            execution_time_ms=execution_time
+            success=not failed,
+            order_id=placed[0]["order_id"] if placed else None,
+            error_message=(
+                f"{len(failed)}/{len(child_orders)} child orders failed "
+                f"({sum(child['quantity'] for child in placed)} of {quantity} placed): {failed[0]['error_message']}"
+            ) if failed else None,
+            execution_time_ms=execution_time,
+            replayed=all(not isinstance(outcome, Exception) and outcome[1] for outcome in outcomes),
+            child_orders=child_orders if sliced else None
         )
         
     except Exception as e:
@@ -256,13 +1026,17 @@ async def execute_single_order(
         
         return OrderExecutionResult(
             client_id=client_id,
-            client_code=f"CLIENT_{client_id}",  # Fallback if client not found
-            quantity=client_order.quantity,
+            client_code=client.client_code if client else f"CLIENT_{client_id}",  # Fallback if client not found
+            quantity=quantity,
             price=client_order.price or batch_request.default_price,
             success=False,
             error_message=error_message,
             execution_time_ms=execution_time
         )
+    
+    finally:
+        if margin is not None and (batch_request.dry_run or not placed):
+            margin_cache.release(margin.reservation)
 
 async def get_client_positions_for_token(client: ClientModel, token_mofsl_id: str, segment: str) -> List[Dict]:
     """
@@ -275,6 +1049,10 @@ async def get_client_positions_for_token(client: ClientModel, token_mofsl_id: st
         
     Returns:
         List[Dict]: Positions for the token
+        
+    Raises:
+        Exception: If authentication or the positions fetch fails - an empty
+            list always means the client holds no position
     """
     try:
         auth_token = await mofsl_wrapper.authenticate_client(client, segment)
@@ -290,82 +1068,343 @@ async def get_client_positions_for_token(client: ClientModel, token_mofsl_id: st
         
     except Exception as e:
         logger.error(f"Error getting positions for client {client.client_code}, token {token_mofsl_id}: {e}")
-        return []
-
-# =============================================================================
-# BATCH ORDER EXECUTION ENDPOINTS
-# =============================================================================
+        raise
 
-@router.post("/execute-all", response_model=BatchOrderResponse)
-async def execute_batch_orders(
-    request: BatchOrderRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+def start_execution_algo(
+    batch_request: BatchOrderRequest,
+    valid_orders: List[ClientOrder],
+    clients_by_id: Dict[int, ClientModel],
+    token_id: int,
+    slicer: OrderSlicer
+) -> Dict[str, Any]:
     """
-    Execute batch orders for multiple clients
+    Plan a batch as TWAP/VWAP slices and hand it to the execution scheduler
+    
+    Each client's quantity is split across the slices in whole lots. Every
+    slice places one order per client it includes, with the client's price
+    and remarks; with an idempotency key each slice order gets its own
+    derived key, so a retried slice is not placed twice.
     
     Args:
-        request (BatchOrderRequest): Batch order request
-        background_tasks (BackgroundTasks): Background task queue
-        db (Session): Database session
+        batch_request (BatchOrderRequest): Batch with an execution_algo
+        valid_orders (List[ClientOrder]): Client orders to schedule
+        clients_by_id (Dict[int, ClientModel]): Prefetched clients
+        token_id (int): Database token ID
+        slicer (OrderSlicer): Instrument slicer (lot size and freeze limits)
         
     Returns:
-        BatchOrderResponse: Execution results for all orders
+        Dict[str, Any]: Execution snapshot with its slices (the plan only for dry runs)
         
     Raises:
-        HTTPException: If validation fails
+        HTTPException: If no slice gets a full lot
     """
-    logger.info(f"Executing batch orders: {len(request.client_orders)} orders for {request.symbol}")
+    algo_request = batch_request.execution_algo
     
-    execution_start = datetime.now()
+    # Repeated clients are scheduled as one combined quantity
+    orders_by_client: Dict[int, ClientOrder] = {}
+    quantities: Dict[int, int] = {}
+    for client_order in valid_orders:
+        orders_by_client.setdefault(client_order.client_id, client_order)
+        quantities[client_order.client_id] = quantities.get(client_order.client_id, 0) + client_order.quantity
+    order_keys = dict(zip(orders_by_client, batch_order_keys(batch_request, list(orders_by_client.values()))))
     
-    try:
-        # Validate token exists (for database tracking)
-        # Note: We use token_id as string for MOFSL API calls
-        token_id = 1  # Placeholder - in real implementation, you'd map this properly
-        
-        # Validate order parameters
-        if request.order_type in ["LMT", "SL"] and not request.default_price and not any(co.price for co in request.client_orders):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Price is required for limit orders"
-            )
+    slices = plan_slices(
+        algo_request.algo,
+        quantities,
+        algo_request.duration_minutes * 60,
+        algo_request.slices,
+        slicer.lot_size,
+        algo_request.volume_profile
+    )
+    if not slices:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No client quantity reaches a full lot of {slicer.lot_size}"
+        )
+    
+    semaphore = asyncio.Semaphore(batch_request.max_concurrent)
+    
+    async def execute_slice(algo_slice: AlgoSlice) -> List[Dict[str, Any]]:
+        journal_writes = []
         
-        if request.order_type in ["SLM", "SL"] and not request.trigger_price:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Trigger price is required for stop-loss orders"
-            )
+        async def execute_with_semaphore(client_id: int, quantity: int):
+            order_key = order_keys.get(client_id)
+            async with semaphore:
+                return await execute_single_order(
+                    client_id,
+                    clients_by_id.get(client_id),
+                    orders_by_client[client_id].model_copy(update={"quantity": quantity}),
+                    batch_request,
+                    token_id,
+                    journal_writes,
+                    f"{order_key}:slice{algo_slice.index}" if order_key else None,
+                    slicer
+                )
         
-        # Filter out zero quantity orders
-        valid_orders = [co for co in request.client_orders if co.quantity > 0]
+        results = await asyncio.gather(
+            *(execute_with_semaphore(client_id, quantity) for client_id, quantity in algo_slice.quantities.items()),
+            return_exceptions=True
+        )
+        await order_journal.wait(journal_writes)
         
-        if not valid_orders:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid orders with quantity > 0"
-            )
+        slice_results = []
+        for (client_id, quantity), result in zip(algo_slice.quantities.items(), results):
+            if isinstance(result, Exception):
+                result = OrderExecutionResult(
+                    client_id=client_id,
+                    client_code=f"CLIENT_{client_id}",
+                    quantity=quantity,
+                    price=orders_by_client[client_id].price or batch_request.default_price,
+                    success=False,
+                    error_message=str(result),
+                    execution_time_ms=0
+                )
+            slice_results.append(result.model_dump(mode="json"))
+        return slice_results
+    
+    execution = AlgoExecution(algo_request.algo, slices, execute_slice, details={
+        "symbol": batch_request.symbol,
+        "transaction_type": batch_request.transaction_type,
+        "duration_minutes": algo_request.duration_minutes,
+        "slice_interval_seconds": algo_request.duration_minutes * 60 / algo_request.slices
+    })
+    if batch_request.dry_run:
+        execution.status = "DRY_RUN"
+    else:
+        execution_scheduler.submit(execution)
+    return execution.snapshot(include_slices=True)
+
+# Database IDs of MOFSL tokens looked up so far (tokens are never renumbered)
+known_token_ids: Dict[str, int] = {}
+
+async def resolve_token_ids(tokens: set, db: AsyncSession) -> Dict[str, int]:
+    """
+    Database token IDs of MOFSL tokens, querying only tokens not seen before
+    
+    Args:
+        tokens (set): MOFSL token IDs
+        db (AsyncSession): Database session
+        
+    Returns:
+        Dict[str, int]: Token ID by MOFSL token (tokens not in the instrument master are absent)
+    """
+    missing = [token for token in tokens if token not in known_token_ids]
+    if missing:
+        rows = (await db.execute(select(TokenModel.token, TokenModel.id).where(TokenModel.token.in_(missing)))).all()
+        for token, token_id in rows:
+            known_token_ids.setdefault(token, token_id)
+    return known_token_ids
+
+def serialize_conditional_order(order: ConditionalOrderModel) -> Dict[str, Any]:
+    """
+    Convert a conditional order to JSON-friendly data, with live levels while it is armed
+    
+    Args:
+        order (ConditionalOrderModel): Conditional order
+        
+    Returns:
+        Dict[str, Any]: Conditional order data
+    """
+    data = {
+        "id": order.id,
+        "client_id": order.client_id,
+        "symbol": order.symbol,
+        "exchange": order.exchange,
+        "trigger_type": order.trigger_type,
+        "transaction_type": order.transaction_type,
+        "product_type": order.product_type,
+        "order_type": order.order_type,
+        "quantity": order.quantity,
+        "price": float(order.price) if order.price is not None else None,
+        "trigger_price": float(order.trigger_price) if order.trigger_price is not None else None,
+        "trail_amount": float(order.trail_amount) if order.trail_amount is not None else None,
+        "reference_price": float(order.reference_price) if order.reference_price is not None else None,
+        "entry": order.is_entry,
+        "status": order.status,
+        "triggered_price": float(order.triggered_price) if order.triggered_price is not None else None,
+        "order_id": order.order_id,
+        "error_message": order.error_message,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "expires_at": order.expires_at.isoformat() if order.expires_at else None,
+        "triggered_at": order.triggered_at.isoformat() if order.triggered_at else None,
+        "completed_at": order.completed_at.isoformat() if order.completed_at else None
+    }
+    levels = trigger_engine.live_levels(order.id)
+    if levels is not None:
+        data.update({name: float(value) if value is not None else None for name, value in levels.items()})
+    return data
+
+async def place_conditional_order(order: ConditionalOrderModel) -> str:
+    """
+    Place a triggered conditional order (the trigger engine's executor)
+    
+    Exits go out at EXIT priority, ahead of entries and unaffected by the
+    kill switch halt; entries are risk checked like any other entry. The
+    conditional order ID is the idempotency key, so placing it again after
+    a restart returns the original broker order.
+    
+    Args:
+        order (ConditionalOrderModel): Triggered conditional order
+        
+    Returns:
+        str: Broker order ID
+        
+    Raises:
+        ValueError: If the client cannot trade
+        Exception: Whatever placing the order raises
+    """
+    async with AsyncSessionLocal() as db:
+        client = await get_client_with_validation(order.client_id, order.segment, db)
+    
+    order_create = OrderCreate(
+        client_id=order.client_id,
+        token_id=order.token_id,
+        order_type=order.order_type,
+        transaction_type=order.transaction_type,
+        product_type=order.product_type,
+        quantity=order.quantity,
+        price=order.price,
+        exchange=order.exchange,
+        remarks=f"{order.trigger_type} triggered at {order.triggered_price} - {order.symbol}"
+    )
+    order_id, replayed = await place_order_once(
+        client,
+        order_create,
+        "",  # Will be handled by authenticate_client
+        DispatchPriority.ENTRY if order.is_entry else DispatchPriority.EXIT,
+        order.exchange,
+        order.segment,
+        f"conditional:{order.id}"
+    )
+    
+    if not replayed:
+        await order_journal.wait([order_journal.submit({
+            "order_id": order_id,
+            "client_id": order.client_id,
+            "token_id": order.token_id,
+            "order_type": order.order_type,
+            "transaction_type": order.transaction_type,
+            "product_type": order.product_type,
+            "quantity": order.quantity,
+            "price": order.price,
+            "exchange": order.exchange,
+            "validity": "DAY",
+            "status": "PENDING",
+            "remarks": order_create.remarks
+        })])
+    return order_id
+
+trigger_engine.execute = place_conditional_order
+
+# =============================================================================
+# BATCH ORDER EXECUTION ENDPOINTS
+# =============================================================================
+
+@router.post("/execute-all", response_model=BatchOrderResponse)
+async def execute_batch_orders(
+    request: BatchOrderRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Execute batch orders for multiple clients
+    
+    Args:
+        request (BatchOrderRequest): Batch order request
+        background_tasks (BackgroundTasks): Background task queue
+        db (AsyncSession): Database session
+        
+    Returns:
+        BatchOrderResponse: Execution results for all orders
+        
+    Raises:
+        HTTPException: If validation fails
+    """
+    if request.allocation:
+        logger.info(f"Executing batch orders: {request.allocation.rule} allocation for {request.symbol}")
+    else:
+        logger.info(f"Executing batch orders: {len(request.client_orders)} orders for {request.symbol}")
+    
+    execution_start = datetime.now()
+    
+    try:
+        # Instrument lot size and freeze limits (token_id for database tracking;
+        # the MOFSL token string is used for the API calls)
+        token, slicer = await load_instrument(request, db)
+        token_id = require_instrument(request, token)
+        
+        allocation_summary = None
+        if request.allocation:
+            # Previews may cover any number of clients; larger executions go to /orders/batches
+            max_orders = None if request.dry_run else MAX_BATCH_ORDERS
+            allocation_summary = await allocate_batch_orders(request, token, slicer, db, max_orders)
+        
+        # Validate order parameters and filter out zero quantity orders
+        valid_orders = validate_batch_parameters(request)
         
         logger.info(f"Processing {len(valid_orders)} valid orders (filtered from {len(request.client_orders)})")
         
+        # Load every client up front so order tasks make no DB round trips
+        clients_by_id = await load_clients_for_batch([co.client_id for co in valid_orders], db)
+        await release_connection(db)
+        
+        if request.execution_algo:
+            # Scheduled over the window - the response describes the plan
+            algo = start_execution_algo(request, valid_orders, clients_by_id, token_id, slicer)
+            return BatchOrderResponse(
+                success=True,
+                message=f"{algo['algo']} execution scheduled: {algo['total_slices']} slices over {algo['duration_minutes']} minutes",
+                summary={
+                    "total_orders": len(valid_orders),
+                    "total_quantity": algo["total_quantity"],
+                    "symbol": request.symbol,
+                    "transaction_type": request.transaction_type,
+                    "order_type": request.order_type,
+                    "algo_id": algo["algo_id"]
+                },
+                results=[],
+                execution_metadata={
+                    "execution_time_ms": int((datetime.now() - execution_start).total_seconds() * 1000),
+                    "dry_run": request.dry_run,
+                    "execution_algo": algo,
+                    "status_url": f"{settings.API_V1_STR}/orders/algos/{algo['algo_id']}",
+                    "slicing": slicer.describe(),
+                    "allocation": allocation_summary,
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                }
+            )
+        
+        # Reject or resize orders the clients cannot afford before anything is sent
+        margin_checks, margin_summary = await check_batch_margins(request, valid_orders, clients_by_id, token_id, slicer)
+        
         # Execute orders with concurrency control
         semaphore = asyncio.Semaphore(request.max_concurrent)
+        journal_writes = []
         
-        async def execute_with_semaphore(client_order: ClientOrder):
+        async def execute_with_semaphore(client_order: ClientOrder, order_key: Optional[str], margin: Optional[MarginCheck]):
             async with semaphore:
                 return await execute_single_order(
                     client_order.client_id,
+                    clients_by_id.get(client_order.client_id),
                     client_order,
                     request,
                     token_id,
-                    db
+                    journal_writes,
+                    order_key,
+                    slicer,
+                    margin
                 )
         
         # Execute all orders concurrently
-        tasks = [execute_with_semaphore(co) for co in valid_orders]
+        tasks = [
+            execute_with_semaphore(co, order_key, margin)
+            for co, order_key, margin in zip(valid_orders, batch_order_keys(request, valid_orders), margin_checks)
+        ]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
+        # Placed orders must be persisted before they are reported
+        unsaved_orders = await order_journal.wait(journal_writes)
+        
         # Process results
         execution_results = []
         for i, result in enumerate(results):
@@ -406,6 +1445,12 @@ async def execute_batch_orders(
             "avg_order_execution_ms": int(avg_execution_time),
             "max_concurrent": request.max_concurrent,
             "dry_run": request.dry_run,
+            "unsaved_orders": unsaved_orders,
+            "replayed_orders": sum(1 for r in execution_results if r.replayed),
+            "child_orders": sum(len(r.child_orders or []) for r in execution_results),
+            "slicing": slicer.describe(),
+            "allocation": allocation_summary,
+            "margin": margin_summary,
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
         
@@ -432,288 +1477,1954 @@ async def execute_batch_orders(
         )
 
 # =============================================================================
-# TOKEN EXIT ENDPOINTS
+# BATCH ORDER JOBS
 # =============================================================================
 
-@router.post("/tokens/{token_mofsl_id}/exit-all")
-async def exit_all_positions(
-    token_mofsl_id: str,
-    request: ExitOrderRequest,
-    db: Session = Depends(get_db)
-):
+# Seconds between database polls when streaming a batch run by another process
+BATCH_EVENTS_POLL_INTERVAL = 1.0
+
+# Result fields persisted per batch item (the rest are only streamed)
+BATCH_ITEM_COLUMNS = set(OrderBatchItemModel.__table__.columns.keys())
+
+def serialize_batch(batch: OrderBatchModel) -> Dict[str, Any]:
     """
-    Exit all positions for a specific token across multiple clients
+    Convert a batch job row to its API representation
     
     Args:
-        token_mofsl_id (str): MOFSL token ID to exit
-        request (ExitOrderRequest): Exit order parameters
-        db (Session): Database session
+        batch (OrderBatchModel): Batch job
         
     Returns:
-        dict: Exit execution results
+        Dict[str, Any]: Batch status and counters
+    """
+    return {
+        "batch_id": batch.id,
+        "status": batch.status,
+        "symbol": batch.symbol,
+        "exchange": batch.exchange,
+        "order_type": batch.order_type,
+        "transaction_type": batch.transaction_type,
+        "total_orders": batch.total_orders,
+        "processed_orders": batch.processed_orders or 0,
+        "successful_orders": batch.successful_orders or 0,
+        "failed_orders": batch.failed_orders or 0,
+        "error_message": batch.error_message,
+        "created_at": batch.created_at,
+        "started_at": batch.started_at,
+        "completed_at": batch.completed_at
+    }
+
+def serialize_batch_item(item: OrderBatchItemModel) -> Dict[str, Any]:
+    """
+    Convert a persisted batch result to the OrderExecutionResult shape
+    
+    Args:
+        item (OrderBatchItemModel): Batch result
         
-    Raises:
-        HTTPException: If exit fails
+    Returns:
+        Dict[str, Any]: Per-order execution result
     """
-    logger.info(f"Exiting all positions for token {token_mofsl_id}")
+    return {
+        "client_id": item.client_id,
+        "client_code": item.client_code,
+        "quantity": item.quantity,
+        "price": item.price,
+        "success": item.success,
+        "order_id": item.order_id,
+        "error_message": item.error_message,
+        "execution_time_ms": item.execution_time_ms
+    }
+
+async def run_batch_job(batch_id: str, request: BatchJobRequest, progress: BatchProgress) -> Dict[str, Any]:
+    """
+    Execute a batch order job in chunks
     
-    execution_start = datetime.now()
+    Each chunk prefetches its clients, executes its orders concurrently
+    (publishing every result as it completes), waits for the order journal
+    and then persists the chunk's results and the batch counters.
     
-    try:
-        # Get clients with active positions (or use client filter)
-        if request.client_filter:
-            clients = db.query(ClientModel).filter(
-                ClientModel.id.in_(request.client_filter),
-                ClientModel.is_active == True
-            ).all()
-        else:
-            # Get all active clients with credentials
-            clients = db.query(ClientModel).filter(
-                ClientModel.is_active == True,
-                ClientModel.encrypted_mofsl_api_key_interactive.isnot(None)
-            ).all()
-        
-        if not clients:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No active clients found for exit operation"
-            )
-        
-        logger.info(f"Processing exit for {len(clients)} clients")
-        
-        # Get positions for each client and prepare exit orders
-        exit_results = []
-        clients_to_exit = []
-        
-        for client in clients:
-            try:
-                positions = await get_client_positions_for_token(client, token_mofsl_id, request.segment)
-                
-                # Filter positions that meet minimum quantity
-                exit_positions = [
-                    pos for pos in positions 
-                    if abs(int(pos.get('quantity', 0))) >= request.min_quantity
-                ]
-                
-                if exit_positions:
-                    clients_to_exit.append((client, exit_positions))
-                    logger.debug(f"Client {client.client_code}: {len(exit_positions)} positions to exit")
-                
-            except Exception as e:
-                logger.warning(f"Failed to get positions for client {client.client_code}: {e}")
-                exit_results.append({
-                    "client_id": client.id,
-                    "client_code": client.client_code,
-                    "success": False,
-                    "error_message": f"Failed to fetch positions: {str(e)}",
-                    "positions_exited": 0
-                })
+    Args:
+        batch_id (str): Batch ID
+        request (BatchJobRequest): Submitted batch job
+        progress (BatchProgress): Live progress tracker
         
-        if not clients_to_exit:
-            return {
-                "success": True,
-                "message": "No positions found to exit for the specified token",
-                "summary": {
-                    "clients_processed": len(clients),
-                    "clients_with_positions": 0,
-                    "total_positions_exited": 0
-                },
-                "results": exit_results
-            }
+    Returns:
+        Dict[str, Any]: Completion summary
+    """
+    started = datetime.now()
+    processed = successful = 0
+    
+    async with session_scope() as db:
+        await db.execute(update(OrderBatchModel).where(OrderBatchModel.id == batch_id).values(
+            status="RUNNING",
+            started_at=func.now()
+        ))
+        token, slicer = await load_instrument(request, db)
+    
+    try:
+        # Checked at submission - the master may have changed since
+        if token is None:
+            raise ValueError(f"Token {request.token_id} not in instrument master")
+        token_id = token.id
+        valid_orders = [co for co in request.client_orders if co.quantity > 0]
+        order_keys = batch_order_keys(request, valid_orders)
+        semaphore = asyncio.Semaphore(request.max_concurrent)
         
-        # Execute exit orders
-        async def execute_client_exit(client_positions_tuple):
-            client, positions = client_positions_tuple
-            client_exit_count = 0
-            client_errors = []
+        for chunk_start in range(0, len(valid_orders), settings.ORDER_BATCH_CHUNK_SIZE):
+            chunk = valid_orders[chunk_start:chunk_start + settings.ORDER_BATCH_CHUNK_SIZE]
+            chunk_keys = order_keys[chunk_start:chunk_start + settings.ORDER_BATCH_CHUNK_SIZE]
             
-            try:
-                auth_token = await mofsl_wrapper.authenticate_client(client, request.segment)
-                
-                for position in positions:
-                    try:
-                        current_qty = int(position.get('quantity', 0))
-                        
-                        if current_qty == 0:
-                            continue
-                        
-                        # Determine exit transaction type (opposite of current position)
-                        exit_transaction = "SELL" if current_qty > 0 else "BUY"
-                        exit_quantity = abs(current_qty)
-                        
-                        if request.dry_run:
-                            client_exit_count += 1
-                            continue
-                        
-                        # Create exit order
-                        exit_order = OrderCreate(
-                            client_id=client.id,
-                            token_id=1,  # Placeholder
-                            order_type=request.order_type,
-                            transaction_type=exit_transaction,
-                            product_type=position.get('product_type', 'MIS'),
-                            quantity=exit_quantity,
-                            price=request.price,
-                            exchange=request.exchange,
-                            validity="DAY",
-                            remarks=f"Exit order for {token_mofsl_id}"
-                        )
-                        
-                        # Place exit order
-                        order_id = await mofsl_wrapper.place_order(
-                            auth_token.token,
-                            exit_order,
-                            client.client_code
-                        )
-                        
-                        client_exit_count += 1
-                        
-                        # Save to database
-                        db_order = OrderModel(
-                            order_id=order_id,
-                            client_id=client.id,
-                            token_id=1,  # Placeholder
-                            order_type=request.order_type,
-                            transaction_type=exit_transaction,
-                            product_type=position.get('product_type', 'MIS'),
-                            quantity=exit_quantity,
-                            price=request.price,
-                            exchange=request.exchange,
-                            status="PENDING",
-                            remarks=f"Exit order for {token_mofsl_id}"
-                        )
-                        
-                        db.add(db_order)
-                        
-                    except Exception as e:
-                        client_errors.append(f"Position exit failed: {str(e)}")
-                        logger.error(f"Failed to exit position for {client.client_code}: {e}")
-                
-                db.commit()
-                
-                return {
-                    "client_id": client.id,
-                    "client_code": client.client_code,
-                    "success": len(client_errors) == 0,
-                    "positions_exited": client_exit_count,
-                    "total_positions": len(positions),
-                    "error_message": "; ".join(client_errors) if client_errors else None
-                }
-                
-            except Exception as e:
-                logger.error(f"Client exit failed for {client.client_code}: {e}")
-                return {
-                    "client_id": client.id,
-                    "client_code": client.client_code,
-                    "success": False,
-                    "error_message": str(e),
-                    "positions_exited": 0,
-                    "total_positions": len(positions)
-                }
-        
-        # Execute exits concurrently with limited concurrency
-        semaphore = asyncio.Semaphore(5)  # Limit concurrent exits
-        
-        async def execute_with_semaphore(client_positions):
-            async with semaphore:
-                return await execute_client_exit(client_positions)
-        
-        tasks = [execute_with_semaphore(cp) for cp in clients_to_exit]
-        client_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Process results
-        final_results = []
-        for result in client_results:
-            if isinstance(result, Exception):
-                final_results.append({
-                    "client_id": 0,
-                    "client_code": "UNKNOWN",
-                    "success": False,
-                    "error_message": str(result),
-                    "positions_exited": 0
-                })
-            else:
-                final_results.append(result)
-        
-        # Add any clients that had no positions
-        final_results.extend(exit_results)
+            async with AsyncSessionLocal() as db:
+                clients_by_id = await load_clients_for_batch([co.client_id for co in chunk], db)
+            
+            margin_checks, _ = await check_batch_margins(request, chunk, clients_by_id, token_id, slicer)
+            journal_writes = []
+            
+            async def execute_with_semaphore(client_order: ClientOrder, order_key: Optional[str], margin: Optional[MarginCheck]):
+                async with semaphore:
+                    return await execute_single_order(
+                        client_order.client_id,
+                        clients_by_id.get(client_order.client_id),
+                        client_order,
+                        request,
+                        token_id,
+                        journal_writes,
+                        order_key,
+                        slicer,
+                        margin
+                    )
+            
+            chunk_results = []
+            for next_done in asyncio.as_completed([
+                execute_with_semaphore(co, key, margin)
+                for co, key, margin in zip(chunk, chunk_keys, margin_checks)
+            ]):
+                result = (await next_done).model_dump()
+                chunk_results.append(result)
+                progress.publish(result)
+            
+            await order_journal.wait(journal_writes)
+            
+            processed += len(chunk_results)
+            successful += sum(1 for result in chunk_results if result["success"])
+            
+            async with session_scope() as db:
+                await db.execute(
+                    insert(OrderBatchItemModel),
+                    [
+                        {"batch_id": batch_id, **{k: v for k, v in result.items() if k in BATCH_ITEM_COLUMNS}}
+                        for result in chunk_results
+                    ]
+                )
+                await db.execute(update(OrderBatchModel).where(OrderBatchModel.id == batch_id).values(
+                    processed_orders=processed,
+                    successful_orders=successful,
+                    failed_orders=processed - successful
+                ))
         
-        # Calculate summary
-        successful_exits = [r for r in final_results if r["success"]]
-        total_positions_exited = sum(r["positions_exited"] for r in final_results)
+        async with session_scope() as db:
+            await db.execute(update(OrderBatchModel).where(OrderBatchModel.id == batch_id).values(
+                status="COMPLETED",
+                completed_at=func.now()
+            ))
         
-        total_time = int((datetime.now() - execution_start).total_seconds() * 1000)
+        logger.info(f"Batch job {batch_id} completed: {successful}/{processed} successful")
         
         return {
-            "success": len(successful_exits) > 0,
-            "message": f"Exit operation completed for token {token_mofsl_id}",
-            "summary": {
-                "token_mofsl_id": token_mofsl_id,
-                "clients_processed": len(clients),
-                "clients_with_positions": len(clients_to_exit),
-                "successful_exits": len(successful_exits),
-                "total_positions_exited": total_positions_exited,
-                "execution_time_ms": total_time,
-                "dry_run": request.dry_run
-            },
-            "results": final_results,
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "batch_id": batch_id,
+            "status": "COMPLETED",
+            "total_orders": len(valid_orders),
+            "processed_orders": processed,
+            "successful_orders": successful,
+            "failed_orders": processed - successful,
+            "execution_time_ms": int((datetime.now() - started).total_seconds() * 1000)
         }
         
-    except HTTPException:
-        # Re-raise HTTP exceptions
+    except (Exception, asyncio.CancelledError) as e:
+        # Cancellation means the server is shutting down mid-batch
+        await mark_batch_failed(
+            batch_id,
+            "Interrupted by server shutdown" if isinstance(e, asyncio.CancelledError) else str(e)
+        )
         raise
-    except Exception as e:
-        logger.error(f"Exit operation failed for token {token_mofsl_id}: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Exit operation failed: {str(e)}"
+
+async def touch_batch_heartbeats(batch_ids: List[str]) -> None:
+    """
+    Refresh the heartbeat of the batches this process holds
+    
+    Args:
+        batch_ids (List[str]): Queued and running batch IDs
+    """
+    async with session_scope() as db:
+        await db.execute(
+            update(OrderBatchModel)
+            .where(OrderBatchModel.id.in_(batch_ids), OrderBatchModel.status.in_(("QUEUED", "RUNNING")))
+            .values(heartbeat_at=func.now())
         )
 
-# =============================================================================
-# ORDER STATUS AND MANAGEMENT ENDPOINTS
-# =============================================================================
+batch_job_runner.on_heartbeat = touch_batch_heartbeats
 
-@router.get("/status/{order_id}")
-async def get_order_status(
-    order_id: str,
-    client_id: int,
-    segment: str = "interactive",
-    db: Session = Depends(get_db)
-):
+async def expire_stale_batch(batch_id: str, db: AsyncSession) -> bool:
     """
-    Get status of a specific order
+    Mark an unfinished batch FAILED if no worker has refreshed it recently
+    
+    A batch whose worker process died stays QUEUED or RUNNING forever
+    otherwise. The conditional update means only one caller expires it.
     
     Args:
-        order_id (str): Order ID to check
-        client_id (int): Client ID
-        segment (str): Credential segment
-        db (Session): Database session
+        batch_id (str): Batch ID
+        db (AsyncSession): Database session
         
     Returns:
-        dict: Order status information
+        bool: True if the batch was expired by this call
     """
-    logger.info(f"Getting status for order {order_id}")
-    
-    try:
-        # Get client
-        client = await get_client_with_validation(client_id, segment, db)
-        
-        # Get order status from MOFSL
-        auth_token = await mofsl_wrapper.authenticate_client(client, segment)
-        order_status = await mofsl_wrapper.get_order_status(
-            auth_token.token, 
-            order_id, 
-            client.client_code
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.ORDER_BATCH_STALE_SECONDS)
+    result = await db.execute(
+        update(OrderBatchModel)
+        .where(
+            OrderBatchModel.id == batch_id,
+            OrderBatchModel.status.in_(("QUEUED", "RUNNING")),
+            func.coalesce(OrderBatchModel.heartbeat_at, OrderBatchModel.started_at, OrderBatchModel.created_at) < cutoff
         )
-        
-        return {
-            "success": True,
-            "message": "Order status retrieved successfully",
-            "data": {
+        .values(
+            status="FAILED",
+            error_message="Worker stopped responding",
+            completed_at=func.now()
+        )
+    )
+    await db.commit()
+    if result.rowcount:
+        logger.warning(f"Batch job {batch_id} marked FAILED: no heartbeat for {settings.ORDER_BATCH_STALE_SECONDS}s")
+    return bool(result.rowcount)
+
+async def mark_batch_failed(batch_id: str, error_message: str) -> None:
+    """
+    Record a batch job as failed
+    
+    Args:
+        batch_id (str): Batch ID
+        error_message (str): Failure reason
+    """
+    async with session_scope() as db:
+        await db.execute(update(OrderBatchModel).where(OrderBatchModel.id == batch_id).values(
+            status="FAILED",
+            error_message=error_message,
+            completed_at=func.now()
+        ))
+
+@router.post("/batches", status_code=status.HTTP_202_ACCEPTED)
+async def submit_batch_job(
+    request: BatchJobRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Submit a batch order job for background execution
+    
+    Returns immediately with the batch ID. Results are streamed from
+    /orders/batches/{batch_id}/events and persisted for /orders/batches/{batch_id}.
+    
+    Args:
+        request (BatchJobRequest): Batch order job
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Batch ID, status and follow-up URLs
+        
+    Raises:
+        HTTPException: If validation fails or the job queue is full
+    """
+    if request.allocation:
+        logger.info(f"Submitting batch job: {request.allocation.rule} allocation for {request.symbol}")
+    else:
+        logger.info(f"Submitting batch job: {len(request.client_orders)} orders for {request.symbol}")
+    
+    if request.execution_algo:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Execution algos are scheduled from /orders/execute-all"
+        )
+    
+    try:
+        token, slicer = await load_instrument(request, db)
+        require_instrument(request, token)
+        
+        # Allocations are resolved now so the job runs (and replays) a fixed order list
+        allocation_summary = None
+        if request.allocation:
+            allocation_summary = await allocate_batch_orders(request, token, slicer, db, settings.ORDER_BATCH_MAX_ORDERS)
+        
+        valid_orders = validate_batch_parameters(request)
+        
+        batch = OrderBatchModel(
+            symbol=request.symbol,
+            exchange=request.exchange,
+            order_type=request.order_type,
+            transaction_type=request.transaction_type,
+            request_payload=request.model_dump_json(),
+            status="QUEUED",
+            total_orders=len(valid_orders)
+        )
+        db.add(batch)
+        await db.commit()
+        
+        try:
+            batch_job_runner.submit(
+                batch.id,
+                len(valid_orders),
+                partial(run_batch_job, batch.id, request),
+                on_abandoned=partial(mark_batch_failed, batch.id, "Not started before server shutdown")
+            )
+        except asyncio.QueueFull:
+            batch.status = "FAILED"
+            batch.error_message = "Batch job queue is full"
+            await db.commit()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Batch job queue is full, try again later"
+            )
+        
+        return {
+            "success": True,
+            "message": f"Batch job queued: {len(valid_orders)} orders",
+            "data": {
+                "batch_id": batch.id,
+                "status": batch.status,
+                "total_orders": len(valid_orders),
+                "allocation": allocation_summary,
+                "status_url": f"{settings.API_V1_STR}/orders/batches/{batch.id}",
+                "events_url": f"{settings.API_V1_STR}/orders/batches/{batch.id}/events"
+            }
+        }
+        
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Batch job submission failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch job submission failed: {str(e)}"
+        )
+
+@router.get("/batches/{batch_id}")
+async def get_batch_job(
+    batch_id: str,
+    request: Request,
+    skip: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of results to return"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get batch job status and persisted per-order results
+    
+    Args:
+        batch_id (str): Batch ID
+        request (Request): Incoming request (for conditional GET)
+        skip (int): Number of results to skip
+        limit (int): Maximum number of results to return
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Batch status, counters and a page of results
+        
+    Raises:
+        HTTPException: If the batch is not found
+    """
+    try:
+        batch = await db.get(OrderBatchModel, batch_id)
+        if not batch:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Batch {batch_id} not found"
+            )
+        
+        items = (await db.scalars(
+            select(OrderBatchItemModel)
+            .where(OrderBatchItemModel.batch_id == batch_id)
+            .order_by(OrderBatchItemModel.id)
+            .offset(skip)
+            .limit(limit)
+        )).all()
+        
+        batch_data = serialize_batch(batch)
+        
+        # Counters in the database are updated per chunk - prefer live progress
+        progress = batch_job_runner.get(batch_id)
+        if progress:
+            batch_data.update(progress.snapshot())
+        
+        return conditional_json_response(request, {
+            "success": True,
+            "message": f"Batch {batch_id} is {batch_data['status']}",
+            "data": {
+                "batch": batch_data,
+                "results": [serialize_batch_item(item) for item in items],
+                "skip": skip,
+                "limit": limit
+            }
+        })
+        
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"Error getting batch job {batch_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get batch job: {str(e)}"
+        )
+
+@router.get("/batches/{batch_id}/events")
+async def stream_batch_job_events(
+    batch_id: str,
+    stream_format: str = Query("sse", alias="format", pattern=STREAM_FORMAT_PATTERN, description="Stream format (sse/ndjson)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream per-order results of a batch job
+    
+    Every result of the batch is sent - including those finished before the
+    client connected - followed by a final "complete" record. Finished
+    batches are replayed from the persisted results.
+    
+    Args:
+        batch_id (str): Batch ID
+        stream_format (str): Stream format - Server-Sent Events or NDJSON lines
+        db (AsyncSession): Database session
+        
+    Returns:
+        StreamingResponse: "result" records followed by one "complete" record
+        
+    Raises:
+        HTTPException: If the batch is not found
+    """
+    try:
+        batch = await db.get(OrderBatchModel, batch_id)
+        await release_connection(db)
+    except Exception as e:
+        logger.error(f"Error loading batch job {batch_id} for streaming: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get batch job: {str(e)}"
+        )
+    
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Batch {batch_id} not found"
+        )
+    
+    progress = batch_job_runner.get(batch_id)
+    if progress:
+        return streaming_records_response(progress.events(), stream_format)
+    
+    async def persisted_records():
+        # Batches running in another worker process are followed by polling
+        # the results they persist after each chunk
+        current = batch
+        last_id = 0
+        while True:
+            async with AsyncSessionLocal() as page_db:
+                items = (await page_db.scalars(
+                    select(OrderBatchItemModel)
+                    .where(OrderBatchItemModel.batch_id == batch_id, OrderBatchItemModel.id > last_id)
+                    .order_by(OrderBatchItemModel.id)
+                    .limit(settings.ORDER_BATCH_CHUNK_SIZE)
+                )).all()
+                if not items:
+                    if current.status not in ("QUEUED", "RUNNING"):
+                        break
+                    # A batch whose worker died ends the stream as FAILED
+                    await expire_stale_batch(batch_id, page_db)
+                    current = await page_db.get(OrderBatchModel, batch_id, populate_existing=True)
+            
+            if not items:
+                if current.status in ("QUEUED", "RUNNING"):
+                    await asyncio.sleep(BATCH_EVENTS_POLL_INTERVAL)
+                continue
+            
+            for item in items:
+                yield "result", serialize_batch_item(item)
+            last_id = items[-1].id
+        
+        yield "complete", serialize_batch(current)
+    
+    return streaming_records_response(persisted_records(), stream_format)
+
+# =============================================================================
+# EXECUTION ALGO ENDPOINTS
+# =============================================================================
+
+@router.get("/algos")
+async def list_execution_algos():
+    """
+    List scheduled, running and recently finished TWAP/VWAP executions
+    
+    Returns:
+        dict: Execution snapshots, newest first
+    """
+    executions = execution_scheduler.executions()
+    
+    return {
+        "success": True,
+        "message": f"Retrieved {len(executions)} executions",
+        "data": [execution.snapshot() for execution in executions]
+    }
+
+@router.get("/algos/{algo_id}")
+async def get_execution_algo(
+    algo_id: str,
+    include_results: bool = Query(False, description="Include the per-order results of executed slices")
+):
+    """
+    Get a TWAP/VWAP execution with its slices
+    
+    Args:
+        algo_id (str): Execution ID
+        include_results (bool): Include per-order results
+        
+    Returns:
+        dict: Execution snapshot
+        
+    Raises:
+        HTTPException: If the execution is not found
+    """
+    execution = execution_scheduler.get(algo_id)
+    if execution is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Execution {algo_id} not found"
+        )
+    
+    data = execution.snapshot(include_slices=True)
+    if include_results:
+        for slice_data, algo_slice in zip(data["slices"], execution.slices):
+            slice_data["results"] = algo_slice.results
+    
+    return {
+        "success": True,
+        "message": f"Execution {algo_id} is {execution.status}",
+        "data": data
+    }
+
+@router.post("/algos/{algo_id}/{action}")
+async def control_execution_algo(
+    algo_id: str,
+    action: str = Path(..., pattern=r'^(pause|resume|cancel)$', description="Control action")
+):
+    """
+    Pause, resume or cancel a TWAP/VWAP execution
+    
+    A slice already being placed completes; the action applies to the
+    slices after it. Resuming shifts the remaining slices by the pause.
+    
+    Args:
+        algo_id (str): Execution ID
+        action (str): pause, resume or cancel
+        
+    Returns:
+        dict: Execution snapshot after the action
+        
+    Raises:
+        HTTPException: If the execution is not found or the action does not apply
+    """
+    try:
+        execution = getattr(execution_scheduler, action)(algo_id)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Execution {algo_id} not found"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot {action} execution {algo_id}: {e}"
+        )
+    
+    logger.info(f"Execution {algo_id} {action}: now {execution.status}")
+    
+    return {
+        "success": True,
+        "message": f"Execution {algo_id} is {execution.status}",
+        "data": execution.snapshot()
+    }
+
+# =============================================================================
+# CONDITIONAL ORDER ENDPOINTS
+# =============================================================================
+
+@router.post("/conditional", status_code=status.HTTP_201_CREATED)
+async def create_conditional_order(
+    request: ConditionalOrderRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create a conditional (GTT) order
+    
+    The trigger is armed server-side and evaluated on every tick posted to
+    /orders/ticks; when hit, the order is placed through the dispatcher. A
+    trigger the last traded price has already crossed fires immediately.
+    
+    Args:
+        request (ConditionalOrderRequest): Trigger and order parameters
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Created conditional order
+        
+    Raises:
+        HTTPException: If the client or instrument is invalid or a trailing stop has no reference price
+    """
+    try:
+        client = await get_client_with_validation(request.client_id, request.segment, db)
+        token = await db.scalar(select(TokenModel).where(TokenModel.token == request.token_id).limit(1))
+        await release_connection(db)
+        if token is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Token {request.token_id} not in instrument master"
+            )
+        
+        slicer = OrderSlicer.for_instrument(token, request.symbol)
+        if request.quantity % slicer.lot_size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Quantity {request.quantity} is not a multiple of the lot size {slicer.lot_size}"
+            )
+        
+        reference_price = request.reference_price
+        if request.trigger_type == "TRAILING_STOP" and reference_price is None:
+            last_price = risk_ledger.last_price(instrument_key(request.exchange, token.id))
+            if last_price is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"No price seen for {request.symbol} yet - reference_price is required"
+                )
+            reference_price = Decimal(str(last_price))
+        
+        order = await trigger_engine.add(ConditionalOrderModel(
+            client_id=client.id,
+            token_id=token.id,
+            trigger_type=request.trigger_type,
+            trigger_price=request.trigger_price,
+            trail_amount=request.trail_amount,
+            reference_price=reference_price,
+            symbol=request.symbol,
+            exchange=request.exchange,
+            segment=request.segment,
+            order_type=request.order_type,
+            transaction_type=request.transaction_type,
+            product_type=request.product_type,
+            quantity=request.quantity,
+            price=request.price,
+            is_entry=request.entry,
+            expires_at=request.expires_at
+        ))
+        
+        logger.info(f"Conditional order {order.id} armed: {request.trigger_type} {request.transaction_type} {request.quantity} {request.symbol} for {client.client_code}")
+        
+        return {
+            "success": True,
+            "message": f"Conditional order {order.id} is {order.status}",
+            "data": serialize_conditional_order(order)
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error creating conditional order: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create conditional order"
+        )
+
+@router.get("/conditional")
+async def list_conditional_orders(
+    client_id: Optional[int] = Query(None, description="Only this client's orders"),
+    order_status: Optional[str] = Query(None, alias="status", pattern=r'^(ACTIVE|TRIGGERED|PLACED|FAILED|CANCELLED|EXPIRED)$', description="Only orders in this status"),
+    limit: int = Query(100, ge=1, le=1000, description="Most orders returned, newest first"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List conditional orders
+    
+    Args:
+        client_id (Optional[int]): Client filter
+        order_status (Optional[str]): Status filter
+        limit (int): Page size
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Conditional orders, newest first (armed orders with live trigger levels)
+    """
+    try:
+        query = select(ConditionalOrderModel).order_by(ConditionalOrderModel.created_at.desc()).limit(limit)
+        if client_id is not None:
+            query = query.where(ConditionalOrderModel.client_id == client_id)
+        if order_status is not None:
+            query = query.where(ConditionalOrderModel.status == order_status)
+        orders = (await db.scalars(query)).all()
+        
+        return {
+            "success": True,
+            "message": f"Retrieved {len(orders)} conditional orders",
+            "data": [serialize_conditional_order(order) for order in orders]
+        }
+        
+    except Exception as e:
+        logger.error(f"Error listing conditional orders: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to list conditional orders"
+        )
+
+@router.post("/conditional/{conditional_id}/cancel")
+async def cancel_conditional_order(
+    conditional_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cancel an armed conditional order
+    
+    Args:
+        conditional_id (str): Conditional order ID
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Cancelled conditional order
+        
+    Raises:
+        HTTPException: If the order is not found or no longer armed
+    """
+    try:
+        try:
+            order = await trigger_engine.cancel(conditional_id)
+        except KeyError:
+            order = await db.get(ConditionalOrderModel, conditional_id)
+            if order is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Conditional order {conditional_id} not found"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Conditional order {conditional_id} is {order.status}"
+            )
+        
+        logger.info(f"Conditional order {conditional_id} cancelled")
+        
+        return {
+            "success": True,
+            "message": f"Conditional order {conditional_id} cancelled",
+            "data": serialize_conditional_order(order)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelling conditional order {conditional_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to cancel conditional order"
+        )
+
+@router.post("/ticks")
+async def ingest_ticks(
+    request: TickBatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply market data ticks
+    
+    Each tick revalues open positions for the risk checks and fires the
+    conditional orders its price reaches. Triggered orders are placed in
+    the background, so the feed is never held up by the broker.
+    
+    Args:
+        request (TickBatchRequest): Ticks in arrival order
+        db (AsyncSession): Database session (only for tokens not seen before)
+        
+    Returns:
+        dict: Tick and trigger counts
+    """
+    try:
+        started = time.perf_counter()
+        token_ids = await resolve_token_ids({tick.token_id for tick in request.ticks}, db)
+        await release_connection(db)
+        
+        triggered = 0
+        unknown = 0
+        for tick in request.ticks:
+            token_id = token_ids.get(tick.token_id)
+            if token_id is None:
+                unknown += 1
+                continue
+            instrument = instrument_key(tick.exchange, token_id)
+            risk_ledger.mark(instrument, tick.price)
+            triggered += trigger_engine.on_tick(instrument, tick.price)
+        
+        return {
+            "success": True,
+            "message": f"Applied {len(request.ticks) - unknown} ticks, triggered {triggered} conditional orders",
+            "data": {
+                "ticks": len(request.ticks),
+                "unknown_tokens": unknown,
+                "triggered_orders": triggered,
+                "processing_ms": round((time.perf_counter() - started) * 1000, 3)
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"Error applying ticks: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to apply ticks"
+        )
+
+# =============================================================================
+# TOKEN EXIT ENDPOINTS
+# =============================================================================
+
+@router.post("/tokens/{token_mofsl_id}/exit-all")
+async def exit_all_positions(
+    token_mofsl_id: str,
+    request: ExitOrderRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exit all positions for a specific token across multiple clients
+    
+    Args:
+        token_mofsl_id (str): MOFSL token ID to exit
+        request (ExitOrderRequest): Exit order parameters
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Exit execution results
+        
+    Raises:
+        HTTPException: If exit fails
+    """
+    logger.info(f"Exiting all positions for token {token_mofsl_id}")
+    
+    execution_start = datetime.now()
+    
+    try:
+        # Get clients with active positions (or use client filter)
+        if request.client_filter:
+            clients = (await db.scalars(select(ClientModel).where(
+                ClientModel.id.in_(request.client_filter),
+                ClientModel.is_active == True
+            ))).all()
+        else:
+            # Get all active clients with credentials
+            clients = (await db.scalars(select(ClientModel).where(
+                ClientModel.is_active == True,
+                ClientModel.encrypted_mofsl_api_key_interactive.isnot(None)
+            ))).all()
+        
+        # Database token ID so exits net off the positions they close
+        exit_token_id = await db.scalar(select(TokenModel.id).where(
+            TokenModel.token == token_mofsl_id,
+            TokenModel.exchange == request.exchange
+        ).limit(1))
+        
+        await release_connection(db)
+        
+        if not clients:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No active clients found for exit operation"
+            )
+        
+        logger.info(f"Processing exit for {len(clients)} clients")
+        
+        # Journal writes for exit orders placed by the concurrent client tasks
+        journal_writes = []
+        
+        async def exit_position(client: ClientModel, auth_token, position: Dict) -> bool:
+            """Place the exit order for one position; returns whether an exit was needed"""
+            current_qty = int(position.get('quantity', 0))
+            
+            if current_qty == 0:
+                return False
+            
+            # Determine exit transaction type (opposite of current position)
+            exit_transaction = "SELL" if current_qty > 0 else "BUY"
+            exit_quantity = abs(current_qty)
+            
+            if request.dry_run:
+                return True
+            
+            # Create exit order
+            exit_order = OrderCreate(
+                client_id=client.id,
+                token_id=exit_token_id or UNMAPPED_TOKEN_ID,
+                order_type=request.order_type,
+                transaction_type=exit_transaction,
+                product_type=position.get('product_type', 'MIS'),
+                quantity=exit_quantity,
+                price=request.price,
+                exchange=request.exchange,
+                validity="DAY",
+                remarks=f"Exit order for {token_mofsl_id}"
+            )
+            
+            # Place exit order (dispatched ahead of new entries)
+            order_key = (
+                f"{request.idempotency_key}:{client.id}:{token_mofsl_id}:{exit_order.product_type}"
+                if request.idempotency_key else None
+            )
+            order_id, replayed = await place_order_once(
+                client,
+                exit_order,
+                auth_token.token,
+                DispatchPriority.EXIT,
+                request.exchange,
+                request.segment,
+                order_key,
+                track_risk=exit_token_id is not None
+            )
+            if replayed:
+                return True
+            
+            # Queue order for the next bulk insert
+            journal_writes.append(order_journal.submit({
+                "order_id": order_id,
+                "client_id": client.id,
+                "token_id": exit_token_id or UNMAPPED_TOKEN_ID,
+                "order_type": request.order_type,
+                "transaction_type": exit_transaction,
+                "product_type": position.get('product_type', 'MIS'),
+                "quantity": exit_quantity,
+                "price": request.price,
+                "exchange": request.exchange,
+                "status": "PENDING",
+                "remarks": f"Exit order for {token_mofsl_id}"
+            }))
+            return True
+        
+        # Execute exit orders - all of a client's positions at once
+        async def execute_client_exit(client: ClientModel, positions: List[Dict]) -> Dict[str, Any]:
+            try:
+                auth_token = await mofsl_wrapper.authenticate_client(client, request.segment)
+                outcomes = await asyncio.gather(
+                    *(exit_position(client, auth_token, position) for position in positions),
+                    return_exceptions=True
+                )
+                
+                client_errors = []
+                for outcome in outcomes:
+                    if isinstance(outcome, Exception):
+                        client_errors.append(f"Position exit failed: {str(outcome)}")
+                        logger.error(f"Failed to exit position for {client.client_code}: {outcome}")
+                
+                return {
+                    "client_id": client.id,
+                    "client_code": client.client_code,
+                    "success": len(client_errors) == 0,
+                    "positions_exited": sum(1 for outcome in outcomes if outcome is True),
+                    "total_positions": len(positions),
+                    "error_message": "; ".join(client_errors) if client_errors else None
+                }
+                
+            except Exception as e:
+                logger.error(f"Client exit failed for {client.client_code}: {e}")
+                return {
+                    "client_id": client.id,
+                    "client_code": client.client_code,
+                    "success": False,
+                    "error_message": str(e),
+                    "positions_exited": 0,
+                    "total_positions": len(positions)
+                }
+        
+        # Discovery fans out with bounded concurrency; each client's exits are
+        # fired as soon as its positions arrive instead of after every fetch
+        discovery_semaphore = asyncio.Semaphore(request.max_concurrent_discovery)
+        clients_with_positions = 0
+        
+        async def discover_and_exit(client: ClientModel) -> Optional[Dict[str, Any]]:
+            nonlocal clients_with_positions
+            try:
+                async with discovery_semaphore:
+                    positions = await get_client_positions_for_token(client, token_mofsl_id, request.segment)
+            except Exception as e:
+                logger.warning(f"Failed to get positions for client {client.client_code}: {e}")
+                return {
+                    "client_id": client.id,
+                    "client_code": client.client_code,
+                    "success": False,
+                    "error_message": f"Failed to fetch positions: {str(e)}",
+                    "positions_exited": 0
+                }
+            
+            # Filter positions that meet minimum quantity
+            exit_positions = [
+                pos for pos in positions 
+                if abs(int(pos.get('quantity', 0))) >= request.min_quantity
+            ]
+            
+            if not exit_positions:
+                return None
+            
+            clients_with_positions += 1
+            logger.debug(f"Client {client.client_code}: {len(exit_positions)} positions to exit")
+            return await execute_client_exit(client, exit_positions)
+        
+        client_results = await asyncio.gather(*(discover_and_exit(client) for client in clients), return_exceptions=True)
+        
+        # Exit orders must be persisted before they are reported
+        unsaved_orders = await order_journal.wait(journal_writes)
+        
+        # Process results (clients without positions report nothing)
+        final_results = []
+        for client, result in zip(clients, client_results):
+            if isinstance(result, Exception):
+                final_results.append({
+                    "client_id": client.id,
+                    "client_code": client.client_code,
+                    "success": False,
+                    "error_message": str(result),
+                    "positions_exited": 0
+                })
+            elif result is not None:
+                final_results.append(result)
+        
+        # Failed position fetches fall through so they are reported as failures
+        if not clients_with_positions and not final_results:
+            return {
+                "success": True,
+                "message": "No positions found to exit for the specified token",
+                "summary": {
+                    "clients_processed": len(clients),
+                    "clients_with_positions": 0,
+                    "total_positions_exited": 0
+                },
+                "results": final_results
+            }
+        
+        # Calculate summary
+        successful_exits = [r for r in final_results if r["success"]]
+        total_positions_exited = sum(r["positions_exited"] for r in final_results)
+        
+        total_time = int((datetime.now() - execution_start).total_seconds() * 1000)
+        
+        return {
+            "success": len(successful_exits) > 0,
+            "message": f"Exit operation completed for token {token_mofsl_id}",
+            "summary": {
+                "token_mofsl_id": token_mofsl_id,
+                "clients_processed": len(clients),
+                "clients_with_positions": clients_with_positions,
+                "successful_exits": len(successful_exits),
+                "total_positions_exited": total_positions_exited,
+                "execution_time_ms": total_time,
+                "unsaved_orders": unsaved_orders,
+                "dry_run": request.dry_run
+            },
+            "results": final_results,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+        
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"Exit operation failed for token {token_mofsl_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Exit operation failed: {str(e)}"
+        )
+
+# =============================================================================
+# KILL SWITCH ENDPOINTS
+# =============================================================================
+
+# Last kill switch run - progress, background task and start time; engaged_at
+# stays set until release so re-runs of the same engagement share exit keys
+kill_switch_state: Dict[str, Any] = {"progress": None, "task": None, "started_at": None, "engaged_at": None}
+
+async def run_kill_switch(clients: List[ClientModel], request: KillSwitchRequest, progress: BatchProgress) -> None:
+    """
+    Cancel open orders and square off positions for every client
+    
+    Each client runs as its own pipeline: fetch order book and positions
+    (bounded fan-out), cancel all open orders, then square off the selected
+    product types. Broker calls use the kill switch dispatch priority and
+    every client's outcome is published to progress as soon as it finishes.
+    Square-off orders are keyed per engagement (until release), so running
+    the kill switch again replays exits already placed instead of doubling them.
+    
+    Args:
+        clients (List[ClientModel]): Clients to process
+        request (KillSwitchRequest): Kill switch options
+        progress (BatchProgress): Progress tracker streamed to callers
+    """
+    started = datetime.now()
+    discovery_semaphore = asyncio.Semaphore(request.max_concurrent_discovery)
+    journal_writes = []
+    cancelled_order_ids = []
+    
+    async def cancel_open_order(client: ClientModel, auth_token, order: Dict) -> bool:
+        order_id = str(order.get("uniqueorderid") or order.get("order_id"))
+        if request.dry_run:
+            return True
+        
+        cancelled = await order_dispatcher.submit(
+            partial(mofsl_wrapper.cancel_order, auth_token.token, order_id, client.client_code),
+            DispatchPriority.KILL_SWITCH,
+            client.id
+        )
+        if cancelled:
+            cancelled_order_ids.append(order_id)
+            order_book_cache.record_cancel(client.id, request.segment, order_id)
+        return cancelled
+    
+    async def square_off_position(client: ClientModel, auth_token, position: Dict, token_ids: Dict[str, int]) -> bool:
+        current_qty = int(position.get('quantity', 0))
+        if request.dry_run:
+            return True
+        
+        token = str(position.get('token') or "")
+        if not token:
+            raise ValueError("Position does not report an instrument token")
+        exchange = position.get('exchange') or request.default_exchange
+        token_id = token_ids.get(token)
+        square_off_order = OrderCreate(
+            client_id=client.id,
+            token_id=token_id or UNMAPPED_TOKEN_ID,
+            order_type="MKT",
+            transaction_type="SELL" if current_qty > 0 else "BUY",
+            product_type=position.get('product_type', 'MIS'),
+            quantity=abs(current_qty),
+            exchange=exchange,
+            validity="DAY",
+            remarks="Kill switch square-off"
+        )
+        
+        # Keyed per engagement so a re-run of the kill switch cannot exit the same position twice
+        order_key = (
+            f"kill-switch:{kill_switch_state['engaged_at']}:{client.id}:{request.segment}:"
+            f"{exchange}:{token}:{square_off_order.product_type}:{square_off_order.transaction_type}"
+        )
+        try:
+            order_id, replayed = await place_order_once(
+                client,
+                square_off_order,
+                auth_token.token,
+                DispatchPriority.KILL_SWITCH,
+                exchange,
+                request.segment,
+                order_key,
+                track_risk=token_id is not None
+            )
+        except IdempotencyUnavailableError:
+            # The kill switch must not wait on Redis - the order tag still finds an earlier exit
+            if await find_order_by_tag(client, request.segment, square_off_order.tag):
+                return True
+            order_id, replayed = await place_order_once(
+                client,
+                square_off_order,
+                auth_token.token,
+                DispatchPriority.KILL_SWITCH,
+                exchange,
+                request.segment,
+                track_risk=token_id is not None
+            )
+        if replayed:
+            return True
+        
+        # Queue order for the next bulk insert
+        journal_writes.append(order_journal.submit({
+            "order_id": order_id,
+            "client_id": client.id,
+            "token_id": square_off_order.token_id,
+            "order_type": square_off_order.order_type,
+            "transaction_type": square_off_order.transaction_type,
+            "product_type": square_off_order.product_type,
+            "quantity": square_off_order.quantity,
+            "exchange": square_off_order.exchange,
+            "status": "PENDING",
+            "remarks": square_off_order.remarks
+        }))
+        return True
+    
+    async def kill_client(client: ClientModel) -> Dict[str, Any]:
+        result = {
+            "client_id": client.id,
+            "client_code": client.client_code,
+            "success": False,
+            "open_orders": 0,
+            "orders_cancelled": 0,
+            "positions_to_square_off": 0,
+            "positions_squared_off": 0,
+            "error_message": None
+        }
+        errors = []
+        
+        try:
+            async with discovery_semaphore:
+                auth_token = await mofsl_wrapper.authenticate_client(client, request.segment)
+                order_book, positions = await asyncio.gather(
+                    order_book_cache.get_book(client, request.segment, max_age=0) if request.cancel_open_orders else asyncio.sleep(0, result=[]),
+                    mofsl_wrapper.get_positions(auth_token.token, client.client_code) if request.square_off else asyncio.sleep(0, result=[])
+                )
+            
+            # Cancel first so pending orders cannot fill against the square-off
+            open_orders = [order for order in order_book if is_open_order(order)]
+            result["open_orders"] = len(open_orders)
+            outcomes = await asyncio.gather(
+                *(cancel_open_order(client, auth_token, order) for order in open_orders),
+                return_exceptions=True
+            )
+            result["orders_cancelled"] = sum(1 for outcome in outcomes if outcome is True)
+            errors.extend(f"Cancel failed: {outcome}" for outcome in outcomes if isinstance(outcome, Exception))
+            
+            square_off_positions = [
+                position for position in positions
+                if position.get('product_type', 'MIS') in request.square_off_product_types
+                and int(position.get('quantity', 0)) != 0
+            ]
+            result["positions_to_square_off"] = len(square_off_positions)
+            token_ids: Dict[str, int] = {}
+            if square_off_positions and not request.dry_run:
+                async with AsyncSessionLocal() as db:
+                    token_ids = await resolve_token_ids({str(position.get('token') or "") for position in square_off_positions}, db)
+            outcomes = await asyncio.gather(
+                *(square_off_position(client, auth_token, position, token_ids) for position in square_off_positions),
+                return_exceptions=True
+            )
+            result["positions_squared_off"] = sum(1 for outcome in outcomes if outcome is True)
+            errors.extend(f"Square-off failed: {outcome}" for outcome in outcomes if isinstance(outcome, Exception))
+            
+        except Exception as e:
+            errors.append(str(e))
+        
+        if errors:
+            logger.error(f"Kill switch errors for client {client.client_code}: {'; '.join(errors)}")
+        
+        result["success"] = (
+            not errors
+            and result["orders_cancelled"] == result["open_orders"]
+            and result["positions_squared_off"] == result["positions_to_square_off"]
+        )
+        result["error_message"] = "; ".join(errors) if errors else None
+        return result
+    
+    async def kill_and_publish(client: ClientModel) -> Dict[str, Any]:
+        result = await kill_client(client)
+        progress.publish(result)
+        return result
+    
+    try:
+        results = await asyncio.gather(*(kill_and_publish(client) for client in clients))
+        
+        # Square-off orders must be persisted before the run is reported complete
+        unsaved_orders = await order_journal.wait(journal_writes)
+        
+        if cancelled_order_ids:
+            async with session_scope() as db:
+                await db.execute(
+                    update(OrderModel)
+                    .where(OrderModel.order_id.in_(cancelled_order_ids))
+                    .values(status="CANCELLED")
+                )
+        
+        summary = {
+            "clients_processed": len(results),
+            "clients_failed": sum(1 for result in results if not result["success"]),
+            "open_orders": sum(result["open_orders"] for result in results),
+            "orders_cancelled": sum(result["orders_cancelled"] for result in results),
+            "positions_to_square_off": sum(result["positions_to_square_off"] for result in results),
+            "positions_squared_off": sum(result["positions_squared_off"] for result in results),
+            "unsaved_orders": unsaved_orders,
+            "entries_halted": order_dispatcher.halt_reason is not None,
+            "dry_run": request.dry_run,
+            "execution_time_ms": int((datetime.now() - started).total_seconds() * 1000)
+        }
+        
+        logger.warning(f"Kill switch completed: {summary}")
+        progress.finish("COMPLETED", summary)
+        
+    except Exception as e:
+        logger.error(f"Kill switch run failed: {e}")
+        progress.finish("FAILED", {"error_message": str(e)})
+
+@router.post("/kill-switch")
+async def engage_kill_switch(
+    request: KillSwitchRequest,
+    stream_format: str = Query("sse", alias="format", pattern=STREAM_FORMAT_PATTERN, description="Stream format (sse/ndjson)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Firm-wide kill switch: cancel all open orders and optionally square off
+    
+    The run continues in the background if the caller disconnects; its
+    progress can be followed again from /orders/kill-switch/events. If a
+    run is already in progress its stream is returned instead of starting
+    another one.
+    
+    Args:
+        request (KillSwitchRequest): Kill switch options
+        stream_format (str): Stream format - Server-Sent Events or NDJSON lines
+        db (AsyncSession): Database session
+        
+    Returns:
+        StreamingResponse: One "result" record per client followed by a "complete" summary
+        
+    Raises:
+        HTTPException: If no clients are found
+    """
+    current = kill_switch_state["progress"]
+    if current is not None and not current.done:
+        logger.warning("Kill switch already running - attaching to the running stream")
+        return streaming_records_response(current.events(), stream_format)
+    
+    logger.warning(
+        f"Kill switch engaged (square_off={request.square_off}, halt_entries={request.halt_entries}, dry_run={request.dry_run})"
+    )
+    
+    try:
+        credential_column = (
+            ClientModel.encrypted_mofsl_api_key_commodity
+            if request.segment == "commodity"
+            else ClientModel.encrypted_mofsl_api_key_interactive
+        )
+        query = select(ClientModel).where(ClientModel.is_active == True, credential_column.isnot(None))
+        if request.client_filter:
+            query = query.where(ClientModel.id.in_(request.client_filter))
+        clients = (await db.scalars(query)).all()
+        await release_connection(db)
+    except Exception as e:
+        logger.error(f"Error loading clients for kill switch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Kill switch failed: {str(e)}"
+        )
+    
+    if not clients:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active clients found for kill switch"
+        )
+    
+    if request.halt_entries and not request.dry_run:
+        await order_dispatcher.halt_entries("kill switch engaged")
+        cancelled_algos = execution_scheduler.cancel_all("Cancelled by kill switch")
+        if cancelled_algos:
+            logger.warning(f"Kill switch cancelled {cancelled_algos} scheduled executions")
+    
+    if kill_switch_state["engaged_at"] is None:
+        kill_switch_state["engaged_at"] = datetime.now(timezone.utc).isoformat()
+    
+    progress = BatchProgress("kill-switch", len(clients))
+    progress.status = "RUNNING"
+    kill_switch_state.update({
+        "progress": progress,
+        "task": asyncio.create_task(run_kill_switch(clients, request, progress)),
+        "started_at": datetime.now(timezone.utc).isoformat()
+    })
+    
+    return streaming_records_response(progress.events(), stream_format)
+
+@router.get("/kill-switch")
+async def get_kill_switch_status():
+    """
+    Kill switch status: entry halt and the last run's progress
+    
+    Returns:
+        dict: Halt state and last run counters/summary
+    """
+    progress = kill_switch_state["progress"]
+    halt_reason = await order_dispatcher.refresh_halt()
+    
+    return {
+        "success": True,
+        "message": "Kill switch status retrieved successfully",
+        "data": {
+            "entries_halted": halt_reason is not None,
+            "halt_reason": halt_reason,
+            "last_run": {
+                "started_at": kill_switch_state["started_at"],
+                "status": progress.status,
+                "clients_total": progress.total,
+                "clients_processed": len(progress.results),
+                "summary": progress.summary
+            } if progress else None
+        }
+    }
+
+@router.get("/kill-switch/events")
+async def stream_kill_switch_events(
+    stream_format: str = Query("sse", alias="format", pattern=STREAM_FORMAT_PATTERN, description="Stream format (sse/ndjson)")
+):
+    """
+    Stream the progress of the running (or last) kill switch run
+    
+    Args:
+        stream_format (str): Stream format - Server-Sent Events or NDJSON lines
+        
+    Returns:
+        StreamingResponse: All "result" records followed by a "complete" summary
+        
+    Raises:
+        HTTPException: If the kill switch has not been engaged
+    """
+    progress = kill_switch_state["progress"]
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Kill switch has not been engaged"
+        )
+    
+    return streaming_records_response(progress.events(), stream_format)
+
+@router.post("/kill-switch/release")
+async def release_kill_switch():
+    """
+    Release the kill switch so new entry orders are accepted again
+    
+    Returns:
+        dict: Release result
+        
+    Raises:
+        HTTPException: If a kill switch run is still in progress
+    """
+    progress = kill_switch_state["progress"]
+    if progress is not None and not progress.done:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Kill switch run still in progress"
+        )
+    
+    await order_dispatcher.resume_entries()
+    kill_switch_state["engaged_at"] = None
+    
+    return {
+        "success": True,
+        "message": "Kill switch released - new entries are accepted",
+        "data": {
+            "entries_halted": False,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    }
+
+# =============================================================================
+# INTRADAY SQUARE-OFF
+# =============================================================================
+
+# Progress of the running (or last) square-off run
+square_off_state: Dict[str, Any] = {"progress": None, "task": None, "started_at": None, "trigger": None, "exchanges": None}
+
+async def run_square_off(
+    clients: List[Tuple[ClientModel, str]],
+    request: SquareOffRequest,
+    exchanges: List[str],
+    progress: BatchProgress,
+    run_id: str
+) -> None:
+    """
+    Square off intraday positions on the given exchanges for every client
+    
+    Each client runs as its own pipeline: fetch positions and order book
+    (bounded fan-out), cancel open orders of the squared-off products, then
+    exit every open position in parallel at EXIT priority. Positions are
+    fetched again after SQUARE_OFF_RETRY_DELAY_SECONDS and anything still
+    open whose exit is no longer working is exited again, for up to
+    max_attempts rounds; positions left open after that are escalated.
+    Every client's report is published to progress as soon as it finishes.
+    Exits are keyed by run, position and round, so a round placed twice
+    (or by a second worker) is only sent to the broker once. Positions the
+    broker reports without a product type are left alone.
+    
+    Args:
+        clients (List[Tuple[ClientModel, str]]): Clients with the credential segment to use
+        request (SquareOffRequest): Square-off options
+        exchanges (List[str]): Exchanges to square off
+        progress (BatchProgress): Progress tracker streamed to callers
+        run_id (str): Identifies the run in exit order keys (the date for scheduled runs)
+    """
+    started = datetime.now()
+    discovery_semaphore = asyncio.Semaphore(request.max_concurrent_discovery)
+    journal_writes = []
+    
+    def is_square_off_position(position: Dict) -> bool:
+        return (
+            position.get('product_type') in request.product_types
+            and (position.get('exchange') or "NSE") in exchanges
+            and int(position.get('quantity', 0)) != 0
+        )
+    
+    async def exit_position(client: ClientModel, auth_token, segment: str, position: Dict, token_id: Optional[int], attempt: int) -> str:
+        current_qty = int(position.get('quantity', 0))
+        exchange = position.get('exchange') or "NSE"
+        exit_order = OrderCreate(
+            client_id=client.id,
+            token_id=token_id or UNMAPPED_TOKEN_ID,
+            order_type="MKT",
+            transaction_type="SELL" if current_qty > 0 else "BUY",
+            product_type=position['product_type'],
+            quantity=abs(current_qty),
+            exchange=exchange,
+            validity="DAY",
+            remarks="Intraday square-off"
+        )
+        
+        order_key = f"squareoff:{run_id}:{client.id}:{exchange}:{position.get('token')}:{exit_order.product_type}:{attempt}"
+        try:
+            order_id, replayed = await place_order_once(
+                client,
+                exit_order,
+                auth_token.token,
+                DispatchPriority.EXIT,
+                exchange,
+                segment,
+                order_key,
+                track_risk=token_id is not None
+            )
+        except IdempotencyUnavailableError:
+            # The cut-off will not wait on Redis - the order tag still finds an earlier exit
+            order_id = await find_order_by_tag(client, segment, exit_order.tag)
+            if order_id:
+                return order_id
+            order_id, replayed = await place_order_once(
+                client,
+                exit_order,
+                auth_token.token,
+                DispatchPriority.EXIT,
+                exchange,
+                segment,
+                track_risk=token_id is not None
+            )
+        if replayed:
+            return order_id
+        
+        # Queue order for the next bulk insert
+        journal_writes.append(order_journal.submit({
+            "order_id": order_id,
+            "client_id": client.id,
+            "token_id": exit_order.token_id,
+            "order_type": exit_order.order_type,
+            "transaction_type": exit_order.transaction_type,
+            "product_type": exit_order.product_type,
+            "quantity": exit_order.quantity,
+            "exchange": exchange,
+            "status": "PENDING",
+            "remarks": exit_order.remarks
+        }))
+        return order_id
+    
+    async def square_off_client(client: ClientModel, segment: str) -> Dict[str, Any]:
+        report = {
+            "client_id": client.id,
+            "client_code": client.client_code,
+            "segment": segment,
+            "success": False,
+            "status": "FAILED",
+            "attempts": 0,
+            "orders_cancelled": 0,
+            "positions": [],
+            "error_message": None
+        }
+        position_reports: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        errors = []
+        fetched = False
+        
+        for attempt in range(request.max_attempts + 1):
+            if attempt:
+                # Give the exits time to fill before checking again
+                await asyncio.sleep(settings.SQUARE_OFF_RETRY_DELAY_SECONDS)
+            
+            try:
+                async with discovery_semaphore:
+                    auth_token = await mofsl_wrapper.authenticate_client(client, segment)
+                    positions, order_book = await asyncio.gather(
+                        mofsl_wrapper.get_positions(auth_token.token, client.client_code),
+                        order_book_cache.get_book(client, segment, max_age=0)
+                    )
+            except Exception as e:
+                errors.append(f"Position fetch failed: {e}")
+                continue
+            fetched = True
+            
+            open_positions = {
+                (position.get('exchange') or "NSE", str(position.get('token')), position['product_type']): position
+                for position in positions if is_square_off_position(position)
+            }
+            for key, position_report in position_reports.items():
+                if key not in open_positions:
+                    position_report.update({"status": "CLOSED", "remaining_quantity": 0})
+            for key, position in open_positions.items():
+                position_report = position_reports.setdefault(key, {
+                    "exchange": key[0],
+                    "token": key[1],
+                    "product_type": key[2],
+                    "quantity": int(position.get('quantity', 0)),
+                    "exit_orders": [],
+                    "errors": []
+                })
+                position_report.update({"status": "OPEN", "remaining_quantity": int(position.get('quantity', 0))})
+            
+            if not open_positions or request.dry_run or attempt == request.max_attempts:
+                break
+            
+            if attempt == 0 and request.cancel_open_orders:
+                # Pending orders of these products could reopen what we close
+                stale_orders = [
+                    order for order in order_book
+                    if is_open_order(order)
+                    and order.get("producttype") in request.product_types
+                    and (order.get("exchange") or "NSE") in exchanges
+                ]
+                outcomes = await asyncio.gather(*(
+                    order_dispatcher.submit(
+                        partial(mofsl_wrapper.cancel_order, auth_token.token, str(order.get("uniqueorderid") or order.get("order_id")), client.client_code),
+                        DispatchPriority.CANCEL,
+                        client.id
+                    )
+                    for order in stale_orders
+                ), return_exceptions=True)
+                for order, outcome in zip(stale_orders, outcomes):
+                    if outcome is True:
+                        report["orders_cancelled"] += 1
+                        order_book_cache.record_cancel(client.id, segment, str(order.get("uniqueorderid") or order.get("order_id")))
+                    elif isinstance(outcome, Exception):
+                        errors.append(f"Cancel failed: {outcome}")
+            
+            # Exits still working at the broker are left to fill
+            working = {str(order.get("uniqueorderid") or order.get("order_id")) for order in order_book if is_open_order(order)}
+            to_exit = [
+                (key, position) for key, position in open_positions.items()
+                if not working.intersection(position_reports[key]["exit_orders"])
+            ]
+            
+            async with AsyncSessionLocal() as db:
+                token_ids = await resolve_token_ids({key[1] for key, _ in to_exit}, db)
+            outcomes = await asyncio.gather(*(
+                exit_position(client, auth_token, segment, position, token_ids.get(key[1]), attempt)
+                for key, position in to_exit
+            ), return_exceptions=True)
+            for (key, _), outcome in zip(to_exit, outcomes):
+                if isinstance(outcome, Exception):
+                    position_reports[key]["errors"].append(f"Attempt {attempt + 1}: {outcome}")
+                else:
+                    position_reports[key]["exit_orders"].append(outcome)
+            report["attempts"] = attempt + 1
+        
+        report["positions"] = list(position_reports.values())
+        still_open = [position for position in report["positions"] if position["status"] == "OPEN"]
+        if request.dry_run:
+            report["status"] = "DRY_RUN" if fetched else "FAILED"
+        elif still_open:
+            for position in still_open:
+                position["status"] = "ESCALATED"
+            report["status"] = "ESCALATED"
+            logger.critical(
+                f"Square-off escalation for client {client.client_code}: {len(still_open)} positions still open after "
+                f"{report['attempts']} attempts ({', '.join(position['exchange'] + ':' + position['token'] for position in still_open)})"
+            )
+        elif fetched:
+            report["status"] = "CLOSED"
+        report["success"] = report["status"] in ("CLOSED", "DRY_RUN")
+        report["error_message"] = "; ".join(errors) if errors else None
+        return report
+    
+    async def square_off_and_publish(client: ClientModel, segment: str) -> Dict[str, Any]:
+        report = await square_off_client(client, segment)
+        progress.publish(report)
+        return report
+    
+    try:
+        reports = await asyncio.gather(*(square_off_and_publish(client, segment) for client, segment in clients))
+        
+        # Exit orders must be persisted before the run is reported complete
+        unsaved_orders = await order_journal.wait(journal_writes)
+        
+        positions = [position for report in reports for position in report["positions"]]
+        summary = {
+            "exchanges": exchanges,
+            "trigger": square_off_state["trigger"],
+            "clients_processed": len(reports),
+            "clients_escalated": sum(1 for report in reports if report["status"] == "ESCALATED"),
+            "clients_failed": sum(1 for report in reports if report["status"] == "FAILED"),
+            "positions_found": len(positions),
+            "positions_closed": sum(1 for position in positions if position["status"] == "CLOSED"),
+            "positions_escalated": sum(1 for position in positions if position["status"] == "ESCALATED"),
+            "exit_orders_placed": sum(len(position["exit_orders"]) for position in positions),
+            "orders_cancelled": sum(report["orders_cancelled"] for report in reports),
+            "unsaved_orders": unsaved_orders,
+            "dry_run": request.dry_run,
+            "execution_time_ms": int((datetime.now() - started).total_seconds() * 1000)
+        }
+        
+        logger.warning(f"Square-off completed: {summary}")
+        progress.finish("COMPLETED", summary)
+        
+    except Exception as e:
+        logger.error(f"Square-off run failed: {e}")
+        progress.finish("FAILED", {"error_message": str(e)})
+
+async def start_square_off(request: SquareOffRequest, trigger: str, run_id: Optional[str] = None) -> BatchProgress:
+    """
+    Load the clients and start a square-off run in the background
+    
+    Args:
+        request (SquareOffRequest): Square-off options
+        trigger (str): What started the run (scheduled or manual)
+        run_id (Optional[str]): Identifies the run in exit order keys (None - the start time)
+        
+    Returns:
+        BatchProgress: Progress of the new run
+        
+    Raises:
+        RuntimeError: If a square-off run is already in progress
+    """
+    current = square_off_state["progress"]
+    if current is not None and not current.done:
+        raise RuntimeError("Square-off run already in progress")
+    
+    exchanges = request.exchanges or list(settings.SQUARE_OFF_TIMES)
+    clients: List[Tuple[ClientModel, str]] = []
+    async with AsyncSessionLocal() as db:
+        for segment in sorted({segment_for_exchange(exchange) for exchange in exchanges}):
+            credential_column = (
+                ClientModel.encrypted_mofsl_api_key_commodity
+                if segment == "commodity"
+                else ClientModel.encrypted_mofsl_api_key_interactive
+            )
+            query = select(ClientModel).where(ClientModel.is_active == True, credential_column.isnot(None))
+            if request.client_filter:
+                query = query.where(ClientModel.id.in_(request.client_filter))
+            clients.extend((client, segment) for client in (await db.scalars(query)).all())
+    
+    logger.warning(f"Square-off started ({trigger}) for {', '.join(exchanges)}: {len(clients)} client credentials, dry_run={request.dry_run}")
+    
+    progress = BatchProgress("square-off", len(clients))
+    progress.status = "RUNNING"
+    started_at = datetime.now(timezone.utc).isoformat()
+    square_off_state.update({
+        "progress": progress,
+        "started_at": started_at,
+        "trigger": trigger,
+        "exchanges": exchanges
+    })
+    square_off_state["task"] = asyncio.create_task(run_square_off(clients, request, exchanges, progress, run_id or started_at))
+    return progress
+
+async def run_scheduled_square_off(exchanges: List[str], run_at: datetime) -> None:
+    """
+    Square off the exchanges whose cut-off was reached (the scheduler's runner)
+    
+    Every worker's scheduler fires at the cut-off; only the one that claims
+    the run in Redis starts it. Without Redis no worker can tell it is the
+    only one, so the run is skipped and escalated instead.
+    
+    Args:
+        exchanges (List[str]): Exchanges to square off
+        run_at (datetime): Scheduled cut-off, in the exchange time zone
+    """
+    try:
+        claimed = await shared_state.claim_once(f"square-off:{run_at.isoformat()}", 86400)
+    except Exception as e:
+        logger.critical(f"Scheduled square-off for {', '.join(exchanges)} skipped - the run could not be claimed: {e}")
+        return
+    if not claimed:
+        logger.info(f"Scheduled square-off for {', '.join(exchanges)} at {run_at.isoformat()} is run by another worker")
+        return
+    await start_square_off(SquareOffRequest(exchanges=exchanges), "scheduled", run_at.date().isoformat())
+
+square_off_scheduler.runner = run_scheduled_square_off
+
+@router.post("/square-off")
+async def run_square_off_now(
+    request: SquareOffRequest,
+    stream_format: str = Query("sse", alias="format", pattern=STREAM_FORMAT_PATTERN, description="Stream format (sse/ndjson)")
+):
+    """
+    Square off intraday positions now instead of waiting for the cut-off
+    
+    The run continues in the background if the caller disconnects; its
+    progress can be followed again from /orders/square-off/events. If a
+    run is already in progress its stream is returned instead of starting
+    another one.
+    
+    Args:
+        request (SquareOffRequest): Square-off options
+        stream_format (str): Stream format - Server-Sent Events or NDJSON lines
+        
+    Returns:
+        StreamingResponse: One "result" report per client followed by a "complete" summary
+        
+    Raises:
+        HTTPException: If the clients cannot be loaded
+    """
+    try:
+        progress = await start_square_off(request, "manual")
+    except RuntimeError:
+        logger.warning("Square-off already running - attaching to the running stream")
+        progress = square_off_state["progress"]
+    except Exception as e:
+        logger.error(f"Error starting square-off: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Square-off failed: {str(e)}"
+        )
+    
+    return streaming_records_response(progress.events(), stream_format)
+
+@router.get("/square-off")
+async def get_square_off_status():
+    """
+    Square-off schedule and the last run's progress
+    
+    Returns:
+        dict: Cut-offs, next run and last run counters/summary
+    """
+    progress = square_off_state["progress"]
+    
+    return {
+        "success": True,
+        "message": "Square-off status retrieved successfully",
+        "data": {
+            "schedule": square_off_scheduler.schedule(),
+            "last_run": {
+                "started_at": square_off_state["started_at"],
+                "trigger": square_off_state["trigger"],
+                "exchanges": square_off_state["exchanges"],
+                "status": progress.status,
+                "clients_total": progress.total,
+                "clients_processed": len(progress.results),
+                "summary": progress.summary
+            } if progress else None
+        }
+    }
+
+@router.get("/square-off/report")
+async def get_square_off_report(
+    escalated_only: bool = Query(False, description="Only clients with positions left open or failed fetches")
+):
+    """
+    Per-client report of the running (or last) square-off run
+    
+    Args:
+        escalated_only (bool): Only clients needing attention
+        
+    Returns:
+        dict: Client reports with per-position exit orders, attempts and errors
+        
+    Raises:
+        HTTPException: If no square-off has run
+    """
+    progress = square_off_state["progress"]
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No square-off has run"
+        )
+    
+    reports = [
+        report for report in progress.results
+        if not escalated_only or report["status"] in ("ESCALATED", "FAILED")
+    ]
+    
+    return {
+        "success": True,
+        "message": f"Retrieved {len(reports)} client reports",
+        "data": {
+            "status": progress.status,
+            "summary": progress.summary,
+            "clients": reports
+        }
+    }
+
+@router.get("/square-off/events")
+async def stream_square_off_events(
+    stream_format: str = Query("sse", alias="format", pattern=STREAM_FORMAT_PATTERN, description="Stream format (sse/ndjson)")
+):
+    """
+    Stream the progress of the running (or last) square-off run
+    
+    Args:
+        stream_format (str): Stream format - Server-Sent Events or NDJSON lines
+        
+    Returns:
+        StreamingResponse: All "result" records followed by a "complete" summary
+        
+    Raises:
+        HTTPException: If no square-off has run
+    """
+    progress = square_off_state["progress"]
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No square-off has run"
+        )
+    
+    return streaming_records_response(progress.events(), stream_format)
+
+# =============================================================================
+# ORDER STATUS AND MANAGEMENT ENDPOINTS
+# =============================================================================
+
+@router.get("/status/{order_id}")
+async def get_order_status(
+    order_id: str,
+    client_id: int,
+    segment: str = "interactive",
+    force_refresh: bool = Query(False, description="Fetch the order book from the broker instead of the cache"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get status of a specific order
+    
+    Served from the client's cached order book; orders the book does not
+    contain are looked up individually at the broker.
+    
+    Args:
+        order_id (str): Order ID to check
+        client_id (int): Client ID
+        segment (str): Credential segment
+        force_refresh (bool): Refresh the cached order book first
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Order status information
+    """
+    logger.info(f"Getting status for order {order_id}")
+    
+    try:
+        # Get client
+        client = await get_client_with_validation(client_id, segment, db)
+        await release_connection(db)
+        
+        order_status, age = await order_book_cache.get_order(client, segment, order_id, force_refresh)
+        source = "order_book"
+        
+        if order_status is None:
+            # Get order status from MOFSL
+            auth_token = await mofsl_wrapper.authenticate_client(client, segment)
+            order_status = await mofsl_wrapper.get_order_status(
+                auth_token.token, 
+                order_id, 
+                client.client_code
+            )
+            source, age = "broker", 0.0
+        
+        return {
+            "success": True,
+            "message": "Order status retrieved successfully",
+            "data": {
                 "order_id": order_id,
                 "client_code": client.client_code,
                 "status": order_status,
+                "source": source,
+                "age_ms": int(age * 1000),
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
         }
@@ -730,7 +3441,7 @@ async def cancel_order(
     order_id: str,
     client_id: int,
     segment: str = "interactive",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Cancel a specific order
@@ -739,7 +3450,7 @@ async def cancel_order(
         order_id (str): Order ID to cancel
         client_id (int): Client ID
         segment (str): Credential segment
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         dict: Cancellation result
@@ -749,25 +3460,42 @@ async def cancel_order(
     try:
         # Get client
         client = await get_client_with_validation(client_id, segment, db)
+        await release_connection(db)
+        
+        # Filled, cancelled and rejected orders cannot change - skip the broker call
+        cached_order = order_book_cache.cached_order(client.id, segment, order_id)
+        if cached_order is not None and is_terminal_order(cached_order):
+            return {
+                "success": False,
+                "message": f"Order is already {cached_order.get('orderstatus')}",
+                "data": {
+                    "order_id": order_id,
+                    "client_code": client.client_code,
+                    "cancelled": False,
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                }
+            }
         
-        # Cancel order through MOFSL
+        # Cancel order through MOFSL (dispatched ahead of all other order traffic)
         auth_token = await mofsl_wrapper.authenticate_client(client, segment)
-        success = await mofsl_wrapper.cancel_order(
-            auth_token.token,
-            order_id,
-            client.client_code
+        success = await order_dispatcher.submit(
+            partial(mofsl_wrapper.cancel_order, auth_token.token, order_id, client.client_code),
+            DispatchPriority.CANCEL,
+            client.id
         )
         
         if success:
+            order_book_cache.record_cancel(client.id, segment, order_id)
+            
             # Update database record if exists
-            db_order = db.query(OrderModel).filter(
+            db_order = await db.scalar(select(OrderModel).where(
                 OrderModel.order_id == order_id,
                 OrderModel.client_id == client_id
-            ).first()
+            ).limit(1))
             
             if db_order:
                 db_order.status = "CANCELLED"
-                db.commit()
+                await db.commit()
         
         return {
             "success": success,
@@ -787,6 +3515,420 @@ async def cancel_order(
             detail=f"Failed to cancel order: {str(e)}"
         )
 
+def matches_bulk_filters(order: Dict[str, Any], request: BulkOrderRequest) -> bool:
+    """
+    Check whether an open order book entry is selected by a bulk request's filters
+    
+    Args:
+        order (Dict[str, Any]): Broker order book entry
+        request (BulkOrderRequest): Bulk cancel or modify request
+    
+    Returns:
+        bool: True if the order is open and matches every filter given
+    """
+    if not is_open_order(order):
+        return False
+    if request.token_id is not None and str(order.get("symboltoken")) != request.token_id:
+        return False
+    if request.exchange is not None and (order.get("exchange") or "NSE") != request.exchange:
+        return False
+    if request.transaction_type is not None and str(order.get("transactiontype", "")).upper() != request.transaction_type:
+        return False
+    if request.product_type is not None and order.get("producttype", "MIS") != request.product_type:
+        return False
+    if request.statuses is not None:
+        statuses = {order_status.strip().lower() for order_status in request.statuses}
+        if str(order.get("orderstatus", "")).strip().lower() not in statuses:
+            return False
+    return True
+
+async def select_bulk_orders(
+    request: BulkOrderRequest,
+    db: AsyncSession
+) -> Tuple[List[Tuple[ClientModel, Any, str, Optional[Dict[str, Any]]]], List[BulkOrderResult]]:
+    """
+    Resolve the open orders a bulk cancel or modify applies to
+    
+    Order books are fetched concurrently (bounded by max_concurrent_discovery).
+    Filtered selections always read a fresh book; explicit orders use the
+    cached book and are only skipped when it shows them finished.
+    
+    Args:
+        request (BulkOrderRequest): Bulk cancel or modify request
+        db (AsyncSession): Database session (released once clients are loaded)
+    
+    Returns:
+        Tuple: (client, auth token, order ID, order book entry or None) per selected order,
+            and results for orders that were skipped or could not be looked up
+    """
+    credential_column = (
+        ClientModel.encrypted_mofsl_api_key_commodity
+        if request.segment == "commodity"
+        else ClientModel.encrypted_mofsl_api_key_interactive
+    )
+    requested: Dict[int, List[str]] = {}
+    if request.order_ids is not None:
+        for ref in request.order_ids:
+            requested.setdefault(ref.client_id, []).append(ref.order_id)
+        clients = await load_clients_for_batch(list(requested), db)
+    else:
+        query = select(ClientModel).where(ClientModel.is_active == True, credential_column.isnot(None))
+        if request.client_ids:
+            query = query.where(ClientModel.id.in_(request.client_ids))
+        clients = {client.id: client for client in (await db.scalars(query)).all()}
+    await release_connection(db)
+    
+    discovery_semaphore = asyncio.Semaphore(request.max_concurrent_discovery)
+    
+    async def discover(client_id: int) -> Tuple[List, List[BulkOrderResult]]:
+        client = clients.get(client_id)
+        client_code = client.client_code if client is not None else None
+        try:
+            client = validate_client_for_trading(client, client_id, request.segment)
+            async with discovery_semaphore:
+                auth_token = await mofsl_wrapper.authenticate_client(client, request.segment)
+                order_book = await order_book_cache.get_book(
+                    client, request.segment, max_age=None if request.order_ids is not None else 0
+                )
+                if request.order_ids is not None:
+                    # Orders missing from the cached book may be newer than it - fetch it again
+                    cached_ids = {str(order.get("uniqueorderid") or order.get("order_id")) for order in order_book}
+                    if not cached_ids.issuperset(requested[client_id]):
+                        order_book = await order_book_cache.get_book(client, request.segment, max_age=0)
+        except Exception as e:
+            logger.error(f"Order book lookup failed for client {client_id}: {e}")
+            return [], [
+                BulkOrderResult(client_id=client_id, client_code=client_code, order_id=order_id, success=False, error_message=str(e))
+                for order_id in requested.get(client_id, [])
+            ]
+        
+        if request.order_ids is None:
+            return [
+                (client, auth_token, str(order.get("uniqueorderid") or order.get("order_id")), order)
+                for order in order_book if matches_bulk_filters(order, request)
+            ], []
+        
+        # Orders missing from the fresh book too are left to the broker to decide
+        orders_by_id = {str(order.get("uniqueorderid") or order.get("order_id")): order for order in order_book}
+        targets, skipped = [], []
+        for order_id in requested[client_id]:
+            order = orders_by_id.get(order_id)
+            if order is not None and not is_open_order(order):
+                skipped.append(BulkOrderResult(
+                    client_id=client_id,
+                    client_code=client.client_code,
+                    order_id=order_id,
+                    success=False,
+                    skipped=True,
+                    error_message=f"Order is already {order.get('orderstatus')}"
+                ))
+            else:
+                targets.append((client, auth_token, order_id, order))
+        return targets, skipped
+    
+    client_ids = list(requested) if request.order_ids is not None else list(clients)
+    discovered = await asyncio.gather(*(discover(client_id) for client_id in client_ids))
+    targets = [target for client_targets, _ in discovered for target in client_targets]
+    results = [result for _, client_results in discovered for result in client_results]
+    return targets, results
+
+async def run_bulk_order_action(
+    targets: List[Tuple[ClientModel, Any, str, Optional[Dict[str, Any]]]],
+    action: Callable[[ClientModel, Any, str, Optional[Dict[str, Any]]], Awaitable[bool]],
+    dry_run: bool
+) -> List[BulkOrderResult]:
+    """
+    Apply a cancel or modify to every selected order concurrently
+    
+    All calls are queued at once; the order dispatcher paces them under
+    the broker rate limits.
+    
+    Args:
+        targets (List[Tuple]): (client, auth token, order ID, order book entry or None) per order
+        action (Callable): Broker call for one order, returning its success
+        dry_run (bool): Report the orders without calling the broker
+    
+    Returns:
+        List[BulkOrderResult]: One result per order, in order
+    """
+    if dry_run:
+        outcomes = [True] * len(targets)
+    else:
+        outcomes = await asyncio.gather(*(action(*target) for target in targets), return_exceptions=True)
+    
+    results = []
+    for (client, _, order_id, _), outcome in zip(targets, outcomes):
+        error_message = None
+        if isinstance(outcome, Exception):
+            error_message = str(outcome)
+        elif outcome is not True:
+            error_message = "Rejected by broker"
+        results.append(BulkOrderResult(
+            client_id=client.id,
+            client_code=client.client_code,
+            order_id=order_id,
+            success=outcome is True,
+            error_message=error_message
+        ))
+    return results
+
+def bulk_order_summary(results: List[BulkOrderResult], request: BulkOrderRequest, started: datetime) -> Dict[str, Any]:
+    """Counts of a bulk cancel or modify"""
+    return {
+        "orders_selected": sum(1 for result in results if not result.skipped),
+        "orders_succeeded": sum(1 for result in results if result.success),
+        "orders_failed": sum(1 for result in results if not result.success and not result.skipped),
+        "orders_skipped": sum(1 for result in results if result.skipped),
+        "dry_run": request.dry_run,
+        "execution_time_ms": int((datetime.now() - started).total_seconds() * 1000)
+    }
+
+def check_bulk_size(targets: List) -> None:
+    """
+    Reject bulk requests that select too many orders
+    
+    Raises:
+        HTTPException: If more than MAX_BULK_ORDERS orders are selected
+    """
+    if len(targets) > MAX_BULK_ORDERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{len(targets)} orders selected - at most {MAX_BULK_ORDERS} can be changed per request, narrow the filters"
+        )
+
+@router.post("/cancel:batch")
+async def cancel_orders_batch(
+    request: BulkOrderRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cancel many open orders in one call
+    
+    Orders are selected by filters (clients, token, exchange, side, product
+    type, status) or listed explicitly, and cancelled concurrently at
+    cancel dispatch priority.
+    
+    Args:
+        request (BulkOrderRequest): Order selection
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Summary and one result per order
+        
+    Raises:
+        HTTPException: If too many orders are selected
+    """
+    logger.info(f"Bulk cancel requested (dry_run={request.dry_run})")
+    started = datetime.now()
+    
+    async def cancel(client: ClientModel, auth_token, order_id: str, order: Optional[Dict[str, Any]]) -> bool:
+        return await order_dispatcher.submit(
+            partial(mofsl_wrapper.cancel_order, auth_token.token, order_id, client.client_code),
+            DispatchPriority.CANCEL,
+            client.id,
+            order.get("exchange") if order else None
+        )
+    
+    try:
+        targets, results = await select_bulk_orders(request, db)
+        check_bulk_size(targets)
+        
+        cancel_results = await run_bulk_order_action(targets, cancel, request.dry_run)
+        results.extend(cancel_results)
+        
+        cancelled = [result for result in cancel_results if result.success and not request.dry_run]
+        for result in cancelled:
+            order_book_cache.record_cancel(result.client_id, request.segment, result.order_id)
+        if cancelled:
+            async with session_scope() as session:
+                await session.execute(
+                    update(OrderModel)
+                    .where(OrderModel.order_id.in_([result.order_id for result in cancelled]))
+                    .values(status="CANCELLED")
+                )
+        
+        summary = bulk_order_summary(results, request, started)
+        logger.info(f"Bulk cancel completed: {summary}")
+        
+        return {
+            "success": summary["orders_failed"] == 0,
+            "message": f"Cancelled {summary['orders_succeeded']} of {summary['orders_selected']} orders",
+            "data": {
+                "summary": summary,
+                "results": results
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in bulk cancel: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Bulk cancel failed: {str(e)}"
+        )
+
+@router.post("/modify:batch")
+async def modify_orders_batch(
+    request: BulkModifyRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply the same modification to many open orders in one call
+    
+    Orders are selected like /orders/cancel:batch and modified
+    concurrently. Modifications run at exit priority, except quantity
+    increases which add exposure and run (and are halted by the kill
+    switch) as entries. Quantity changes to orders whose current quantity
+    is in neither the broker book nor the orders table fail.
+    
+    Args:
+        request (BulkModifyRequest): Order selection and modification
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Summary and one result per order
+        
+    Raises:
+        HTTPException: If too many orders are selected
+    """
+    modifications = request.modifications()
+    logger.info(f"Bulk modify requested: {modifications} (dry_run={request.dry_run})")
+    started = datetime.now()
+    
+    # Quantities of orders the broker book does not show, from our own records
+    recorded_quantities: Dict[str, int] = {}
+    
+    async def modify(client: ClientModel, auth_token, order_id: str, order: Optional[Dict[str, Any]]) -> bool:
+        increases_quantity = False
+        if request.quantity is not None:
+            current_quantity = int(order["quantity"]) if order and order.get("quantity") else recorded_quantities.get(order_id)
+            if current_quantity is None:
+                raise ValueError("Current quantity unknown - cannot tell whether the new quantity adds exposure")
+            increases_quantity = request.quantity > current_quantity
+        return await order_dispatcher.submit(
+            partial(mofsl_wrapper.modify_order, auth_token.token, order_id, modifications, client.client_code),
+            DispatchPriority.ENTRY if increases_quantity else DispatchPriority.EXIT,
+            client.id,
+            order.get("exchange") if order else None
+        )
+    
+    try:
+        targets, results = await select_bulk_orders(request, db)
+        check_bulk_size(targets)
+        
+        unlisted = [order_id for _, _, order_id, order in targets if not (order and order.get("quantity"))]
+        if request.quantity is not None and unlisted:
+            async with AsyncSessionLocal() as session:
+                rows = await session.execute(select(OrderModel.order_id, OrderModel.quantity).where(OrderModel.order_id.in_(unlisted)))
+                recorded_quantities.update({order_id: quantity for order_id, quantity in rows.all()})
+        
+        modify_results = await run_bulk_order_action(targets, modify, request.dry_run)
+        results.extend(modify_results)
+        
+        modified = [result for result in modify_results if result.success and not request.dry_run]
+        if modified:
+            cache_fields = {
+                "orderstatus": "Modified",
+                "ordertype": request.order_type,
+                "quantity": request.quantity,
+                "price": float(request.price) if request.price is not None else None,
+                "triggerprice": float(request.trigger_price) if request.trigger_price is not None else None,
+                "validity": request.validity
+            }
+            cache_fields = {field: value for field, value in cache_fields.items() if value is not None}
+            for result in modified:
+                order_book_cache.record_order(result.client_id, request.segment, {"uniqueorderid": result.order_id, **cache_fields})
+            
+            async with session_scope() as session:
+                await session.execute(
+                    update(OrderModel)
+                    .where(OrderModel.order_id.in_([result.order_id for result in modified]))
+                    .values(**modifications)
+                )
+        
+        summary = bulk_order_summary(results, request, started)
+        logger.info(f"Bulk modify completed: {summary}")
+        
+        return {
+            "success": summary["orders_failed"] == 0,
+            "message": f"Modified {summary['orders_succeeded']} of {summary['orders_selected']} orders",
+            "data": {
+                "summary": summary,
+                "modifications": modifications,
+                "results": results
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in bulk modify: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Bulk modify failed: {str(e)}"
+        )
+
+@router.post("/reconcile")
+async def reconcile_orders():
+    """
+    Sync open order statuses with the broker order books now
+    
+    Runs one reconciliation cycle immediately instead of waiting for the
+    background reconciler.
+    
+    Returns:
+        dict: Cycle counters
+        
+    Raises:
+        HTTPException: If the cycle fails
+    """
+    try:
+        cycle = await order_reconciler.reconcile()
+        
+        return {
+            "success": True,
+            "message": f"Reconciled {cycle['open_orders']} open orders ({cycle['orders_updated']} updated)",
+            "data": {
+                **cycle,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"Order reconciliation failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Order reconciliation failed: {str(e)}"
+        )
+
+@router.get("/risk/{client_id}")
+async def get_client_risk(client_id: int):
+    """
+    Pre-trade risk ledger state of a client
+    
+    Args:
+        client_id (int): Client ID
+        
+    Returns:
+        dict: Limits, P&L, working order value and per-instrument exposure
+        
+    Raises:
+        HTTPException: If the ledger has nothing for the client
+    """
+    snapshot = risk_ledger.snapshot(client_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No risk ledger entries for client {client_id}"
+        )
+    
+    return {
+        "success": True,
+        "message": "Client risk retrieved successfully",
+        "data": snapshot
+    }
+
 @router.get("/health")
 async def orders_health_check():
     """
@@ -798,5 +3940,15 @@ async def orders_health_check():
     return {
         "status": "healthy",
         "service": "Orders API",
+        "batch_jobs": batch_job_runner.stats(),
+        "dispatcher": order_dispatcher.stats(),
+        "idempotency": order_idempotency.stats(),
+        "reconciler": order_reconciler.stats(),
+        "order_book_cache": order_book_cache.stats(),
+        "execution_algos": execution_scheduler.stats(),
+        "risk": risk_ledger.stats(),
+        "margin_cache": margin_cache.stats(),
+        "conditional_orders": trigger_engine.stats(),
+        "square_off": square_off_scheduler.schedule(),
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
\ No newline at end of file
@@ -1,18 +1,26 @@
 # File: /app/api/portfolio.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, validator
 import logging
+import asyncio
 from datetime import datetime, timezone
 from decimal import Decimal
 
-from app.db.database import get_db
+from app.db.database import get_db, release_connection
 from app.models.models import Client as ClientModel, Position as PositionModel, Trade as TradeModel
 from app.schemas.schemas import (
     Client, Position, Trade, PositionListResponse, TradeListResponse,
     ResponseBase, DashboardStats, ClientPortfolioSummary
 )
 from app.core.mofsl_api_wrapper import mofsl_wrapper
+from app.core.order_book_cache import order_book_cache
+from app.core.margin_cache import margin_cache
+from app.core.streaming import streaming_records_response, STREAM_FORMAT_PATTERN
+from app.core.raw_json import scan_array_fields, encode_with_raw
+from app.core.responses import FastJSONResponse, conditional_json_response
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +31,54 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+# =============================================================================
+# REQUEST/RESPONSE SCHEMAS
+# =============================================================================
+
+BATCH_PORTFOLIO_FIELDS = ("summary", "positions", "holdings", "profile")
+
+class BatchPortfolioRequest(BaseModel):
+    """Bulk portfolio request for multiple clients"""
+    client_ids: List[int] = Field(..., min_items=1, max_items=200, description="Client IDs to fetch")
+    fields: List[str] = Field(default=["summary"], min_items=1, description="Fields to include (summary, positions, holdings, profile)")
+    segment: str = Field(default="interactive", pattern=r'^(interactive|commodity)$', description="Credential segment")
+    max_concurrent: int = Field(default=10, ge=1, le=50, description="Maximum concurrent broker fetches")
+    
+    @validator('fields')
+    def validate_fields(cls, v):
+        """Validate requested field selectors"""
+        invalid = [field for field in v if field not in BATCH_PORTFOLIO_FIELDS]
+        if invalid:
+            raise ValueError(f"Invalid fields: {invalid}. Valid fields: {list(BATCH_PORTFOLIO_FIELDS)}")
+        return list(dict.fromkeys(v))
+
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
+def summarize_client_portfolio(positions: List[Dict], holdings: List[Dict]) -> Dict[str, Any]:
+    """
+    Calculate compact per-client P&L summary
+    
+    Args:
+        positions (List[Dict]): Position data from MOFSL
+        holdings (List[Dict]): Holdings data from MOFSL
+        
+    Returns:
+        Dict[str, Any]: Summary with position/holding counts, value and P&L
+    """
+    total_pnl = sum(Decimal(str(pos.get('pnl', 0))) for pos in positions)
+    day_pnl = sum(Decimal(str(pos.get('day_pnl', 0))) for pos in positions)
+    portfolio_value = sum(Decimal(str(holding.get('current_value', 0))) for holding in holdings)
+    
+    return {
+        "total_positions": len(positions),
+        "total_holdings": len(holdings),
+        "portfolio_value": float(portfolio_value),
+        "total_pnl": float(total_pnl),
+        "day_pnl": float(day_pnl)
+    }
+
 def calculate_portfolio_summary(positions: List[Dict], holdings: List[Dict], trades: List[Dict]) -> Dict[str, Any]:
     """
     Calculate portfolio summary statistics
@@ -143,13 +195,100 @@ def format_portfolio_response(
         "last_updated": datetime.now(timezone.utc).isoformat()
     }
 
-async def get_client_or_404(client_id: int, db: Session) -> ClientModel:
+async def fetch_client_portfolio_fields(client: ClientModel, segment: str, fields: List[str]) -> Dict[str, Any]:
+    """
+    Fetch only the requested portfolio fields for a client
+    
+    Args:
+        client (ClientModel): Client database model
+        segment (str): Credential segment
+        fields (List[str]): Field selectors (summary, positions, holdings, profile)
+        
+    Returns:
+        Dict[str, Any]: Compact per-client portfolio entry
+    """
+    auth_token = await mofsl_wrapper.authenticate_client(client, segment)
+    
+    # Only hit the broker endpoints the selectors need
+    fetches = {}
+    if "positions" in fields or "summary" in fields:
+        fetches["positions"] = mofsl_wrapper.get_positions(auth_token.token, client.client_code)
+    if "holdings" in fields or "summary" in fields:
+        fetches["holdings"] = mofsl_wrapper.get_holdings(auth_token.token, client.client_code)
+    if "profile" in fields:
+        fetches["profile"] = mofsl_wrapper.get_client_profile(auth_token.token, client.client_code)
+    
+    fetched = dict(zip(fetches.keys(), await asyncio.gather(*fetches.values())))
+    
+    entry = {
+        "client_id": client.id,
+        "client_code": client.client_code
+    }
+    
+    if "summary" in fields:
+        entry["summary"] = summarize_client_portfolio(fetched["positions"], fetched["holdings"])
+    for field in ("positions", "holdings", "profile"):
+        if field in fields:
+            entry[field] = fetched[field]
+    
+    return entry
+
+async def build_client_summary(client: ClientModel, segment: str = "interactive") -> Dict[str, Any]:
+    """
+    Build a dashboard summary entry for a client
+    
+    Broker failures are reported in the entry rather than raised.
+    
+    Args:
+        client (ClientModel): Client database model
+        segment (str): Credential segment
+        
+    Returns:
+        Dict[str, Any]: Client summary (portfolio_summary is None on error)
+    """
+    entry = {
+        "client_id": client.id,
+        "client_code": client.client_code,
+        "name": client.name,
+        "risk_profile": client.risk_profile
+    }
+    
+    try:
+        portfolio_summary = await mofsl_wrapper.get_portfolio_summary(client, segment=segment)
+        entry["portfolio_summary"] = summarize_client_portfolio(
+            portfolio_summary.get('positions', []),
+            portfolio_summary.get('holdings', [])
+        )
+    except Exception as e:
+        logger.warning(f"Failed to get summary for client {client.client_code}: {e}")
+        entry["portfolio_summary"] = None
+        entry["error"] = str(e)
+    
+    entry["last_updated"] = datetime.now(timezone.utc).isoformat()
+    return entry
+
+def raw_json_response(request: Request, content: Dict[str, Any]) -> Response:
+    """
+    Build a JSON response that splices raw broker fragments in verbatim
+    
+    Bypasses jsonable_encoder so RawJSON payloads are never parsed or re-encoded.
+    
+    Args:
+        request (Request): Incoming request (for If-None-Match)
+        content (Dict[str, Any]): Response body, possibly containing RawJSON values
+        
+    Returns:
+        Response: application/json response, or 304 if the client's copy is current
+    """
+    return conditional_json_response(request, encode_with_raw(content))
+
+async def get_client_or_404(client_id: int, db: AsyncSession) -> ClientModel:
     """
     Get client by ID or raise 404
     
     Args:
         client_id (int): Client ID
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         ClientModel: Client model
@@ -157,7 +296,7 @@ async def get_client_or_404(client_id: int, db: Session) -> ClientModel:
     Raises:
         HTTPException: If client not found
     """
-    client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+    client = await db.get(ClientModel, client_id)
     
     if not client:
         raise HTTPException(
@@ -180,20 +319,22 @@ async def get_client_or_404(client_id: int, db: Session) -> ClientModel:
 @router.get("/clients/{client_id}")
 async def get_client_portfolio(
     client_id: int,
+    request: Request,
     segment: str = Query("interactive", description="Credential segment (interactive/commodity)"),
     include_trades: bool = Query(False, description="Include recent trades"),
     include_margin: bool = Query(True, description="Include margin information"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get comprehensive portfolio data for a client
     
     Args:
         client_id (int): Client ID
+        request (Request): Incoming request (for If-None-Match)
         segment (str): Credential segment to use
         include_trades (bool): Whether to include recent trades
         include_margin (bool): Whether to include margin information
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         dict: Comprehensive portfolio data
@@ -206,6 +347,7 @@ async def get_client_portfolio(
     try:
         # Get client from database
         client = await get_client_or_404(client_id, db)
+        await release_connection(db)
         
         # Check if client has required credentials
         if segment == "interactive":
@@ -239,9 +381,8 @@ async def get_client_portfolio(
         
         if include_trades:
             try:
-                # Get order book which includes executed trades
-                auth_token = await mofsl_wrapper.authenticate_client(client, segment)
-                order_book = await mofsl_wrapper.get_order_book(auth_token.token, client.client_code)
+                # Get order book which includes executed trades (cached)
+                order_book = await order_book_cache.get_book(client, segment)
                 executed_orders = [order for order in order_book if order.get('status') in ['COMPLETE', 'EXECUTED']]
                 additional_data['recent_trades'] = executed_orders[:20]
             except Exception as e:
@@ -263,11 +404,11 @@ async def get_client_portfolio(
         
         logger.info(f"Portfolio retrieved for client {client.client_code}")
         
-        return {
+        return conditional_json_response(request, {
             "success": True,
             "message": f"Portfolio data retrieved for {client.client_code}",
             "data": formatted_portfolio
-        }
+        })
         
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -282,16 +423,20 @@ async def get_client_portfolio(
 @router.get("/clients/{client_id}/positions")
 async def get_client_positions(
     client_id: int,
+    request: Request,
     segment: str = Query("interactive", description="Credential segment"),
-    db: Session = Depends(get_db)
+    raw: bool = Query(False, description="Forward the broker payload without parsing/re-encoding it"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get positions for a specific client
     
     Args:
         client_id (int): Client ID
+        request (Request): Incoming request (for If-None-Match)
         segment (str): Credential segment
-        db (Session): Database session
+        raw (bool): Pass the broker's positions bytes through unchanged
+        db (AsyncSession): Database session
         
     Returns:
         dict: Client positions
@@ -301,16 +446,36 @@ async def get_client_positions(
     try:
         # Get client
         client = await get_client_or_404(client_id, db)
+        await release_connection(db)
         
         # Authenticate and get positions
         auth_token = await mofsl_wrapper.authenticate_client(client, segment)
+        
+        if raw:
+            raw_positions = await mofsl_wrapper.get_positions_raw(auth_token.token, client.client_code)
+            position_count, sums = scan_array_fields(raw_positions, ("pnl", "day_pnl"))
+            
+            return raw_json_response(request, {
+                "success": True,
+                "message": f"Retrieved {position_count} positions for {client.client_code}",
+                "data": {
+                    "client_code": client.client_code,
+                    "positions": raw_positions,
+                    "summary": {
+                        "total_positions": position_count,
+                        "total_pnl": float(sums["pnl"]),
+                        "day_pnl": float(sums["day_pnl"])
+                    }
+                }
+            })
+        
         positions = await mofsl_wrapper.get_positions(auth_token.token, client.client_code)
         
         # Calculate summary
         total_pnl = sum(Decimal(str(pos.get('pnl', 0))) for pos in positions)
         day_pnl = sum(Decimal(str(pos.get('day_pnl', 0))) for pos in positions)
         
-        return {
+        return conditional_json_response(request, {
             "success": True,
             "message": f"Retrieved {len(positions)} positions for {client.client_code}",
             "data": {
@@ -322,7 +487,7 @@ async def get_client_positions(
                     "day_pnl": float(day_pnl)
                 }
             }
-        }
+        })
         
     except HTTPException:
         raise
@@ -336,16 +501,20 @@ async def get_client_positions(
 @router.get("/clients/{client_id}/holdings")
 async def get_client_holdings(
     client_id: int,
+    request: Request,
     segment: str = Query("interactive", description="Credential segment"),
-    db: Session = Depends(get_db)
+    raw: bool = Query(False, description="Forward the broker payload without parsing/re-encoding it"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get holdings for a specific client
     
     Args:
         client_id (int): Client ID
+        request (Request): Incoming request (for If-None-Match)
         segment (str): Credential segment
-        db (Session): Database session
+        raw (bool): Pass the broker's holdings bytes through unchanged
+        db (AsyncSession): Database session
         
     Returns:
         dict: Client holdings
@@ -355,9 +524,34 @@ async def get_client_holdings(
     try:
         # Get client
         client = await get_client_or_404(client_id, db)
+        await release_connection(db)
         
         # Authenticate and get holdings
         auth_token = await mofsl_wrapper.authenticate_client(client, segment)
+        
+        if raw:
+            raw_holdings = await mofsl_wrapper.get_holdings_raw(auth_token.token, client.client_code)
+            holding_count, sums = scan_array_fields(raw_holdings, ("investment_value", "current_value"))
+            total_investment = sums["investment_value"]
+            current_value = sums["current_value"]
+            total_pnl = current_value - total_investment
+            
+            return raw_json_response(request, {
+                "success": True,
+                "message": f"Retrieved {holding_count} holdings for {client.client_code}",
+                "data": {
+                    "client_code": client.client_code,
+                    "holdings": raw_holdings,
+                    "summary": {
+                        "total_holdings": holding_count,
+                        "total_investment": float(total_investment),
+                        "current_value": float(current_value),
+                        "total_pnl": float(total_pnl),
+                        "pnl_percentage": float((total_pnl / total_investment * 100) if total_investment > 0 else 0)
+                    }
+                }
+            })
+        
         holdings = await mofsl_wrapper.get_holdings(auth_token.token, client.client_code)
         
         # Calculate summary
@@ -365,7 +559,7 @@ async def get_client_holdings(
         current_value = sum(Decimal(str(holding.get('current_value', 0))) for holding in holdings)
         total_pnl = current_value - total_investment
         
-        return {
+        return conditional_json_response(request, {
             "success": True,
             "message": f"Retrieved {len(holdings)} holdings for {client.client_code}",
             "data": {
@@ -379,7 +573,7 @@ async def get_client_holdings(
                     "pnl_percentage": float((total_pnl / total_investment * 100) if total_investment > 0 else 0)
                 }
             }
-        }
+        })
         
     except HTTPException:
         raise
@@ -390,19 +584,145 @@ async def get_client_holdings(
             detail="Failed to retrieve holdings"
         )
 
+@router.get("/clients/{client_id}/margins")
+async def get_client_margins(
+    client_id: int,
+    segment: str = Query("interactive", description="Credential segment"),
+    refresh: bool = Query(False, description="Fetch from the broker even if a cached copy is fresh"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get margin summary for a specific client
+    
+    Served from the margin cache; the estimate deducts margin reserved by
+    orders placed since the broker figure was fetched.
+    
+    Args:
+        client_id (int): Client ID
+        segment (str): Credential segment
+        refresh (bool): Bypass the cached copy
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Client margins
+    """
+    logger.info(f"Getting margins for client {client_id}")
+    
+    try:
+        client = await get_client_or_404(client_id, db)
+        await release_connection(db)
+        
+        await margin_cache.get(client, segment, max_age=0 if refresh else None)
+        
+        return {
+            "success": True,
+            "message": f"Retrieved margins for {client.client_code}",
+            "data": {
+                "client_code": client.client_code,
+                **margin_cache.snapshot(client.id, segment)
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting margins for client {client_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve margins"
+        )
+
+@router.post("/clients:batch")
+async def get_clients_portfolio_batch(
+    request: BatchPortfolioRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get portfolio data for many clients in one request
+    
+    Args:
+        request (BatchPortfolioRequest): Client IDs and field selectors
+        db (AsyncSession): Database session
+        
+    Returns:
+        dict: Per-client portfolio entries and per-client errors
+    """
+    client_ids = list(dict.fromkeys(request.client_ids))
+    logger.info(f"Getting batch portfolio for {len(client_ids)} clients (fields: {request.fields})")
+    
+    try:
+        # Load all requested clients with a single IN query
+        clients = (await db.scalars(select(ClientModel).where(ClientModel.id.in_(client_ids)))).all()
+        await release_connection(db)
+        clients_by_id = {client.id: client for client in clients}
+        
+        errors = []
+        eligible_clients = []
+        
+        for client_id in client_ids:
+            client = clients_by_id.get(client_id)
+            if not client:
+                errors.append({"client_id": client_id, "error": f"Client with ID {client_id} not found"})
+            elif not client.is_active:
+                errors.append({"client_id": client_id, "error": f"Client {client.client_code} is inactive"})
+            else:
+                eligible_clients.append(client)
+        
+        # Fetch broker data concurrently with bounded fan-out
+        semaphore = asyncio.Semaphore(request.max_concurrent)
+        
+        async def fetch_with_semaphore(client: ClientModel):
+            async with semaphore:
+                return await fetch_client_portfolio_fields(client, request.segment, request.fields)
+        
+        results = await asyncio.gather(
+            *[fetch_with_semaphore(client) for client in eligible_clients],
+            return_exceptions=True
+        )
+        
+        entries = []
+        for client, result in zip(eligible_clients, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to get batch portfolio for client {client.client_code}: {result}")
+                errors.append({"client_id": client.id, "client_code": client.client_code, "error": str(result)})
+            else:
+                entries.append(result)
+        
+        return FastJSONResponse(content={
+            "success": True,
+            "message": f"Retrieved portfolio data for {len(entries)}/{len(client_ids)} clients",
+            "data": {
+                "clients": entries,
+                "errors": errors,
+                "requested": len(client_ids),
+                "successful": len(entries),
+                "fields": request.fields,
+                "last_updated": datetime.now(timezone.utc).isoformat()
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting batch portfolio: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve batch portfolio data"
+        )
+
 # =============================================================================
 # DASHBOARD ENDPOINTS
 # =============================================================================
 
 @router.get("/dashboard/stats")
 async def get_dashboard_stats(
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get dashboard statistics for all clients
     
     Args:
-        db (Session): Database session
+        request (Request): Incoming request (for If-None-Match)
+        db (AsyncSession): Database session
         
     Returns:
         dict: Dashboard statistics
@@ -411,14 +731,15 @@ async def get_dashboard_stats(
     
     try:
         # Get basic client stats from database
-        total_clients = db.query(ClientModel).count()
-        active_clients = db.query(ClientModel).filter(ClientModel.is_active == True).count()
+        total_clients = await db.scalar(select(func.count(ClientModel.id)))
+        active_clients = await db.scalar(select(func.count(ClientModel.id)).where(ClientModel.is_active == True))
         
         # Get clients with credentials for portfolio stats
-        clients_with_creds = db.query(ClientModel).filter(
+        clients_with_creds = (await db.scalars(select(ClientModel).where(
             ClientModel.is_active == True,
             ClientModel.encrypted_mofsl_api_key_interactive.isnot(None)
-        ).limit(10).all()  # Limit to prevent too many API calls
+        ).limit(10))).all()  # Limit to prevent too many API calls
+        await release_connection(db)
         
         # Initialize aggregated stats
         total_portfolio_value = Decimal('0.00')
@@ -472,11 +793,11 @@ async def get_dashboard_stats(
             "last_updated": datetime.now(timezone.utc).isoformat()
         }
         
-        return {
+        return conditional_json_response(request, {
             "success": True,
             "message": "Dashboard statistics retrieved successfully",
             "data": dashboard_stats
-        }
+        })
         
     except Exception as e:
         logger.error(f"Error getting dashboard stats: {e}")
@@ -487,15 +808,17 @@ async def get_dashboard_stats(
 
 @router.get("/dashboard/clients")
 async def get_client_summaries(
+    request: Request,
     limit: int = Query(20, ge=1, le=100, description="Number of client summaries to return"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get portfolio summaries for multiple clients
     
     Args:
+        request (Request): Incoming request (for If-None-Match)
         limit (int): Maximum number of clients to process
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         dict: Client portfolio summaries
@@ -504,55 +827,18 @@ async def get_client_summaries(
     
     try:
         # Get active clients with credentials
-        clients = db.query(ClientModel).filter(
+        clients = (await db.scalars(select(ClientModel).where(
             ClientModel.is_active == True,
             ClientModel.encrypted_mofsl_api_key_interactive.isnot(None)
-        ).limit(limit).all()
+        ).limit(limit))).all()
+        await release_connection(db)
         
         client_summaries = []
         
         for client in clients:
-            try:
-                # Get quick portfolio summary
-                portfolio_summary = await mofsl_wrapper.get_portfolio_summary(client, segment="interactive")
-                
-                positions = portfolio_summary.get('positions', [])
-                holdings = portfolio_summary.get('holdings', [])
-                
-                # Calculate summary stats
-                total_pnl = sum(Decimal(str(pos.get('pnl', 0))) for pos in positions)
-                day_pnl = sum(Decimal(str(pos.get('day_pnl', 0))) for pos in positions)
-                portfolio_value = sum(Decimal(str(holding.get('current_value', 0))) for holding in holdings)
-                
-                client_summaries.append({
-                    "client_id": client.id,
-                    "client_code": client.client_code,
-                    "name": client.name,
-                    "risk_profile": client.risk_profile,
-                    "portfolio_summary": {
-                        "total_positions": len(positions),
-                        "total_holdings": len(holdings),
-                        "portfolio_value": float(portfolio_value),
-                        "total_pnl": float(total_pnl),
-                        "day_pnl": float(day_pnl)
-                    },
-                    "last_updated": datetime.now(timezone.utc).isoformat()
-                })
-                
-            except Exception as e:
-                logger.warning(f"Failed to get summary for client {client.client_code}: {e}")
-                # Add client with error status
-                client_summaries.append({
-                    "client_id": client.id,
-                    "client_code": client.client_code,
-                    "name": client.name,
-                    "risk_profile": client.risk_profile,
-                    "portfolio_summary": None,
-                    "error": str(e),
-                    "last_updated": datetime.now(timezone.utc).isoformat()
-                })
+            client_summaries.append(await build_client_summary(client))
         
-        return {
+        return conditional_json_response(request, {
             "success": True,
             "message": f"Retrieved summaries for {len(client_summaries)} clients",
             "data": {
@@ -560,7 +846,7 @@ async def get_client_summaries(
                 "total_processed": len(client_summaries),
                 "successful": len([c for c in client_summaries if c.get('portfolio_summary')])
             }
-        }
+        })
         
     except Exception as e:
         logger.error(f"Error getting client summaries: {e}")
@@ -569,6 +855,76 @@ async def get_client_summaries(
             detail="Failed to retrieve client summaries"
         )
 
+@router.get("/dashboard/clients/stream")
+async def stream_client_summaries(
+    limit: int = Query(20, ge=1, le=500, description="Number of client summaries to stream"),
+    stream_format: str = Query("ndjson", alias="format", pattern=STREAM_FORMAT_PATTERN, description="Stream format (ndjson/sse)"),
+    max_concurrent: int = Query(10, ge=1, le=50, description="Maximum concurrent broker fetches"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream portfolio summaries for multiple clients as they complete
+    
+    Each client summary is emitted as soon as its broker calls finish,
+    followed by a final summary record.
+    
+    Args:
+        limit (int): Maximum number of clients to process
+        stream_format (str): Stream format - NDJSON lines or Server-Sent Events
+        max_concurrent (int): Maximum concurrent broker fetches
+        db (AsyncSession): Database session
+        
+    Returns:
+        StreamingResponse: "client" records followed by one "summary" record
+    """
+    logger.info(f"Streaming client summaries (limit: {limit}, format: {stream_format})")
+    
+    try:
+        # Load clients up front so the stream only does broker I/O
+        clients = (await db.scalars(select(ClientModel).where(
+            ClientModel.is_active == True,
+            ClientModel.encrypted_mofsl_api_key_interactive.isnot(None)
+        ).limit(limit))).all()
+        await release_connection(db)
+    except Exception as e:
+        logger.error(f"Error loading clients for summary stream: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve client summaries"
+        )
+    
+    async def records():
+        started = datetime.now()
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def summarize_with_semaphore(client: ClientModel):
+            async with semaphore:
+                return await build_client_summary(client)
+        
+        tasks = [asyncio.ensure_future(summarize_with_semaphore(client)) for client in clients]
+        successful = 0
+        
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                summary = await next_done
+                if summary.get('portfolio_summary'):
+                    successful += 1
+                yield "client", summary
+        finally:
+            # Client disconnected or stream failed - stop outstanding broker calls
+            for task in tasks:
+                task.cancel()
+        
+        yield "summary", {
+            "total_processed": len(clients),
+            "successful": successful,
+            "failed": len(clients) - successful,
+            "execution_time_ms": int((datetime.now() - started).total_seconds() * 1000),
+            "last_updated": datetime.now(timezone.utc).isoformat()
+        }
+    
+    return streaming_records_response(records(), stream_format)
+
 # =============================================================================
 # REAL-TIME DATA ENDPOINTS
 # =============================================================================
@@ -577,7 +933,7 @@ async def get_client_summaries(
 async def get_realtime_portfolio(
     client_id: int,
     segment: str = Query("interactive", description="Credential segment"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get real-time portfolio data (positions only for speed)
@@ -585,7 +941,7 @@ async def get_realtime_portfolio(
     Args:
         client_id (int): Client ID
         segment (str): Credential segment
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         dict: Real-time portfolio data
@@ -595,6 +951,7 @@ async def get_realtime_portfolio(
     try:
         # Get client
         client = await get_client_or_404(client_id, db)
+        await release_connection(db)
         
         # Get only positions for speed (holdings are typically slower)
         auth_token = await mofsl_wrapper.authenticate_client(client, segment)
@@ -607,7 +964,7 @@ async def get_realtime_portfolio(
         # Get market status (simplified)
         market_status = "OPEN"  # This could be enhanced with actual market hours check
         
-        return {
+        return FastJSONResponse(content={
             "success": True,
             "message": "Real-time data retrieved successfully",
             "data": {
@@ -622,7 +979,7 @@ async def get_realtime_portfolio(
                 },
                 "alerts": []  # Could include risk alerts, margin calls, etc.
             }
-        }
+        })
         
     except HTTPException:
         raise
@@ -1,16 +1,18 @@
 # File: /app/api/tokens.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 import redis
 import json
 import logging
 from datetime import timedelta
 
-from app.db.database import get_db
+from app.db.database import get_db, release_connection
 from app.models.models import Client as ClientModel, Token as TokenModel
 from app.schemas.schemas import Token, TokenResponse, TokenListResponse
 from app.core.mofsl_api_wrapper import mofsl_wrapper
+from app.core.responses import conditional_json_response, STATIC_CACHE
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -132,12 +134,12 @@ def filter_instruments(instruments: List[Dict[str, Any]], query: str) -> List[Di
     filtered.sort(key=sort_key)
     return filtered[:50]  # Return top 50 results
 
-async def get_master_client(db: Session) -> ClientModel:
+async def get_master_client(db: AsyncSession) -> ClientModel:
     """
     Get master/admin client for instrument search
     
     Args:
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         ClientModel: Master client with credentials
@@ -146,10 +148,10 @@ async def get_master_client(db: Session) -> ClientModel:
         HTTPException: If no master client found
     """
     # Look for an active client with credentials (you might want to add a specific flag for master clients)
-    master_client = db.query(ClientModel).filter(
+    master_client = await db.scalar(select(ClientModel).where(
         ClientModel.is_active == True,
         ClientModel.encrypted_mofsl_api_key_interactive.isnot(None)
-    ).first()
+    ).limit(1))
     
     if not master_client:
         raise HTTPException(
@@ -165,21 +167,23 @@ async def get_master_client(db: Session) -> ClientModel:
 
 @router.get("/search", response_model=TokenListResponse)
 async def search_tokens(
+    request: Request,
     q: str = Query(..., min_length=1, max_length=50, description="Search query for instruments"),
     exchange: str = Query("NSE", description="Exchange to search in (NSE, BSE, MCX, NCDEX)"),
     limit: int = Query(50, ge=1, le=100, description="Maximum number of results"),
     use_cache: bool = Query(True, description="Whether to use cached results"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Search for trading instruments/tokens
     
     Args:
+        request (Request): Incoming request (for If-None-Match)
         q (str): Search query (symbol, name, or token)
         exchange (str): Exchange to search in
         limit (int): Maximum number of results to return
         use_cache (bool): Whether to use cached results
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         TokenListResponse: List of matching instruments
@@ -213,6 +217,7 @@ async def search_tokens(
         else:
             # Get master client for API access
             master_client = await get_master_client(db)
+            await release_connection(db)
             
             # Authenticate and search instruments
             auth_token = await mofsl_wrapper.authenticate_client(master_client, segment="interactive")
@@ -232,14 +237,16 @@ async def search_tokens(
         
         logger.info(f"Returning {len(limited_results)} filtered results for query '{q}'")
         
-        return TokenListResponse(
-            success=True,
-            message=f"Found {len(limited_results)} instruments matching '{q}' on {exchange}",
-            data=limited_results,
-            total=len(filtered_instruments),
-            page=1,
-            per_page=limit
-        )
+        # Instruments are trusted broker/cache data - serialize directly
+        # instead of re-validating every row against the response model
+        return conditional_json_response(request, {
+            "success": True,
+            "message": f"Found {len(limited_results)} instruments matching '{q}' on {exchange}",
+            "data": limited_results,
+            "total": len(filtered_instruments),
+            "page": 1,
+            "per_page": limit
+        })
         
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -252,10 +259,15 @@ async def search_tokens(
         )
 
 @router.get("/exchanges", response_model=Dict[str, List[str]])
-async def get_supported_exchanges():
+async def get_supported_exchanges(request: Request):
     """
     Get list of supported exchanges
     
+    The list only changes with a deploy, so clients may cache it for a day.
+    
+    Args:
+        request (Request): Incoming request (for If-None-Match)
+    
     Returns:
         Dict[str, List[str]]: Supported exchanges and segments
     """
@@ -270,19 +282,19 @@ async def get_supported_exchanges():
         }
     }
     
-    return exchanges
+    return conditional_json_response(request, exchanges, cache_control=STATIC_CACHE)
 
 @router.post("/cache/refresh")
 async def refresh_instrument_cache(
     exchange: str = Query(..., description="Exchange to refresh cache for"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Refresh instrument cache for an exchange
     
     Args:
         exchange (str): Exchange to refresh
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         dict: Refresh status
@@ -305,6 +317,7 @@ async def refresh_instrument_cache(
         
         # Get master client
         master_client = await get_master_client(db)
+        await release_connection(db)
         
         # Fetch fresh data from MOFSL
         auth_token = await mofsl_wrapper.authenticate_client(master_client, segment="interactive")
@@ -381,25 +394,27 @@ async def get_cache_status():
 
 @router.get("/local", response_model=TokenListResponse)
 async def get_local_tokens(
+    request: Request,
     skip: int = Query(0, ge=0, description="Number of tokens to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of tokens to return"),
     exchange: Optional[str] = Query(None, description="Filter by exchange"),
     segment: Optional[str] = Query(None, description="Filter by segment"),
     is_active: bool = Query(True, description="Filter by active status"),
     search: Optional[str] = Query(None, description="Search by symbol or name"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get tokens from local database
     
     Args:
+        request (Request): Incoming request (for If-None-Match)
         skip (int): Number of records to skip
         limit (int): Number of records to return
         exchange (Optional[str]): Filter by exchange
         segment (Optional[str]): Filter by segment
         is_active (bool): Filter by active status
         search (Optional[str]): Search term
-        db (Session): Database session
+        db (AsyncSession): Database session
         
     Returns:
         TokenListResponse: List of tokens from database
@@ -408,48 +423,46 @@ async def get_local_tokens(
     
     try:
         # Build query
-        query = db.query(TokenModel)
+        query = select(TokenModel)
         
         # Apply filters
         if is_active:
-            query = query.filter(TokenModel.is_active == is_active)
+            query = query.where(TokenModel.is_active == is_active)
         
         if exchange:
-            query = query.filter(TokenModel.exchange == exchange.upper())
+            query = query.where(TokenModel.exchange == exchange.upper())
         
         if segment:
-            query = query.filter(TokenModel.segment == segment.upper())
+            query = query.where(TokenModel.segment == segment.upper())
         
         if search:
             search_filter = f"%{search}%"
-            query = query.filter(
+            query = query.where(
                 (TokenModel.symbol.ilike(search_filter)) |
                 (TokenModel.name.ilike(search_filter)) |
                 (TokenModel.token.ilike(search_filter))
             )
         
         # Get total count
-        total = query.count()
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
         
         # Apply pagination and get results
-        tokens = query.offset(skip).limit(limit).all()
+        tokens = (await db.scalars(query.offset(skip).limit(limit))).all()
         
         # Convert to response format
-        token_list = []
-        for token in tokens:
-            token_data = Token.model_validate(token)
-            token_list.append(token_data)
+        token_list = [Token.model_validate(token) for token in tokens]
         
         logger.info(f"Retrieved {len(token_list)} local tokens (total: {total})")
         
-        return TokenListResponse(
+        # Rows are already validated - skip response_model re-validation
+        return conditional_json_response(request, TokenListResponse.model_construct(
             success=True,
             message=f"Retrieved {len(token_list)} tokens from database",
             data=token_list,
             total=total,
             page=skip // limit + 1,
             per_page=limit
-        )
+        ))
         
     except Exception as e:
         logger.error(f"Error getting local tokens: {e}")
@@ -0,0 +1,102 @@
+# File: /app/core/allocation.py
+import heapq
+from typing import Any, List, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.models import Margin as MarginModel, Position as PositionModel
+
+# Rules accepted by load_allocation_weights
+ALLOCATION_RULES = ("equal", "margin", "portfolio_value", "risk_profile")
+
+def allocate_lots(weights: Sequence[Tuple[int, float]], total_quantity: int, lot_size: int = 1) -> List[Tuple[int, int]]:
+    """
+    Split a total quantity across clients in proportion to their weights
+
+    Works in whole lots using the largest remainder method: every client
+    gets the whole lots of its exact share, and the lots left over go to
+    the largest fractional remainders. The result never exceeds the total
+    and differs from the exact shares by less than one lot per client.
+
+    Args:
+        weights (Sequence[Tuple[int, float]]): (client ID, weight) pairs; clients with weight <= 0 get nothing
+        total_quantity (int): Quantity to allocate (rounded down to whole lots)
+        lot_size (int): Lot size
+
+    Returns:
+        List[Tuple[int, int]]: (client ID, quantity) for clients allocated at least one lot, in input order
+    """
+    total_lots = total_quantity // lot_size
+    positive = [(client_id, weight) for client_id, weight in weights if weight > 0]
+    weight_sum = sum(weight for _, weight in positive)
+    if not positive or total_lots <= 0:
+        return []
+
+    shares = [total_lots * weight / weight_sum for _, weight in positive]
+    lots = [int(share) for share in shares]
+    leftover = total_lots - sum(lots)
+    for index in heapq.nlargest(leftover, range(len(shares)), key=lambda i: shares[i] - lots[i]):
+        lots[index] += 1
+
+    return [
+        (client_id, client_lots * lot_size)
+        for (client_id, _), client_lots in zip(positive, lots)
+        if client_lots
+    ]
+
+async def load_allocation_weights(
+    rule: str,
+    clients: Sequence[Any],
+    db: AsyncSession,
+    margin_segment: str = "EQ"
+) -> List[Tuple[int, float]]:
+    """
+    Allocation weight of each client under a rule
+
+    - equal: 1 per client
+    - margin: latest available margin for the segment (margins table)
+    - portfolio_value: total market value of the client's positions
+    - risk_profile: ORDER_ALLOCATION_RISK_WEIGHTS for the client's risk profile
+
+    Args:
+        rule (str): Allocation rule
+        clients (Sequence[Any]): Client models
+        db (AsyncSession): Database session
+        margin_segment (str): Margin segment (EQ, FO, CD) for the margin rule
+
+    Returns:
+        List[Tuple[int, float]]: (client ID, weight) in client order
+
+    Raises:
+        ValueError: If the rule is unknown
+    """
+    client_ids = [client.id for client in clients]
+
+    if rule == "equal":
+        values = {client_id: 1.0 for client_id in client_ids}
+    elif rule == "risk_profile":
+        values = {
+            client.id: settings.ORDER_ALLOCATION_RISK_WEIGHTS.get(client.risk_profile or "moderate", 0.0)
+            for client in clients
+        }
+    elif rule == "margin":
+        rows = (await db.execute(
+            select(MarginModel.client_id, MarginModel.available_margin)
+            .where(MarginModel.client_id.in_(client_ids), MarginModel.segment == margin_segment)
+            .order_by(MarginModel.margin_date)
+        )).all()
+        # Later rows overwrite earlier ones - the latest margin wins
+        values = {client_id: float(available or 0) for client_id, available in rows}
+    elif rule == "portfolio_value":
+        rows = (await db.execute(
+            select(PositionModel.client_id, func.sum(PositionModel.market_value))
+            .where(PositionModel.client_id.in_(client_ids))
+            .group_by(PositionModel.client_id)
+        )).all()
+        values = {client_id: float(total or 0) for client_id, total in rows}
+    else:
+        raise ValueError(f"Unknown allocation rule: {rule}")
+
+    return [(client_id, values.get(client_id, 0.0)) for client_id in client_ids]
@@ -0,0 +1,226 @@
+# File: /app/core/batch_jobs.py
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class BatchProgress:
+    """
+    Live progress of a queued or running batch job
+
+    Results are kept in publication order so every subscriber - however late
+    it connects - receives the full sequence followed by the completion record.
+    """
+
+    def __init__(self, batch_id: str, total: int):
+        self.batch_id = batch_id
+        self.total = total
+        self.status = "QUEUED"
+        self.results: List[Dict[str, Any]] = []
+        self.successful = 0
+        self.summary: Optional[Dict[str, Any]] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.summary is not None
+
+    def publish(self, result: Dict[str, Any]) -> None:
+        """
+        Record one finished item and wake subscribers
+
+        Args:
+            result (Dict[str, Any]): Item result (must include a "success" flag)
+        """
+        self.results.append(result)
+        if result.get("success"):
+            self.successful += 1
+        self._notify()
+
+    def finish(self, status: str, summary: Dict[str, Any]) -> None:
+        """
+        Mark the job finished and wake subscribers
+
+        Args:
+            status (str): Final job status (COMPLETED or FAILED)
+            summary (Dict[str, Any]): Completion record sent to subscribers
+        """
+        self.status = status
+        self.summary = summary
+        self._notify()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current status and counters"""
+        processed = len(self.results)
+        return {
+            "status": self.status,
+            "total_orders": self.total,
+            "processed_orders": processed,
+            "successful_orders": self.successful,
+            "failed_orders": processed - self.successful
+        }
+
+    async def events(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream ("result", item) records followed by one ("complete", summary) record
+
+        Yields:
+            Tuple[str, Dict[str, Any]]: Record type and payload
+        """
+        sent = 0
+        while True:
+            # Take the event before reading state so no publish is missed
+            changed = self._changed
+            while sent < len(self.results):
+                yield "result", self.results[sent]
+                sent += 1
+            if self.done:
+                yield "complete", self.summary
+                return
+            await changed.wait()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+# A job receives its progress tracker and returns the completion summary
+BatchJob = Callable[[BatchProgress], Awaitable[Dict[str, Any]]]
+
+# Called for jobs that were still queued when the runner stopped
+AbandonCallback = Callable[[], Awaitable[None]]
+
+# Called periodically with the IDs of the jobs this runner holds
+HeartbeatCallback = Callable[[List[str]], Awaitable[None]]
+
+class BatchJobRunner:
+    """
+    Background workers that execute submitted batch jobs in FIFO order
+
+    Jobs are held in memory; the job function is responsible for persisting
+    its own status and results. If on_heartbeat is set it is called every
+    heartbeat_interval seconds with the queued and running job IDs, so other
+    processes can tell a live job from one whose process died.
+    """
+
+    def __init__(self, workers: int = 2, max_queued: int = 100, heartbeat_interval: float = 10.0):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.heartbeat_interval = heartbeat_interval
+        self.on_heartbeat: Optional[HeartbeatCallback] = None
+        self._active: Dict[str, BatchProgress] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the worker tasks (no-op if already running)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queues belong to the event loop they are used on
+            self._loop = loop
+            self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queued)
+            self._tasks = []
+            self._heartbeat_task = None
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self) -> None:
+        """Cancel the workers; running jobs are interrupted and queued jobs abandoned"""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while self._loop and not self._queue.empty():
+            progress, _, on_abandoned = self._queue.get_nowait()
+            progress.finish("FAILED", {"batch_id": progress.batch_id, "status": "FAILED", "error_message": "Abandoned"})
+            self._active.pop(progress.batch_id, None)
+            if on_abandoned is not None:
+                try:
+                    await on_abandoned()
+                except Exception as e:
+                    logger.error(f"Abandon callback failed for batch job {progress.batch_id}: {e}")
+
+    def submit(
+        self,
+        batch_id: str,
+        total: int,
+        job: BatchJob,
+        on_abandoned: Optional[AbandonCallback] = None
+    ) -> BatchProgress:
+        """
+        Queue a job for background execution
+
+        Args:
+            batch_id (str): Batch ID
+            total (int): Number of items the job will publish
+            job (BatchJob): Job function
+            on_abandoned (Optional[AbandonCallback]): Called if the runner stops before the job starts
+
+        Returns:
+            BatchProgress: Progress tracker for the job
+
+        Raises:
+            asyncio.QueueFull: If max_queued jobs are already waiting
+        """
+        self.start()
+        progress = BatchProgress(batch_id, total)
+        self._queue.put_nowait((progress, job, on_abandoned))
+        self._active[batch_id] = progress
+        return progress
+
+    def get(self, batch_id: str) -> Optional[BatchProgress]:
+        """Progress of a queued or running job, or None if it is not in memory"""
+        return self._active.get(batch_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue and worker counters for health reporting"""
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._loop else 0,
+            "active": len(self._active)
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            progress, job, _ = await self._queue.get()
+            progress.status = "RUNNING"
+            try:
+                summary = await job(progress)
+                progress.finish("COMPLETED", summary)
+            except asyncio.CancelledError:
+                progress.finish("FAILED", {"batch_id": progress.batch_id, "status": "FAILED", "error_message": "Interrupted"})
+                raise
+            except Exception as e:
+                logger.error(f"Batch job {progress.batch_id} failed: {e}")
+                progress.finish("FAILED", {"batch_id": progress.batch_id, "status": "FAILED", "error_message": str(e)})
+            finally:
+                self._active.pop(progress.batch_id, None)
+                self._queue.task_done()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if self.on_heartbeat is None or not self._active:
+                continue
+            try:
+                await self.on_heartbeat(list(self._active))
+            except Exception as e:
+                logger.error(f"Batch job heartbeat failed: {e}")
+
+# Global batch job runner instance
+batch_job_runner = BatchJobRunner(
+    workers=settings.ORDER_BATCH_WORKERS,
+    max_queued=settings.ORDER_BATCH_MAX_QUEUED,
+    heartbeat_interval=settings.ORDER_BATCH_HEARTBEAT_SECONDS
+)
@@ -0,0 +1,153 @@
+# File: /app/core/compression.py
+import gzip
+import logging
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Brotli is optional - only gzip is offered when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+    logger.info("brotli not installed. Response compression limited to gzip.")
+
+COMPRESSIBLE_MEDIA_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/"
+)
+
+# Event streams must flush frame by frame, so they are never buffered
+UNCOMPRESSED_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+def select_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the content coding to use from an Accept-Encoding header
+
+    Args:
+        accept_encoding (str): Accept-Encoding request header value
+
+    Returns:
+        Optional[str]: "br", "gzip" or None if neither is acceptable
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag for the compressed representation (W/"abc" -> W/"abc-gzip")"""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that gzip/brotli compresses complete responses
+
+    Only single-chunk responses above the size threshold are compressed.
+    Streaming responses pass through untouched so NDJSON/SSE records are
+    delivered as soon as they are produced. ETags are suffixed with
+    the content coding so each representation keeps a distinct validator.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = select_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = request_headers.get("if-none-match", "")
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=start_message)
+            body = message.get("body", b"")
+
+            if start_message["status"] == 304:
+                # Echo the coded ETag the client revalidated with
+                etag = headers.get("etag")
+                if etag and encoded_etag(etag, encoding) in if_none_match:
+                    headers["ETag"] = encoded_etag(etag, encoding)
+                headers.add_vary_header("Accept-Encoding")
+                passthrough = True
+            elif message.get("more_body", False) or not self._should_compress(headers, body):
+                if self._is_compressible(headers):
+                    headers.add_vary_header("Accept-Encoding")
+                passthrough = True
+            else:
+                body = self._compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                message = {**message, "body": body}
+                passthrough = True
+
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _is_compressible(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "")
+        if "content-encoding" in headers or content_type.startswith(UNCOMPRESSED_MEDIA_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_MEDIA_TYPES)
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes) -> bool:
+        return len(body) >= self.minimum_size and self._is_compressible(headers)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
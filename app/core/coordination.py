@@ -0,0 +1,128 @@
+# File: /app/core/coordination.py
+import asyncio
+import logging
+import math
+import uuid
+from typing import Optional
+
+import redis.asyncio as redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class SharedState:
+    """
+    Redis-backed state shared by every worker process
+
+    Holds the entry halt set by the kill switch, so an engagement handled
+    by one worker stops entries in all of them and survives restarts, and
+    leases that elect a single worker for background jobs. A lease is held
+    by this process until it stops renewing it for ttl_seconds; a one-off
+    claim is never renewed and goes to whichever worker asks first.
+    """
+
+    def __init__(self, redis_url: str, key_prefix: str = "trading:"):
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        self.owner = uuid.uuid4().hex
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis: Optional[redis.Redis] = None
+
+    async def get_halt(self) -> Optional[str]:
+        """
+        Current entry halt reason
+
+        Returns:
+            Optional[str]: Halt reason, or None if entries are accepted
+
+        Raises:
+            redis.RedisError: If Redis is unreachable
+        """
+        return await self._client().get(self.key_prefix + "entries:halted")
+
+    async def set_halt(self, reason: str) -> None:
+        """
+        Halt entries in every worker until clear_halt is called
+
+        Args:
+            reason (str): Reason reported to rejected callers
+
+        Raises:
+            redis.RedisError: If Redis is unreachable
+        """
+        await self._client().set(self.key_prefix + "entries:halted", reason)
+
+    async def clear_halt(self) -> None:
+        """
+        Accept entries again in every worker
+
+        Raises:
+            redis.RedisError: If Redis is unreachable
+        """
+        await self._client().delete(self.key_prefix + "entries:halted")
+
+    async def acquire_lease(self, name: str, ttl_seconds: float) -> bool:
+        """
+        Take or renew a named lease
+
+        Args:
+            name (str): Lease name
+            ttl_seconds (float): Lease lifetime unless renewed
+
+        Returns:
+            bool: True if this process holds the lease
+
+        Raises:
+            redis.RedisError: If Redis is unreachable
+        """
+        key = self.key_prefix + "lease:" + name
+        ttl = max(1, math.ceil(ttl_seconds))
+        if await self._client().set(key, self.owner, nx=True, ex=ttl):
+            return True
+        if await self._client().get(key) == self.owner:
+            await self._client().set(key, self.owner, ex=ttl)
+            return True
+        return False
+
+    async def claim_once(self, name: str, ttl_seconds: float) -> bool:
+        """
+        Claim a one-off job so only one worker runs it
+
+        Args:
+            name (str): Job name (unique per run)
+            ttl_seconds (float): How long the claim is remembered
+
+        Returns:
+            bool: True if this process claimed the job first
+
+        Raises:
+            redis.RedisError: If Redis is unreachable
+        """
+        key = self.key_prefix + "once:" + name
+        return bool(await self._client().set(key, self.owner, nx=True, ex=max(1, math.ceil(ttl_seconds))))
+
+    async def release_lease(self, name: str) -> None:
+        """
+        Give up a lease this process holds
+
+        Args:
+            name (str): Lease name
+        """
+        key = self.key_prefix + "lease:" + name
+        try:
+            if await self._client().get(key) == self.owner:
+                await self._client().delete(key)
+        except redis.RedisError as e:
+            logger.error(f"Failed to release lease {name}: {e}")
+
+    def _client(self) -> redis.Redis:
+        # Connection pools belong to the event loop they are used on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+# Global shared state instance
+shared_state = SharedState(redis_url=settings.REDIS_URL)
@@ -0,0 +1,377 @@
+# File: /app/core/dispatch.py
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from app.config import settings
+from app.core.coordination import SharedState, shared_state
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class DispatchPriority(IntEnum):
+    """Broker operation classes - lower values are dispatched first"""
+    KILL_SWITCH = 0
+    CANCEL = 1
+    EXIT = 2
+    ENTRY = 3
+
+class TradingHaltedError(RuntimeError):
+    """Raised for entry orders while new entries are halted"""
+
+class DispatchMetrics:
+    """Queue depth, wait-time and run-time statistics for one priority class"""
+
+    def __init__(self, window: int = 1000):
+        self._recent_waits = deque(maxlen=window)
+        self.queued = 0
+        self.submitted = 0
+        self.started = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def record_submit(self) -> None:
+        """Record an operation entering the queue"""
+        self.submitted += 1
+        self.queued += 1
+
+    def record_cancel(self) -> None:
+        """Record a queued operation whose caller went away"""
+        self.queued -= 1
+        self.cancelled += 1
+
+    def record_start(self, wait_seconds: float) -> None:
+        """Record an operation leaving the queue after wait_seconds"""
+        self.queued -= 1
+        self.started += 1
+        self.total_wait += wait_seconds
+        self.max_wait = max(self.max_wait, wait_seconds)
+        self._recent_waits.append(wait_seconds)
+
+    def record_finish(self, run_seconds: float, failed: bool) -> None:
+        """Record a finished operation"""
+        self.total_run += run_seconds
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current statistics
+
+        Returns:
+            Dict[str, Any]: Counters and average/p95/max queue wait in ms
+        """
+        finished = self.completed + self.failed
+        waits = sorted(self._recent_waits)
+        p95 = waits[max(int(len(waits) * 0.95) - 1, 0)] if waits else 0.0
+        return {
+            "queued": self.queued,
+            "running": self.started - finished,
+            "submitted": self.submitted,
+            "cancelled": self.cancelled,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait / self.started * 1000, 3) if self.started else 0.0,
+            "p95_wait_ms": round(p95 * 1000, 3),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "avg_run_ms": round(self.total_run / finished * 1000, 3) if finished else 0.0
+        }
+
+class _DispatchItem:
+    __slots__ = ("operation", "priority", "client_key", "exchange", "future", "enqueued_at", "task", "cancelled")
+
+    def __init__(self, operation, priority, client_key, exchange, future):
+        self.operation = operation
+        self.priority = priority
+        self.client_key = client_key
+        self.exchange = exchange
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+
+class OrderDispatcher:
+    """
+    Central scheduler for broker order traffic
+
+    Operations are queued per priority class and per client. Whenever
+    capacity frees up the highest priority class is served first, and its
+    clients are served round-robin so one large batch cannot starve other
+    clients. Each exchange has its own concurrency pool. Entries may never
+    occupy the share of the global and exchange pools reserved for cancels
+    and exits, so urgent operations start as soon as they arrive even
+    during an entry spike.
+
+    The entry halt is kept in shared_state when one is given, so a kill
+    switch engaged through any worker stops entries in every worker; each
+    entry re-reads it just before it is sent.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 20,
+        reserved_priority_slots: int = 4,
+        exchange_limits: Optional[Dict[str, int]] = None,
+        default_exchange_limit: int = 5,
+        shared_state: Optional[SharedState] = None
+    ):
+        self.max_concurrent = max_concurrent
+        self.reserved_priority_slots = min(reserved_priority_slots, max_concurrent - 1)
+        self.exchange_limits = exchange_limits or {}
+        self.default_exchange_limit = default_exchange_limit
+        self._queues: Dict[DispatchPriority, Dict[Any, Deque[_DispatchItem]]] = {p: {} for p in DispatchPriority}
+        self._rotation: Dict[DispatchPriority, Deque[Any]] = {p: deque() for p in DispatchPriority}
+        self._metrics: Dict[DispatchPriority, DispatchMetrics] = {p: DispatchMetrics() for p in DispatchPriority}
+        self._in_flight = 0
+        self._exchange_in_flight: Dict[str, int] = {}
+        self.shared_state = shared_state
+        self.halt_reason: Optional[str] = None
+        self._halt_unshared = False
+
+    async def submit(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        priority: DispatchPriority,
+        client_key: Any,
+        exchange: Optional[str] = None
+    ) -> T:
+        """
+        Queue a broker operation and wait for its result
+
+        Args:
+            operation (Callable[[], Awaitable[T]]): Zero-argument coroutine function
+            priority (DispatchPriority): Operation class
+            client_key (Any): Client the operation is for (fair-share key)
+            exchange (Optional[str]): Exchange pool to run in (None - only the global limit applies)
+
+        Returns:
+            T: Result of the operation
+
+        Raises:
+            TradingHaltedError: If entries are halted and this is an entry
+            Exception: Whatever the operation raises
+        """
+        # A halt seen here may since have been released by another worker
+        if priority == DispatchPriority.ENTRY and self.halt_reason is not None and await self.refresh_halt() is not None:
+            raise TradingHaltedError(f"New entries are halted: {self.halt_reason}")
+
+        item = _DispatchItem(operation, priority, client_key, exchange, asyncio.get_running_loop().create_future())
+
+        client_queues = self._queues[priority]
+        if client_key not in client_queues:
+            client_queues[client_key] = deque()
+            self._rotation[priority].append(client_key)
+        client_queues[client_key].append(item)
+
+        self._metrics[priority].record_submit()
+        self._pump()
+
+        try:
+            return await item.future
+        except asyncio.CancelledError:
+            # Caller went away - drop the queued item or stop the running call
+            if item.task is None:
+                item.cancelled = True
+                self._metrics[priority].record_cancel()
+            elif not item.task.done():
+                item.task.cancel()
+            raise
+
+    async def halt_entries(self, reason: str) -> int:
+        """
+        Reject new entry orders in every worker and fail the ones queued here
+
+        Entries already sent to the broker are not affected. If the shared
+        halt cannot be written this worker still halts.
+
+        Args:
+            reason (str): Reason reported to rejected callers
+
+        Returns:
+            int: Number of queued entries that were failed
+        """
+        self._halt_unshared = False
+        if self.shared_state is not None:
+            try:
+                await self.shared_state.set_halt(reason)
+            except Exception as e:
+                logger.error(f"Entry halt not shared with other workers: {e}")
+                self._halt_unshared = True
+        return self._halt_locally(reason)
+
+    async def resume_entries(self) -> None:
+        """Accept entry orders again in every worker"""
+        if self.shared_state is not None:
+            try:
+                await self.shared_state.clear_halt()
+            except Exception as e:
+                logger.error(f"Entry halt not cleared for other workers: {e}")
+        if self.halt_reason is not None:
+            logger.warning(f"Order entries resumed (halted for: {self.halt_reason})")
+        self.halt_reason = None
+        self._halt_unshared = False
+
+    async def refresh_halt(self) -> Optional[str]:
+        """
+        Pick up a halt set or cleared by another worker
+
+        Called on startup, before every entry is sent and for status reads.
+        If the shared halt cannot be read this worker's own halt applies.
+
+        Returns:
+            Optional[str]: Current halt reason, or None if entries are accepted
+        """
+        if self.shared_state is None:
+            return self.halt_reason
+        try:
+            reason = await self.shared_state.get_halt()
+        except Exception as e:
+            logger.error(f"Shared entry halt unavailable - using this worker's: {e}")
+            return self.halt_reason
+
+        if reason is not None and self.halt_reason is None:
+            self._halt_locally(reason)
+        elif reason is None and self.halt_reason is not None and not self._halt_unshared:
+            logger.warning(f"Order entries resumed by another worker (halted for: {self.halt_reason})")
+            self.halt_reason = None
+        return self.halt_reason
+
+    def _halt_locally(self, reason: str) -> int:
+        self.halt_reason = reason
+        error = TradingHaltedError(f"New entries are halted: {reason}")
+        failed = 0
+
+        client_queues = self._queues[DispatchPriority.ENTRY]
+        for queue in client_queues.values():
+            for item in queue:
+                if not item.cancelled and not item.future.done():
+                    item.cancelled = True
+                    item.future.set_exception(error)
+                    self._metrics[DispatchPriority.ENTRY].record_cancel()
+                    failed += 1
+        client_queues.clear()
+        self._rotation[DispatchPriority.ENTRY].clear()
+
+        logger.warning(f"Order entries halted ({reason}); {failed} queued entries failed")
+        return failed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth, latency and concurrency metrics
+
+        Returns:
+            Dict[str, Any]: Global and per-exchange in-flight counts and per-priority statistics
+        """
+        exchanges = set(self.exchange_limits) | set(self._exchange_in_flight)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "reserved_priority_slots": self.reserved_priority_slots,
+            "in_flight": self._in_flight,
+            "entries_halted": self.halt_reason is not None,
+            "halt_reason": self.halt_reason,
+            "exchanges": {
+                exchange: {
+                    "in_flight": self._exchange_in_flight.get(exchange, 0),
+                    "limit": self._exchange_limit(exchange)
+                }
+                for exchange in sorted(exchanges)
+            },
+            "priorities": {priority.name.lower(): self._metrics[priority].snapshot() for priority in DispatchPriority}
+        }
+
+    def _exchange_limit(self, exchange: str) -> int:
+        return self.exchange_limits.get(exchange, self.default_exchange_limit)
+
+    def _limit_for(self, limit: int, priority: DispatchPriority) -> int:
+        # Entries get the pool minus its share of the reserved slots
+        if priority != DispatchPriority.ENTRY:
+            return limit
+        return max(1, limit - math.ceil(limit * self.reserved_priority_slots / self.max_concurrent))
+
+    def _has_exchange_capacity(self, exchange: Optional[str], priority: DispatchPriority) -> bool:
+        if exchange is None:
+            return True
+        return self._exchange_in_flight.get(exchange, 0) < self._limit_for(self._exchange_limit(exchange), priority)
+
+    def _pump(self) -> None:
+        for priority in DispatchPriority:
+            limit = self._limit_for(self.max_concurrent, priority)
+
+            client_queues = self._queues[priority]
+            rotation = self._rotation[priority]
+            blocked = 0
+            # Round-robin over clients; skip (but keep) clients whose next
+            # operation targets an exchange that is at its limit
+            while rotation and blocked < len(rotation) and self._in_flight < limit:
+                client_key = rotation.popleft()
+                queue = client_queues[client_key]
+                while queue and queue[0].cancelled:
+                    queue.popleft()
+                if not queue:
+                    del client_queues[client_key]
+                    continue
+
+                if not self._has_exchange_capacity(queue[0].exchange, priority):
+                    rotation.append(client_key)
+                    blocked += 1
+                    continue
+
+                item = queue.popleft()
+                if queue:
+                    rotation.append(client_key)
+                else:
+                    del client_queues[client_key]
+                blocked = 0
+                self._start(item)
+
+    def _start(self, item: _DispatchItem) -> None:
+        self._in_flight += 1
+        if item.exchange is not None:
+            self._exchange_in_flight[item.exchange] = self._exchange_in_flight.get(item.exchange, 0) + 1
+        self._metrics[item.priority].record_start(time.perf_counter() - item.enqueued_at)
+        item.task = asyncio.create_task(self._run(item))
+
+    async def _run(self, item: _DispatchItem) -> None:
+        started = time.perf_counter()
+        failed = True
+        try:
+            # Another worker may have halted entries since this one was queued
+            if item.priority == DispatchPriority.ENTRY and await self.refresh_halt() is not None:
+                raise TradingHaltedError(f"New entries are halted: {self.halt_reason}")
+            result = await item.operation()
+            failed = False
+            if not item.future.done():
+                item.future.set_result(result)
+        except asyncio.CancelledError:
+            if not item.future.done():
+                item.future.cancel()
+            raise
+        except Exception as e:
+            if not item.future.done():
+                item.future.set_exception(e)
+        finally:
+            self._in_flight -= 1
+            if item.exchange is not None:
+                self._exchange_in_flight[item.exchange] -= 1
+            self._metrics[item.priority].record_finish(time.perf_counter() - started, failed)
+            self._pump()
+
+# Global dispatcher for all order traffic
+order_dispatcher = OrderDispatcher(
+    max_concurrent=settings.DISPATCH_MAX_CONCURRENT,
+    reserved_priority_slots=settings.DISPATCH_RESERVED_PRIORITY_SLOTS,
+    exchange_limits=settings.DISPATCH_EXCHANGE_LIMITS,
+    default_exchange_limit=settings.DISPATCH_DEFAULT_EXCHANGE_LIMIT,
+    shared_state=shared_state
+)
@@ -0,0 +1,536 @@
+# File: /app/core/execution_algos.py
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.config import settings
+from app.core.allocation import allocate_lots
+
+logger = logging.getLogger(__name__)
+
+# Trading session the VWAP volume curve starts at (IST)
+IST = timezone(timedelta(hours=5, minutes=30))
+SESSION_OPEN_MINUTES = 9 * 60 + 15
+
+# =============================================================================
+# CLOCKS
+# =============================================================================
+
+class MonotonicClock:
+    """Wall time for live execution"""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+class SimulatedClock:
+    """
+    Manually advanced clock for tests and replays
+
+    Sleepers wake only when advance() moves the clock past their deadline,
+    so a whole execution window runs in milliseconds.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._sleepers: List[Any] = []
+        self._sequence = itertools.count()
+
+    def now(self) -> float:
+        return self._now
+
+    async def sleep(self, seconds: float) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self._now + max(seconds, 0.0), next(self._sequence), future))
+        await future
+
+    async def advance(self, seconds: float) -> None:
+        """
+        Move the clock forward, waking sleepers in deadline order
+
+        Args:
+            seconds (float): Time to advance
+        """
+        target = self._now + seconds
+        while self._sleepers and self._sleepers[0][0] <= target:
+            deadline, _, future = heapq.heappop(self._sleepers)
+            self._now = max(self._now, deadline)
+            if not future.done():
+                future.set_result(None)
+            # Let the woken task (and whatever it starts) run at this time
+            for _ in range(3):
+                await asyncio.sleep(0)
+        self._now = target
+        await asyncio.sleep(0)
+
+# =============================================================================
+# TIMER WHEEL
+# =============================================================================
+
+class Timer:
+    """Handle of a scheduled timer wheel callback"""
+    __slots__ = ("deadline_tick", "callback", "cancelled")
+
+    def __init__(self, deadline_tick: int, callback: Callable[[], None]):
+        self.deadline_tick = deadline_tick
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+class TimerWheel:
+    """
+    Hashed timing wheel
+
+    Timers land in the slot of their deadline tick modulo the wheel size, so
+    scheduling and cancelling are O(1) and each tick only looks at one slot.
+    Timers more than one revolution away stay in their slot until their tick
+    comes round.
+    """
+
+    def __init__(self, tick_seconds: float, slots: int, now: float = 0.0):
+        self.tick_seconds = tick_seconds
+        self._slots: List[List[Timer]] = [[] for _ in range(slots)]
+        self._tick = int(now // tick_seconds)
+        self._pending = 0
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> Timer:
+        """
+        Run a callback after a delay (rounded up to whole ticks, at least one)
+
+        Args:
+            delay (float): Delay in seconds
+            callback (Callable[[], None]): Called from advance()
+
+        Returns:
+            Timer: Handle for cancellation
+        """
+        timer = Timer(self._tick + max(1, math.ceil(delay / self.tick_seconds)), callback)
+        self._slots[timer.deadline_tick % len(self._slots)].append(timer)
+        self._pending += 1
+        return timer
+
+    def advance(self, now: float) -> int:
+        """
+        Fire every timer due by a clock time
+
+        Args:
+            now (float): Current clock time
+
+        Returns:
+            int: Number of callbacks fired
+        """
+        target = int(now // self.tick_seconds)
+        fired = 0
+        while self._tick < target:
+            if not self._pending:
+                # Nothing scheduled - skip the idle ticks
+                self._tick = target
+                break
+            self._tick += 1
+            slot = self._slots[self._tick % len(self._slots)]
+            if not slot:
+                continue
+            due = [timer for timer in slot if timer.deadline_tick <= self._tick]
+            if not due:
+                continue
+            slot[:] = [timer for timer in slot if timer.deadline_tick > self._tick]
+            self._pending -= len(due)
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                fired += 1
+                try:
+                    timer.callback()
+                except Exception as e:
+                    logger.error(f"Timer callback failed: {e}")
+        return fired
+
+# =============================================================================
+# SLICE PLANNING
+# =============================================================================
+
+class AlgoSlice:
+    """One scheduled child batch of an execution algo"""
+
+    def __init__(self, index: int, offset_seconds: float, quantities: Dict[int, int]):
+        self.index = index
+        self.offset_seconds = offset_seconds
+        self.quantities = quantities
+        self.results: Optional[List[Dict[str, Any]]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "offset_seconds": round(self.offset_seconds, 3),
+            "quantity": sum(self.quantities.values()),
+            "clients": len(self.quantities),
+            "executed": self.results is not None,
+            "successful_orders": sum(1 for r in self.results if r.get("success")) if self.results is not None else None
+        }
+
+def session_volume_weights(start: datetime, offsets: Sequence[float], duration_seconds: float) -> List[float]:
+    """
+    Expected relative volume of each slice from the intraday volume curve
+
+    Each slice is weighted by the ORDER_ALGO_VWAP_PROFILE bucket its
+    midpoint falls in (buckets of ORDER_ALGO_VWAP_BUCKET_MINUTES from the
+    09:15 IST open; times outside the session use the nearest bucket).
+
+    Args:
+        start (datetime): Wall time of the first slice
+        offsets (Sequence[float]): Slice start offsets in seconds
+        duration_seconds (float): Execution window
+
+    Returns:
+        List[float]: Weight per slice
+    """
+    profile = settings.ORDER_ALGO_VWAP_PROFILE
+    step = duration_seconds / len(offsets)
+    weights = []
+    for offset in offsets:
+        midpoint = (start + timedelta(seconds=offset + step / 2)).astimezone(IST)
+        minutes = midpoint.hour * 60 + midpoint.minute - SESSION_OPEN_MINUTES
+        bucket = min(max(int(minutes // settings.ORDER_ALGO_VWAP_BUCKET_MINUTES), 0), len(profile) - 1)
+        weights.append(float(profile[bucket]))
+    return weights
+
+def resample_profile(profile: Sequence[float], slices: int) -> List[float]:
+    """
+    Stretch or shrink a volume profile to a number of slices
+
+    Args:
+        profile (Sequence[float]): Relative volumes over the window
+        slices (int): Number of slices
+
+    Returns:
+        List[float]: Weight per slice (each slice takes the profile point its midpoint falls on)
+    """
+    return [float(profile[min(int((index + 0.5) * len(profile) / slices), len(profile) - 1)]) for index in range(slices)]
+
+def plan_slices(
+    algo: str,
+    quantities: Dict[int, int],
+    duration_seconds: float,
+    slices: int,
+    lot_size: int = 1,
+    volume_profile: Optional[Sequence[float]] = None,
+    start: Optional[datetime] = None
+) -> List[AlgoSlice]:
+    """
+    Split client quantities into evenly spaced slices over a window
+
+    TWAP gives every slice the same share. VWAP sizes slices by expected
+    volume: the given profile, or the intraday curve at the slices' times.
+    Each client's quantity is split across the slices in whole lots;
+    slices left without any quantity are dropped.
+
+    Args:
+        algo (str): TWAP or VWAP
+        quantities (Dict[int, int]): Quantity per client ID
+        duration_seconds (float): Execution window
+        slices (int): Number of slices
+        lot_size (int): Lot size
+        volume_profile (Optional[Sequence[float]]): Relative volumes over the window (VWAP only)
+        start (Optional[datetime]): Wall time of the first slice (default - now)
+
+    Returns:
+        List[AlgoSlice]: Slices in execution order
+    """
+    offsets = [index * duration_seconds / slices for index in range(slices)]
+    if algo == "VWAP":
+        if volume_profile:
+            weights = resample_profile(volume_profile, slices)
+        else:
+            weights = session_volume_weights(start or datetime.now(timezone.utc), offsets, duration_seconds)
+    else:
+        weights = [1.0] * slices
+
+    slice_quantities: List[Dict[int, int]] = [{} for _ in range(slices)]
+    for client_id, quantity in quantities.items():
+        for index, slice_quantity in allocate_lots(list(enumerate(weights)), quantity, lot_size):
+            slice_quantities[index][client_id] = slice_quantity
+
+    return [
+        AlgoSlice(index, offsets[index], slice_quantities[index])
+        for index in range(slices)
+        if slice_quantities[index]
+    ]
+
+# =============================================================================
+# SCHEDULER
+# =============================================================================
+
+# Executes one slice and returns its per-order results (each with a "success" flag)
+SliceExecutor = Callable[[AlgoSlice], Awaitable[List[Dict[str, Any]]]]
+
+class AlgoExecution:
+    """State of one scheduled TWAP/VWAP execution"""
+
+    def __init__(self, algo: str, slices: List[AlgoSlice], execute: SliceExecutor, details: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.algo = algo
+        self.slices = slices
+        self.execute = execute
+        self.details = details or {}
+        self.status = "SCHEDULED"
+        self.next_slice = 0
+        self.started_at: Optional[float] = None
+        self.paused_at: Optional[float] = None
+        self.paused_seconds = 0.0
+        self.created_at = datetime.now(timezone.utc)
+        self.error_message: Optional[str] = None
+        self._timer: Optional[Timer] = None
+        self._running = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("COMPLETED", "CANCELLED", "FAILED")
+
+    def snapshot(self, include_slices: bool = False) -> Dict[str, Any]:
+        """API representation"""
+        executed = [s for s in self.slices if s.results is not None]
+        results = [r for s in executed for r in s.results]
+        data = {
+            "algo_id": self.id,
+            "algo": self.algo,
+            "status": self.status,
+            "total_slices": len(self.slices),
+            "executed_slices": len(executed),
+            "total_quantity": sum(sum(s.quantities.values()) for s in self.slices),
+            "executed_quantity": sum(r.get("quantity", 0) for r in results if r.get("success")),
+            "successful_orders": sum(1 for r in results if r.get("success")),
+            "failed_orders": sum(1 for r in results if not r.get("success")),
+            "paused_seconds": round(self.paused_seconds, 3),
+            "created_at": self.created_at.isoformat(),
+            "error_message": self.error_message,
+            **self.details
+        }
+        if include_slices:
+            data["slices"] = [s.to_dict() for s in self.slices]
+        return data
+
+class ExecutionScheduler:
+    """
+    Runs TWAP/VWAP executions on a shared timer wheel
+
+    One background task ticks the wheel; each due slice is executed as its
+    own task, and the next slice of an execution is scheduled once the
+    previous one has finished. Pausing shifts the rest of the schedule by
+    the time spent paused. Finished executions are kept (up to max_finished)
+    for status lookups.
+    """
+
+    def __init__(
+        self,
+        tick_seconds: float = 0.5,
+        slots: int = 512,
+        clock: Optional[Any] = None,
+        max_finished: int = 100
+    ):
+        self.tick_seconds = tick_seconds
+        self.slots = slots
+        self.clock = clock or MonotonicClock()
+        self.max_finished = max_finished
+        self.wheel = TimerWheel(tick_seconds, slots, self.clock.now())
+        self._executions: Dict[str, AlgoExecution] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slice_tasks: set = set()
+
+    def start(self) -> None:
+        """Start ticking the wheel (no-op if already running)"""
+        self._bind_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the wheel and interrupt running slices; unfinished executions are marked FAILED"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in list(self._slice_tasks):
+            task.cancel()
+        await asyncio.gather(*self._slice_tasks, return_exceptions=True)
+        for execution in self._executions.values():
+            if not execution.finished:
+                execution.status = "FAILED"
+                execution.error_message = "Stopped before completion (server shutdown)"
+
+    def submit(self, execution: AlgoExecution) -> AlgoExecution:
+        """
+        Schedule an execution; its first slice fires on the next tick
+
+        Args:
+            execution (AlgoExecution): Execution to run
+
+        Returns:
+            AlgoExecution: The submitted execution
+        """
+        self.start()
+        self._prune()
+        self._executions[execution.id] = execution
+        execution.started_at = self.clock.now()
+        self._schedule_next(execution)
+        logger.info(f"{execution.algo} execution {execution.id} scheduled: {len(execution.slices)} slices")
+        return execution
+
+    def get(self, execution_id: str) -> Optional[AlgoExecution]:
+        """Execution by ID, or None"""
+        return self._executions.get(execution_id)
+
+    def executions(self) -> List[AlgoExecution]:
+        """All executions in memory, newest first"""
+        return sorted(self._executions.values(), key=lambda e: e.created_at, reverse=True)
+
+    def pause(self, execution_id: str) -> AlgoExecution:
+        """
+        Hold the remaining slices (a slice already executing completes)
+
+        Raises:
+            KeyError: If the execution is unknown
+            ValueError: If it is not running
+        """
+        execution = self._executions[execution_id]
+        if execution.status not in ("SCHEDULED", "RUNNING"):
+            raise ValueError(f"Execution is {execution.status}")
+        if execution._timer is not None:
+            execution._timer.cancel()
+            execution._timer = None
+        execution.status = "PAUSED"
+        execution.paused_at = self.clock.now()
+        return execution
+
+    def resume(self, execution_id: str) -> AlgoExecution:
+        """
+        Continue a paused execution, shifting the remaining slices by the pause
+
+        Raises:
+            KeyError: If the execution is unknown
+            ValueError: If it is not paused
+        """
+        execution = self._executions[execution_id]
+        if execution.status != "PAUSED":
+            raise ValueError(f"Execution is {execution.status}")
+        execution.paused_seconds += self.clock.now() - execution.paused_at
+        execution.paused_at = None
+        execution.status = "RUNNING"
+        if not execution._running:
+            self._schedule_next(execution)
+        return execution
+
+    def cancel(self, execution_id: str) -> AlgoExecution:
+        """
+        Drop the remaining slices (a slice already executing completes)
+
+        Raises:
+            KeyError: If the execution is unknown
+            ValueError: If it already finished
+        """
+        execution = self._executions[execution_id]
+        if execution.finished:
+            raise ValueError(f"Execution is {execution.status}")
+        if execution._timer is not None:
+            execution._timer.cancel()
+            execution._timer = None
+        execution.status = "CANCELLED"
+        return execution
+
+    def cancel_all(self, reason: str) -> int:
+        """
+        Cancel every unfinished execution
+
+        Args:
+            reason (str): Recorded as the executions' error message
+
+        Returns:
+            int: Number of executions cancelled
+        """
+        cancelled = 0
+        for execution in self._executions.values():
+            if not execution.finished:
+                self.cancel(execution.id)
+                execution.error_message = reason
+                cancelled += 1
+        return cancelled
+
+    def stats(self) -> Dict[str, Any]:
+        """Scheduler counters for health reporting"""
+        by_status: Dict[str, int] = {}
+        for execution in self._executions.values():
+            by_status[execution.status] = by_status.get(execution.status, 0) + 1
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "timers": len(self.wheel),
+            "executions": by_status,
+            "tick_seconds": self.tick_seconds
+        }
+
+    def _schedule_next(self, execution: AlgoExecution) -> None:
+        if execution.next_slice >= len(execution.slices):
+            execution.status = "COMPLETED"
+            return
+        algo_slice = execution.slices[execution.next_slice]
+        due = execution.started_at + execution.paused_seconds + algo_slice.offset_seconds
+        execution._timer = self.wheel.schedule(due - self.clock.now(), lambda: self._fire(execution))
+
+    def _fire(self, execution: AlgoExecution) -> None:
+        execution._timer = None
+        if execution.status not in ("SCHEDULED", "RUNNING"):
+            return
+        execution.status = "RUNNING"
+        execution._running = True
+        task = asyncio.create_task(self._run_slice(execution, execution.slices[execution.next_slice]))
+        self._slice_tasks.add(task)
+        task.add_done_callback(self._slice_tasks.discard)
+
+    async def _run_slice(self, execution: AlgoExecution, algo_slice: AlgoSlice) -> None:
+        try:
+            algo_slice.results = await execution.execute(algo_slice)
+        except Exception as e:
+            logger.error(f"Slice {algo_slice.index} of execution {execution.id} failed: {e}")
+            algo_slice.results = []
+            execution.error_message = f"Slice {algo_slice.index}: {e}"
+        finally:
+            execution._running = False
+        execution.next_slice += 1
+        if execution.status == "RUNNING":
+            self._schedule_next(execution)
+
+    def _prune(self) -> None:
+        finished = [e for e in self._executions.values() if e.finished]
+        for execution in sorted(finished, key=lambda e: e.created_at)[:max(0, len(finished) - self.max_finished + 1)]:
+            del self._executions[execution.id]
+
+    def _bind_loop(self) -> None:
+        # Tasks belong to the event loop they are used on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._task = None
+            self._slice_tasks = set()
+
+    async def _run(self) -> None:
+        while True:
+            await self.clock.sleep(self.tick_seconds)
+            self.wheel.advance(self.clock.now())
+
+# Global execution scheduler instance
+execution_scheduler = ExecutionScheduler(
+    tick_seconds=settings.ORDER_ALGO_TICK_SECONDS,
+    slots=settings.ORDER_ALGO_WHEEL_SLOTS,
+    max_finished=settings.ORDER_ALGO_MAX_FINISHED
+)
@@ -0,0 +1,150 @@
+# File: /app/core/idempotency.py
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class IdempotencyUnavailableError(RuntimeError):
+    """Raised when keyed orders cannot be deduplicated because Redis is unreachable"""
+
+class OrderInProgressError(RuntimeError):
+    """Raised when an order with the same idempotency key has no known outcome yet"""
+
+class OrderIdempotencyStore:
+    """
+    Redis-backed deduplication of order submissions
+
+    Each order is identified by an idempotency key (request key plus client
+    and, for exits, position). The first submission claims the key with a
+    PENDING record; once the broker returns an order ID the record is
+    replaced with the ID and kept for ttl_seconds, so retries return the
+    original order instead of placing a new one. PENDING records expire
+    after pending_ttl_seconds in case the process dies mid-placement.
+
+    Keyed orders fail closed: if Redis is unreachable they are rejected
+    rather than placed without protection.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        ttl_seconds: int = 86400,
+        pending_ttl_seconds: int = 300,
+        key_prefix: str = "order:idempotency:"
+    ):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self.pending_ttl_seconds = pending_ttl_seconds
+        self.key_prefix = key_prefix
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis: Optional[redis.Redis] = None
+        self.claims = 0
+        self.replays = 0
+
+    @staticmethod
+    def order_tag(key: str) -> str:
+        """
+        Broker order tag for an idempotency key
+
+        Tags are short, so the key is hashed; the same key always gives the
+        same tag, which lets an order with an unknown outcome be found in the
+        broker order book.
+
+        Args:
+            key (str): Order idempotency key
+
+        Returns:
+            str: 10-character order tag
+        """
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+
+    async def claim(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim a key for a new order
+
+        Args:
+            key (str): Order idempotency key
+
+        Returns:
+            Optional[Dict[str, Any]]: None if the key was claimed, otherwise the existing record
+
+        Raises:
+            IdempotencyUnavailableError: If Redis is unreachable
+        """
+        pending = json.dumps({"status": "PENDING", "claimed_at": datetime.now(timezone.utc).isoformat()})
+        try:
+            while True:
+                if await self._client().set(self.key_prefix + key, pending, nx=True, ex=self.pending_ttl_seconds):
+                    self.claims += 1
+                    return None
+                existing = await self._client().get(self.key_prefix + key)
+                # Expired between SET and GET - try to claim again
+                if existing is not None:
+                    self.replays += 1
+                    return json.loads(existing)
+        except redis.RedisError as e:
+            logger.error(f"Idempotency store unavailable: {e}")
+            raise IdempotencyUnavailableError(f"Idempotency store unavailable: {e}")
+
+    async def complete(self, key: str, order_id: str) -> None:
+        """
+        Record the broker order ID for a claimed key
+
+        Args:
+            key (str): Order idempotency key
+            order_id (str): Broker order ID
+        """
+        record = json.dumps({
+            "status": "PLACED",
+            "order_id": order_id,
+            "placed_at": datetime.now(timezone.utc).isoformat()
+        })
+        try:
+            await self._client().set(self.key_prefix + key, record, ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            # The PENDING record stays - retries will look the order up by its tag
+            logger.error(f"Failed to record order {order_id} for idempotency key {key}: {e}")
+
+    async def release(self, key: str) -> None:
+        """
+        Drop a claim whose order was definitely not placed, so a retry can place it
+
+        Args:
+            key (str): Order idempotency key
+        """
+        try:
+            await self._client().delete(self.key_prefix + key)
+        except redis.RedisError as e:
+            logger.error(f"Failed to release idempotency key {key}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Claim and replay counters for health reporting"""
+        return {
+            "claims": self.claims,
+            "replays": self.replays,
+            "ttl_seconds": self.ttl_seconds,
+            "pending_ttl_seconds": self.pending_ttl_seconds
+        }
+
+    def _client(self) -> redis.Redis:
+        # Connection pools belong to the event loop they are used on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+# Global order idempotency store
+order_idempotency = OrderIdempotencyStore(
+    redis_url=settings.REDIS_URL,
+    ttl_seconds=settings.ORDER_IDEMPOTENCY_TTL_SECONDS,
+    pending_ttl_seconds=settings.ORDER_IDEMPOTENCY_PENDING_TTL_SECONDS
+)
@@ -0,0 +1,299 @@
+# File: /app/core/margin_cache.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.core.mofsl_api_wrapper import mofsl_wrapper
+
+logger = logging.getLogger(__name__)
+
+# Margin summary particulars (lowercase) read as each figure, in order of preference
+AVAILABLE_MARGIN_FIELDS = ("total available margin", "available margin", "net available margin", "available funds", "availablemargin")
+USED_MARGIN_FIELDS = ("total margin used", "margin used", "used margin", "utilised margin", "usedmargin")
+
+def parse_margin_summary(rows: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+    """
+    Available and used margin from a broker margin summary
+
+    Accepts the report layout (rows of particulars and amount) as well as
+    plain key/value records.
+
+    Args:
+        rows (List[Dict[str, Any]]): Margin summary rows
+
+    Returns:
+        Dict[str, Optional[float]]: available_margin and used_margin (None if not reported)
+    """
+    figures: Dict[str, Any] = {}
+    for row in rows:
+        if "particulars" in row:
+            figures[str(row["particulars"]).strip().lower()] = row.get("amount")
+        else:
+            figures.update({str(key).strip().lower(): value for key, value in row.items()})
+
+    def pick(fields: Sequence[str]) -> Optional[float]:
+        for field in fields:
+            if figures.get(field) not in (None, ""):
+                try:
+                    return float(figures[field])
+                except (TypeError, ValueError):
+                    continue
+        return None
+
+    return {"available_margin": pick(AVAILABLE_MARGIN_FIELDS), "used_margin": pick(USED_MARGIN_FIELDS)}
+
+class MarginSnapshot:
+    """Broker margin figures of one client and segment"""
+    __slots__ = ("fetched_at", "requested_at", "available_margin", "used_margin", "rows")
+
+    def __init__(self, fetched_at: float, requested_at: float, rows: List[Dict[str, Any]]):
+        self.fetched_at = fetched_at
+        self.requested_at = requested_at
+        self.rows = rows
+        figures = parse_margin_summary(rows)
+        self.available_margin = figures["available_margin"]
+        self.used_margin = figures["used_margin"]
+
+class MarginReservation:
+    """Estimated margin blocked by an order we are placing"""
+    __slots__ = ("key", "amount", "created_at")
+
+    def __init__(self, key: Tuple[int, str], amount: float, created_at: float):
+        self.key = key
+        self.amount = amount
+        self.created_at = created_at
+
+class MarginCheck:
+    """Outcome of the margin check of one order"""
+    __slots__ = ("quantity", "requirement", "reservation", "error")
+
+    def __init__(self, quantity: int, requirement: float = 0.0, reservation: Optional[MarginReservation] = None, error: Optional[str] = None):
+        self.quantity = quantity  # Approved quantity (resized orders are smaller)
+        self.requirement = requirement
+        self.reservation = reservation
+        self.error = error
+
+class MarginCache:
+    """
+    Per-client cache of broker margins with a local estimate of in-flight usage
+
+    Margins are keyed by client and credential segment and fetched at most
+    once at a time per key. Orders reserve their estimated requirement
+    (quantity x price x the product's margin rate) until a broker figure
+    fetched after the reservation reflects them, so consecutive orders see
+    each other's usage without another round trip.
+
+    Reservations are per process: orders placed by another worker are only
+    seen once the broker's margin figure includes them.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_clients: int = 5000, requirement_rates: Optional[Dict[str, float]] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_clients = max_clients
+        self.requirement_rates = requirement_rates or {}
+        self._snapshots: "OrderedDict[Tuple[int, str], MarginSnapshot]" = OrderedDict()
+        self._reservations: Dict[Tuple[int, str], List[MarginReservation]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.hits = 0
+        self.fetches = 0
+        self.rejections = 0
+        self.resizes = 0
+
+    async def get(self, client: Any, segment: str = "interactive", max_age: Optional[float] = None) -> MarginSnapshot:
+        """
+        Margin snapshot for a client, fetched from the broker if the cached copy is too old
+
+        Args:
+            client (Any): Client model (id and client_code are used)
+            segment (str): Credential segment
+            max_age (Optional[float]): Oldest acceptable copy in seconds (None - ttl_seconds, 0 - always fetch)
+
+        Returns:
+            MarginSnapshot: Broker margin figures
+        """
+        key = (client.id, segment)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and time.monotonic() - snapshot.fetched_at < (self.ttl_seconds if max_age is None else max_age):
+            self.hits += 1
+            self._snapshots.move_to_end(key)
+            return snapshot
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures belong to the event loop they are used on
+            self._loop = loop
+            self._in_flight = {}
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            # A fetch already in flight is as fresh as a new one
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The fetching caller went away - fetch again
+                return await self.get(client, segment, max_age)
+
+        future = loop.create_future()
+        self._in_flight[key] = future
+        try:
+            self.fetches += 1
+            requested_at = time.monotonic()
+            auth_token = await mofsl_wrapper.authenticate_client(client, segment)
+            rows = await mofsl_wrapper.get_margin_summary(auth_token.token, client.client_code)
+            snapshot = self._store(key, MarginSnapshot(time.monotonic(), requested_at, rows))
+            future.set_result(snapshot)
+            return snapshot
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark the exception retrieved in case nobody shared the fetch
+                future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def available(self, client_id: int, segment: str) -> Optional[float]:
+        """Cached available margin less in-flight reservations, or None if unknown"""
+        snapshot = self._snapshots.get((client_id, segment))
+        if snapshot is None or snapshot.available_margin is None:
+            return None
+        return snapshot.available_margin - self.reserved(client_id, segment)
+
+    def reserved(self, client_id: int, segment: str) -> float:
+        """Estimated margin of orders placed since the cached figure was requested"""
+        return sum(reservation.amount for reservation in self._reservations.get((client_id, segment), ()))
+
+    def requirement(self, transaction_type: str, product_type: str, quantity: int, price: float) -> float:
+        """
+        Estimated margin an order blocks
+
+        Delivery sells are covered by holdings and block nothing; everything
+        else blocks its value times the product's margin rate.
+
+        Args:
+            transaction_type (str): BUY or SELL
+            product_type (str): CNC, MIS or NRML
+            quantity (int): Order quantity
+            price (float): Order or reference price
+
+        Returns:
+            float: Estimated requirement
+        """
+        if transaction_type == "SELL" and product_type == "CNC":
+            return 0.0
+        return quantity * price * self.requirement_rates.get(product_type, 1.0)
+
+    def check_orders(
+        self,
+        segment: str,
+        orders: Sequence[Tuple[int, int, Optional[float], str, str]],
+        lot_size: int = 1,
+        resize: bool = False
+    ) -> List[MarginCheck]:
+        """
+        Check a batch of orders against the cached margins in one pass
+
+        Orders are taken in sequence per client - each approved order reserves
+        its requirement, so a client's later orders see less margin. Orders
+        with no price or no cached margin are approved unchecked.
+
+        Args:
+            segment (str): Credential segment
+            orders (Sequence[Tuple[int, int, Optional[float], str, str]]): (client ID, quantity, price, transaction type, product type)
+            lot_size (int): Lot size for resized quantities
+            resize (bool): Shrink unaffordable orders to the largest affordable whole-lot quantity instead of rejecting them
+
+        Returns:
+            List[MarginCheck]: One check per order, in order
+        """
+        now = time.monotonic()
+        checks = []
+        for client_id, quantity, price, transaction_type, product_type in orders:
+            available = self.available(client_id, segment)
+            if available is None or not price:
+                checks.append(MarginCheck(quantity))
+                continue
+
+            unit = self.requirement(transaction_type, product_type, 1, price)
+            approved = quantity
+            if unit * quantity > available:
+                affordable = int(max(available, 0.0) // unit) if unit else quantity
+                affordable -= affordable % lot_size
+                if not resize or affordable <= 0:
+                    self.rejections += 1
+                    checks.append(MarginCheck(0, unit * quantity, error=(
+                        f"Insufficient margin: requires {unit * quantity:.2f}, available {max(available, 0.0):.2f}"
+                    )))
+                    continue
+                self.resizes += 1
+                approved = affordable
+
+            reservation = None
+            if unit:
+                reservation = MarginReservation((client_id, segment), unit * approved, now)
+                self._reservations.setdefault(reservation.key, []).append(reservation)
+            checks.append(MarginCheck(approved, unit * approved, reservation))
+        return checks
+
+    def release(self, reservation: Optional[MarginReservation]) -> None:
+        """Return the margin of an order that was not placed"""
+        if reservation is None:
+            return
+        reservations = self._reservations.get(reservation.key)
+        if reservations and reservation in reservations:
+            reservations.remove(reservation)
+
+    def snapshot(self, client_id: int, segment: str) -> Optional[Dict[str, Any]]:
+        """Cached figures and the local estimate for a client, or None if not cached"""
+        snapshot = self._snapshots.get((client_id, segment))
+        if snapshot is None:
+            return None
+        return {
+            "available_margin": snapshot.available_margin,
+            "used_margin": snapshot.used_margin,
+            "reserved_margin": round(self.reserved(client_id, segment), 2),
+            "estimated_available_margin": self.available(client_id, segment),
+            "age_ms": round((time.monotonic() - snapshot.fetched_at) * 1000, 3),
+            "summary": snapshot.rows
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for health reporting"""
+        return {
+            "clients": len(self._snapshots),
+            "reservations": sum(len(reservations) for reservations in self._reservations.values()),
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "rejections": self.rejections,
+            "resizes": self.resizes,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    def _store(self, key: Tuple[int, str], snapshot: MarginSnapshot) -> MarginSnapshot:
+        self._snapshots[key] = snapshot
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self.max_clients:
+            evicted, _ = self._snapshots.popitem(last=False)
+            self._reservations.pop(evicted, None)
+        # Orders reserved before the request are in the broker's figure now
+        reservations = [r for r in self._reservations.get(key, ()) if r.created_at >= snapshot.requested_at]
+        if reservations:
+            self._reservations[key] = reservations
+        else:
+            self._reservations.pop(key, None)
+        return snapshot
+
+# Global margin cache instance
+margin_cache = MarginCache(
+    ttl_seconds=settings.MARGIN_CACHE_TTL_SECONDS,
+    max_clients=settings.MARGIN_CACHE_MAX_CLIENTS,
+    requirement_rates=settings.MARGIN_REQUIREMENT_RATES
+)
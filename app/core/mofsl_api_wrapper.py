@@ -9,11 +9,15 @@ from dataclasses import dataclass
 from enum import Enum
 
 from app.core.security import decrypt_data
+from app.core.raw_json import RawJSON, find_top_level_value, as_json_array
 from app.schemas.schemas import Client
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+class OrderRejectedError(ValueError):
+    """Raised when an order was definitely not accepted - failed validation or a parsed broker rejection"""
+
 class MOFSLEnvironment(Enum):
     """MOFSL API Environment Enum"""
     UAT = "UAT"
@@ -80,7 +84,8 @@ class MOFSLApiWrapper:
             "modify_order": "/rest/secure/v1/modifyorder",
             "cancel_order": "/rest/secure/v1/cancelorder",
             "order_status": "/rest/report/v1/getorderdetail",
-            "order_book": "/rest/report/v1/getorderbook"
+            "order_book": "/rest/report/v1/getorderbook",
+            "margin_summary": "/rest/report/v1/getreportmarginsummary"
         },
         MOFSLEnvironment.PRODUCTION: {
             "base_url": "https://openapi.motilaloswal.com",
@@ -94,7 +99,8 @@ class MOFSLApiWrapper:
             "modify_order": "/rest/secure/v1/modifyorder",
             "cancel_order": "/rest/secure/v1/cancelorder",
             "order_status": "/rest/report/v1/getorderdetail",
-            "order_book": "/rest/report/v1/getorderbook"
+            "order_book": "/rest/report/v1/getorderbook",
+            "margin_summary": "/rest/report/v1/getreportmarginsummary"
         }
     }
     
@@ -510,6 +516,7 @@ class MOFSLApiWrapper:
             Dict[str, Any]: API response data
             
         Raises:
+            OrderRejectedError: If the broker responded with a parsed non-success status
             ValueError: If request fails or response is invalid
             httpx.HTTPError: If HTTP request fails
         """
@@ -541,9 +548,10 @@ class MOFSLApiWrapper:
                             logger.debug(f"Authenticated request successful: {url}")
                             return response_data
                         else:
+                            # A parsed rejection - the request was definitely not carried out
                             error_msg = response_data.get("message", "Unknown error")
                             logger.error(f"API error response: {error_msg}")
-                            raise ValueError(f"API error: {error_msg}")
+                            raise OrderRejectedError(f"API error: {error_msg}")
                             
                     except ValueError:
                         # Re-raise ValueError
@@ -565,10 +573,113 @@ class MOFSLApiWrapper:
         except httpx.HTTPError as e:
             logger.error(f"HTTP error during request to {url}: {e}")
             raise
+        except OrderRejectedError:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during request to {url}: {e}")
+            raise ValueError(f"Request failed: {str(e)}")
+    
+    async def _make_authenticated_request_raw(self, endpoint: str, auth_token: str, payload: Dict[str, Any]) -> RawJSON:
+        """
+        Make an authenticated request and return the raw "data" bytes without parsing the body
+        
+        The body is only decoded on the error path to extract the broker message.
+        
+        Args:
+            endpoint (str): API endpoint path
+            auth_token (str): Authentication token
+            payload (Dict[str, Any]): Request payload
+            
+        Returns:
+            RawJSON: Raw JSON array sliced from the response "data" field
+            
+        Raises:
+            ValueError: If request fails or response is invalid
+            httpx.HTTPError: If HTTP request fails
+        """
+        url = self.base_url + endpoint
+        
+        # Prepare headers with authentication
+        headers = {
+            **self._client_config["headers"],
+            "Authorization": f"Bearer {auth_token}"
+        }
+        
+        try:
+            async with httpx.AsyncClient(timeout=self._client_config["timeout"]) as http_client:
+                logger.debug(f"Making raw authenticated request to: {url}")
+                
+                response = await http_client.post(
+                    url,
+                    json=payload,
+                    headers=headers
+                )
+                
+                body = response.content
+                data = find_top_level_value(body, "data") if response.status_code == 200 else None
+                
+                if data is not None:
+                    logger.debug(f"Raw authenticated request successful: {url}")
+                    return as_json_array(data)
+                
+                # Error path - parse the body for the broker message
+                try:
+                    error_data = response.json()
+                except Exception:
+                    error_data = None
+                if not isinstance(error_data, dict):
+                    error_data = {}
+                
+                if response.status_code == 200:
+                    if error_data.get("status") == "success":
+                        return as_json_array(None)
+                    error_msg = error_data.get("message", "Unknown error")
+                    logger.error(f"API error response: {error_msg}")
+                    raise ValueError(f"API error: {error_msg}")
+                
+                logger.error(f"HTTP error {response.status_code} from {url}")
+                error_msg = error_data.get("message", f"HTTP {response.status_code}")
+                raise ValueError(f"Request failed: {error_msg}")
+                
+        except httpx.HTTPError as e:
+            logger.error(f"HTTP error during request to {url}: {e}")
+            raise
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Unexpected error during request to {url}: {e}")
             raise ValueError(f"Request failed: {str(e)}")
     
+    async def get_positions_raw(self, auth_token: str, client_code: str) -> RawJSON:
+        """
+        Fetch client positions as the broker's raw JSON array
+        
+        Args:
+            auth_token (str): Valid authentication token
+            client_code (str): Client code for the positions
+            
+        Returns:
+            RawJSON: Raw JSON array of positions
+        """
+        logger.info(f"Fetching raw positions for client: {client_code}")
+        endpoint = self.ENDPOINTS[self.environment]["positions"]
+        return await self._make_authenticated_request_raw(endpoint, auth_token, {"clientcode": client_code})
+    
+    async def get_holdings_raw(self, auth_token: str, client_code: str) -> RawJSON:
+        """
+        Fetch client holdings as the broker's raw JSON array
+        
+        Args:
+            auth_token (str): Valid authentication token
+            client_code (str): Client code for the holdings
+            
+        Returns:
+            RawJSON: Raw JSON array of holdings
+        """
+        logger.info(f"Fetching raw holdings for client: {client_code}")
+        endpoint = self.ENDPOINTS[self.environment]["holdings"]
+        return await self._make_authenticated_request_raw(endpoint, auth_token, {"clientcode": client_code})
+    
     async def get_positions(self, auth_token: str, client_code: str) -> List[Dict[str, Any]]:
         """
         Fetch client positions from MOFSL API
@@ -738,6 +849,47 @@ class MOFSLApiWrapper:
             logger.error(f"Error fetching profile for client {client_code}: {e}")
             raise
     
+    async def get_margin_summary(self, auth_token: str, client_code: str) -> List[Dict[str, Any]]:
+        """
+        Fetch client margin summary from MOFSL API
+        
+        Args:
+            auth_token (str): Valid authentication token
+            client_code (str): Client code for the margin summary
+            
+        Returns:
+            List[Dict[str, Any]]: Margin summary rows (particulars and amount)
+            
+        Raises:
+            ValueError: If request fails or token is invalid
+            httpx.HTTPError: If HTTP request fails
+        """
+        logger.info(f"Fetching margin summary for client: {client_code}")
+        
+        try:
+            # Prepare request payload
+            payload = {
+                "clientcode": client_code
+            }
+            
+            # Make authenticated request
+            endpoint = self.ENDPOINTS[self.environment]["margin_summary"]
+            response_data = await self._make_authenticated_request(endpoint, auth_token, payload)
+            
+            # Extract margin data
+            margin_data = response_data.get("data", [])
+            
+            # Ensure we return a list
+            if not isinstance(margin_data, list):
+                margin_data = [margin_data] if margin_data else []
+            
+            logger.info(f"Successfully fetched margin summary for client {client_code}")
+            return margin_data
+            
+        except Exception as e:
+            logger.error(f"Error fetching margin summary for client {client_code}: {e}")
+            raise
+    
     async def get_portfolio_summary(self, client: Client, segment: str = "interactive") -> Dict[str, Any]:
         """
         Get comprehensive portfolio summary for a client
@@ -871,6 +1023,10 @@ class MOFSLApiWrapper:
         if order_details.remarks:
             payload["remarks"] = order_details.remarks[:100]  # Limit remarks length
         
+        # Add order tag if provided (used to find orders with an unknown outcome)
+        if getattr(order_details, "tag", None):
+            payload["tag"] = order_details.tag
+        
         logger.debug(f"Mapped order payload: {payload}")
         return payload
     
@@ -887,7 +1043,8 @@ class MOFSLApiWrapper:
             str: Unique order ID from MOFSL API
             
         Raises:
-            ValueError: If order placement fails or validation errors occur
+            OrderRejectedError: If the order fails validation or the broker rejects it
+            ValueError: If order placement fails with an unknown outcome
             httpx.HTTPError: If HTTP request fails
         """
         logger.info(f"Placing order for client {client_code}: {order_details.transaction_type} {order_details.quantity} @ {order_details.order_type}")
@@ -1108,23 +1265,23 @@ class MOFSLApiWrapper:
             order_details: OrderCreate schema object
             
         Raises:
-            ValueError: If validation fails
+            OrderRejectedError: If validation fails
         """
         # Check required fields
         if not order_details.quantity or order_details.quantity <= 0:
-            raise ValueError("Order quantity must be greater than 0")
+            raise OrderRejectedError("Order quantity must be greater than 0")
         
         # Validate price for limit orders
         if order_details.order_type in ["LMT", "SL"] and (not order_details.price or order_details.price <= 0):
-            raise ValueError("Price is required and must be greater than 0 for limit orders")
+            raise OrderRejectedError("Price is required and must be greater than 0 for limit orders")
         
         # Validate trigger price for stop-loss orders
         if order_details.order_type in ["SLM", "SL"] and (not order_details.trigger_price or order_details.trigger_price <= 0):
-            raise ValueError("Trigger price is required and must be greater than 0 for stop-loss orders")
+            raise OrderRejectedError("Trigger price is required and must be greater than 0 for stop-loss orders")
         
         # Validate disclosed quantity
         if order_details.disclosed_quantity and order_details.disclosed_quantity > order_details.quantity:
-            raise ValueError("Disclosed quantity cannot be greater than total quantity")
+            raise OrderRejectedError("Disclosed quantity cannot be greater than total quantity")
         
         logger.debug("Order details validation passed")
     
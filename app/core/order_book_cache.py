@@ -0,0 +1,203 @@
+# File: /app/core/order_book_cache.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.mofsl_api_wrapper import mofsl_wrapper
+
+logger = logging.getLogger(__name__)
+
+# Order book statuses after which an order can no longer change
+TERMINAL_ORDER_STATUSES = {"traded", "complete", "executed", "cancel", "cancelled", "expired", "rejected", "error"}
+
+def order_book_id(entry: Dict[str, Any]) -> str:
+    """Order ID of a broker order book entry"""
+    return str(entry.get("uniqueorderid") or entry.get("order_id"))
+
+def is_terminal_order(entry: Dict[str, Any]) -> bool:
+    """Whether an order book entry is filled, cancelled or rejected"""
+    return str(entry.get("orderstatus", "")).strip().lower() in TERMINAL_ORDER_STATUSES
+
+class _CachedBook:
+    __slots__ = ("fetched_at", "orders")
+
+    def __init__(self, fetched_at: float, orders: Dict[str, Dict[str, Any]]):
+        self.fetched_at = fetched_at
+        self.orders = orders
+
+class OrderBookCache:
+    """
+    Per-client cache of broker order books
+
+    Books are keyed by client and credential segment. They are refreshed by
+    the order reconciler and on demand (at most one broker fetch per book
+    in flight - concurrent callers share it), and patched locally when we
+    place or cancel orders. Least recently used books are evicted beyond
+    max_clients.
+    """
+
+    def __init__(self, ttl_seconds: float = 10.0, max_clients: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_clients = max_clients
+        self._books: "OrderedDict[Tuple[int, str], _CachedBook]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.hits = 0
+        self.fetches = 0
+        self.shared_fetches = 0
+
+    async def get_book(self, client: Any, segment: str = "interactive", max_age: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Order book for a client, fetched from the broker if the cached copy is too old
+
+        Args:
+            client (Any): Client model (id and client_code are used)
+            segment (str): Credential segment
+            max_age (Optional[float]): Oldest acceptable copy in seconds (None - ttl_seconds, 0 - always fetch)
+
+        Returns:
+            List[Dict[str, Any]]: Order book entries
+        """
+        book = await self._get(client, segment, self.ttl_seconds if max_age is None else max_age)
+        return list(book.orders.values())
+
+    async def get_order(
+        self,
+        client: Any,
+        segment: str,
+        order_id: str,
+        force_refresh: bool = False
+    ) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Order book entry for one order
+
+        An order missing from a cached book (e.g. placed elsewhere) triggers one refresh.
+
+        Args:
+            client (Any): Client model
+            segment (str): Credential segment
+            order_id (str): Broker order ID
+            force_refresh (bool): Fetch the book from the broker first
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], float]: Entry (None if the broker has no such order) and its age in seconds
+        """
+        book = await self._get(client, segment, 0 if force_refresh else self.ttl_seconds)
+        if order_id not in book.orders and not force_refresh:
+            book = await self._get(client, segment, 0)
+        return book.orders.get(order_id), time.monotonic() - book.fetched_at
+
+    def store(self, client_id: int, segment: str, order_book: List[Dict[str, Any]]) -> None:
+        """
+        Replace a client's cached book with a freshly fetched one
+
+        Args:
+            client_id (int): Client ID
+            segment (str): Credential segment
+            order_book (List[Dict[str, Any]]): Order book entries
+        """
+        key = (client_id, segment)
+        self._books[key] = _CachedBook(time.monotonic(), {order_book_id(entry): entry for entry in order_book})
+        self._books.move_to_end(key)
+        while len(self._books) > self.max_clients:
+            self._books.popitem(last=False)
+
+    def record_order(self, client_id: int, segment: str, entry: Dict[str, Any]) -> None:
+        """
+        Add or update an order we placed in the client's cached book
+
+        Clients without a cached book are left alone; their next lookup fetches it.
+
+        Args:
+            client_id (int): Client ID
+            segment (str): Credential segment
+            entry (Dict[str, Any]): Order book style entry (must include uniqueorderid)
+        """
+        book = self._books.get((client_id, segment))
+        if book is not None:
+            order_id = order_book_id(entry)
+            book.orders[order_id] = {**book.orders.get(order_id, {}), **entry}
+
+    def record_cancel(self, client_id: int, segment: str, order_id: str) -> None:
+        """
+        Mark an order we cancelled as cancelled in the client's cached book
+
+        Args:
+            client_id (int): Client ID
+            segment (str): Credential segment
+            order_id (str): Broker order ID
+        """
+        book = self._books.get((client_id, segment))
+        if book is not None and order_id in book.orders:
+            book.orders[order_id] = {**book.orders[order_id], "orderstatus": "Cancelled"}
+
+    def cached_order(self, client_id: int, segment: str, order_id: str) -> Optional[Dict[str, Any]]:
+        """Cached entry for an order without fetching, or None"""
+        book = self._books.get((client_id, segment))
+        return book.orders.get(order_id) if book is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for health reporting"""
+        return {
+            "clients": len(self._books),
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "shared_fetches": self.shared_fetches,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    async def _get(self, client: Any, segment: str, max_age: float) -> _CachedBook:
+        key = (client.id, segment)
+        book = self._books.get(key)
+        if book is not None and time.monotonic() - book.fetched_at < max_age:
+            self.hits += 1
+            self._books.move_to_end(key)
+            return book
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures belong to the event loop they are used on
+            self._loop = loop
+            self._in_flight = {}
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            # A fetch already in flight is as fresh as a new one
+            self.shared_fetches += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The fetching caller went away - fetch again
+                return await self._get(client, segment, max_age)
+
+        future = loop.create_future()
+        self._in_flight[key] = future
+        try:
+            self.fetches += 1
+            auth_token = await mofsl_wrapper.authenticate_client(client, segment)
+            order_book = await mofsl_wrapper.get_order_book(auth_token.token, client.client_code)
+            self.store(client.id, segment, order_book)
+            book = self._books[key]
+            future.set_result(book)
+            return book
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case nobody shared the fetch
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+# Global order book cache instance
+order_book_cache = OrderBookCache(
+    ttl_seconds=settings.ORDER_BOOK_CACHE_TTL_SECONDS,
+    max_clients=settings.ORDER_BOOK_CACHE_MAX_CLIENTS
+)
@@ -0,0 +1,306 @@
+# File: /app/core/order_journal.py
+import asyncio
+import json
+import logging
+import os
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Numeric, insert, select
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.config import settings
+from app.db.database import session_scope
+from app.models.models import Order as OrderModel
+
+logger = logging.getLogger(__name__)
+
+class OrderJournal:
+    """
+    Write-behind journal for placed orders
+
+    Order tasks submit rows without touching the database. A background
+    flusher writes everything queued in one multi-row INSERT when the batch
+    fills up or the flush interval elapses. Routes wait for their own rows
+    before responding, so every reported order is durable - in the orders
+    table, or in the append-only fallback log if the database is unavailable.
+    Logged rows are replayed into the database on the next startup.
+
+    If the database rejects a batch (a constraint violation or an oversized
+    value), its rows are inserted one by one so a single bad row cannot
+    hold back other orders; the rows it still rejects are moved to a
+    quarantine log for manual repair.
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: int = 20,
+        max_batch_size: int = 500,
+        fallback_path: str = "logs/order_journal.jsonl",
+        quarantine_path: str = "logs/order_journal_rejected.jsonl"
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.fallback_path = fallback_path
+        self.quarantine_path = quarantine_path
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.rows_written = 0
+        self.rows_logged = 0
+        self.rows_quarantined = 0
+        self.flushes = 0
+
+    def start(self) -> None:
+        """Start the background flusher (no-op if already running)"""
+        self._bind_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything queued and stop the background flusher"""
+        self._bind_loop()
+        if self._task is not None:
+            # Holding the lock means the flusher is not mid-write
+            async with self._flush_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def submit(self, row: Dict[str, Any]) -> asyncio.Future:
+        """
+        Queue an order row for the next flush
+
+        Args:
+            row (Dict[str, Any]): Order column values
+
+        Returns:
+            asyncio.Future: Resolves once the row is durable
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_now.set()
+        self._has_pending.set()
+        return future
+
+    async def wait(self, futures: List[asyncio.Future]) -> int:
+        """
+        Wait until the given rows are durable, flushing immediately
+
+        Args:
+            futures (List[asyncio.Future]): Futures returned by submit
+
+        Returns:
+            int: Number of rows that could not be persisted anywhere
+        """
+        if not futures:
+            return 0
+        if any(not future.done() for future in futures):
+            self._flush_now.set()
+
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        return sum(1 for result in results if isinstance(result, Exception))
+
+    async def flush(self) -> None:
+        """Persist everything queued so far"""
+        self._bind_loop()
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+
+            rows = [row for row, _ in batch]
+            try:
+                inserted, rejected, unwritten = await self._insert(rows)
+            except Exception as e:
+                logger.error(f"Order journal flush failed, logging {len(rows)} orders to {self.fallback_path}: {e}")
+                inserted, rejected, unwritten = 0, [], rows
+            self.rows_written += inserted
+
+            # Rows that could not be persisted anywhere fail their callers
+            failures: Dict[int, Exception] = {}
+            if rejected:
+                error = await self._log_rows(rejected, self.quarantine_path)
+                if error is None:
+                    self.rows_quarantined += len(rejected)
+                failures.update((id(row), error) for row in rejected if error is not None)
+            if unwritten:
+                error = await self._log_rows(unwritten, self.fallback_path)
+                if error is None:
+                    self.rows_logged += len(unwritten)
+                failures.update((id(row), error) for row in unwritten if error is not None)
+
+            self.flushes += 1
+            for row, future in batch:
+                if future.done() or future.get_loop().is_closed():
+                    continue
+                error = failures.get(id(row))
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    async def replay_log(self) -> int:
+        """
+        Insert rows from the fallback log that are not in the database yet
+
+        Rows the database rejects are moved to the quarantine log and lines
+        that cannot be parsed (e.g. a write cut short by a crash) are
+        skipped. The log is removed once every row is inserted or
+        quarantined and kept otherwise.
+
+        Returns:
+            int: Number of rows inserted
+        """
+        if not os.path.exists(self.fallback_path):
+            return 0
+
+        rows = await asyncio.to_thread(self._read_log)
+        try:
+            async with session_scope() as db:
+                existing = set((await db.scalars(select(OrderModel.order_id).where(
+                    OrderModel.order_id.in_([row["order_id"] for row in rows])
+                ))).all())
+            missing = [row for row in rows if row["order_id"] not in existing]
+            inserted, rejected, unwritten = await self._insert(missing) if missing else (0, [], [])
+            if rejected:
+                await asyncio.to_thread(self._append_to_log, rejected, self.quarantine_path)
+                self.rows_quarantined += len(rejected)
+        except Exception as e:
+            logger.error(f"Order journal replay failed, keeping {self.fallback_path}: {e}")
+            return 0
+
+        if unwritten:
+            # Inserted rows are skipped by the next replay
+            logger.error(f"Order journal replay stopped with {len(unwritten)} orders left, keeping {self.fallback_path}")
+            return inserted
+
+        os.remove(self.fallback_path)
+        logger.info(
+            f"Replayed {inserted} orders from {self.fallback_path}"
+            + (f", quarantined {len(rejected)} to {self.quarantine_path}" if rejected else "")
+        )
+        return inserted
+
+    def stats(self) -> Dict[str, Any]:
+        """Journal counters for health reporting"""
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "rows_logged": self.rows_logged,
+            "rows_quarantined": self.rows_quarantined,
+            "fallback_log_exists": os.path.exists(self.fallback_path)
+        }
+
+    def _bind_loop(self) -> None:
+        # Synchronisation primitives belong to the event loop they are used on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._has_pending = asyncio.Event()
+            self._flush_now = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_pending.wait()
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            self._has_pending.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Order journal flusher error: {e}")
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]], List[Dict[str, Any]]]:
+        # Returns (rows inserted, rows the database rejected, rows not attempted
+        # because the database became unavailable); a batch failing for any
+        # other reason than its rows raises
+        try:
+            async with session_scope() as db:
+                await db.execute(insert(OrderModel), rows)
+            return len(rows), [], []
+        except (IntegrityError, DataError) as e:
+            if len(rows) == 1:
+                logger.error(f"Order journal rejected order {rows[0].get('order_id')}: {e}")
+                return 0, rows, []
+            logger.warning(f"Order journal batch of {len(rows)} orders rejected, inserting one by one: {e}")
+
+        inserted = 0
+        rejected = []
+        for index, row in enumerate(rows):
+            try:
+                async with session_scope() as db:
+                    await db.execute(insert(OrderModel), [row])
+                inserted += 1
+            except (IntegrityError, DataError) as e:
+                logger.error(f"Order journal rejected order {row.get('order_id')}: {e}")
+                rejected.append(row)
+            except Exception as e:
+                logger.error(f"Order journal insert failed after {inserted} orders: {e}")
+                return inserted, rejected, rows[index:]
+        return inserted, rejected, []
+
+    async def _log_rows(self, rows: List[Dict[str, Any]], path: str) -> Optional[Exception]:
+        # Returns the error if the rows could not be written
+        try:
+            await asyncio.to_thread(self._append_to_log, rows, path)
+            return None
+        except Exception as e:
+            logger.critical(f"Order journal log write to {path} failed for {len(rows)} orders: {e}")
+            return e
+
+    def _append_to_log(self, rows: List[Dict[str, Any]], path: Optional[str] = None) -> None:
+        path = path or self.fallback_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as log:
+            for row in rows:
+                log.write(json.dumps(row, default=str) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+
+    def _read_log(self) -> List[Dict[str, Any]]:
+        # Decimals were written as strings
+        numeric_columns = {
+            column.name for column in OrderModel.__table__.columns
+            if isinstance(column.type, Numeric)
+        }
+        rows = []
+        with open(self.fallback_path, encoding="utf-8") as log:
+            for number, line in enumerate(log, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    if not isinstance(row, dict) or not row.get("order_id"):
+                        raise ValueError("not an order row")
+                except ValueError as e:
+                    logger.error(f"Skipping unreadable line {number} of {self.fallback_path} ({e}): {line.strip()[:200]}")
+                    continue
+                for name in numeric_columns & row.keys():
+                    if row[name] is not None:
+                        row[name] = Decimal(row[name])
+                rows.append(row)
+        return rows
+
+# Global order journal instance
+order_journal = OrderJournal(
+    flush_interval_ms=settings.ORDER_JOURNAL_FLUSH_INTERVAL_MS,
+    max_batch_size=settings.ORDER_JOURNAL_MAX_BATCH_SIZE,
+    fallback_path=settings.ORDER_JOURNAL_FALLBACK_PATH,
+    quarantine_path=settings.ORDER_JOURNAL_QUARANTINE_PATH
+)
@@ -0,0 +1,326 @@
+# File: /app/core/order_reconciler.py
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, select, update
+
+from app.config import settings
+from app.core.coordination import SharedState, shared_state
+from app.core.order_book_cache import order_book_cache, order_book_id
+from app.core.risk import IST, risk_ledger
+from app.db.database import session_scope
+from app.models.models import Client as ClientModel, Order as OrderModel
+
+logger = logging.getLogger(__name__)
+
+# Order statuses that can still change at the broker
+OPEN_DB_STATUSES = ("PENDING", "OPEN")
+
+# Broker order book status -> orders.status
+BROKER_STATUS_MAP = {
+    "sent": "OPEN",
+    "confirm": "OPEN",
+    "open": "OPEN",
+    "pending": "OPEN",
+    "partial": "OPEN",
+    "trigger pending": "OPEN",
+    "modified": "OPEN",
+    "traded": "COMPLETE",
+    "complete": "COMPLETE",
+    "executed": "COMPLETE",
+    "cancel": "CANCELLED",
+    "cancelled": "CANCELLED",
+    "expired": "CANCELLED",
+    "rejected": "REJECTED",
+    "error": "REJECTED"
+}
+
+# Credential segment used for an order's exchange
+COMMODITY_EXCHANGES = {"MCX", "NCDEX"}
+
+# Status of open orders from an earlier session that the broker no longer lists
+EXPIRED_STATUS = "EXPIRED"
+
+# Lease that picks the one worker running the background loop
+RECONCILER_LEASE = "order-reconciler"
+
+def _first(order: Dict[str, Any], *fields: str) -> Any:
+    for field in fields:
+        if order.get(field) not in (None, ""):
+            return order[field]
+    return None
+
+class OrderReconciler:
+    """
+    Background sync of open orders against the broker order books
+
+    Each cycle loads the open orders, fetches the order book once per client
+    (and segment) that has any - feeding the order book cache - and writes every changed status, filled
+    quantity and average price in a single UPDATE. The poll interval follows
+    the load: idle_interval when nothing is open, otherwise long enough to
+    keep order book fetches under max_fetches_per_second, bounded by
+    min_interval and max_interval.
+
+    Orders placed before the current session (midnight IST) that are
+    missing from a freshly fetched book are marked EXPIRED, so the open set
+    does not grow with every order the broker has dropped. With a
+    shared_state the background loop only runs in the worker holding the
+    reconciler lease.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 2.0,
+        max_interval: float = 30.0,
+        idle_interval: float = 10.0,
+        max_fetches_per_second: float = 20.0,
+        max_concurrent_fetches: int = 20,
+        lease_seconds: float = 90.0,
+        shared_state: Optional[SharedState] = None
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_interval = idle_interval
+        self.max_fetches_per_second = max_fetches_per_second
+        self.max_concurrent_fetches = max_concurrent_fetches
+        self.lease_seconds = lease_seconds
+        self.shared_state = shared_state
+        self.leader = shared_state is None
+        self.interval = idle_interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.cycles = 0
+        self.orders_updated = 0
+        self.last_cycle: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        """Start the background loop (no-op if already running)"""
+        self._bind_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.shared_state is not None and self.leader:
+            await self.shared_state.release_lease(RECONCILER_LEASE)
+            self.leader = False
+
+    async def reconcile(self) -> Dict[str, Any]:
+        """
+        Run one reconciliation cycle
+
+        Returns:
+            Dict[str, Any]: Cycle counters (open orders, clients, book fetch failures, updated and expired orders)
+        """
+        self._bind_loop()
+        async with self._cycle_lock:
+            started = time.perf_counter()
+            session_start = datetime.now(IST).replace(hour=0, minute=0, second=0, microsecond=0)
+
+            async with session_scope() as db:
+                open_orders = (await db.execute(
+                    select(
+                        OrderModel.id,
+                        OrderModel.order_id,
+                        OrderModel.client_id,
+                        OrderModel.exchange,
+                        OrderModel.status,
+                        OrderModel.filled_quantity,
+                        OrderModel.average_price,
+                        OrderModel.order_time
+                    ).where(OrderModel.status.in_(OPEN_DB_STATUSES))
+                )).all()
+                clients = (await db.scalars(select(ClientModel).where(
+                    ClientModel.id.in_({order.client_id for order in open_orders})
+                ))).all() if open_orders else []
+
+            # One order book per client and credential segment
+            groups: Dict[Tuple[int, str], List[Any]] = {}
+            for order in open_orders:
+                segment = "commodity" if order.exchange in COMMODITY_EXCHANGES else "interactive"
+                groups.setdefault((order.client_id, segment), []).append(order)
+
+            clients_by_id = {client.id: client for client in clients}
+            semaphore = asyncio.Semaphore(self.max_concurrent_fetches)
+
+            async def fetch_book(client_id: int, segment: str) -> Dict[str, Dict[str, Any]]:
+                async with semaphore:
+                    # Books fetched by lookups since the last cycle are reused
+                    order_book = await order_book_cache.get_book(clients_by_id[client_id], segment, max_age=self.min_interval)
+                return {order_book_id(entry): entry for entry in order_book}
+
+            group_keys = [key for key in groups if key[0] in clients_by_id]
+            books = await asyncio.gather(*(fetch_book(*key) for key in group_keys), return_exceptions=True)
+
+            changes = []
+            fetch_failures = 0
+            expired = 0
+            for key, book in zip(group_keys, books):
+                if isinstance(book, Exception):
+                    fetch_failures += 1
+                    logger.warning(f"Order book fetch failed for client {key[0]} ({key[1]}): {book}")
+                    continue
+                for order in groups[key]:
+                    entry = book.get(order.order_id)
+                    if entry is not None:
+                        change = self._diff(order, entry)
+                        if change is not None:
+                            changes.append(change)
+                            self._record_risk(order.order_id, change)
+                    elif self._placed_before(order, session_start):
+                        # The broker's book only lists the current session
+                        changes.append({
+                            "id": order.id,
+                            "status": EXPIRED_STATUS,
+                            "filled_quantity": order.filled_quantity,
+                            "average_price": order.average_price
+                        })
+                        risk_ledger.close_order(order.order_id)
+                        expired += 1
+
+            if expired:
+                logger.warning(f"{expired} open orders from earlier sessions are missing from the order book - marked {EXPIRED_STATUS}")
+
+            if changes:
+                await self._apply(changes)
+
+            self.cycles += 1
+            self.orders_updated += len(changes)
+            self.interval = self._next_interval(len(open_orders), len(group_keys))
+            self.last_cycle = {
+                "open_orders": len(open_orders),
+                "order_books": len(group_keys),
+                "fetch_failures": fetch_failures,
+                "orders_updated": len(changes),
+                "orders_expired": expired,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "next_interval_seconds": round(self.interval, 3)
+            }
+            return self.last_cycle
+
+    def stats(self) -> Dict[str, Any]:
+        """Reconciler counters for health reporting"""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self.leader,
+            "cycles": self.cycles,
+            "orders_updated": self.orders_updated,
+            "interval_seconds": round(self.interval, 3),
+            "last_cycle": self.last_cycle
+        }
+
+    def _next_interval(self, open_orders: int, order_books: int) -> float:
+        if not open_orders:
+            return self.idle_interval
+        # Spread one fetch per client over the interval
+        return min(self.max_interval, max(self.min_interval, order_books / self.max_fetches_per_second))
+
+    @staticmethod
+    def _placed_before(order: Any, session_start: datetime) -> bool:
+        if order.order_time is None:
+            return False
+        # SQLite returns naive UTC timestamps
+        order_time = order.order_time if order.order_time.tzinfo else order.order_time.replace(tzinfo=timezone.utc)
+        return order_time < session_start
+
+    @staticmethod
+    def _diff(order: Any, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Row values for the order if the broker reports anything new
+        status = BROKER_STATUS_MAP.get(str(entry.get("orderstatus", "")).strip().lower())
+        if status is None:
+            return None
+
+        filled = _first(entry, "qtytradedtoday", "tradedquantity", "filledquantity")
+        filled_quantity = int(filled) if filled is not None else order.filled_quantity
+
+        average = _first(entry, "averageprice", "averagetradedprice")
+        try:
+            average_price = Decimal(str(average)).quantize(Decimal("0.01")) if average is not None else order.average_price
+        except InvalidOperation:
+            average_price = order.average_price
+        if not filled_quantity:
+            # Brokers report 0 for orders without fills
+            average_price = order.average_price
+
+        if (status, filled_quantity, average_price) == (order.status, order.filled_quantity, order.average_price):
+            return None
+        return {
+            "id": order.id,
+            "status": status,
+            "filled_quantity": filled_quantity,
+            "average_price": average_price
+        }
+
+    @staticmethod
+    def _record_risk(order_id: str, change: Dict[str, Any]) -> None:
+        # Fills move the risk ledger's working quantity into positions
+        average_price = change["average_price"]
+        risk_ledger.record_fill(order_id, change["filled_quantity"] or 0, float(average_price) if average_price else None)
+        if change["status"] != "OPEN":
+            risk_ledger.close_order(order_id)
+
+    @staticmethod
+    async def _apply(changes: List[Dict[str, Any]]) -> None:
+        # One UPDATE for the whole cycle - each column picks its value by row id
+        ids = [change["id"] for change in changes]
+        values = {
+            column: case({change["id"]: change[column] for change in changes}, value=OrderModel.id)
+            for column in ("status", "filled_quantity", "average_price")
+        }
+        async with session_scope() as db:
+            await db.execute(
+                # Rows changed elsewhere since the cycle started (e.g. cancelled) are left alone
+                update(OrderModel)
+                .where(OrderModel.id.in_(ids), OrderModel.status.in_(OPEN_DB_STATUSES))
+                .values(**values),
+                execution_options={"synchronize_session": False}
+            )
+
+    def _bind_loop(self) -> None:
+        # Synchronisation primitives belong to the event loop they are used on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._cycle_lock = asyncio.Lock()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if await self._hold_lease():
+                    await self.reconcile()
+            except Exception as e:
+                logger.error(f"Order reconciliation cycle failed: {e}")
+            await asyncio.sleep(self.interval if self.leader else self.idle_interval)
+
+    async def _hold_lease(self) -> bool:
+        # Only one worker reconciles; the others wait to take over its lease
+        if self.shared_state is None:
+            return True
+        leader = await self.shared_state.acquire_lease(RECONCILER_LEASE, self.lease_seconds)
+        if leader != self.leader:
+            logger.info(f"Order reconciler {'took' if leader else 'lost'} the reconciler lease")
+        self.leader = leader
+        return leader
+
+# Global order reconciler instance
+order_reconciler = OrderReconciler(
+    min_interval=settings.ORDER_RECONCILE_MIN_INTERVAL_SECONDS,
+    max_interval=settings.ORDER_RECONCILE_MAX_INTERVAL_SECONDS,
+    idle_interval=settings.ORDER_RECONCILE_IDLE_INTERVAL_SECONDS,
+    max_fetches_per_second=settings.ORDER_RECONCILE_MAX_FETCHES_PER_SECOND,
+    max_concurrent_fetches=settings.ORDER_RECONCILE_MAX_CONCURRENT_FETCHES,
+    lease_seconds=settings.ORDER_RECONCILE_LEASE_SECONDS,
+    shared_state=shared_state
+)
@@ -0,0 +1,98 @@
+# File: /app/core/order_slicer.py
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+class OrderSlicer:
+    """
+    Splits an order quantity into exchange-compliant child quantities
+
+    Quantities are rounded down to a multiple of the lot size, then split
+    into children of at most the freeze quantity (rounded down to whole
+    lots): full-size children first, then the remainder.
+    """
+
+    def __init__(self, lot_size: int = 1, freeze_quantity: Optional[int] = None, max_children: int = 100):
+        if lot_size < 1:
+            raise ValueError(f"Invalid lot size: {lot_size}")
+        if freeze_quantity is not None and freeze_quantity < lot_size:
+            raise ValueError(f"Freeze quantity {freeze_quantity} is below the lot size {lot_size}")
+        self.lot_size = lot_size
+        self.freeze_quantity = freeze_quantity
+        self.max_children = max_children
+
+    @classmethod
+    def for_instrument(cls, token: Optional[Any], symbol: str) -> "OrderSlicer":
+        """
+        Slicer for an instrument from the instrument master
+
+        The freeze quantity is looked up in ORDER_FREEZE_QUANTITIES by the
+        instrument's symbol, then its name (the underlying for derivatives),
+        then the request symbol.
+
+        Args:
+            token (Optional[Any]): Token model, or None if the instrument is not in the master
+            symbol (str): Trading symbol from the request
+
+        Returns:
+            OrderSlicer: Slicer (lot size 1 and no freeze limit for unknown instruments)
+        """
+        candidates = [token.symbol, token.name, symbol] if token is not None else [symbol]
+        freeze_quantity = next(
+            (settings.ORDER_FREEZE_QUANTITIES[name] for name in candidates if name in settings.ORDER_FREEZE_QUANTITIES),
+            None
+        )
+        return cls(
+            lot_size=(token.lot_size or 1) if token is not None else 1,
+            freeze_quantity=freeze_quantity,
+            max_children=settings.ORDER_SLICE_MAX_CHILDREN
+        )
+
+    @property
+    def max_child_quantity(self) -> Optional[int]:
+        """Largest quantity sent in one child order (None - unlimited)"""
+        if self.freeze_quantity is None:
+            return None
+        return self.freeze_quantity - self.freeze_quantity % self.lot_size
+
+    def round_quantity(self, quantity: int) -> int:
+        """Quantity rounded down to a whole number of lots"""
+        return quantity - quantity % self.lot_size
+
+    def slice(self, quantity: int) -> List[int]:
+        """
+        Child order quantities for a requested quantity
+
+        Args:
+            quantity (int): Requested quantity
+
+        Returns:
+            List[int]: Child quantities (a single element if no split is needed)
+
+        Raises:
+            ValueError: If the quantity is below one lot or needs more than max_children orders
+        """
+        total = self.round_quantity(quantity)
+        if total <= 0:
+            raise ValueError(f"Quantity {quantity} is below the lot size {self.lot_size}")
+
+        child_quantity = self.max_child_quantity
+        if child_quantity is None or total <= child_quantity:
+            return [total]
+
+        full_children, remainder = divmod(total, child_quantity)
+        children = full_children + (1 if remainder else 0)
+        if children > self.max_children:
+            raise ValueError(
+                f"Quantity {quantity} needs {children} orders of at most {child_quantity} "
+                f"(limit {self.max_children})"
+            )
+        return [child_quantity] * full_children + ([remainder] if remainder else [])
+
+    def describe(self) -> Dict[str, Any]:
+        """Slicing parameters for response metadata"""
+        return {
+            "lot_size": self.lot_size,
+            "freeze_quantity": self.freeze_quantity,
+            "max_child_quantity": self.max_child_quantity
+        }
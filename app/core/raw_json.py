@@ -0,0 +1,201 @@
+# File: /app/core/raw_json.py
+import re
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.responses import dumps
+
+logger = logging.getLogger(__name__)
+
+# Structural tokens: a complete JSON string (escapes included) or a bracket.
+# Everything else (numbers, literals, whitespace, separators) is skipped in C.
+_TOKEN_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]', re.DOTALL)
+_COLON_RE = re.compile(rb'\s*:\s*')
+_SCALAR_END_RE = re.compile(rb'\s*[,}\]]')
+_NUMBER_RE = re.compile(rb'\s*:\s*"?\s*(-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)')
+_ROW_START_RE = re.compile(rb'[\[,]\s*\{')
+
+class RawJSON(bytes):
+    """Pre-encoded JSON fragment that is spliced verbatim by encode_with_raw"""
+
+def find_top_level_value(body: bytes, key: str) -> Optional[bytes]:
+    """
+    Slice the value of a top-level key out of a JSON object without parsing it
+
+    Args:
+        body (bytes): JSON object document
+        key (str): Top-level key to find
+
+    Returns:
+        Optional[bytes]: Raw JSON bytes of the value, or None if the key is absent
+    """
+    target = json.dumps(key).encode()
+    depth = 0
+    tokens = _TOKEN_RE.finditer(body)
+
+    for token in tokens:
+        text = token.group()
+        if text in (b"{", b"["):
+            depth += 1
+            continue
+        if text in (b"}", b"]"):
+            depth -= 1
+            continue
+        if depth != 1 or text != target:
+            continue
+
+        # Only a string followed by a colon is a key
+        colon = _COLON_RE.match(body, token.end())
+        if not colon:
+            continue
+        start = colon.end()
+
+        if body[start:start + 1] in (b"{", b"["):
+            # Broker envelopes put a flat array of rows last, so the value
+            # usually ends right before the closing brace of the document.
+            # The candidate holds exactly one "]", so if that is its last byte
+            # the array closes there and only "}" follows it
+            if body[start:start + 1] == b"[":
+                document_end = len(body.rstrip())
+                value_end = len(body[:document_end - 1].rstrip())
+                candidate = body[start:value_end]
+                if (
+                    body[document_end - 1:document_end] == b"}"
+                    and candidate[-1:] == b"]"
+                    and _is_flat_object_array(candidate)
+                ):
+                    return candidate
+            
+            # Otherwise consume tokens until the container closes
+            value_depth = 0
+            for inner in tokens:
+                inner_text = inner.group()
+                if inner_text in (b"{", b"["):
+                    value_depth += 1
+                elif inner_text in (b"}", b"]"):
+                    value_depth -= 1
+                    if value_depth == 0:
+                        return body[start:inner.end()]
+            return None
+
+        if body[start:start + 1] == b'"':
+            string = _TOKEN_RE.match(body, start)
+            return body[start:string.end()] if string else None
+
+        end = _SCALAR_END_RE.search(body, start)
+        return body[start:end.start() if end else len(body)].strip()
+
+    return None
+
+def as_json_array(value: Optional[bytes]) -> RawJSON:
+    """
+    Normalize a raw JSON value to an array, mirroring the wrapper's list handling
+
+    Args:
+        value (Optional[bytes]): Raw JSON value (array, object, null or missing)
+
+    Returns:
+        RawJSON: Raw JSON array
+    """
+    if value is None or value in (b"null", b"", b"{}", b'""', b"false"):
+        return RawJSON(b"[]")
+    if value[:1] == b"[":
+        return RawJSON(value)
+    return RawJSON(b"[" + value + b"]")
+
+def scan_array_fields(array: bytes, fields: Iterable[str]) -> Tuple[int, Dict[str, Decimal]]:
+    """
+    Count the objects in a JSON array and sum numeric fields of each object
+
+    Broker rows are flat objects, so the common case is handled with a few
+    C-level byte counts and one regex pass. Arrays with nested containers
+    fall back to a structural scan so only keys directly on the array
+    elements are summed. Numeric strings are accepted and unparseable
+    values are skipped, like the dict-based summaries.
+
+    Args:
+        array (bytes): Raw JSON array of objects
+        fields (Iterable[str]): Keys whose values should be summed
+
+    Returns:
+        Tuple[int, Dict[str, Decimal]]: Element count and per-field sums
+    """
+    fields = list(fields)
+    sums = {field: Decimal('0') for field in fields}
+    if not fields:
+        return _count_array_objects(array), sums
+
+    field_re = re.compile(
+        rb'"(' + b"|".join(re.escape(json.dumps(field)[1:-1].encode()) for field in fields) + rb')"'
+        + _NUMBER_RE.pattern
+    )
+
+    if _is_flat_object_array(array):
+        count = array.count(b"{")
+        matches = field_re.findall(array)
+    else:
+        count, matches = _scan_nested_array(array, field_re)
+
+    for key, value in matches:
+        try:
+            sums[key.decode()] += Decimal(value.decode())
+        except InvalidOperation:
+            continue
+
+    return count, sums
+
+def _is_flat_object_array(array: bytes) -> bool:
+    """Check that an array holds only flat objects (every brace opens or closes a row)"""
+    if array.count(b"[") != 1 or array.count(b"]") != 1:
+        return False
+    opened = array.count(b"{")
+    return opened == array.count(b"}") and opened == len(_ROW_START_RE.findall(array))
+
+def _count_array_objects(array: bytes) -> int:
+    """Count the objects directly inside a JSON array"""
+    if _is_flat_object_array(array):
+        return array.count(b"{")
+    return _scan_nested_array(array, None)[0]
+
+def _scan_nested_array(array: bytes, field_re: Optional[re.Pattern]) -> Tuple[int, list]:
+    """Structural scan: count depth-2 objects and match fields only at that depth"""
+    count = 0
+    depth = 0
+    matches = []
+
+    for token in _TOKEN_RE.finditer(array):
+        text = token.group()
+        if text in (b"{", b"["):
+            depth += 1
+            if depth == 2 and text == b"{":
+                count += 1
+        elif text in (b"}", b"]"):
+            depth -= 1
+        elif depth == 2 and field_re is not None:
+            match = field_re.match(array, token.start())
+            if match:
+                matches.append(match.groups())
+
+    return count, matches
+
+def encode_with_raw(value: Any) -> bytes:
+    """
+    Encode a value as JSON, splicing RawJSON fragments in without re-encoding
+
+    Args:
+        value (Any): Dicts/lists/scalars, possibly containing RawJSON values
+
+    Returns:
+        bytes: Encoded JSON document
+    """
+    if isinstance(value, RawJSON):
+        return bytes(value)
+    if isinstance(value, dict):
+        return b"{" + b",".join(
+            json.dumps(str(k)).encode() + b":" + encode_with_raw(v) for k, v in value.items()
+        ) + b"}"
+    if isinstance(value, (list, tuple)):
+        return b"[" + b",".join(encode_with_raw(v) for v in value) + b"]"
+    return dumps(value)
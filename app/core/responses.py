@@ -0,0 +1,157 @@
+# File: /app/core/responses.py
+import re
+import json
+import hashlib
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# orjson is optional - fall back to the stdlib encoder when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.warning("orjson not installed. Falling back to stdlib json serialization.")
+
+def _default(value: Any) -> Any:
+    """
+    Encode types the JSON serializers do not handle natively
+
+    Decimals follow FastAPI's jsonable_encoder convention (int when integral,
+    float otherwise) so responses are unchanged by the faster path.
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize content to compact JSON bytes
+
+    Args:
+        content (Any): Dicts/lists/scalars, Decimals, datetimes or Pydantic models
+
+    Returns:
+        bytes: Encoded JSON
+    """
+    if isinstance(content, BaseModel):
+        # Pydantic's own serializer matches response_model output exactly
+        return content.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson (or compact stdlib json)
+
+    Handles Decimal, datetime and Pydantic models natively. Returning an
+    instance directly from a route also skips FastAPI's jsonable_encoder
+    and response_model re-validation.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+# =============================================================================
+# CONDITIONAL GET (ETag / If-None-Match)
+# =============================================================================
+
+# Per-request timestamps change on every call without the data changing,
+# so they are left out of the snapshot version
+_VOLATILE_FIELDS_RE = re.compile(rb'"(?:last_updated|timestamp)":"[^"]*"')
+_ETAG_CODING_RE = re.compile(r'-(?:gzip|br)"$')
+
+NO_CACHE = "no-cache"
+STATIC_CACHE = "public, max-age=86400"
+
+def compute_etag(body: bytes) -> str:
+    """
+    Compute a weak ETag for an encoded JSON snapshot
+
+    The tag is weak because bodies differing only in their timestamps share
+    it - they are the same snapshot, but not byte-for-byte identical.
+
+    Args:
+        body (bytes): Encoded response body
+
+    Returns:
+        str: Weak ETag value (W/"...")
+    """
+    version = _VOLATILE_FIELDS_RE.sub(b"", body)
+    return 'W/"' + hashlib.blake2b(version, digest_size=16).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check whether the request's If-None-Match header matches an ETag
+
+    Uses weak comparison (RFC 9110) and ignores the content-coding suffix
+    added by the compression middleware.
+
+    Args:
+        request (Request): Incoming request
+        etag (str): Current ETag of the resource
+
+    Returns:
+        bool: True if the client's cached copy is current
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque_tag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if _ETAG_CODING_RE.sub('"', candidate) == opaque_tag:
+            return True
+    return False
+
+def conditional_json_response(
+    request: Request,
+    content: Any,
+    cache_control: str = NO_CACHE
+) -> Response:
+    """
+    Encode a JSON snapshot and answer 304 Not Modified if the client has it
+
+    Args:
+        request (Request): Incoming request
+        content (Any): Response content, or an already encoded JSON body
+        cache_control (str): Cache-Control header value
+
+    Returns:
+        Response: 200 with the body and ETag, or an empty 304
+    """
+    body = content if isinstance(content, bytes) else dumps(content)
+    etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,355 @@
+# File: /app/core/risk.py
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.db.database import session_scope
+from app.models.models import Order as OrderModel, Position as PositionModel
+
+logger = logging.getLogger(__name__)
+
+# Daily loss resets at midnight IST
+IST = timezone(timedelta(hours=5, minutes=30))
+
+class RiskLimitError(Exception):
+    """Order rejected by a pre-trade risk limit"""
+
+def instrument_key(exchange: str, token_id: Any) -> str:
+    """Ledger key of an instrument"""
+    return f"{exchange}:{token_id}"
+
+class InstrumentExposure:
+    """A client's position and working orders in one instrument"""
+    __slots__ = ("quantity", "average_price", "mark_price", "unrealized_pnl", "open_buy_quantity", "open_sell_quantity")
+
+    def __init__(self):
+        self.quantity = 0  # Signed net quantity
+        self.average_price = 0.0
+        self.mark_price: Optional[float] = None
+        self.unrealized_pnl = 0.0
+        self.open_buy_quantity = 0
+        self.open_sell_quantity = 0
+
+class ClientRisk:
+    """Running risk totals of one client"""
+    __slots__ = ("max_daily_loss", "max_position_size", "realized_pnl", "unrealized_pnl", "open_order_value", "instruments")
+
+    def __init__(self):
+        self.max_daily_loss: Optional[float] = None
+        self.max_position_size: Optional[float] = None
+        self.realized_pnl = 0.0
+        self.unrealized_pnl = 0.0
+        self.open_order_value = 0.0
+        self.instruments: Dict[str, InstrumentExposure] = {}
+
+class OpenOrder:
+    """Working order reserved against a client's exposure"""
+    __slots__ = ("client_id", "instrument", "side", "quantity", "price", "filled_quantity", "filled_value")
+
+    def __init__(self, client_id: int, instrument: str, side: int, quantity: int, price: Optional[float]):
+        self.client_id = client_id
+        self.instrument = instrument
+        self.side = side  # 1 buy, -1 sell
+        self.quantity = quantity  # Unfilled quantity
+        self.price = price
+        self.filled_quantity = 0
+        self.filled_value = 0.0
+
+class RiskLedger:
+    """
+    In-memory pre-trade risk ledger
+
+    Keeps per-client net positions, realized and unrealized P&L and working
+    order value, so checking an order is a few dictionary lookups. Entry
+    orders are reserved before they are sent - concurrent orders of a batch
+    see each other - and confirmed or released with the outcome. Fills
+    (from order reconciliation) move reserved quantity into positions and
+    prices (fills and marks) revalue open positions.
+
+    Limits come from the client: max_position_size caps the value of the
+    position in any one instrument including working orders, and
+    max_daily_loss blocks new exposure once realized plus unrealized loss
+    reaches it. Orders that reduce a position are never blocked.
+
+    The ledger lives in process memory. With several workers each one only
+    reserves the orders it places, so a client's limits are only enforced
+    across all of its orders in a single-worker deployment.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._clients: Dict[int, ClientRisk] = {}
+        self._orders: Dict[str, OpenOrder] = {}
+        self._holders: Dict[str, Set[int]] = {}
+        self._marks: Dict[str, float] = {}
+        self._day_ends_at = self._next_day_start()
+        self.checks = 0
+        self.rejections = 0
+
+    async def load(self) -> None:
+        """Rebuild the ledger from stored positions and open orders"""
+        async with session_scope() as db:
+            positions = (await db.execute(select(
+                PositionModel.client_id,
+                PositionModel.exchange,
+                PositionModel.token_id,
+                PositionModel.net_quantity,
+                PositionModel.average_price,
+                PositionModel.last_price,
+                PositionModel.realized_pnl
+            ))).all()
+            open_orders = (await db.execute(select(
+                OrderModel.order_id,
+                OrderModel.client_id,
+                OrderModel.exchange,
+                OrderModel.token_id,
+                OrderModel.transaction_type,
+                OrderModel.quantity,
+                OrderModel.filled_quantity,
+                OrderModel.price,
+                OrderModel.average_price
+            ).where(OrderModel.status.in_(("PENDING", "OPEN"))))).all()
+
+        self._clients, self._orders, self._holders, self._marks = {}, {}, {}, {}
+        for position in positions:
+            risk = self._risk(position.client_id)
+            risk.realized_pnl += float(position.realized_pnl or 0)
+            instrument = instrument_key(position.exchange, position.token_id)
+            if position.last_price is not None:
+                self._marks[instrument] = float(position.last_price)
+            if position.net_quantity:
+                exposure = self._exposure(risk, instrument)
+                exposure.quantity += position.net_quantity
+                exposure.average_price = float(position.average_price or 0)
+                self._revalue(position.client_id, risk, instrument, exposure)
+
+        for row in open_orders:
+            order = self._open(
+                row.client_id,
+                instrument_key(row.exchange, row.token_id),
+                1 if row.transaction_type == "BUY" else -1,
+                row.quantity - (row.filled_quantity or 0),
+                float(row.price) if row.price is not None else None
+            )
+            # Fills already in the positions table are not applied again
+            order.filled_quantity = row.filled_quantity or 0
+            order.filled_value = order.filled_quantity * float(row.average_price or 0)
+            self._orders[row.order_id] = order
+
+        logger.info(f"Risk ledger loaded: {len(self._clients)} clients, {len(self._orders)} open orders")
+
+    def reserve(self, client: Any, order: Any, enforce: bool = True) -> OpenOrder:
+        """
+        Check an order against the client's limits and reserve its exposure
+
+        Args:
+            client (Any): Client model (limits are read from it)
+            order (Any): Order to place (OrderCreate)
+            enforce (bool): Apply the limits (False - only track the order, e.g. exits)
+
+        Returns:
+            OpenOrder: Reservation to confirm or release
+
+        Raises:
+            RiskLimitError: If the order would breach a limit
+        """
+        self._roll_day()
+        risk = self._risk(client.id)
+        risk.max_daily_loss = float(client.max_daily_loss) if client.max_daily_loss is not None else None
+        risk.max_position_size = float(client.max_position_size) if client.max_position_size is not None else None
+
+        instrument = instrument_key(order.exchange, order.token_id)
+        side = 1 if order.transaction_type == "BUY" else -1
+        price = order.price or order.trigger_price
+        price = float(price) if price is not None else self._marks.get(instrument)
+
+        if enforce and self.enabled:
+            self.checks += 1
+            exposure = risk.instruments.get(instrument)
+            current = exposure.quantity if exposure else 0
+            if exposure:
+                # Working orders on the same side count as if filled
+                current += exposure.open_buy_quantity if side > 0 else -exposure.open_sell_quantity
+            projected = current + side * order.quantity
+            if abs(projected) > abs(current):
+                if risk.max_daily_loss is not None and risk.realized_pnl + risk.unrealized_pnl <= -risk.max_daily_loss:
+                    self.rejections += 1
+                    raise RiskLimitError(
+                        f"Daily loss limit {risk.max_daily_loss:.2f} reached "
+                        f"(P&L {risk.realized_pnl + risk.unrealized_pnl:.2f})"
+                    )
+                if risk.max_position_size is not None and price and abs(projected) * price > risk.max_position_size:
+                    self.rejections += 1
+                    raise RiskLimitError(
+                        f"Position value {abs(projected) * price:.2f} would exceed the limit {risk.max_position_size:.2f}"
+                    )
+
+        return self._open(client.id, instrument, side, order.quantity, price)
+
+    def confirm(self, reservation: OpenOrder, order_id: str) -> None:
+        """Track a reserved order under its broker order ID once placed"""
+        self._orders[order_id] = reservation
+
+    def release(self, reservation: OpenOrder) -> None:
+        """Drop a reservation whose order was not placed"""
+        self._close(reservation)
+
+    def record_fill(self, order_id: str, filled_quantity: int, average_price: Optional[float]) -> None:
+        """
+        Apply an order's cumulative fill
+
+        Args:
+            order_id (str): Broker order ID (untracked orders are ignored)
+            filled_quantity (int): Total filled quantity so far
+            average_price (Optional[float]): Average price of all fills so far
+        """
+        order = self._orders.get(order_id)
+        if order is None or filled_quantity <= order.filled_quantity:
+            return
+
+        self._roll_day()
+        delta = filled_quantity - order.filled_quantity
+        filled_value = filled_quantity * float(average_price) if average_price else order.filled_value + delta * (order.price or 0)
+        price = (filled_value - order.filled_value) / delta
+        order.filled_quantity = filled_quantity
+        order.filled_value = filled_value
+
+        risk = self._clients[order.client_id]
+        exposure = self._exposure(risk, order.instrument)
+        filled = min(delta, order.quantity)
+        self._adjust_open(risk, exposure, order, -filled)
+        order.quantity -= filled
+
+        quantity = exposure.quantity
+        signed = order.side * delta
+        if quantity == 0 or (quantity > 0) == (signed > 0):
+            exposure.average_price = (abs(quantity) * exposure.average_price + delta * price) / (abs(quantity) + delta)
+        else:
+            closed = min(delta, abs(quantity))
+            risk.realized_pnl += closed * (price - exposure.average_price) * (1 if quantity > 0 else -1)
+            if abs(signed) > abs(quantity):
+                # Position flipped - the remainder opens at the fill price
+                exposure.average_price = price
+        exposure.quantity = quantity + signed
+
+        self._marks[order.instrument] = price
+        self._revalue(order.client_id, risk, order.instrument, exposure)
+
+    def close_order(self, order_id: str) -> None:
+        """Release the unfilled part of a completed, cancelled or rejected order"""
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            self._close(order)
+
+    def last_price(self, instrument: str) -> Optional[float]:
+        """Last known price of an instrument (fills and marks), or None"""
+        return self._marks.get(instrument)
+
+    def mark(self, instrument: str, price: float) -> None:
+        """
+        Revalue every open position in an instrument at a new price
+
+        Args:
+            instrument (str): Instrument key (instrument_key)
+            price (float): Last traded price
+        """
+        self._marks[instrument] = price
+        for client_id in self._holders.get(instrument, ()):
+            risk = self._clients[client_id]
+            self._revalue(client_id, risk, instrument, risk.instruments[instrument])
+
+    def snapshot(self, client_id: int) -> Optional[Dict[str, Any]]:
+        """Ledger state of a client, or None if it has no activity"""
+        risk = self._clients.get(client_id)
+        if risk is None:
+            return None
+        return {
+            "client_id": client_id,
+            "max_daily_loss": risk.max_daily_loss,
+            "max_position_size": risk.max_position_size,
+            "realized_pnl": round(risk.realized_pnl, 2),
+            "unrealized_pnl": round(risk.unrealized_pnl, 2),
+            "open_order_value": round(risk.open_order_value, 2),
+            "instruments": {
+                instrument: {
+                    "quantity": exposure.quantity,
+                    "average_price": round(exposure.average_price, 2),
+                    "mark_price": exposure.mark_price,
+                    "unrealized_pnl": round(exposure.unrealized_pnl, 2),
+                    "open_buy_quantity": exposure.open_buy_quantity,
+                    "open_sell_quantity": exposure.open_sell_quantity
+                }
+                for instrument, exposure in risk.instruments.items()
+            }
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Ledger counters for health reporting"""
+        return {
+            "enabled": self.enabled,
+            "clients": len(self._clients),
+            "open_orders": len(self._orders),
+            "checks": self.checks,
+            "rejections": self.rejections
+        }
+
+    def _risk(self, client_id: int) -> ClientRisk:
+        risk = self._clients.get(client_id)
+        if risk is None:
+            risk = self._clients[client_id] = ClientRisk()
+        return risk
+
+    def _exposure(self, risk: ClientRisk, instrument: str) -> InstrumentExposure:
+        exposure = risk.instruments.get(instrument)
+        if exposure is None:
+            exposure = risk.instruments[instrument] = InstrumentExposure()
+        return exposure
+
+    def _open(self, client_id: int, instrument: str, side: int, quantity: int, price: Optional[float]) -> OpenOrder:
+        order = OpenOrder(client_id, instrument, side, quantity, price)
+        risk = self._risk(client_id)
+        self._adjust_open(risk, self._exposure(risk, instrument), order, quantity)
+        return order
+
+    def _close(self, order: OpenOrder) -> None:
+        risk = self._clients.get(order.client_id)
+        if risk is not None and order.quantity:
+            self._adjust_open(risk, self._exposure(risk, order.instrument), order, -order.quantity)
+            order.quantity = 0
+
+    @staticmethod
+    def _adjust_open(risk: ClientRisk, exposure: InstrumentExposure, order: OpenOrder, quantity: int) -> None:
+        if order.side > 0:
+            exposure.open_buy_quantity += quantity
+        else:
+            exposure.open_sell_quantity += quantity
+        risk.open_order_value += quantity * (order.price or 0)
+
+    def _revalue(self, client_id: int, risk: ClientRisk, instrument: str, exposure: InstrumentExposure) -> None:
+        exposure.mark_price = self._marks.get(instrument, exposure.mark_price)
+        unrealized = (exposure.mark_price - exposure.average_price) * exposure.quantity if exposure.mark_price is not None else 0.0
+        risk.unrealized_pnl += unrealized - exposure.unrealized_pnl
+        exposure.unrealized_pnl = unrealized
+        if exposure.quantity:
+            self._holders.setdefault(instrument, set()).add(client_id)
+        else:
+            self._holders.get(instrument, set()).discard(client_id)
+
+    def _roll_day(self) -> None:
+        # Realized losses count towards one trading day only
+        if time.time() >= self._day_ends_at:
+            for risk in self._clients.values():
+                risk.realized_pnl = 0.0
+            self._day_ends_at = self._next_day_start()
+
+    @staticmethod
+    def _next_day_start() -> float:
+        now = datetime.now(IST)
+        return (now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+
+# Global risk ledger instance
+risk_ledger = RiskLedger(enabled=settings.RISK_CHECKS_ENABLED)
@@ -0,0 +1,141 @@
+# File: /app/core/square_off.py
+import asyncio
+import logging
+from datetime import datetime, time, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Exchanges traded with the commodity credentials
+COMMODITY_EXCHANGES = ("MCX", "NCDEX")
+
+# Starts a square-off run for the given exchanges and scheduled cut-off
+SquareOffRunner = Callable[[List[str], datetime], Awaitable[Any]]
+
+def segment_for_exchange(exchange: str) -> str:
+    """Credential segment used to trade an exchange"""
+    return "commodity" if exchange in COMMODITY_EXCHANGES else "interactive"
+
+def parse_cutoffs(times: Dict[str, str]) -> Dict[time, List[str]]:
+    """
+    Exchanges grouped by square-off time
+
+    Args:
+        times (Dict[str, str]): "HH:MM" cut-off by exchange
+
+    Returns:
+        Dict[time, List[str]]: Exchanges squared off at each time
+
+    Raises:
+        ValueError: If a time is not HH:MM
+    """
+    cutoffs: Dict[time, List[str]] = {}
+    for exchange, at in times.items():
+        cutoffs.setdefault(time.fromisoformat(at), []).append(exchange)
+    return cutoffs
+
+def next_square_off(cutoffs: Dict[time, List[str]], now: datetime) -> Tuple[datetime, List[str]]:
+    """
+    First cut-off after now, on a weekday
+
+    Args:
+        cutoffs (Dict[time, List[str]]): Exchanges by cut-off time
+        now (datetime): Current time in the exchange time zone
+
+    Returns:
+        Tuple[datetime, List[str]]: Run time and the exchanges it squares off
+
+    Raises:
+        ValueError: If no cut-off is configured
+    """
+    for days in range(8):
+        date = (now + timedelta(days=days)).date()
+        if date.weekday() >= 5:
+            continue
+        for at in sorted(cutoffs):
+            run_at = datetime.combine(date, at, tzinfo=now.tzinfo)
+            if run_at > now:
+                return run_at, cutoffs[at]
+    raise ValueError("No square-off time configured")
+
+class SquareOffScheduler:
+    """
+    Daily intraday square-off at each exchange's cut-off time
+
+    Runs on weekdays in the exchange time zone (there is no holiday
+    calendar - a run on a holiday finds nothing to square off). What a run
+    does is up to the registered runner; the scheduler only decides when.
+    Every worker runs its own scheduler, so the runner is handed the cut-off
+    to claim the run against.
+    """
+
+    def __init__(self, times: Dict[str, str], timezone_name: str = "Asia/Kolkata"):
+        self.times = times
+        self.cutoffs = parse_cutoffs(times)
+        self.timezone = ZoneInfo(timezone_name)
+        self.runner: Optional[SquareOffRunner] = None
+        self.next_run_at: Optional[datetime] = None
+        self.next_exchanges: List[str] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the scheduler (no-op if already running or nothing is configured)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Tasks belong to the event loop they are created on
+            self._loop = loop
+            self._task = None
+        if self.cutoffs and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scheduler (a run already started is not interrupted)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.next_run_at = None
+        self.next_exchanges = []
+
+    def now(self) -> datetime:
+        """Current time in the exchange time zone"""
+        return datetime.now(self.timezone)
+
+    def schedule(self) -> Dict[str, Any]:
+        """Configured cut-offs and the next run"""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "timezone": str(self.timezone),
+            "cutoffs": self.times,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "next_exchanges": self.next_exchanges
+        }
+
+    async def _run(self) -> None:
+        while True:
+            self.next_run_at, self.next_exchanges = next_square_off(self.cutoffs, self.now())
+            while (delay := (self.next_run_at - self.now()).total_seconds()) > 0:
+                # Short sleeps keep the schedule right across clock adjustments
+                await asyncio.sleep(min(delay, 60))
+
+            run_at, exchanges = self.next_run_at, self.next_exchanges
+            logger.warning(f"Scheduled square-off for {', '.join(exchanges)}")
+            try:
+                if self.runner is None:
+                    raise RuntimeError("No square-off runner registered")
+                await self.runner(exchanges, run_at)
+            except Exception as e:
+                logger.error(f"Scheduled square-off for {', '.join(exchanges)} failed to start: {e}")
+
+# Global square-off scheduler instance
+square_off_scheduler = SquareOffScheduler(
+    times=settings.SQUARE_OFF_TIMES,
+    timezone_name=settings.SQUARE_OFF_TIMEZONE
+)
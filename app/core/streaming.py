@@ -0,0 +1,85 @@
+# File: /app/core/streaming.py
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+
+from app.core.responses import dumps
+
+logger = logging.getLogger(__name__)
+
+# Supported streaming formats and their media types
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
+STREAM_FORMAT_PATTERN = r'^(ndjson|sse)$'
+
+def encode_ndjson(record: Dict[str, Any]) -> bytes:
+    """
+    Encode a record as one NDJSON line
+
+    Args:
+        record (Dict[str, Any]): Record to encode
+
+    Returns:
+        bytes: JSON document terminated by a newline
+    """
+    return dumps(record) + b"\n"
+
+def encode_sse(record: Dict[str, Any], event: Optional[str] = None) -> bytes:
+    """
+    Encode a record as a Server-Sent Event
+
+    Args:
+        record (Dict[str, Any]): Record to encode as the event data
+        event (Optional[str]): Event name
+
+    Returns:
+        bytes: SSE frame terminated by a blank line
+    """
+    frame = f"event: {event}\n".encode() if event else b""
+    return frame + b"data: " + dumps(record) + b"\n\n"
+
+def streaming_records_response(
+    records: AsyncIterator[Tuple[str, Dict[str, Any]]],
+    stream_format: str = "ndjson"
+) -> StreamingResponse:
+    """
+    Wrap an async iterator of (record_type, payload) tuples in a streaming response
+
+    NDJSON lines carry the record type in a "type" field; SSE frames use it
+    as the event name.
+
+    Args:
+        records (AsyncIterator[Tuple[str, Dict[str, Any]]]): Records to stream
+        stream_format (str): "ndjson" or "sse"
+
+    Returns:
+        StreamingResponse: Response that flushes each record as it is produced
+    """
+    if stream_format not in STREAM_MEDIA_TYPES:
+        raise ValueError(f"Invalid stream format: {stream_format}. Valid formats: {list(STREAM_MEDIA_TYPES)}")
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            async for record_type, payload in records:
+                if stream_format == "sse":
+                    yield encode_sse(payload, event=record_type)
+                else:
+                    yield encode_ndjson({"type": record_type, **payload})
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error(f"Stream aborted: {e}")
+            error = {"error": str(e)}
+            yield encode_sse(error, event="error") if stream_format == "sse" else encode_ndjson({"type": "error", **error})
+
+    return StreamingResponse(
+        body(),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so records flush immediately
+        }
+    )
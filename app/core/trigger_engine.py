@@ -0,0 +1,642 @@
+# File: /app/core/trigger_engine.py
+import asyncio
+import bisect
+import heapq
+import itertools
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, func, or_, select, update
+
+from app.config import settings
+from app.db.database import session_scope
+from app.models.models import ConditionalOrder as ConditionalOrderModel
+from app.core.risk import instrument_key
+
+logger = logging.getLogger(__name__)
+
+TRIGGER_TYPES = ("STOP_LOSS", "TARGET", "TRAILING_STOP")
+
+# Conditional orders waiting for their trigger or for placement
+PENDING_STATUSES = ("ACTIVE", "TRIGGERED")
+
+# Places a triggered order and returns the broker order ID
+ConditionalExecutor = Callable[[ConditionalOrderModel], Awaitable[str]]
+
+def to_price(value: float) -> Decimal:
+    """Price column value (2 decimals) of a float"""
+    return Decimal(str(round(value, 2)))
+
+class TriggerLevels:
+    """
+    Fixed trigger levels of one direction, kept sorted
+
+    A level fires once the observed value is at or below it. Firing is one
+    bisection plus the fired levels, so a tick that crosses nothing costs
+    O(log n) however many levels are pending.
+    """
+
+    def __init__(self):
+        self._levels: List[Tuple[float, int]] = []  # (level, seq), ascending
+        self._items: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def add(self, level: float, seq: int, item: Any) -> None:
+        """Add an item firing at level (seq must be unique)"""
+        bisect.insort(self._levels, (level, seq))
+        self._items[seq] = item
+
+    def remove(self, level: float, seq: int) -> Optional[Any]:
+        """Remove an item, returning it (None if not pending)"""
+        index = bisect.bisect_left(self._levels, (level, seq))
+        if index < len(self._levels) and self._levels[index] == (level, seq):
+            del self._levels[index]
+            return self._items.pop(seq)
+        return None
+
+    def fire(self, value: float) -> List[Tuple[Any, float]]:
+        """Remove and return (item, level) for every level at or above value"""
+        # (value,) sorts before every (value, seq)
+        index = bisect.bisect_left(self._levels, (value,))
+        if index == len(self._levels):
+            return []
+        fired = self._levels[index:]
+        del self._levels[index:]
+        return [(self._items.pop(seq), level) for level, seq in fired]
+
+class _TrailGroup:
+    __slots__ = ("gid", "peak", "trails", "size")
+
+    def __init__(self, gid: int, peak: float):
+        self.gid = gid
+        self.peak = peak
+        self.trails: List[Tuple[float, int]] = []  # Min-heap of (trail, seq), may hold removed entries
+        self.size = 0
+
+class TrailingStops:
+    """
+    Trailing stops of one direction
+
+    A stop fires once the observed value drops its trail below the highest
+    value seen since it was placed (its peak). Stops sharing a peak form a
+    group holding a min-heap of trails, and only each group's nearest level
+    (peak minus smallest trail) is kept in a TriggerLevels. Groups are
+    stacked by peak, highest at the bottom, so a new high lifts exactly the
+    groups at the top of the stack, which merge into one. A tick costs
+    O(log n) plus the stops fired and groups merged - never a pass over
+    every stop to move its level.
+    """
+
+    def __init__(self):
+        self._groups: List[_TrailGroup] = []  # Peaks descending
+        self._keys: List[float] = []  # Negated peaks (ascending) for bisection
+        self._levels = TriggerLevels()
+        self._items: Dict[int, Any] = {}
+        self._group_of: Dict[int, _TrailGroup] = {}
+        self._removed: Set[int] = set()
+        self._gids = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, trail: float, seq: int, item: Any, peak: float) -> None:
+        """Add a stop trailing peak by trail (seq must be unique)"""
+        index = bisect.bisect_left(self._keys, -peak)
+        if index < len(self._groups) and self._groups[index].peak == peak:
+            group = self._groups[index]
+            self._unlist(group)
+        else:
+            group = _TrailGroup(next(self._gids), peak)
+            self._groups.insert(index, group)
+            self._keys.insert(index, -peak)
+        heapq.heappush(group.trails, (trail, seq))
+        group.size += 1
+        self._items[seq] = item
+        self._group_of[seq] = group
+        self._list(group)
+
+    def remove(self, seq: int) -> Optional[Any]:
+        """Remove a stop, returning its item (None if not pending)"""
+        group = self._group_of.pop(seq, None)
+        if group is None:
+            return None
+        self._unlist(group)
+        group.size -= 1
+        self._removed.add(seq)
+        self._settle(group)
+        return self._items.pop(seq)
+
+    def peak_of(self, seq: int) -> Optional[float]:
+        """Current peak of a pending stop"""
+        group = self._group_of.get(seq)
+        return group.peak if group is not None else None
+
+    def observe(self, value: float) -> List[Tuple[Any, float]]:
+        """
+        Raise peaks to value and fire the stops it has fallen to
+
+        Args:
+            value (float): Observed value
+
+        Returns:
+            List[Tuple[Any, float]]: (item, level) of the fired stops (removed)
+        """
+        merged = None
+        while self._groups and self._groups[-1].peak <= value:
+            group = self._groups.pop()
+            self._keys.pop()
+            self._unlist(group)
+            # Merge the smaller heap into the larger one
+            if merged is None or group.size > merged.size:
+                merged, group = group, merged
+            if group is not None:
+                self._absorb(merged, group)
+        if merged is not None:
+            merged.peak = value
+            self._groups.append(merged)
+            self._keys.append(-value)
+            self._list(merged)
+
+        fired = []
+        for group, _ in self._levels.fire(value):
+            while group.trails and group.peak - group.trails[0][0] >= value:
+                trail, seq = heapq.heappop(group.trails)
+                if seq in self._removed:
+                    self._removed.discard(seq)
+                    continue
+                group.size -= 1
+                del self._group_of[seq]
+                fired.append((self._items.pop(seq), group.peak - trail))
+            self._settle(group)
+        return fired
+
+    def _list(self, group: _TrailGroup) -> None:
+        self._levels.add(group.peak - group.trails[0][0], group.gid, group)
+
+    def _unlist(self, group: _TrailGroup) -> None:
+        self._levels.remove(group.peak - group.trails[0][0], group.gid)
+
+    def _absorb(self, group: _TrailGroup, other: _TrailGroup) -> None:
+        for trail, seq in other.trails:
+            if seq in self._removed:
+                self._removed.discard(seq)
+                continue
+            heapq.heappush(group.trails, (trail, seq))
+            self._group_of[seq] = group
+        group.size += other.size
+
+    def _settle(self, group: _TrailGroup) -> None:
+        # Drop removed stops off the top of the heap, then relist the group or retire it
+        while group.trails and group.trails[0][1] in self._removed:
+            self._removed.discard(heapq.heappop(group.trails)[1])
+        if group.size:
+            self._list(group)
+            return
+        index = bisect.bisect_left(self._keys, -group.peak)
+        if index < len(self._groups) and self._groups[index] is group:
+            del self._groups[index]
+            del self._keys[index]
+
+class TriggerBook:
+    """Pending triggers of one instrument"""
+    __slots__ = ("falling", "rising", "trailing_sells", "trailing_buys", "last_price")
+
+    def __init__(self):
+        self.falling = TriggerLevels()  # Fire when the price drops to the level
+        self.rising = TriggerLevels()  # Fire when the price rises to the level (negated)
+        self.trailing_sells = TrailingStops()  # Trail below the high
+        self.trailing_buys = TrailingStops()  # Trail above the low (negated)
+        self.last_price: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.falling) + len(self.rising) + len(self.trailing_sells) + len(self.trailing_buys)
+
+    def on_tick(self, price: float) -> List[Tuple[Any, float]]:
+        """Fire every trigger the price has reached, returning (item, trigger price) pairs"""
+        self.last_price = price
+        fired = self.falling.fire(price) + self.trailing_sells.observe(price)
+        fired.extend((item, -level) for item, level in self.rising.fire(-price) + self.trailing_buys.observe(-price))
+        return fired
+
+def fires_on_fall(order: ConditionalOrderModel) -> bool:
+    """Whether a fixed trigger fires when the price drops to it (sell stops, buy targets)"""
+    return (order.trigger_type == "STOP_LOSS") == (order.transaction_type == "SELL")
+
+class TriggerEngine:
+    """
+    Server-side conditional (GTT) orders driven by price ticks
+
+    Pending triggers live in one TriggerBook per instrument (kept once
+    created, with the instrument's last price) and a tick only touches the
+    levels it crosses. Fired orders are handed to the executor,
+    which places them through the order dispatcher, in background tasks so
+    tick ingestion never waits on the broker. Status changes are written to
+    the conditional_orders table and pending orders are reloaded on
+    startup; trailing stop water marks are saved every flush interval.
+
+    Every worker arms every active trigger: each flush interval the books
+    are synced with the table, picking up orders created or cancelled
+    through other workers and their trailing water marks. A fired order is
+    claimed with a conditional UPDATE before it is placed, so when ticks
+    reach several workers only the first to claim it places it.
+    """
+
+    def __init__(self, flush_interval_seconds: float = 5.0):
+        self.flush_interval = flush_interval_seconds
+        self.execute: Optional[ConditionalExecutor] = None
+        self._books: Dict[str, TriggerBook] = {}
+        self._active: Dict[str, Tuple[ConditionalOrderModel, int]] = {}
+        self._seqs = itertools.count()
+        self._placing: Set[asyncio.Task] = set()
+        self._dispatched: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.fired = 0
+        self.placed = 0
+        self.failed = 0
+
+    async def load(self) -> int:
+        """
+        Rebuild the books from stored pending orders
+
+        Orders triggered before a restart are placed again by whichever
+        worker claims them first; the executor's idempotency key keeps an
+        order that did reach the broker from being placed twice.
+
+        Returns:
+            int: Number of pending orders loaded
+        """
+        async with session_scope() as db:
+            orders = (await db.scalars(
+                select(ConditionalOrderModel).where(ConditionalOrderModel.status.in_(PENDING_STATUSES))
+            )).all()
+
+        self._books, self._active = {}, {}
+        for order in orders:
+            if order.status == "ACTIVE":
+                self._index(order)
+            else:
+                self._dispatch(order, claim_from="TRIGGERED")
+        if orders:
+            logger.info(f"Loaded {len(orders)} pending conditional orders")
+        return len(orders)
+
+    def start(self) -> None:
+        """Start the background flusher (no-op if already running)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Tasks belong to the event loop they are created on
+            self._loop = loop
+            self._task = None
+            self._placing = set()
+            self._dispatched = set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Wait for placements in progress, save trailing stops and stop the flusher"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._placing:
+            await asyncio.gather(*self._placing, return_exceptions=True)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Conditional order flush failed on shutdown: {e}")
+
+    async def add(self, order: ConditionalOrderModel) -> ConditionalOrderModel:
+        """
+        Persist a new conditional order and arm its trigger
+
+        A trigger the last seen price has already crossed fires immediately.
+
+        Args:
+            order (ConditionalOrderModel): Order to add (trailing stops need a reference_price)
+
+        Returns:
+            ConditionalOrderModel: Stored order
+        """
+        order.status = "ACTIVE"
+        async with session_scope() as db:
+            db.add(order)
+
+        self._rearm(order)
+        return order
+
+    async def cancel(self, order_id: str) -> ConditionalOrderModel:
+        """
+        Cancel an active conditional order and disarm it here
+
+        The order may have been created through another worker; it is
+        cancelled only while still ACTIVE in the table, so a trigger that
+        fired first is not cancelled (and a fired trigger that has not been
+        claimed yet will not be placed).
+
+        Args:
+            order_id (str): Conditional order ID
+
+        Returns:
+            ConditionalOrderModel: Cancelled order
+
+        Raises:
+            KeyError: If the order is not active (unknown, triggered or finished)
+        """
+        completed_at = datetime.now(timezone.utc)
+        async with session_scope() as db:
+            result = await db.execute(
+                update(ConditionalOrderModel)
+                .where(ConditionalOrderModel.id == order_id, ConditionalOrderModel.status == "ACTIVE")
+                .values(status="CANCELLED", completed_at=completed_at)
+            )
+            if not result.rowcount:
+                raise KeyError(order_id)
+            # Armed here - or only in the worker it was created through so far
+            order = self._unindex(order_id) if order_id in self._active else await db.get(ConditionalOrderModel, order_id)
+        order.status, order.completed_at = "CANCELLED", completed_at
+        return order
+
+    def on_tick(self, instrument: str, price: float) -> int:
+        """
+        Fire the triggers of an instrument that a price has reached
+
+        Args:
+            instrument (str): Instrument key (see risk.instrument_key)
+            price (float): Traded price
+
+        Returns:
+            int: Number of orders triggered
+        """
+        self.ticks += 1
+        book = self._books.get(instrument)
+        if book is None:
+            return 0
+        return self._fire(book, price)
+
+    def live_levels(self, order_id: str) -> Optional[Dict[str, Decimal]]:
+        """Current reference_price and trigger_price of an armed order, or None if it is not armed"""
+        entry = self._active.get(order_id)
+        if entry is None:
+            return None
+        order, seq = entry
+        if order.trigger_type == "TRAILING_STOP":
+            reference, level = self._trailing_levels(order, seq)
+            return {"reference_price": reference, "trigger_price": level}
+        return {"reference_price": order.reference_price, "trigger_price": order.trigger_price}
+
+    async def flush(self) -> None:
+        """Save moved trailing stop water marks and levels"""
+        updates: Dict[str, List[Dict[str, Any]]] = {"SELL": [], "BUY": []}
+        for order, seq in self._active.values():
+            if order.trigger_type != "TRAILING_STOP":
+                continue
+            reference, level = self._trailing_levels(order, seq)
+            if reference != order.reference_price:
+                order.reference_price, order.trigger_price = reference, level
+                updates[order.transaction_type].append({"b_id": order.id, "b_reference": reference, "b_trigger": level})
+        if not updates["SELL"] and not updates["BUY"]:
+            return
+
+        table = ConditionalOrderModel.__table__
+        async with session_scope() as db:
+            connection = await db.connection()
+            for side, rows in updates.items():
+                if not rows:
+                    continue
+                # Another worker may have saved a further water mark - never move it back
+                further = table.c.reference_price < bindparam("b_reference") if side == "SELL" else table.c.reference_price > bindparam("b_reference")
+                await connection.execute(
+                    table.update()
+                    .where(table.c.id == bindparam("b_id"), or_(table.c.reference_price.is_(None), further))
+                    .values(reference_price=bindparam("b_reference"), trigger_price=bindparam("b_trigger")),
+                    rows
+                )
+
+    async def sync(self) -> int:
+        """
+        Bring the books in line with the table
+
+        Arms orders created through other workers, disarms orders they
+        cancelled or fired, and moves trailing stops up to water marks
+        other workers have saved.
+
+        Returns:
+            int: Number of orders armed, disarmed or moved
+        """
+        async with session_scope() as db:
+            rows = (await db.execute(
+                select(ConditionalOrderModel.id, ConditionalOrderModel.reference_price)
+                .where(ConditionalOrderModel.status == "ACTIVE")
+            )).all()
+            stored = {row.id: row.reference_price for row in rows}
+            # Orders fired here but not yet claimed are still ACTIVE in the table
+            new_ids = [order_id for order_id in stored if order_id not in self._active and order_id not in self._dispatched]
+            new_orders = (await db.scalars(
+                select(ConditionalOrderModel).where(ConditionalOrderModel.id.in_(new_ids))
+            )).all() if new_ids else []
+
+        changes = 0
+        for order_id in [order_id for order_id in self._active if order_id not in stored]:
+            self._unindex(order_id)
+            changes += 1
+
+        for order_id, (order, seq) in list(self._active.items()):
+            reference = stored.get(order_id)
+            # Re-arming can fire other orders of the book
+            if order_id not in self._active or order.trigger_type != "TRAILING_STOP" or reference is None:
+                continue
+            local, _ = self._trailing_levels(order, seq)
+            if (reference > local) if order.transaction_type == "SELL" else (reference < local):
+                self._unindex(order_id)
+                trail = order.trail_amount
+                order.reference_price = reference
+                order.trigger_price = reference - trail if order.transaction_type == "SELL" else reference + trail
+                self._rearm(order)
+                changes += 1
+
+        for order in new_orders:
+            self._rearm(order)
+            changes += 1
+        return changes
+
+    def stats(self) -> Dict[str, Any]:
+        """Engine counters for health reporting"""
+        return {
+            "active": len(self._active),
+            "instruments": len(self._books),
+            "placing": len(self._placing),
+            "ticks": self.ticks,
+            "fired": self.fired,
+            "placed": self.placed,
+            "failed": self.failed
+        }
+
+    def _rearm(self, order: ConditionalOrderModel) -> None:
+        # Arm an order, firing it at once if the last seen price has crossed it
+        book = self._index(order)
+        if book.last_price is not None:
+            self._fire(book, book.last_price)
+
+    def _index(self, order: ConditionalOrderModel) -> TriggerBook:
+        instrument = instrument_key(order.exchange, order.token_id)
+        book = self._books.get(instrument)
+        if book is None:
+            book = self._books[instrument] = TriggerBook()
+
+        seq = next(self._seqs)
+        if order.trigger_type == "TRAILING_STOP":
+            trail, reference = float(order.trail_amount), float(order.reference_price)
+            if order.transaction_type == "SELL":
+                book.trailing_sells.add(trail, seq, order, reference)
+            else:
+                book.trailing_buys.add(trail, seq, order, -reference)
+        elif fires_on_fall(order):
+            book.falling.add(float(order.trigger_price), seq, order)
+        else:
+            book.rising.add(-float(order.trigger_price), seq, order)
+        self._active[order.id] = (order, seq)
+        return book
+
+    def _unindex(self, order_id: str) -> ConditionalOrderModel:
+        order, seq = self._active.pop(order_id)
+        book = self._books[instrument_key(order.exchange, order.token_id)]
+        if order.trigger_type == "TRAILING_STOP":
+            (book.trailing_sells if order.transaction_type == "SELL" else book.trailing_buys).remove(seq)
+        elif fires_on_fall(order):
+            book.falling.remove(float(order.trigger_price), seq)
+        else:
+            book.rising.remove(-float(order.trigger_price), seq)
+        return order
+
+    def _trailing_levels(self, order: ConditionalOrderModel, seq: int) -> Tuple[Decimal, Decimal]:
+        # Water mark and trigger level in prices
+        book = self._books[instrument_key(order.exchange, order.token_id)]
+        trail = float(order.trail_amount)
+        if order.transaction_type == "SELL":
+            high = book.trailing_sells.peak_of(seq)
+            return to_price(high), to_price(high - trail)
+        low = -book.trailing_buys.peak_of(seq)
+        return to_price(low), to_price(low + trail)
+
+    def _fire(self, book: TriggerBook, price: float) -> int:
+        fired = book.on_tick(price)
+        if not fired:
+            return 0
+        now = datetime.now(timezone.utc)
+        for order, level in fired:
+            del self._active[order.id]
+            if order.trigger_type == "TRAILING_STOP":
+                trail = float(order.trail_amount)
+                order.trigger_price = to_price(level)
+                order.reference_price = to_price(level + trail if order.transaction_type == "SELL" else level - trail)
+            order.status = "TRIGGERED"
+            order.triggered_price = to_price(price)
+            order.triggered_at = now
+            self._dispatch(order, claim_from="ACTIVE")
+        self.fired += len(fired)
+        return len(fired)
+
+    def _dispatch(self, order: ConditionalOrderModel, claim_from: str) -> None:
+        self._dispatched.add(order.id)
+        task = asyncio.create_task(self._place(order, claim_from))
+        self._placing.add(task)
+
+        def done(task: asyncio.Task) -> None:
+            self._placing.discard(task)
+            self._dispatched.discard(order.id)
+
+        task.add_done_callback(done)
+
+    async def _claim(self, order: ConditionalOrderModel, claim_from: str) -> bool:
+        # Only the worker whose UPDATE changes the row places the order
+        attempts = order.placement_attempts or 0
+        values = {
+            "status": "TRIGGERED",
+            "placement_attempts": attempts + 1,
+            "triggered_price": order.triggered_price,
+            "triggered_at": order.triggered_at,
+            "reference_price": order.reference_price,
+            "trigger_price": order.trigger_price
+        }
+        try:
+            async with session_scope() as db:
+                result = await db.execute(
+                    update(ConditionalOrderModel)
+                    .where(
+                        ConditionalOrderModel.id == order.id,
+                        ConditionalOrderModel.status == claim_from,
+                        func.coalesce(ConditionalOrderModel.placement_attempts, 0) == attempts
+                    )
+                    .values(**values)
+                )
+        except Exception as e:
+            # The executor's idempotency key still stops a second placement
+            logger.error(f"Could not claim conditional order {order.id} - placing it unclaimed: {e}")
+            return True
+        if not result.rowcount:
+            return False
+        for name, value in values.items():
+            setattr(order, name, value)
+        return True
+
+    async def _place(self, order: ConditionalOrderModel, claim_from: str) -> None:
+        # Saved before placing so a restart mid-placement retries it
+        if not await self._claim(order, claim_from):
+            logger.info(f"Conditional order {order.id} was claimed by another worker or cancelled")
+            return
+
+        expires_at = order.expires_at
+        if expires_at is not None and expires_at.tzinfo is None:
+            # SQLite returns naive timestamps
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at is not None and expires_at <= datetime.now(timezone.utc):
+            await self._record(order, status="EXPIRED", completed_at=datetime.now(timezone.utc))
+            return
+
+        try:
+            if self.execute is None:
+                raise RuntimeError("No conditional order executor registered")
+            broker_order_id = await self.execute(order)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Conditional order {order.id} triggered at {order.triggered_price} but was not placed: {e}")
+            await self._record(order, status="FAILED", error_message=str(e), completed_at=datetime.now(timezone.utc))
+            return
+
+        self.placed += 1
+        logger.info(f"Conditional order {order.id} triggered at {order.triggered_price} - placed {broker_order_id}")
+        await self._record(order, status="PLACED", order_id=broker_order_id, completed_at=datetime.now(timezone.utc))
+
+    async def _save(self, order: ConditionalOrderModel, **values: Any) -> None:
+        for name, value in values.items():
+            setattr(order, name, value)
+        async with session_scope() as db:
+            await db.execute(update(ConditionalOrderModel).where(ConditionalOrderModel.id == order.id).values(**values))
+
+    async def _record(self, order: ConditionalOrderModel, **values: Any) -> None:
+        # Status writes after a trigger must not stop the placement
+        try:
+            await self._save(order, **values)
+        except Exception as e:
+            logger.error(f"Could not save conditional order {order.id} as {values.get('status')}: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Conditional order flush failed: {e}")
+
+# Global trigger engine instance
+trigger_engine = TriggerEngine(flush_interval_seconds=settings.CONDITIONAL_ORDER_FLUSH_INTERVAL_SECONDS)
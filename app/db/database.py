@@ -1,10 +1,86 @@
 # File: /app/db/database.py
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+from uuid import uuid4
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.config import settings
+from app.db.pool_metrics import InstrumentedQueuePool
+
+# Async drivers for the sync URLs used in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite"
+}
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    Convert a sync database URL to its async driver equivalent
+
+    Args:
+        database_url (str): Database URL (e.g. postgresql://... or postgresql+psycopg2://...)
 
-# Create database engine
+    Returns:
+        str: URL using the async driver (e.g. postgresql+asyncpg://...)
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.drivername != ASYNC_DRIVERS[backend]:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    return url.render_as_string(hide_password=False)
+
+def get_async_engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Build async engine keyword arguments from the pool settings
+    
+    SQLite keeps its default pool and ignores the PostgreSQL-only options.
+    
+    Args:
+        database_url (str): Database URL
+        
+    Returns:
+        Dict[str, Any]: Keyword arguments for create_async_engine
+    """
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "echo": settings.DEBUG
+    }
+    if make_url(database_url).get_backend_name() != "postgresql":
+        return options
+    
+    if settings.DB_USE_NULL_POOL:
+        options["poolclass"] = NullPool
+    else:
+        options.update({
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT
+        })
+    
+    connect_args = {}
+    if settings.DB_PGBOUNCER:
+        # PgBouncer hands each transaction to any server connection, so
+        # named prepared statements must not be cached or reused
+        connect_args.update({
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"
+        })
+    elif settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+# Create database engine (sync - used for table creation and scripts)
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
@@ -12,20 +88,66 @@ engine = create_engine(
     echo=settings.DEBUG  # Set to True for SQL query logging in debug mode
 )
 
+# Create async database engine (used by the API)
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    **get_async_engine_options(settings.DATABASE_URL)
+)
+
+if settings.DB_PGBOUNCER and settings.DB_STATEMENT_TIMEOUT_MS and async_engine.dialect.name == "postgresql":
+    # Startup parameters and session SETs don't survive transaction pooling
+    @event.listens_for(async_engine.sync_engine, "begin")
+    def set_statement_timeout(connection):
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create AsyncSessionLocal class
+# Objects stay usable after commit - lazy refreshes are not possible in async code
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class
 Base = declarative_base()
 
 # Dependency to get database session
-def get_db():
+async def get_db() -> AsyncIterator[AsyncSession]:
     """
     Database session dependency for FastAPI.
     This will be used in API endpoints to get database access.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+async def release_connection(db: AsyncSession) -> None:
+    """
+    End the session's transaction and return its connection to the pool
+    
+    Call after loading what a route needs and before slow broker I/O.
+    Loaded objects stay readable, and the session checks out a fresh
+    connection the next time it is used (e.g. for writes).
+    
+    Args:
+        db (AsyncSession): Database session
+    """
+    await db.close()
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """
+    Short-lived session for one unit of work
+    
+    Commits on success, rolls back on error and releases the connection on exit.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
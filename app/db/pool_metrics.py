@@ -0,0 +1,106 @@
+# File: /app/db/pool_metrics.py
+import time
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+class PoolMetrics:
+    """Connection pool checkout, wait-time and overflow statistics"""
+
+    def __init__(self, window: int = 1000):
+        self._recent = deque(maxlen=window)
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all counters"""
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.peak_checked_out = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent.clear()
+
+    def record_checkout(self, seconds: float, checked_out: int, in_overflow: bool) -> None:
+        """
+        Record a completed checkout
+        
+        Args:
+            seconds (float): Time spent waiting for the connection
+            checked_out (int): Connections checked out after this checkout
+            in_overflow (bool): Whether the pool was beyond pool_size
+        """
+        self.checkouts += 1
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+        if in_overflow:
+            self.overflow_checkouts += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+        self._recent.append(seconds)
+
+    def record_timeout(self) -> None:
+        """Record a checkout that gave up waiting (pool_timeout exceeded)"""
+        self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current checkout statistics
+
+        Returns:
+            Dict[str, Any]: Checkout counters and average/p95/max wait in ms
+        """
+        recent = sorted(self._recent)
+        p95 = recent[max(int(len(recent) * 0.95) - 1, 0)] if recent else 0.0
+        return {
+            "checkouts": self.checkouts,
+            "overflow_checkouts": self.overflow_checkouts,
+            "peak_checked_out": self.peak_checked_out,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "p95_wait_ms": round(p95 * 1000, 3),
+            "max_wait_ms": round(self.max_wait * 1000, 3)
+        }
+
+# Global metrics for the API's async engine
+pool_metrics = PoolMetrics()
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waits"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_checkout(
+            time.perf_counter() - start,
+            checked_out=self.checkedout(),
+            in_overflow=self.overflow() > 0
+        )
+        return connection
+
+def pool_status(pool: Pool) -> Dict[str, Any]:
+    """
+    Live pool gauges merged with the recorded checkout statistics
+    
+    Args:
+        pool (Pool): Engine connection pool
+        
+    Returns:
+        Dict[str, Any]: Pool size, checked out/in and overflow connections plus wait times
+    """
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "timeout_seconds": pool.timeout()
+        })
+    status.update(pool_metrics.snapshot())
+    return status
@@ -1,16 +1,77 @@
 # File: /app/main.py
-from fastapi import FastAPI
+import logging
+from fastapi import FastAPI, status
+from sqlalchemy import text
 from app.config import settings
+from app.db.database import async_engine
+from app.db.pool_metrics import pool_status
 from app.api import clients, tokens, portfolio, orders
+from app.core.responses import FastJSONResponse
+from app.core.compression import CompressionMiddleware
+from app.core.order_journal import order_journal
+from app.core.batch_jobs import batch_job_runner
+from app.core.dispatch import order_dispatcher
+from app.core.order_reconciler import order_reconciler
+from app.core.execution_algos import execution_scheduler
+from app.core.risk import risk_ledger
+from app.core.trigger_engine import trigger_engine
+from app.core.square_off import square_off_scheduler
+
+logger = logging.getLogger(__name__)
 
 # Create FastAPI application instance
 app = FastAPI(
     title=settings.PROJECT_NAME,
     debug=settings.DEBUG,
     version="1.0.0",
-    description="Trading Platform API for managing client portfolios and orders"
+    description="Trading Platform API for managing client portfolios and orders",
+    default_response_class=FastJSONResponse
 )
 
+# Compress large JSON responses (streams are passed through)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+
+@app.on_event("startup")
+async def startup():
+    """Recover orders logged while the database was down and start background workers."""
+    await order_journal.replay_log()
+    order_journal.start()
+    # A kill switch engaged before this worker started still halts its entries
+    halt_reason = await order_dispatcher.refresh_halt()
+    if halt_reason is not None:
+        logger.warning(f"Starting with order entries halted: {halt_reason}")
+    try:
+        await risk_ledger.load()
+    except Exception as e:
+        logger.error(f"Risk ledger not loaded - starting empty: {e}")
+    try:
+        await trigger_engine.load()
+    except Exception as e:
+        logger.error(f"Conditional orders not loaded - no triggers armed: {e}")
+    trigger_engine.start()
+    batch_job_runner.start()
+    execution_scheduler.start()
+    if settings.ORDER_RECONCILE_ENABLED:
+        order_reconciler.start()
+    if settings.SQUARE_OFF_ENABLED:
+        square_off_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Persist queued orders before the process exits."""
+    await square_off_scheduler.stop()
+    await order_reconciler.stop()
+    await trigger_engine.stop()
+    await execution_scheduler.stop()
+    await batch_job_runner.stop()
+    await order_journal.stop()
+
 # Include API routers
 app.include_router(clients.router, prefix="/api/v1")
 app.include_router(tokens.router, prefix="/api/v1")
@@ -49,7 +110,30 @@ async def api_health_check():
             "Token Search with Redis Caching",
             "Portfolio Data Integration",
             "Batch Order Execution",
+            "Background Batch Order Jobs",
+            "Order Status Reconciliation",
+            "TWAP/VWAP Execution Algos",
+            "Pre-trade Risk Checks",
+            "Conditional (GTT) Orders",
+            "Scheduled Intraday Square-off",
             "Position Exit Management",
             "Real-time Portfolio Updates"
         ]
-    }
\ No newline at end of file
+    }
+
+@app.get("/api/v1/health/db")
+async def database_health_check():
+    """Database connectivity, live connection pool metrics and order journal counters."""
+    pool = pool_status(async_engine.pool)
+    journal = order_journal.stats()
+    
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return FastJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unhealthy", "error": str(e), "pool": pool, "order_journal": journal}
+        )
+    
+    return {"status": "healthy", "pool": pool, "order_journal": journal}
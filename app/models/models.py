@@ -129,7 +129,7 @@ class Order(Base):
     disclosed_quantity = Column(Integer, default=0)
     
     # Order status and execution
-    status = Column(String(15), index=True, nullable=False)  # PENDING, OPEN, COMPLETE, CANCELLED, REJECTED
+    status = Column(String(15), index=True, nullable=False)  # PENDING, OPEN, COMPLETE, CANCELLED, REJECTED, EXPIRED
     filled_quantity = Column(Integer, default=0)
     average_price = Column(Numeric(10, 2), nullable=True)
     
@@ -292,4 +292,107 @@ class Margin(Base):
     # Unique constraint
     __table_args__ = (
         Index('idx_margin_client_segment_date', 'client_id', 'segment', 'margin_date', unique=True),
-    )
\ No newline at end of file
+    )
+
+class OrderBatch(Base):
+    """Batch order jobs table"""
+    __tablename__ = "order_batches"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    
+    # Trade parameters
+    symbol = Column(String(20), nullable=False)
+    exchange = Column(String(10), nullable=False)
+    order_type = Column(String(10), nullable=False)
+    transaction_type = Column(String(4), nullable=False)
+    request_payload = Column(Text, nullable=False)  # Submitted request as JSON
+    
+    # Job status and progress
+    status = Column(String(15), index=True, nullable=False)  # QUEUED, RUNNING, COMPLETED, FAILED
+    total_orders = Column(Integer, nullable=False)
+    processed_orders = Column(Integer, default=0)
+    successful_orders = Column(Integer, default=0)
+    failed_orders = Column(Integer, default=0)
+    error_message = Column(Text, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Refreshed while a worker holds the job
+    
+    # Relationships
+    items = relationship("OrderBatchItem", back_populates="batch", cascade="all, delete-orphan")
+
+class OrderBatchItem(Base):
+    """Per-client results of batch order jobs"""
+    __tablename__ = "order_batch_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # Foreign key
+    batch_id = Column(String(36), ForeignKey("order_batches.id"), nullable=False)
+    
+    # Execution result
+    client_id = Column(Integer, nullable=False)
+    client_code = Column(String(20), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Numeric(10, 2), nullable=True)
+    success = Column(Boolean, nullable=False)
+    order_id = Column(String(50), nullable=True)
+    error_message = Column(Text, nullable=True)
+    execution_time_ms = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    batch = relationship("OrderBatch", back_populates="items")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_batch_item_batch', 'batch_id', 'id'),
+    )
+
+class ConditionalOrder(Base):
+    """Server-side conditional (GTT) orders table"""
+    __tablename__ = "conditional_orders"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    
+    # Foreign keys
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
+    token_id = Column(Integer, ForeignKey("tokens.id"), nullable=False)
+    
+    # Trigger
+    trigger_type = Column(String(15), nullable=False)  # STOP_LOSS, TARGET, TRAILING_STOP
+    trigger_price = Column(Numeric(10, 2), nullable=True)  # Fixed level; current level for trailing stops
+    trail_amount = Column(Numeric(10, 2), nullable=True)  # Trailing stops only
+    reference_price = Column(Numeric(10, 2), nullable=True)  # Trailing stop high (SELL) or low (BUY) water mark
+    
+    # Order placed when triggered
+    symbol = Column(String(20), nullable=False)
+    exchange = Column(String(10), nullable=False)
+    segment = Column(String(20), default="interactive")  # Credential segment
+    order_type = Column(String(10), nullable=False)  # MKT, LMT
+    transaction_type = Column(String(4), nullable=False)  # BUY, SELL
+    product_type = Column(String(10), nullable=False)  # MIS, CNC, NRML
+    quantity = Column(Integer, nullable=False)
+    price = Column(Numeric(10, 2), nullable=True)  # Limit price
+    is_entry = Column(Boolean, default=False)  # Opens a position (risk checked, halted by the kill switch)
+    
+    # Status
+    status = Column(String(15), index=True, nullable=False)  # ACTIVE, TRIGGERED, PLACED, FAILED, CANCELLED, EXPIRED
+    placement_attempts = Column(Integer, default=0)  # Bumped by every claim, so only one worker places each attempt
+    triggered_price = Column(Numeric(10, 2), nullable=True)
+    order_id = Column(String(50), nullable=True)
+    error_message = Column(Text, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_conditional_client_status', 'client_id', 'status'),
+    )
@@ -129,6 +129,7 @@ class TokenUpdate(BaseModel):
 
 class OrderCreate(OrderBase):
     """Schema for creating a new order"""
+    tag: Optional[str] = Field(None, max_length=20, description="Order tag sent to the broker")
     
     @validator('price')
     def validate_price_for_limit_orders(cls, v, values):
@@ -390,7 +391,7 @@ class UserLogin(BaseModel):
     password: str
     totp_code: Optional[str] = Field(None, pattern=r'^\d{6}$')
 
-class Token(BaseModel):
+class AccessToken(BaseModel):
     """Schema for JWT token response"""
     access_token: str
     token_type: str = "bearer"
@@ -0,0 +1,169 @@
+# File: /benchmarks/bench_serialization.py
+# Per-route serialization benchmark: FastAPI default path vs FastJSONResponse
+#
+# Run from the repository root:
+#     python -m benchmarks.bench_serialization
+
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.responses import FastJSONResponse, orjson
+from app.schemas.schemas import Token, TokenListResponse
+
+RUNS = 30
+
+# =============================================================================
+# SYNTHETIC PAYLOADS
+# =============================================================================
+
+def make_instruments(count: int) -> list:
+    """Instrument rows as returned by the broker/Redis cache"""
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "id": i,
+            "token": str(10000 + i),
+            "symbol": f"SYM{i}",
+            "name": f"Instrument {i} Ltd",
+            "exchange": "NSE",
+            "segment": "EQ",
+            "instrument_type": "EQ",
+            "lot_size": 1,
+            "tick_size": 0.05,
+            "created_at": now
+        }
+        for i in range(count)
+    ]
+
+def make_token_rows(count: int) -> list:
+    """ORM-like token rows for /tokens/local"""
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            id=i, token=str(10000 + i), symbol=f"SYM{i}", name=f"Instrument {i} Ltd",
+            exchange="NSE", segment="EQ", instrument_type="EQ", strike_price=None,
+            option_type=None, expiry_date=None, lot_size=1, tick_size=Decimal("0.05"),
+            is_active=True, created_at=now, updated_at=now
+        )
+        for i in range(count)
+    ]
+
+def make_positions(count: int) -> list:
+    return [
+        {"token": str(10000 + i), "symbol": f"SYM{i}", "quantity": random.randint(-500, 500),
+         "pnl": round(random.uniform(-5000, 5000), 2), "day_pnl": round(random.uniform(-500, 500), 2),
+         "product_type": "MIS"}
+        for i in range(count)
+    ]
+
+def make_holdings(count: int) -> list:
+    return [
+        {"token": str(20000 + i), "symbol": f"HLD{i}", "quantity": random.randint(1, 500),
+         "investment_value": round(random.uniform(1000, 100000), 2),
+         "current_value": round(random.uniform(1000, 100000), 2)}
+        for i in range(count)
+    ]
+
+def make_portfolio_payload() -> dict:
+    summary = {key: Decimal(str(round(random.uniform(-1e5, 1e5), 2))) for key in
+               ("total_pnl", "day_pnl", "total_investment", "current_value", "available_margin", "used_margin")}
+    return {
+        "success": True,
+        "message": "Portfolio data retrieved",
+        "data": {
+            "client_info": {"id": 1, "client_code": "C001", "name": "Client 1"},
+            "summary": summary,
+            "positions": make_positions(200),
+            "holdings": make_holdings(300),
+            "last_updated": datetime.now(timezone.utc).isoformat()
+        }
+    }
+
+def make_batch_payload() -> dict:
+    return {
+        "success": True,
+        "message": "Retrieved portfolio data",
+        "data": {
+            "clients": [
+                {"client_id": i, "client_code": f"C{i:03d}",
+                 "summary": {"total_positions": 20, "total_pnl": random.uniform(-1e4, 1e4)},
+                 "positions": make_positions(20)}
+                for i in range(100)
+            ],
+            "errors": []
+        }
+    }
+
+# =============================================================================
+# BENCHMARK HELPERS
+# =============================================================================
+
+def timed(func) -> float:
+    """Median wall time of func() in milliseconds"""
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def default_dict_path(content: dict) -> bytes:
+    """FastAPI default for dict returns: jsonable_encoder + JSONResponse"""
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+def default_model_path(response_model, build) -> bytes:
+    """FastAPI default for response_model routes: validate, re-validate, encode"""
+    field = create_response_field(name="response", type_=response_model)
+    content = asyncio.run(serialize_response(field=field, response_content=build(), is_coroutine=True))
+    return JSONResponse(content=content).body
+
+def main():
+    instruments = make_instruments(100)
+    token_rows = make_token_rows(1000)
+    portfolio = make_portfolio_payload()
+    batch = make_batch_payload()
+
+    def search_before():
+        return default_model_path(TokenListResponse, lambda: TokenListResponse(
+            success=True, message="ok", data=instruments, total=len(instruments), page=1, per_page=100))
+
+    def local_before():
+        return default_model_path(TokenListResponse, lambda: TokenListResponse(
+            success=True, message="ok", data=[Token.model_validate(row) for row in token_rows],
+            total=len(token_rows), page=1, per_page=1000))
+
+    def local_after():
+        return FastJSONResponse(content=TokenListResponse.model_construct(
+            success=True, message="ok", data=[Token.model_validate(row) for row in token_rows],
+            total=len(token_rows), page=1, per_page=1000)).body
+
+    routes = [
+        ("GET /tokens/search (100 rows)", search_before,
+         lambda: FastJSONResponse(content={"success": True, "message": "ok", "data": instruments,
+                                           "total": len(instruments), "page": 1, "per_page": 100}).body),
+        ("GET /tokens/local (1000 rows)", local_before, local_after),
+        ("GET /portfolio/clients/{id}", lambda: default_dict_path(portfolio),
+         lambda: FastJSONResponse(content=portfolio).body),
+        ("POST /portfolio/clients:batch (100)", lambda: default_dict_path(batch),
+         lambda: FastJSONResponse(content=batch).body),
+    ]
+
+    print(f"Serializer: {'orjson' if orjson else 'stdlib json'}, median of {RUNS} runs\n")
+    print(f"{'Route':<40}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, before, after in routes:
+        before_ms = timed(before)
+        after_ms = timed(after)
+        print(f"{name:<40}{before_ms:>12.2f}{after_ms:>12.2f}{before_ms / after_ms:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# File: /tests/conftest.py
+import os
+import tempfile
+
+# Settings are read at import time - point the app at a throwaway SQLite
+# database before anything from app is imported
+_data_dir = tempfile.mkdtemp(prefix="trading-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir}/test.db"
+os.environ["ORDER_JOURNAL_FALLBACK_PATH"] = f"{_data_dir}/order_journal.jsonl"
+os.environ.setdefault("FERNET_KEY", "TdoXQcLV2wnd1or_hBjmLN1WCTcRlS-xTUNqp2nOxZY=")
+
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.core.coordination import shared_state
+from app.core.idempotency import order_idempotency
+from app.models.models import Base
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands the idempotency store uses"""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+
+    def _live(self, key: str) -> bool:
+        if key in self.expires and self.expires[key] <= time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    async def set(self, key: str, value: Any, nx: bool = False, ex: Optional[int] = None) -> bool:
+        if nx and self._live(key):
+            return False
+        self.values[key] = value
+        if ex is not None:
+            self.expires[key] = time.monotonic() + ex
+        return True
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.values.get(key) if self._live(key) else None
+
+    async def delete(self, key: str) -> int:
+        self.expires.pop(key, None)
+        return 1 if self.values.pop(key, None) is not None else 0
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """Sync engine on the test database, with the schema created"""
+    engine = create_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(autouse=True)
+def shared_redis(monkeypatch) -> FakeRedis:
+    """State shared between worker processes, in an in-memory Redis"""
+    redis = FakeRedis()
+    monkeypatch.setattr(shared_state, "_client", lambda: redis)
+    return redis
+
+@pytest.fixture
+def fake_redis(monkeypatch) -> FakeRedis:
+    """Idempotency store backed by an in-memory Redis"""
+    redis = FakeRedis()
+    monkeypatch.setattr(order_idempotency, "_client", lambda: redis)
+    return redis
+
+@pytest.fixture
+def auth_token() -> SimpleNamespace:
+    """Broker session token returned by the mocked authenticate_client"""
+    return SimpleNamespace(token="test-token")
@@ -0,0 +1,41 @@
+# File: /tests/test_allocation.py
+import random
+
+from app.core.allocation import allocate_lots
+
+def test_equal_weights_split_evenly():
+    assert allocate_lots([(1, 1), (2, 1), (3, 1)], 300) == [(1, 100), (2, 100), (3, 100)]
+
+def test_leftover_lots_go_to_largest_remainders():
+    # Exact shares 3.33, 3.33, 3.33 lots - one leftover lot goes to the first largest remainder
+    allocation = dict(allocate_lots([(1, 1), (2, 1), (3, 1)], 10))
+    assert sum(allocation.values()) == 10
+    assert sorted(allocation.values()) == [3, 3, 4]
+
+def test_proportional_to_weights_in_whole_lots():
+    assert allocate_lots([(1, 3), (2, 1)], 400, lot_size=50) == [(1, 300), (2, 100)]
+
+def test_partial_lot_of_total_is_not_allocated():
+    allocation = allocate_lots([(1, 1), (2, 1)], 130, lot_size=50)
+    assert sum(quantity for _, quantity in allocation) == 100
+
+def test_non_positive_weights_and_empty_allocations_are_dropped():
+    assert allocate_lots([(1, 0), (2, -1), (3, 1)], 10) == [(3, 10)]
+    assert allocate_lots([(1, 1), (2, 100)], 1) == [(2, 1)]
+    assert allocate_lots([(1, 0)], 10) == []
+    assert allocate_lots([(1, 1)], 10, lot_size=25) == []
+
+def test_never_over_allocates_and_stays_within_one_lot_of_exact_share():
+    rng = random.Random(7)
+    for _ in range(500):
+        lot_size = rng.choice([1, 25, 50, 75])
+        weights = [(client_id, rng.uniform(0, 10)) for client_id in range(1, rng.randint(1, 30))]
+        total_quantity = rng.randint(0, 100000)
+        allocation = dict(allocate_lots(weights, total_quantity, lot_size))
+
+        total_lots = total_quantity // lot_size
+        weight_sum = sum(weight for _, weight in weights if weight > 0)
+        assert sum(allocation.values()) == (total_lots * lot_size if weight_sum else 0)
+        for client_id, weight in weights:
+            exact_lots = total_lots * weight / weight_sum if weight > 0 else 0
+            assert abs(allocation.get(client_id, 0) / lot_size - exact_lots) < 1
@@ -0,0 +1,74 @@
+# File: /tests/test_batch_jobs.py
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.api.orders import expire_stale_batch
+from app.config import settings
+from app.core.batch_jobs import BatchJobRunner
+from app.db.database import AsyncSessionLocal
+from app.main import app
+from app.models.models import OrderBatch as OrderBatchModel
+
+def add_batch(engine, status, heartbeat_age_seconds):
+    with Session(engine) as session:
+        batch = OrderBatchModel(
+            symbol="TCS",
+            exchange="NSE",
+            order_type="MKT",
+            transaction_type="BUY",
+            request_payload="{}",
+            status=status,
+            total_orders=2,
+            heartbeat_at=datetime.now(timezone.utc) - timedelta(seconds=heartbeat_age_seconds)
+        )
+        session.add(batch)
+        session.commit()
+        return batch.id
+
+def test_stream_of_a_batch_whose_worker_died_ends_failed(db_engine):
+    batch_id = add_batch(db_engine, "RUNNING", settings.ORDER_BATCH_STALE_SECONDS + 60)
+
+    response = TestClient(app).get(f"/api/v1/orders/batches/{batch_id}/events?format=ndjson")
+
+    assert response.status_code == 200
+    complete = json.loads(response.text.splitlines()[-1])
+    assert complete["type"] == "complete"
+    assert complete["status"] == "FAILED"
+    assert complete["error_message"] == "Worker stopped responding"
+
+@pytest.mark.asyncio
+async def test_batch_with_a_recent_heartbeat_is_not_expired(db_engine):
+    batch_id = add_batch(db_engine, "RUNNING", 0)
+
+    async with AsyncSessionLocal() as db:
+        assert await expire_stale_batch(batch_id, db) is False
+    with Session(db_engine) as session:
+        assert session.get(OrderBatchModel, batch_id).status == "RUNNING"
+
+@pytest.mark.asyncio
+async def test_runner_heartbeats_the_jobs_it_holds():
+    runner = BatchJobRunner(workers=1, heartbeat_interval=0.01)
+    beats = []
+    release = asyncio.Event()
+
+    async def on_heartbeat(batch_ids):
+        beats.append(batch_ids)
+
+    async def job(progress):
+        await release.wait()
+        return {"batch_id": progress.batch_id, "status": "COMPLETED"}
+
+    runner.on_heartbeat = on_heartbeat
+    progress = runner.submit("batch-1", 0, job)
+    await asyncio.sleep(0.05)
+    release.set()
+    async for _ in progress.events():
+        pass
+    await runner.stop()
+
+    assert ["batch-1"] in beats
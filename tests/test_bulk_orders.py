@@ -0,0 +1,116 @@
+# File: /tests/test_bulk_orders.py
+import itertools
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.mofsl_api_wrapper import mofsl_wrapper
+from app.core.order_book_cache import order_book_cache
+from app.core.security import encrypt_data
+from app.main import app
+from app.models.models import Client as ClientModel
+
+INSTRUMENT = "11536"
+
+# Order book IDs are unique across the whole module, so cached books never overlap
+books = itertools.count(1)
+
+@pytest.fixture(scope="module")
+def clients(db_engine):
+    """Two clients whose orders these tests cancel and modify"""
+    with Session(db_engine) as session:
+        for code in ("X001", "X002"):
+            session.add(ClientModel(
+                client_code=code,
+                name=f"Client {code}",
+                email=f"{code.lower()}@example.com",
+                is_active=True,
+                encrypted_mofsl_api_key_interactive=encrypt_data("key"),
+                encrypted_mofsl_secret_key_interactive=encrypt_data("secret"),
+                encrypted_mofsl_user_id_interactive=encrypt_data("user"),
+                encrypted_mofsl_password_interactive=encrypt_data("password")
+            ))
+        session.commit()
+        return session.scalars(select(ClientModel.id).where(ClientModel.client_code.in_(("X001", "X002"))).order_by(ClientModel.id)).all()
+
+@pytest.fixture
+def broker(monkeypatch, auth_token):
+    """Order book per client with an open buy, an open sell and a filled buy"""
+    book = next(books)
+    calls = []
+
+    def order_id(client_code, name):
+        return f"{client_code}-{book}-{name}"
+
+    async def authenticate_client(client, segment="interactive", force_refresh=False):
+        return auth_token
+
+    async def get_order_book(auth_token, client_code):
+        return [
+            {"uniqueorderid": order_id(client_code, "buy"), "orderstatus": "Confirm", "symboltoken": INSTRUMENT, "exchange": "NSE", "transactiontype": "BUY", "producttype": "MIS", "quantity": 10},
+            {"uniqueorderid": order_id(client_code, "sell"), "orderstatus": "Trigger Pending", "symboltoken": INSTRUMENT, "exchange": "NSE", "transactiontype": "SELL", "producttype": "MIS", "quantity": 10},
+            {"uniqueorderid": order_id(client_code, "filled"), "orderstatus": "Traded", "symboltoken": INSTRUMENT, "exchange": "NSE", "transactiontype": "BUY", "producttype": "MIS", "quantity": 10}
+        ]
+
+    async def cancel_order(auth_token, unique_order_id, client_code):
+        calls.append(("cancel", unique_order_id))
+        return True
+
+    async def modify_order(auth_token, unique_order_id, order_modifications, client_code):
+        calls.append(("modify", unique_order_id, order_modifications))
+        return True
+
+    monkeypatch.setattr(mofsl_wrapper, "authenticate_client", authenticate_client)
+    monkeypatch.setattr(mofsl_wrapper, "get_order_book", get_order_book)
+    monkeypatch.setattr(mofsl_wrapper, "cancel_order", cancel_order)
+    monkeypatch.setattr(mofsl_wrapper, "modify_order", modify_order)
+    return order_id, calls
+
+def test_cancel_by_filters_only_touches_matching_open_orders(clients, broker):
+    order_id, calls = broker
+    with TestClient(app) as client:
+        response = client.post("/api/v1/orders/cancel:batch", json={"client_ids": clients, "token_id": INSTRUMENT, "transaction_type": "BUY"})
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    cancelled = sorted(order_id(code, "buy") for code in ("X001", "X002"))
+    assert sorted(call[1] for call in calls) == cancelled
+    assert (data["summary"]["orders_selected"], data["summary"]["orders_succeeded"]) == (2, 2)
+    assert order_book_cache.cached_order(clients[0], "interactive", order_id("X001", "buy"))["orderstatus"] == "Cancelled"
+
+def test_explicit_orders_already_finished_are_skipped(clients, broker):
+    order_id, calls = broker
+    with TestClient(app) as client:
+        response = client.post("/api/v1/orders/cancel:batch", json={"order_ids": [
+            {"client_id": clients[0], "order_id": order_id("X001", "sell")},
+            {"client_id": clients[0], "order_id": order_id("X001", "filled")}
+        ]})
+
+    summary = response.json()["data"]["summary"]
+    assert calls == [("cancel", order_id("X001", "sell"))]
+    assert (summary["orders_succeeded"], summary["orders_skipped"], summary["orders_failed"]) == (1, 1, 0)
+
+def test_modify_applies_the_same_change_to_every_selected_order(clients, broker):
+    order_id, calls = broker
+    with TestClient(app) as client:
+        response = client.post("/api/v1/orders/modify:batch", json={"client_ids": clients, "statuses": ["trigger pending"], "price": "101.5"})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["summary"]["orders_succeeded"] == 2
+    assert sorted(calls) == [("modify", order_id(code, "sell"), {"price": Decimal("101.5")}) for code in ("X001", "X002")]
+
+def test_dry_run_reports_without_calling_the_broker(clients, broker):
+    _, calls = broker
+    with TestClient(app) as client:
+        response = client.post("/api/v1/orders/cancel:batch", json={"client_ids": clients, "dry_run": True})
+
+    assert response.json()["data"]["summary"]["orders_selected"] == 4
+    assert calls == []
+
+@pytest.mark.parametrize("selection", [{}, {"client_ids": [1], "order_ids": [{"client_id": 1, "order_id": "1"}]}])
+def test_orders_must_be_selected_one_way(selection):
+    response = TestClient(app).post("/api/v1/orders/cancel:batch", json=selection)
+    assert response.status_code == 422
@@ -0,0 +1,152 @@
+# File: /tests/test_dispatch.py
+import asyncio
+
+import pytest
+
+from app.core.coordination import SharedState
+from app.core.dispatch import DispatchPriority, OrderDispatcher, TradingHaltedError
+
+def recording(started, name, gate=None):
+    """Operation that logs its start and optionally waits on a gate"""
+    async def operation():
+        started.append(name)
+        if gate is not None:
+            await gate.wait()
+        return name
+    return operation
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_higher_priorities_are_served_first_when_capacity_frees():
+    dispatcher = OrderDispatcher(max_concurrent=1, reserved_priority_slots=0)
+    started, gate = [], asyncio.Event()
+    blocker = asyncio.create_task(dispatcher.submit(recording(started, "blocker", gate), DispatchPriority.ENTRY, 0))
+    await settle()
+
+    tasks = [
+        asyncio.create_task(dispatcher.submit(recording(started, name), priority, client))
+        for name, priority, client in [
+            ("entry", DispatchPriority.ENTRY, 1),
+            ("exit", DispatchPriority.EXIT, 1),
+            ("kill", DispatchPriority.KILL_SWITCH, 2),
+            ("cancel", DispatchPriority.CANCEL, 3),
+        ]
+    ]
+    await settle()
+    assert started == ["blocker"]
+
+    gate.set()
+    assert await asyncio.gather(*tasks) == ["entry", "exit", "kill", "cancel"]
+    await blocker
+    assert started == ["blocker", "kill", "cancel", "exit", "entry"]
+
+@pytest.mark.asyncio
+async def test_entries_never_take_the_reserved_slots():
+    dispatcher = OrderDispatcher(max_concurrent=2, reserved_priority_slots=1)
+    started, gate = [], asyncio.Event()
+    entries = [
+        asyncio.create_task(dispatcher.submit(recording(started, f"entry-{n}", gate), DispatchPriority.ENTRY, n))
+        for n in range(2)
+    ]
+    await settle()
+    assert started == ["entry-0"]
+
+    # An exit arriving during the entry spike starts at once
+    exit_task = asyncio.create_task(dispatcher.submit(recording(started, "exit", gate), DispatchPriority.EXIT, 9))
+    await settle()
+    assert started == ["entry-0", "exit"]
+
+    gate.set()
+    await asyncio.gather(exit_task, *entries)
+    assert started[-1] == "entry-1"
+
+@pytest.mark.asyncio
+async def test_clients_are_served_round_robin_within_a_priority():
+    dispatcher = OrderDispatcher(max_concurrent=2, reserved_priority_slots=1)
+    started, gate = [], asyncio.Event()
+    blocker = asyncio.create_task(dispatcher.submit(recording(started, "blocker", gate), DispatchPriority.ENTRY, 0))
+    await settle()
+
+    tasks = [
+        asyncio.create_task(dispatcher.submit(recording(started, f"{client}-{n}"), DispatchPriority.ENTRY, client))
+        for client in ("a", "b") for n in range(3)
+    ]
+    await settle()
+    gate.set()
+    await asyncio.gather(blocker, *tasks)
+    assert started[1:] == ["a-0", "b-0", "a-1", "b-1", "a-2", "b-2"]
+
+@pytest.mark.asyncio
+async def test_exchange_pool_limits_concurrency():
+    dispatcher = OrderDispatcher(max_concurrent=10, reserved_priority_slots=0, exchange_limits={"BSE": 1})
+    started, gate = [], asyncio.Event()
+    tasks = [
+        asyncio.create_task(dispatcher.submit(recording(started, f"bse-{n}", gate), DispatchPriority.EXIT, n, "BSE"))
+        for n in range(3)
+    ]
+    tasks.append(asyncio.create_task(dispatcher.submit(recording(started, "nse", gate), DispatchPriority.EXIT, 9, "NSE")))
+    await settle()
+    assert sorted(started) == ["bse-0", "nse"]
+    gate.set()
+    await asyncio.gather(*tasks)
+    assert dispatcher.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_halt_rejects_new_entries_and_fails_queued_ones():
+    dispatcher = OrderDispatcher(max_concurrent=2, reserved_priority_slots=1)
+    started, gate = [], asyncio.Event()
+    running = asyncio.create_task(dispatcher.submit(recording(started, "running", gate), DispatchPriority.ENTRY, 1))
+    await settle()
+    queued = asyncio.create_task(dispatcher.submit(recording(started, "queued"), DispatchPriority.ENTRY, 2))
+    await settle()
+
+    assert await dispatcher.halt_entries("test") == 1
+    with pytest.raises(TradingHaltedError):
+        await queued
+    with pytest.raises(TradingHaltedError):
+        await dispatcher.submit(recording(started, "new entry"), DispatchPriority.ENTRY, 3)
+
+    # Exits, cancels and entries already at the broker are unaffected
+    assert await dispatcher.submit(recording(started, "exit"), DispatchPriority.EXIT, 3) == "exit"
+    gate.set()
+    assert await running == "running"
+
+    await dispatcher.resume_entries()
+    assert await dispatcher.submit(recording(started, "after resume"), DispatchPriority.ENTRY, 3) == "after resume"
+    assert "queued" not in started and "new entry" not in started
+
+@pytest.mark.asyncio
+async def test_halt_is_shared_by_every_worker(monkeypatch, fake_redis):
+    state = SharedState("redis://unused")
+    monkeypatch.setattr(state, "_client", lambda: fake_redis)
+    engaged = OrderDispatcher(max_concurrent=2, reserved_priority_slots=1, shared_state=state)
+    other = OrderDispatcher(max_concurrent=2, reserved_priority_slots=1, shared_state=state)
+    started = []
+
+    await engaged.halt_entries("kill switch engaged")
+    with pytest.raises(TradingHaltedError):
+        await other.submit(recording(started, "other worker entry"), DispatchPriority.ENTRY, 1)
+    assert other.halt_reason == "kill switch engaged"
+
+    # A worker started after the engagement reads the halt on startup
+    restarted = OrderDispatcher(shared_state=state)
+    assert await restarted.refresh_halt() == "kill switch engaged"
+
+    await engaged.resume_entries()
+    assert await other.submit(recording(started, "after resume"), DispatchPriority.ENTRY, 1) == "after resume"
+    assert started == ["after resume"]
+
+@pytest.mark.asyncio
+async def test_operation_errors_reach_the_caller_and_free_the_slot():
+    dispatcher = OrderDispatcher(max_concurrent=1, reserved_priority_slots=0)
+
+    async def failing():
+        raise ValueError("rejected")
+
+    with pytest.raises(ValueError, match="rejected"):
+        await dispatcher.submit(failing, DispatchPriority.ENTRY, 1)
+    assert dispatcher.stats()["in_flight"] == 0
+    assert await dispatcher.submit(recording([], "next"), DispatchPriority.ENTRY, 1) == "next"
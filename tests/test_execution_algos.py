@@ -0,0 +1,103 @@
+# File: /tests/test_execution_algos.py
+import asyncio
+
+import pytest
+
+from app.core.execution_algos import AlgoExecution, ExecutionScheduler, SimulatedClock, TimerWheel, plan_slices
+
+def test_wheel_fires_timers_in_deadline_order():
+    wheel = TimerWheel(tick_seconds=1.0, slots=4)
+    fired = []
+    wheel.schedule(2.5, lambda: fired.append("late"))
+    wheel.schedule(0.2, lambda: fired.append("early"))
+
+    # Delays round up to whole ticks
+    assert wheel.advance(0.9) == 0
+    assert wheel.advance(1.0) == 1
+    assert wheel.advance(3.0) == 1
+    assert fired == ["early", "late"]
+    assert len(wheel) == 0
+
+def test_wheel_keeps_timers_more_than_one_revolution_away():
+    wheel = TimerWheel(tick_seconds=1.0, slots=4)
+    fired = []
+    wheel.schedule(6, lambda: fired.append("far"))
+    wheel.schedule(2, lambda: fired.append("near"))
+
+    # Both land in slot 2 - the far timer waits for its own tick
+    assert wheel.advance(5.0) == 1
+    assert fired == ["near"]
+    assert wheel.advance(6.0) == 1
+    assert fired == ["near", "far"]
+
+def test_cancelled_timers_never_fire():
+    wheel = TimerWheel(tick_seconds=0.5, slots=8)
+    fired = []
+    timer = wheel.schedule(1.0, lambda: fired.append("cancelled"))
+    timer.cancel()
+
+    assert wheel.advance(10.0) == 0
+    assert fired == []
+    assert len(wheel) == 0
+
+def test_twap_and_vwap_split_every_client_across_the_window():
+    twap = plan_slices("TWAP", {1: 30, 2: 60}, 60, 3)
+    assert [algo_slice.offset_seconds for algo_slice in twap] == [0, 20, 40]
+    assert [algo_slice.quantities for algo_slice in twap] == [{1: 10, 2: 20}] * 3
+
+    vwap = plan_slices("VWAP", {1: 100}, 60, 2, volume_profile=[3, 1])
+    assert [algo_slice.quantities for algo_slice in vwap] == [{1: 75}, {1: 25}]
+
+@pytest.mark.asyncio
+async def test_pausing_shifts_the_remaining_slices_on_a_simulated_clock():
+    clock = SimulatedClock()
+    scheduler = ExecutionScheduler(tick_seconds=1.0, slots=8, clock=clock)
+    executed = []
+
+    async def execute(algo_slice):
+        executed.append((algo_slice.index, clock.now()))
+        return [{"success": True, "quantity": quantity} for quantity in algo_slice.quantities.values()]
+
+    execution = scheduler.submit(AlgoExecution("TWAP", plan_slices("TWAP", {1: 30, 2: 60}, 60, 3), execute))
+    # Let the wheel task start sleeping on the clock
+    await asyncio.sleep(0)
+    await clock.advance(1)
+    assert executed == [(0, 1.0)]
+
+    scheduler.pause(execution.id)
+    await clock.advance(30)
+    assert len(executed) == 1
+
+    # Slice 1 was due at 20s - 30s paused moves it to 50s
+    scheduler.resume(execution.id)
+    await clock.advance(18)
+    assert len(executed) == 1
+    await clock.advance(1)
+    assert executed[-1] == (1, 50.0)
+
+    scheduler.cancel(execution.id)
+    await clock.advance(60)
+    snapshot = execution.snapshot()
+    await scheduler.stop()
+
+    assert len(executed) == 2
+    assert snapshot["status"] == "CANCELLED"
+    assert (snapshot["executed_slices"], snapshot["executed_quantity"], snapshot["paused_seconds"]) == (2, 60, 30.0)
+
+@pytest.mark.asyncio
+async def test_execution_completes_after_its_last_slice():
+    clock = SimulatedClock()
+    scheduler = ExecutionScheduler(tick_seconds=1.0, slots=8, clock=clock)
+
+    async def execute(algo_slice):
+        return [{"success": True, "quantity": quantity} for quantity in algo_slice.quantities.values()]
+
+    execution = scheduler.submit(AlgoExecution("TWAP", plan_slices("TWAP", {1: 20}, 10, 2), execute))
+    await asyncio.sleep(0)
+    await clock.advance(11)
+    await scheduler.stop()
+
+    assert execution.status == "COMPLETED"
+    assert execution.snapshot()["executed_quantity"] == 20
+    with pytest.raises(ValueError):
+        scheduler.pause(execution.id)
@@ -0,0 +1,93 @@
+# File: /tests/test_margin_cache.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.margin_cache import MarginCache, parse_margin_summary
+from app.core.mofsl_api_wrapper import mofsl_wrapper
+
+CLIENT = SimpleNamespace(id=1, client_code="M001")
+
+@pytest.fixture
+def broker(monkeypatch, auth_token):
+    """Broker reporting 10,000 of available margin, counting fetches"""
+    fetches = []
+
+    async def authenticate_client(client, segment="interactive", force_refresh=False):
+        return auth_token
+
+    async def get_margin_summary(auth_token, client_code):
+        fetches.append(client_code)
+        await asyncio.sleep(0)
+        return [
+            {"particulars": "Total Available Margin", "amount": "10000"},
+            {"particulars": "Total Margin Used", "amount": "2500.50"}
+        ]
+
+    monkeypatch.setattr(mofsl_wrapper, "authenticate_client", authenticate_client)
+    monkeypatch.setattr(mofsl_wrapper, "get_margin_summary", get_margin_summary)
+    return fetches
+
+def test_summary_figures_are_read_from_either_layout():
+    assert parse_margin_summary([{"particulars": " Available Margin ", "amount": "1500.25"}]) == {"available_margin": 1500.25, "used_margin": None}
+    assert parse_margin_summary([{"availablemargin": "", "Available Funds": 800, "usedmargin": "n/a"}]) == {"available_margin": 800.0, "used_margin": None}
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_fetch(broker):
+    cache = MarginCache(ttl_seconds=30)
+
+    snapshots = await asyncio.gather(*(cache.get(CLIENT) for _ in range(5)))
+    await cache.get(CLIENT)
+
+    assert broker == ["M001"]
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+    assert (snapshots[0].available_margin, snapshots[0].used_margin) == (10000.0, 2500.5)
+
+@pytest.mark.asyncio
+async def test_in_flight_orders_are_deducted_from_the_estimate(broker):
+    cache = MarginCache(requirement_rates={"MIS": 0.2})
+    await cache.get(CLIENT)
+
+    # 100 x 200 x 0.2 = 4000 each - the third order no longer fits
+    checks = cache.check_orders("interactive", [(1, 100, 200.0, "BUY", "MIS")] * 3)
+
+    assert [check.quantity for check in checks] == [100, 100, 0]
+    assert checks[2].error == "Insufficient margin: requires 4000.00, available 2000.00"
+    assert cache.available(1, "interactive") == 2000.0
+
+    cache.release(checks[1].reservation)
+    assert cache.available(1, "interactive") == 6000.0
+
+@pytest.mark.asyncio
+async def test_unaffordable_orders_are_resized_to_whole_lots(broker):
+    cache = MarginCache(requirement_rates={"NRML": 0.1})
+    await cache.get(CLIENT)
+
+    # 10,000 covers 1,000 units at 100 x 0.1 - 990 in lots of 30
+    [check] = cache.check_orders("interactive", [(1, 1200, 100.0, "BUY", "NRML")], lot_size=30, resize=True)
+
+    assert (check.quantity, check.requirement, check.error) == (990, 9900.0, None)
+    assert cache.stats()["resizes"] == 1
+
+@pytest.mark.asyncio
+async def test_orders_without_a_price_or_cached_margin_are_not_checked(broker):
+    cache = MarginCache()
+    checks = cache.check_orders("interactive", [(1, 10 ** 6, 100.0, "BUY", "MIS")])
+    await cache.get(CLIENT)
+    checks += cache.check_orders("interactive", [(1, 10 ** 6, None, "BUY", "MIS"), (1, 10 ** 6, 100.0, "SELL", "CNC")])
+
+    assert [(check.quantity, check.error) for check in checks] == [(10 ** 6, None)] * 3
+    assert cache.reserved(1, "interactive") == 0
+
+@pytest.mark.asyncio
+async def test_a_fresh_broker_figure_replaces_earlier_reservations(broker):
+    cache = MarginCache(requirement_rates={"MIS": 1.0})
+    await cache.get(CLIENT)
+    cache.check_orders("interactive", [(1, 10, 300.0, "BUY", "MIS")])
+    assert cache.reserved(1, "interactive") == 3000.0
+
+    await cache.get(CLIENT, max_age=0)
+
+    assert cache.reserved(1, "interactive") == 0
+    assert cache.available(1, "interactive") == 10000.0
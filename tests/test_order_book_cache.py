@@ -0,0 +1,77 @@
+# File: /tests/test_order_book_cache.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.mofsl_api_wrapper import mofsl_wrapper
+from app.core.order_book_cache import OrderBookCache, is_terminal_order
+
+CLIENT = SimpleNamespace(id=1, client_code="B001")
+
+@pytest.fixture
+def broker(monkeypatch, auth_token):
+    """Broker order book with one open order, counting fetches"""
+    book = [{"uniqueorderid": "1001", "orderstatus": "Confirm", "orderqty": 10}]
+    fetches = []
+
+    async def authenticate_client(client, segment="interactive", force_refresh=False):
+        return auth_token
+
+    async def get_order_book(auth_token, client_code):
+        fetches.append(client_code)
+        await asyncio.sleep(0)
+        return [dict(entry) for entry in book]
+
+    monkeypatch.setattr(mofsl_wrapper, "authenticate_client", authenticate_client)
+    monkeypatch.setattr(mofsl_wrapper, "get_order_book", get_order_book)
+    return SimpleNamespace(book=book, fetches=fetches)
+
+@pytest.mark.asyncio
+async def test_status_lookups_are_served_from_one_shared_fetch(broker):
+    cache = OrderBookCache(ttl_seconds=30)
+
+    lookups = await asyncio.gather(*(cache.get_order(CLIENT, "interactive", "1001") for _ in range(5)))
+    entry, age = await cache.get_order(CLIENT, "interactive", "1001")
+
+    assert broker.fetches == ["B001"]
+    assert all(found["orderstatus"] == "Confirm" for found, _ in lookups)
+    assert entry["orderqty"] == 10 and age >= 0
+    assert cache.stats()["shared_fetches"] == 4
+
+@pytest.mark.asyncio
+async def test_forced_refresh_and_unknown_orders_fetch_the_book_again(broker):
+    cache = OrderBookCache(ttl_seconds=30)
+    await cache.get_book(CLIENT)
+    broker.book.append({"uniqueorderid": "1002", "orderstatus": "Confirm"})
+
+    entry, _ = await cache.get_order(CLIENT, "interactive", "1002")
+    assert entry is not None
+    broker.book[0]["orderstatus"] = "Traded"
+    entry, _ = await cache.get_order(CLIENT, "interactive", "1001", force_refresh=True)
+
+    assert is_terminal_order(entry)
+    assert len(broker.fetches) == 3
+
+@pytest.mark.asyncio
+async def test_our_placements_and_cancels_patch_the_cached_book(broker):
+    cache = OrderBookCache(ttl_seconds=30)
+    # Nothing cached yet - nothing to patch
+    cache.record_order(1, "interactive", {"uniqueorderid": "2001", "orderstatus": "Pending"})
+    assert cache.cached_order(1, "interactive", "2001") is None
+
+    await cache.get_book(CLIENT)
+    cache.record_order(1, "interactive", {"uniqueorderid": "2001", "orderstatus": "Pending"})
+    cache.record_cancel(1, "interactive", "1001")
+
+    assert cache.cached_order(1, "interactive", "2001")["orderstatus"] == "Pending"
+    assert cache.cached_order(1, "interactive", "1001") == {"uniqueorderid": "1001", "orderstatus": "Cancelled", "orderqty": 10}
+    assert len(broker.fetches) == 1
+
+def test_least_recently_used_books_are_evicted():
+    cache = OrderBookCache(max_clients=2)
+    for client_id in (1, 2, 3):
+        cache.store(client_id, "interactive", [{"order_id": f"{client_id}-1", "orderstatus": "Confirm"}])
+
+    assert cache.cached_order(1, "interactive", "1-1") is None
+    assert cache.cached_order(3, "interactive", "3-1") is not None
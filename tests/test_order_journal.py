@@ -0,0 +1,98 @@
+# File: /tests/test_order_journal.py
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core import order_journal as journal_module
+from app.core.order_journal import OrderJournal
+from app.models.models import Order as OrderModel
+
+order_numbers = itertools.count(1)
+
+def order_row(**overrides):
+    row = {
+        "order_id": f"JOURNAL{next(order_numbers)}",
+        "client_id": 1,
+        "token_id": 1,
+        "order_type": "MKT",
+        "transaction_type": "BUY",
+        "product_type": "MIS",
+        "quantity": 1,
+        "exchange": "NSE",
+        "status": "PENDING"
+    }
+    row.update(overrides)
+    return row
+
+def saved(engine, order_ids):
+    with Session(engine) as session:
+        return set(session.scalars(select(OrderModel.order_id).where(OrderModel.order_id.in_(order_ids))).all())
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as log:
+        return [json.loads(line) for line in log]
+
+@pytest.fixture
+def journal(tmp_path):
+    return OrderJournal(
+        flush_interval_ms=5,
+        fallback_path=str(tmp_path / "journal.jsonl"),
+        quarantine_path=str(tmp_path / "rejected.jsonl")
+    )
+
+@pytest.mark.asyncio
+async def test_bad_row_is_quarantined_without_failing_the_batch(db_engine, journal):
+    existing = order_row()
+    rows = [order_row(), order_row(order_id=existing["order_id"]), order_row()]
+
+    await journal.wait([journal.submit(existing)])
+    assert await journal.wait([journal.submit(row) for row in rows]) == 0
+
+    assert saved(db_engine, [rows[0]["order_id"], rows[2]["order_id"]]) == {rows[0]["order_id"], rows[2]["order_id"]}
+    assert [row["order_id"] for row in read_lines(journal.quarantine_path)] == [existing["order_id"]]
+    assert not os.path.exists(journal.fallback_path)
+    assert (journal.rows_written, journal.rows_quarantined) == (3, 1)
+    await journal.stop()
+
+@pytest.mark.asyncio
+async def test_rows_are_logged_while_the_database_is_down_and_replayed(db_engine, journal, monkeypatch):
+    @contextlib.asynccontextmanager
+    async def unavailable():
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+        yield
+
+    rows = [order_row(), order_row()]
+    with monkeypatch.context() as patch:
+        patch.setattr(journal_module, "session_scope", unavailable)
+        assert await journal.wait([journal.submit(row) for row in rows]) == 0
+    await journal.stop()
+    assert journal.rows_logged == 2
+    assert saved(db_engine, [row["order_id"] for row in rows]) == set()
+
+    assert await journal.replay_log() == 2
+    assert saved(db_engine, [row["order_id"] for row in rows]) == {row["order_id"] for row in rows}
+    assert not os.path.exists(journal.fallback_path)
+
+@pytest.mark.asyncio
+async def test_replay_quarantines_bad_rows_and_skips_torn_lines(db_engine, journal):
+    good, bad, already_saved = order_row(price="101.50"), order_row(quantity=None), order_row()
+    await journal.wait([journal.submit(already_saved)])
+
+    with open(journal.fallback_path, "w", encoding="utf-8") as log:
+        for row in (good, bad, already_saved):
+            log.write(json.dumps(row) + "\n")
+        # A crash cut the last write short
+        log.write('{"order_id": "JOURNAL-TORN", "client_id"')
+
+    assert await journal.replay_log() == 1
+    assert saved(db_engine, [good["order_id"], bad["order_id"]]) == {good["order_id"]}
+    assert [row["order_id"] for row in read_lines(journal.quarantine_path)] == [bad["order_id"]]
+    assert not os.path.exists(journal.fallback_path)
+    await journal.stop()
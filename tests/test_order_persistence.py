@@ -0,0 +1,173 @@
+# File: /tests/test_order_persistence.py
+import itertools
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.mofsl_api_wrapper import mofsl_wrapper
+from app.core.risk import instrument_key, risk_ledger
+from app.core.security import encrypt_data
+from app.main import app
+from app.models.models import Client as ClientModel, Order as OrderModel, Token as TokenModel
+
+INSTRUMENT = "11536"
+
+# Broker order IDs are unique across the whole module
+order_ids = itertools.count(1)
+
+@pytest.fixture(scope="module")
+def database(db_engine):
+    """Two clients and an instrument whose database ID is not 1"""
+    engine = db_engine
+    with Session(engine) as session:
+        for code in ("P001", "P002"):
+            session.add(ClientModel(
+                client_code=code,
+                name=f"Client {code}",
+                email=f"{code.lower()}@example.com",
+                is_active=True,
+                encrypted_mofsl_api_key_interactive=encrypt_data("key"),
+                encrypted_mofsl_secret_key_interactive=encrypt_data("secret"),
+                encrypted_mofsl_user_id_interactive=encrypt_data("user"),
+                encrypted_mofsl_password_interactive=encrypt_data("password")
+            ))
+        # Placeholder IDs are 1 - make sure the traded instrument is something else
+        session.add(TokenModel(token="1", symbol="FILLER", name="FILLER", exchange="NSE", segment="EQ", instrument_type="EQ", lot_size=1))
+        session.add(TokenModel(token=INSTRUMENT, symbol="TCS", name="TCS", exchange="NSE", segment="EQ", instrument_type="EQ", lot_size=1))
+        session.commit()
+        token_id = session.scalar(select(TokenModel.id).where(TokenModel.token == INSTRUMENT))
+        client_ids = session.scalars(select(ClientModel.id).order_by(ClientModel.id)).all()
+    assert token_id != 1
+    return engine, token_id, client_ids
+
+@pytest.fixture
+def broker(monkeypatch, auth_token):
+    """Broker with an open position in the instrument for every client"""
+    async def authenticate_client(client, segment="interactive", force_refresh=False):
+        return auth_token
+
+    async def place_order(auth_token, order_details, client_code):
+        return f"PERSIST{next(order_ids)}"
+
+    async def get_positions(auth_token, client_code):
+        return [{"token": INSTRUMENT, "exchange": "NSE", "quantity": 10, "product_type": "MIS"}]
+
+    async def get_order_book(auth_token, client_code):
+        return []
+
+    monkeypatch.setattr(mofsl_wrapper, "authenticate_client", authenticate_client)
+    monkeypatch.setattr(mofsl_wrapper, "place_order", place_order)
+    monkeypatch.setattr(mofsl_wrapper, "get_positions", get_positions)
+    monkeypatch.setattr(mofsl_wrapper, "get_order_book", get_order_book)
+
+def persisted_token_ids(engine, remarks_prefix):
+    with Session(engine) as session:
+        return session.scalars(select(OrderModel.token_id).where(OrderModel.remarks.startswith(remarks_prefix))).all()
+
+def test_execute_all_persists_the_instrument_token_id(database, broker):
+    engine, token_id, client_ids = database
+    response = TestClient(app).post("/api/v1/orders/execute-all", json={
+        "token_id": INSTRUMENT,
+        "symbol": "TCS",
+        "exchange": "NSE",
+        "order_type": "MKT",
+        "transaction_type": "BUY",
+        "margin_check": "off",
+        "client_orders": [{"client_id": client_id, "quantity": 5, "remarks": "persist entry"} for client_id in client_ids]
+    })
+    assert response.status_code == 200
+    assert response.json()["summary"]["successful_orders"] == len(client_ids)
+    assert persisted_token_ids(engine, "persist entry") == [token_id] * len(client_ids)
+
+def test_exit_all_persists_the_instrument_token_id(database, broker):
+    engine, token_id, client_ids = database
+    response = TestClient(app).post(f"/api/v1/orders/tokens/{INSTRUMENT}/exit-all", json={
+        "token_mofsl_id": INSTRUMENT,
+        "exchange": "NSE",
+        "client_filter": client_ids
+    })
+    assert response.status_code == 200
+    assert persisted_token_ids(engine, f"Exit order for {INSTRUMENT}") == [token_id] * len(client_ids)
+
+def test_kill_switch_square_off_persists_the_instrument_token_id(database, broker, fake_redis):
+    engine, token_id, client_ids = database
+    client = TestClient(app)
+    try:
+        response = client.post("/api/v1/orders/kill-switch?format=ndjson", json={
+            "confirm": True,
+            "client_filter": client_ids,
+            "cancel_open_orders": False,
+            "square_off": True,
+            "halt_entries": False
+        })
+        assert response.status_code == 200
+        summary = json.loads(response.text.splitlines()[-1])
+        assert summary["positions_squared_off"] == len(client_ids)
+        assert persisted_token_ids(engine, "Kill switch square-off") == [token_id] * len(client_ids)
+
+        # Running the kill switch again replays the exits instead of doubling them
+        response = client.post("/api/v1/orders/kill-switch?format=ndjson", json={
+            "confirm": True,
+            "client_filter": client_ids,
+            "cancel_open_orders": False,
+            "square_off": True,
+            "halt_entries": False
+        })
+        assert json.loads(response.text.splitlines()[-1])["positions_squared_off"] == len(client_ids)
+        assert len(persisted_token_ids(engine, "Kill switch square-off")) == len(client_ids)
+    finally:
+        client.post("/api/v1/orders/kill-switch/release")
+
+def test_exit_all_reports_clients_whose_positions_could_not_be_fetched(database, broker, monkeypatch):
+    engine, token_id, client_ids = database
+
+    async def get_positions(auth_token, client_code):
+        raise ValueError("positions unavailable")
+
+    monkeypatch.setattr(mofsl_wrapper, "get_positions", get_positions)
+    response = TestClient(app).post(f"/api/v1/orders/tokens/{INSTRUMENT}/exit-all", json={
+        "token_mofsl_id": INSTRUMENT,
+        "exchange": "NSE",
+        "client_filter": client_ids
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success"] is False
+    assert [result["error_message"] for result in body["results"]] == ["Failed to fetch positions: positions unavailable"] * len(client_ids)
+
+def test_execute_all_rejects_instruments_missing_from_the_master(database, broker):
+    engine, token_id, client_ids = database
+    response = TestClient(app).post("/api/v1/orders/execute-all", json={
+        "token_id": "99999",
+        "symbol": "UNMAPPED",
+        "exchange": "NSE",
+        "order_type": "MKT",
+        "transaction_type": "BUY",
+        "margin_check": "off",
+        "client_orders": [{"client_id": client_id, "quantity": 5, "remarks": "unmapped entry"} for client_id in client_ids]
+    })
+    assert response.status_code == 404
+    assert persisted_token_ids(engine, "unmapped entry") == []
+
+def test_exits_of_unmapped_instruments_are_not_booked_under_a_placeholder(database, broker, monkeypatch):
+    engine, token_id, client_ids = database
+
+    async def get_positions(auth_token, client_code):
+        return [{"token": "77777", "exchange": "NSE", "quantity": 10, "product_type": "MIS"}]
+
+    monkeypatch.setattr(mofsl_wrapper, "get_positions", get_positions)
+    response = TestClient(app).post("/api/v1/orders/tokens/77777/exit-all", json={
+        "token_mofsl_id": "77777",
+        "exchange": "NSE",
+        "client_filter": client_ids
+    })
+
+    assert response.status_code == 200
+    assert response.json()["summary"]["total_positions_exited"] == len(client_ids)
+    for client_id in client_ids:
+        snapshot = risk_ledger.snapshot(client_id) or {"instruments": {}}
+        assert instrument_key("NSE", 1) not in snapshot["instruments"]
@@ -0,0 +1,111 @@
+# File: /tests/test_order_reconciler.py
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.coordination import SharedState
+from app.core.order_book_cache import order_book_cache
+from app.core.order_reconciler import OrderReconciler
+from app.models.models import Client as ClientModel, Order as OrderModel
+
+def db_order(status="OPEN", filled_quantity=0, average_price=None):
+    return SimpleNamespace(id=7, status=status, filled_quantity=filled_quantity, average_price=average_price)
+
+def test_unchanged_order_has_no_diff():
+    entry = {"orderstatus": "Confirm", "qtytradedtoday": 0, "averageprice": 0}
+    assert OrderReconciler._diff(db_order(), entry) is None
+
+def test_unknown_broker_status_is_ignored():
+    assert OrderReconciler._diff(db_order(), {"orderstatus": "Something new"}) is None
+
+def test_fill_updates_status_quantity_and_average_price():
+    entry = {"orderstatus": "Traded", "qtytradedtoday": "10", "averageprice": "101.456"}
+    assert OrderReconciler._diff(db_order(), entry) == {
+        "id": 7,
+        "status": "COMPLETE",
+        "filled_quantity": 10,
+        "average_price": Decimal("101.46")
+    }
+
+def test_partial_fill_stays_open():
+    change = OrderReconciler._diff(db_order(), {"orderstatus": "Partial", "tradedquantity": 4, "averagetradedprice": 99.5})
+    assert change["status"] == "OPEN"
+    assert change["filled_quantity"] == 4
+    assert change["average_price"] == Decimal("99.50")
+
+def test_zero_average_price_without_fills_keeps_recorded_price():
+    change = OrderReconciler._diff(db_order(), {"orderstatus": "Cancelled", "qtytradedtoday": 0, "averageprice": 0})
+    assert change == {"id": 7, "status": "CANCELLED", "filled_quantity": 0, "average_price": None}
+
+def test_missing_fill_fields_keep_recorded_values():
+    order = db_order(status="PENDING", filled_quantity=3, average_price=Decimal("50.00"))
+    change = OrderReconciler._diff(order, {"orderstatus": "Open"})
+    assert change == {"id": 7, "status": "OPEN", "filled_quantity": 3, "average_price": Decimal("50.00")}
+
+def test_unparseable_average_price_keeps_recorded_price():
+    order = db_order(filled_quantity=5, average_price=Decimal("10.00"))
+    assert OrderReconciler._diff(order, {"orderstatus": "Open", "qtytradedtoday": 5, "averageprice": "n/a"}) is None
+
+@pytest.fixture
+def stale_orders(db_engine):
+    """One client with an open order from an earlier session and one from today"""
+    with Session(db_engine) as session:
+        client = ClientModel(client_code="R001", name="Client R001", email="r001@example.com", is_active=True)
+        session.add(client)
+        session.flush()
+        for order_id, age in (("RECON-OLD", timedelta(days=3)), ("RECON-NEW", timedelta(0))):
+            session.add(OrderModel(
+                order_id=order_id,
+                client_id=client.id,
+                token_id=1,
+                order_type="LMT",
+                transaction_type="BUY",
+                product_type="CNC",
+                quantity=5,
+                price=Decimal("10.00"),
+                status="OPEN",
+                exchange="NSE",
+                order_time=datetime.now(timezone.utc) - age
+            ))
+        session.commit()
+    yield db_engine
+    with Session(db_engine) as session:
+        for order in session.scalars(select(OrderModel).where(OrderModel.order_id.startswith("RECON-"))):
+            session.delete(order)
+        session.delete(session.scalar(select(ClientModel).where(ClientModel.client_code == "R001")))
+        session.commit()
+
+@pytest.mark.asyncio
+async def test_orders_from_earlier_sessions_missing_from_the_book_expire(stale_orders, monkeypatch):
+    async def get_book(client, segment="interactive", max_age=None):
+        return []
+
+    monkeypatch.setattr(order_book_cache, "get_book", get_book)
+    cycle = await OrderReconciler().reconcile()
+
+    assert cycle["orders_expired"] == 1
+    with Session(stale_orders) as session:
+        statuses = dict(session.execute(select(OrderModel.order_id, OrderModel.status).where(OrderModel.order_id.startswith("RECON-"))).all())
+    # Today's order may simply not be listed yet
+    assert statuses == {"RECON-OLD": "EXPIRED", "RECON-NEW": "OPEN"}
+
+@pytest.mark.asyncio
+async def test_only_the_lease_holder_reconciles(monkeypatch, fake_redis):
+    state = SharedState("redis://unused")
+    monkeypatch.setattr(state, "_client", lambda: fake_redis)
+    first = OrderReconciler(shared_state=state)
+    second = OrderReconciler(shared_state=state)
+    # Each worker process has its own owner ID
+    monkeypatch.setattr(state, "owner", "worker-1")
+    assert await first._hold_lease() is True
+    monkeypatch.setattr(state, "owner", "worker-2")
+    assert await second._hold_lease() is False
+
+    monkeypatch.setattr(state, "owner", "worker-1")
+    await first.stop()
+    monkeypatch.setattr(state, "owner", "worker-2")
+    assert await second._hold_lease() is True
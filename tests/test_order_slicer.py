@@ -0,0 +1,40 @@
+# File: /tests/test_order_slicer.py
+import pytest
+
+from app.core.order_slicer import OrderSlicer
+
+def test_quantity_below_freeze_limit_is_not_split():
+    assert OrderSlicer(lot_size=1, freeze_quantity=100).slice(100) == [100]
+
+def test_unlimited_slicer_rounds_down_to_whole_lots():
+    assert OrderSlicer(lot_size=50).slice(175) == [150]
+
+def test_full_children_first_then_remainder():
+    assert OrderSlicer(lot_size=1, freeze_quantity=100).slice(250) == [100, 100, 50]
+
+def test_child_size_is_freeze_quantity_rounded_to_lots():
+    slicer = OrderSlicer(lot_size=75, freeze_quantity=1800)
+    children = slicer.slice(4000)
+    assert slicer.max_child_quantity == 1800
+    assert children == [1800, 1800, 375]
+    assert all(child % 75 == 0 for child in children)
+
+def test_freeze_quantity_not_a_lot_multiple():
+    slicer = OrderSlicer(lot_size=50, freeze_quantity=120)
+    assert slicer.max_child_quantity == 100
+    assert slicer.slice(260) == [100, 100, 50]
+
+def test_quantity_below_one_lot_is_rejected():
+    with pytest.raises(ValueError):
+        OrderSlicer(lot_size=50).slice(49)
+
+def test_too_many_children_is_rejected():
+    slicer = OrderSlicer(lot_size=1, freeze_quantity=10, max_children=3)
+    assert slicer.slice(30) == [10, 10, 10]
+    with pytest.raises(ValueError):
+        slicer.slice(31)
+
+@pytest.mark.parametrize("lot_size, freeze_quantity", [(0, None), (50, 25)])
+def test_invalid_configuration(lot_size, freeze_quantity):
+    with pytest.raises(ValueError):
+        OrderSlicer(lot_size=lot_size, freeze_quantity=freeze_quantity)
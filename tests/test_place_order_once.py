@@ -0,0 +1,160 @@
+# File: /tests/test_place_order_once.py
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import redis.asyncio as redis
+
+from app.api import orders
+from app.config import settings
+from app.core.dispatch import DispatchPriority
+from app.core.idempotency import IdempotencyUnavailableError, OrderInProgressError, order_idempotency
+from app.core.mofsl_api_wrapper import OrderRejectedError, mofsl_wrapper
+from app.schemas.schemas import OrderCreate
+
+class FakeBroker:
+    """Broker that places orders (or fails them) and serves a tagged order book"""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)  # Exceptions raised by the next placements
+        self.placed = []
+        self.order_book = []
+
+    async def place_order(self, auth_token, order_details, client_code):
+        if self.failures:
+            failure = self.failures.pop(0)
+            if failure.get("reached_broker"):
+                self.record(order_details)
+            raise failure["error"]
+        return self.record(order_details)
+
+    def record(self, order_details):
+        order_id = f"OID{len(self.placed) + 1}"
+        self.placed.append(order_details)
+        self.order_book.append({"uniqueorderid": order_id, "orderstatus": "Confirm", "tag": order_details.tag})
+        return order_id
+
+    async def get_order_book(self, auth_token, client_code):
+        return list(self.order_book)
+
+@pytest.fixture
+def broker(monkeypatch, auth_token):
+    broker = FakeBroker()
+    monkeypatch.setattr(mofsl_wrapper, "place_order", broker.place_order)
+    monkeypatch.setattr(mofsl_wrapper, "get_order_book", broker.get_order_book)
+
+    async def authenticate_client(client, segment="interactive", force_refresh=False):
+        return auth_token
+
+    monkeypatch.setattr(mofsl_wrapper, "authenticate_client", authenticate_client)
+    return broker
+
+@pytest.fixture
+def client():
+    return SimpleNamespace(id=901, client_code="T901", max_daily_loss=None, max_position_size=None)
+
+def exit_order():
+    return OrderCreate(
+        client_id=901,
+        token_id=5,
+        order_type="MKT",
+        transaction_type="SELL",
+        product_type="MIS",
+        quantity=10,
+        exchange="NSE",
+        validity="DAY"
+    )
+
+async def place(client, order_key):
+    return await orders.place_order_once(client, exit_order(), "test-token", DispatchPriority.EXIT, "NSE", "interactive", order_key)
+
+def network_error(reached_broker=False):
+    return {"error": httpx.ConnectError("connection reset"), "reached_broker": reached_broker}
+
+@pytest.mark.asyncio
+async def test_unkeyed_order_is_placed_without_redis(broker, client):
+    assert await place(client, None) == ("OID1", False)
+    assert broker.placed[0].tag is None
+
+@pytest.mark.asyncio
+async def test_retry_with_same_key_replays_the_placed_order(fake_redis, broker, client):
+    assert await place(client, "key-replay") == ("OID1", False)
+    assert await place(client, "key-replay") == ("OID1", True)
+    assert len(broker.placed) == 1
+    assert broker.placed[0].tag == order_idempotency.order_tag("key-replay")
+
+@pytest.mark.asyncio
+async def test_network_error_after_the_order_reached_the_broker_finds_it_by_tag(fake_redis, broker, client):
+    broker.failures = [network_error(reached_broker=True)]
+    assert await place(client, "key-reached") == ("OID1", False)
+    assert len(broker.placed) == 1
+    assert await place(client, "key-reached") == ("OID1", True)
+
+@pytest.mark.asyncio
+async def test_network_error_before_the_broker_is_retried(fake_redis, broker, client, monkeypatch):
+    monkeypatch.setattr(settings, "ORDER_PLACE_TRANSPORT_RETRIES", 1)
+    broker.failures = [network_error()]
+    assert await place(client, "key-retried") == ("OID1", False)
+    assert len(broker.placed) == 1
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_release_the_key_once_the_book_shows_no_order(fake_redis, broker, client, monkeypatch):
+    monkeypatch.setattr(settings, "ORDER_PLACE_TRANSPORT_RETRIES", 1)
+    broker.failures = [network_error(), network_error()]
+    with pytest.raises(httpx.ConnectError):
+        await place(client, "key-exhausted")
+    assert broker.placed == []
+
+    # Nothing was placed, so a retry with the key places the order at once
+    assert await place(client, "key-exhausted") == ("OID1", False)
+
+@pytest.mark.asyncio
+async def test_rejected_order_releases_the_key(fake_redis, broker, client):
+    broker.failures = [{"error": OrderRejectedError("API error: insufficient funds")}]
+    with pytest.raises(OrderRejectedError):
+        await place(client, "key-rejected")
+    assert await place(client, "key-rejected") == ("OID1", False)
+
+@pytest.mark.asyncio
+async def test_server_error_after_the_order_reached_the_broker_finds_it_by_tag(fake_redis, broker, client):
+    # 5xx and unreadable responses do not say whether the order was placed
+    broker.failures = [{"error": ValueError("Request failed: HTTP 504"), "reached_broker": True}]
+    assert await place(client, "key-504") == ("OID1", False)
+    assert await place(client, "key-504") == ("OID1", True)
+    assert len(broker.placed) == 1
+
+@pytest.mark.asyncio
+async def test_server_error_releases_the_key_once_the_book_shows_no_order(fake_redis, broker, client, monkeypatch):
+    monkeypatch.setattr(settings, "ORDER_PLACE_TRANSPORT_RETRIES", 1)
+    broker.failures = [{"error": ValueError("Invalid response format: Expecting value")}]
+    with pytest.raises(ValueError):
+        await place(client, "key-garbled")
+    # Only network errors are retried
+    assert broker.placed == []
+    assert await place(client, "key-garbled") == ("OID1", False)
+
+@pytest.mark.asyncio
+async def test_pending_claim_without_a_tagged_order_is_in_progress(fake_redis, broker, client):
+    assert await order_idempotency.claim("key-pending") is None
+    with pytest.raises(OrderInProgressError):
+        await place(client, "key-pending")
+    assert broker.placed == []
+
+@pytest.mark.asyncio
+async def test_pending_claim_with_a_tagged_order_completes_it(fake_redis, broker, client):
+    assert await order_idempotency.claim("key-died") is None
+    broker.order_book.append({"uniqueorderid": "OID77", "orderstatus": "Confirm", "tag": order_idempotency.order_tag("key-died")})
+    assert await place(client, "key-died") == ("OID77", True)
+    assert await place(client, "key-died") == ("OID77", True)
+    assert broker.placed == []
+
+@pytest.mark.asyncio
+async def test_keyed_order_fails_closed_without_redis(broker, client, monkeypatch):
+    class DownRedis:
+        async def set(self, *args, **kwargs):
+            raise redis.ConnectionError("connection refused")
+
+    monkeypatch.setattr(order_idempotency, "_client", lambda: DownRedis())
+    with pytest.raises(IdempotencyUnavailableError):
+        await place(client, "key-no-redis")
+    assert broker.placed == []
@@ -0,0 +1,51 @@
+# File: /tests/test_raw_json.py
+import json
+
+import pytest
+
+from app.core.raw_json import RawJSON, as_json_array, encode_with_raw, find_top_level_value, scan_array_fields
+
+ROWS = [{"pnl": 1.5, "symbol": "A"}, {"pnl": "2", "symbol": "B"}]
+
+@pytest.mark.parametrize("envelope", [
+    {"status": "success", "message": "ok", "data": ROWS},
+    {"data": ROWS, "status": "success", "message": "ok"},
+    {"status": "success", "data": ROWS, "message": "ok"},
+    {"status": "success", "data": ROWS, "extra": [1, 2]},
+    {"status": "success", "data": ROWS, "extra": {"nested": [1]}},
+])
+def test_data_array_is_sliced_wherever_it_is(envelope):
+    for separators in ((",", ":"), (", ", ": ")):
+        body = json.dumps(envelope, separators=separators).encode()
+        value = find_top_level_value(body, "data")
+        assert json.loads(value) == ROWS
+
+def test_spliced_value_gives_valid_json():
+    body = b'{"data":[{"pnl":1}],"status":"success","message":"ok"}'
+    encoded = encode_with_raw({"success": True, "data": as_json_array(find_top_level_value(body, "data"))})
+    assert json.loads(encoded) == {"success": True, "data": [{"pnl": 1}]}
+
+def test_nested_keys_with_the_same_name_are_ignored():
+    body = b'{"meta":{"data":[1]},"data":{"rows":[{"a":1}]}}'
+    assert json.loads(find_top_level_value(body, "data")) == {"rows": [{"a": 1}]}
+
+def test_brackets_inside_strings_do_not_end_the_value():
+    body = json.dumps({"data": [{"symbol": "A]["}], "message": "x]"}).encode()
+    assert json.loads(find_top_level_value(body, "data")) == [{"symbol": "A]["}]
+
+def test_scalar_string_and_missing_values():
+    body = b'{"status": "success", "count": 12, "data": null}'
+    assert find_top_level_value(body, "status") == b'"success"'
+    assert find_top_level_value(body, "count") == b"12"
+    assert as_json_array(find_top_level_value(body, "data")) == RawJSON(b"[]")
+    assert find_top_level_value(body, "missing") is None
+
+def test_scan_array_fields_counts_rows_and_sums_numbers():
+    count, sums = scan_array_fields(json.dumps(ROWS).encode(), ["pnl"])
+    assert count == 2
+    assert float(sums["pnl"]) == 3.5
+
+    nested = json.dumps([{"pnl": 1, "legs": [{"pnl": 100}]}, {"pnl": 2}]).encode()
+    count, sums = scan_array_fields(nested, ["pnl"])
+    assert count == 2
+    assert float(sums["pnl"]) == 3
@@ -0,0 +1,34 @@
+# File: /tests/test_responses.py
+from starlette.requests import Request
+
+from app.core.compression import encoded_etag
+from app.core.responses import compute_etag, conditional_json_response
+
+def request_with(if_none_match=None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+def test_etag_is_weak_and_ignores_timestamps():
+    first = compute_etag(b'{"data":[1],"timestamp":"2026-10-18T10:00:00"}')
+    second = compute_etag(b'{"data":[1],"timestamp":"2026-10-18T10:00:05"}')
+    assert first.startswith('W/"')
+    assert first == second
+    assert compute_etag(b'{"data":[2],"timestamp":"2026-10-18T10:00:00"}') != first
+
+def test_current_snapshot_answers_not_modified():
+    content = {"data": [1, 2, 3]}
+    etag = conditional_json_response(request_with(), content).headers["etag"]
+
+    response = conditional_json_response(request_with(etag), content)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    # Compressed representations and strong forms of the tag match too
+    assert conditional_json_response(request_with(encoded_etag(etag, "gzip")), content).status_code == 304
+    assert conditional_json_response(request_with(etag[2:]), content).status_code == 304
+
+def test_changed_snapshot_is_sent_again():
+    etag = conditional_json_response(request_with(), {"data": [1]}).headers["etag"]
+    response = conditional_json_response(request_with(etag), {"data": [2]})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
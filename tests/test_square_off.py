@@ -0,0 +1,122 @@
+# File: /tests/test_square_off.py
+import itertools
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+import redis.asyncio as redis
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api import orders
+from app.config import settings
+from app.core.coordination import shared_state
+from app.core.mofsl_api_wrapper import mofsl_wrapper
+from app.core.security import encrypt_data
+from app.main import app
+from app.models.models import Client as ClientModel, Token as TokenModel
+
+INSTRUMENT = "2885"
+UNLABELLED = "3045"
+
+# Broker order IDs are unique across the whole module
+order_ids = itertools.count(1)
+
+@pytest.fixture(scope="module")
+def clients(db_engine):
+    """Two clients squared off by these tests"""
+    with Session(db_engine) as session:
+        for code in ("Q001", "Q002"):
+            session.add(ClientModel(
+                client_code=code,
+                name=f"Client {code}",
+                email=f"{code.lower()}@example.com",
+                is_active=True,
+                encrypted_mofsl_api_key_interactive=encrypt_data("key"),
+                encrypted_mofsl_secret_key_interactive=encrypt_data("secret"),
+                encrypted_mofsl_user_id_interactive=encrypt_data("user"),
+                encrypted_mofsl_password_interactive=encrypt_data("password")
+            ))
+        session.add(TokenModel(token=INSTRUMENT, symbol="RELIANCE", name="RELIANCE", exchange="NSE", segment="EQ", instrument_type="EQ", lot_size=1))
+        session.commit()
+        return session.scalars(select(ClientModel.id).where(ClientModel.client_code.in_(("Q001", "Q002"))).order_by(ClientModel.id)).all()
+
+@pytest.fixture
+def broker(monkeypatch, auth_token):
+    """Broker whose intraday position closes once an exit is placed"""
+    placed = []
+
+    async def authenticate_client(client, segment="interactive", force_refresh=False):
+        return auth_token
+
+    async def place_order(auth_token, order_details, client_code):
+        placed.append((client_code, order_details))
+        return f"SQOFF{next(order_ids)}"
+
+    async def get_positions(auth_token, client_code):
+        # A position without a product type is reported but never squared off
+        positions = [{"token": UNLABELLED, "exchange": "NSE", "quantity": 5}]
+        if not any(code == client_code for code, _ in placed):
+            positions.append({"token": INSTRUMENT, "exchange": "NSE", "quantity": 10, "product_type": "MIS"})
+        return positions
+
+    async def get_order_book(auth_token, client_code):
+        return [{"uniqueorderid": "OPEN1", "orderstatus": "Confirm", "exchange": "NSE"}]
+
+    monkeypatch.setattr(mofsl_wrapper, "authenticate_client", authenticate_client)
+    monkeypatch.setattr(mofsl_wrapper, "place_order", place_order)
+    monkeypatch.setattr(mofsl_wrapper, "get_positions", get_positions)
+    monkeypatch.setattr(mofsl_wrapper, "get_order_book", get_order_book)
+    monkeypatch.setattr(settings, "SQUARE_OFF_RETRY_DELAY_SECONDS", 0)
+    return placed
+
+def test_square_off_report_skips_positions_without_a_product_type(clients, broker, fake_redis):
+    with TestClient(app) as client:
+        response = client.post("/api/v1/orders/square-off?format=ndjson", json={"exchanges": ["NSE"], "client_filter": clients})
+        assert response.status_code == 200
+        summary = json.loads(response.text.splitlines()[-1])
+        report = client.get("/api/v1/orders/square-off/report").json()["data"]
+
+    assert report["status"] == "COMPLETED"
+    assert (summary["positions_found"], summary["positions_closed"], summary["exit_orders_placed"]) == (2, 2, 2)
+    # The order book entry has no product type either, so it is not cancelled
+    assert summary["orders_cancelled"] == 0
+    assert len(broker) == 2
+    for client_report in report["clients"]:
+        assert client_report["status"] == "CLOSED"
+        assert [position["token"] for position in client_report["positions"]] == [INSTRUMENT]
+        assert client_report["positions"][0]["product_type"] == "MIS"
+
+@pytest.mark.asyncio
+async def test_scheduled_square_off_runs_in_one_worker(monkeypatch):
+    started = []
+
+    async def start_square_off(request, trigger, run_id=None):
+        started.append((request.exchanges, trigger, run_id))
+
+    monkeypatch.setattr(orders, "start_square_off", start_square_off)
+    run_at = datetime(2026, 10, 19, 15, 15, tzinfo=ZoneInfo("Asia/Kolkata"))
+
+    # Every worker's scheduler fires at the same cut-off
+    await orders.run_scheduled_square_off(["NSE", "BSE"], run_at)
+    await orders.run_scheduled_square_off(["NSE", "BSE"], run_at)
+
+    assert started == [(["NSE", "BSE"], "scheduled", "2026-10-19")]
+
+@pytest.mark.asyncio
+async def test_scheduled_square_off_is_skipped_when_the_run_cannot_be_claimed(monkeypatch):
+    started = []
+
+    async def start_square_off(request, trigger, run_id=None):
+        started.append(trigger)
+
+    def unreachable():
+        raise redis.ConnectionError("Redis is down")
+
+    monkeypatch.setattr(orders, "start_square_off", start_square_off)
+    monkeypatch.setattr(shared_state, "_client", unreachable)
+    await orders.run_scheduled_square_off(["MCX"], datetime(2026, 10, 19, 23, 25, tzinfo=ZoneInfo("Asia/Kolkata")))
+
+    assert started == []
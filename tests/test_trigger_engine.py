@@ -0,0 +1,121 @@
+# File: /tests/test_trigger_engine.py
+import asyncio
+import itertools
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.risk import instrument_key
+from app.core.trigger_engine import TriggerBook, TriggerEngine
+from app.models.models import ConditionalOrder as ConditionalOrderModel
+
+INSTRUMENT = instrument_key("NSE", 42)
+
+# Labels the orders of each test
+symbols = itertools.count(1)
+
+def conditional(trigger_type="STOP_LOSS", transaction_type="SELL", trigger_price=None, trail_amount=None, reference_price=None):
+    return ConditionalOrderModel(
+        client_id=1,
+        token_id=42,
+        trigger_type=trigger_type,
+        trigger_price=Decimal(str(trigger_price)) if trigger_price is not None else None,
+        trail_amount=Decimal(str(trail_amount)) if trail_amount is not None else None,
+        reference_price=Decimal(str(reference_price)) if reference_price is not None else None,
+        symbol=f"GTT{next(symbols)}",
+        exchange="NSE",
+        order_type="MKT",
+        transaction_type=transaction_type,
+        product_type="MIS",
+        quantity=1
+    )
+
+def engine_placing_into(placed):
+    engine = TriggerEngine()
+
+    async def execute(order):
+        placed.append(order.id)
+        return f"BROKER-{order.id}"
+
+    engine.execute = execute
+    return engine
+
+async def placements(*engines):
+    for engine in engines:
+        if engine._placing:
+            await asyncio.gather(*engine._placing)
+
+def test_fixed_levels_fire_once_crossed():
+    book = TriggerBook()
+    stop, target = conditional(trigger_price=95), conditional("TARGET", trigger_price=110)
+    book.falling.add(95.0, 1, stop)
+    book.rising.add(-110.0, 2, target)
+
+    assert book.on_tick(100.0) == []
+    assert book.on_tick(94.5) == [(stop, 95.0)]
+    assert book.on_tick(111.0) == [(target, 110.0)]
+    assert len(book) == 0
+
+def test_trailing_stop_follows_the_high():
+    book = TriggerBook()
+    trailing = conditional("TRAILING_STOP", trail_amount=5, reference_price=100)
+    book.trailing_sells.add(5.0, 1, trailing, 100.0)
+
+    assert book.on_tick(96.0) == []
+    assert book.on_tick(120.0) == []
+    assert book.trailing_sells.peak_of(1) == 120.0
+    # 100 - 5 would not fire any more; 120 - 5 does
+    assert book.on_tick(115.0) == [(trailing, 115.0)]
+
+@pytest.mark.asyncio
+async def test_a_trigger_firing_in_two_workers_is_placed_once(db_engine):
+    placed = []
+    worker_a, worker_b = engine_placing_into(placed), engine_placing_into(placed)
+    order = await worker_a.add(conditional(trigger_price=95))
+    await worker_b.sync()
+
+    assert worker_a.on_tick(INSTRUMENT, 94.0) == 1
+    assert worker_b.on_tick(INSTRUMENT, 94.0) == 1
+    await placements(worker_a, worker_b)
+
+    assert placed == [order.id]
+    with Session(db_engine) as session:
+        stored = session.get(ConditionalOrderModel, order.id)
+        assert (stored.status, stored.order_id, stored.placement_attempts) == ("PLACED", f"BROKER-{order.id}", 1)
+
+@pytest.mark.asyncio
+async def test_orders_cancelled_through_another_worker_are_disarmed(db_engine):
+    placed = []
+    worker_a, worker_b = engine_placing_into(placed), engine_placing_into(placed)
+    order = await worker_a.add(conditional(trigger_price=95))
+
+    # Not armed in worker B yet - the cancel still goes through
+    cancelled = await worker_b.cancel(order.id)
+    assert cancelled.status == "CANCELLED"
+    with pytest.raises(KeyError):
+        await worker_a.cancel(order.id)
+
+    assert await worker_a.sync() == 1
+    assert worker_a.on_tick(INSTRUMENT, 90.0) == 0
+    assert placed == []
+
+@pytest.mark.asyncio
+async def test_trailing_water_marks_are_shared_and_never_moved_back(db_engine):
+    placed = []
+    worker_a, worker_b = engine_placing_into(placed), engine_placing_into(placed)
+    order = await worker_a.add(conditional("TRAILING_STOP", trail_amount=5, reference_price=100))
+    await worker_b.sync()
+
+    worker_a.on_tick(INSTRUMENT, 130.0)
+    worker_b.on_tick(INSTRUMENT, 128.0)
+    await worker_a.flush()
+    await worker_b.flush()
+    with Session(db_engine) as session:
+        assert session.get(ConditionalOrderModel, order.id).reference_price == Decimal("130.00")
+
+    await worker_b.sync()
+    assert worker_b.live_levels(order.id) == {"reference_price": Decimal("130.00"), "trigger_price": Decimal("125.00")}
+    assert worker_b.on_tick(INSTRUMENT, 124.0) == 1
+    await placements(worker_b)
+    assert placed == [order.id]
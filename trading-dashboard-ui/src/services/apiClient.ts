@@ -31,12 +31,8 @@ const apiClient: AxiosInstance = axios.create(API_CONFIG);
 // Request interceptor
 apiClient.interceptors.request.use(
   (config: InternalAxiosRequestConfig) => {
-    // Add timestamp to prevent caching
-    if (config.params) {
-      config.params._t = new Date().getTime();
-    } else {
-      config.params = { _t: new Date().getTime() };
-    }
+    // No cache-busting params: read endpoints send ETags with no-cache, so the
+    // browser revalidates with If-None-Match and gets a 304 when nothing changed
 
     // Add authentication token if available
     const token = localStorage.getItem('auth_token');
@@ -220,13 +216,17 @@ export const api = {
       api.get<any>(`/api/v1/portfolio/clients/${clientId}`, { params }),
 
     // Get client positions
-    getClientPositions: (clientId: number, params?: { segment?: string }) =>
+    getClientPositions: (clientId: number, params?: { segment?: string; raw?: boolean }) =>
       api.get<any>(`/api/v1/portfolio/clients/${clientId}/positions`, { params }),
 
     // Get client holdings
-    getClientHoldings: (clientId: number, params?: { segment?: string }) =>
+    getClientHoldings: (clientId: number, params?: { segment?: string; raw?: boolean }) =>
       api.get<any>(`/api/v1/portfolio/clients/${clientId}/holdings`, { params }),
 
+    // Get portfolio data for many clients in one request
+    getClientsBatch: (data: { client_ids: number[]; fields?: string[]; segment?: string; max_concurrent?: number }) =>
+      api.post<any>('/api/v1/portfolio/clients:batch', data),
+
     // Get dashboard stats
     getDashboardStats: () =>
       api.get<any>('/api/v1/portfolio/dashboard/stats'),
@@ -245,6 +245,34 @@ export const api = {
     executeBatch: (orderData: any) =>
       api.post<any>('/api/v1/orders/execute-all', orderData),
 
+    // Submit a batch order job (runs in the background)
+    submitBatchJob: (orderData: any) =>
+      api.post<any>('/api/v1/orders/batches', orderData),
+
+    // Get batch job status and results
+    getBatchJob: (batchId: string, params?: { skip?: number; limit?: number }) =>
+      api.get<any>(`/api/v1/orders/batches/${batchId}`, { params }),
+
+    // Server-Sent Events URL for live batch job results
+    getBatchJobEventsUrl: (batchId: string) =>
+      `${API_CONFIG.baseURL}/api/v1/orders/batches/${batchId}/events`,
+
+    // Kill switch: cancel all open orders (optionally square off); streams per-client results
+    engageKillSwitch: (killSwitchData: any) =>
+      api.post<string>('/api/v1/orders/kill-switch?format=ndjson', killSwitchData, { responseType: 'text' }),
+
+    // Kill switch status (entry halt and last run)
+    getKillSwitchStatus: () =>
+      api.get<any>('/api/v1/orders/kill-switch'),
+
+    // Server-Sent Events URL for the running (or last) kill switch run
+    getKillSwitchEventsUrl: () =>
+      `${API_CONFIG.baseURL}/api/v1/orders/kill-switch/events`,
+
+    // Release the kill switch so new entries are accepted
+    releaseKillSwitch: () =>
+      api.post<any>('/api/v1/orders/kill-switch/release'),
+
     // Exit all positions for token
     exitAllPositions: (tokenId: string, exitData: any) =>
       api.post<any>(`/api/v1/orders/tokens/${tokenId}/exit-all`, exitData),